@@ -0,0 +1,76 @@
+"""
+Render cost against the number of instruments
+Creates engines with 4 to 64 instruments, holds one note on every instrument
+and times render_voice_block. With the workspaces sized from the instruction
+lists the cost per instrument should stay flat, so the total is linear in the
+number of instruments.
+
+Run from the editor directory after building the extension:
+    python benchmarks/instrument_scaling.py
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+# pylint: disable=wrong-import-position
+from editor.audio.engine_math import SAMPLES_PER_NOTE
+from editor.audio.synth_wrapper import SynthWrapper
+
+INSTRUMENT_COUNTS = (4, 8, 16, 32, 64)
+
+
+def time_blocks(num_instruments: int, num_blocks: int, note: int) -> tuple:
+    """Time the voice blocks of an engine with one held note per instrument
+
+    Args:
+        num_instruments: Number of instruments of the engine
+        num_blocks: Number of SAMPLES_PER_NOTE blocks to render
+        note: Note played on every instrument
+
+    Returns:
+        Tuple (seconds per block, bytes of instrument data)
+    """
+    wrapper = SynthWrapper(num_instruments)
+    # Every voice is rendered, however long the block takes
+    wrapper.set_cpu_budget(0)
+    for instrument in range(num_instruments):
+        wrapper.voice_note_on(instrument, note)
+    wrapper.render_voice_block(SAMPLES_PER_NOTE)
+
+    start = time.perf_counter()
+    for _ in range(num_blocks):
+        wrapper.render_voice_block(SAMPLES_PER_NOTE)
+    elapsed = time.perf_counter() - start
+    return elapsed / num_blocks, wrapper.engine.get_synth_data_size()
+
+
+def main():
+    """Print the block cost per instrument count and the linear fit"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--blocks', type=int, default=20, help='blocks rendered per engine')
+    parser.add_argument('--note', type=int, default=60, help='note held on every instrument')
+    args = parser.parse_args()
+
+    counts = np.array(INSTRUMENT_COUNTS)
+    seconds = []
+    print(f"{'instruments':>11} {'data bytes':>10} {'ms/block':>9} {'us/instrument':>13}")
+    for count in counts:
+        block, data_size = time_blocks(int(count), args.blocks, args.note)
+        seconds.append(block)
+        print(f"{count:>11} {data_size:>10} {block * 1e3:>9.3f} {block / count * 1e6:>13.1f}")
+
+    slope, intercept = np.polyfit(counts, seconds, 1)
+    fitted = slope * counts + intercept
+    deviation = np.max(np.abs(np.array(seconds) - fitted) / fitted)
+    print(f"Linear fit: {slope * 1e6:.1f} us per instrument + {intercept * 1e6:.1f} us, "
+          f"largest deviation {deviation:.1%}")
+
+
+if __name__ == '__main__':
+    main()
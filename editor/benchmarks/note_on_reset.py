@@ -0,0 +1,80 @@
+"""
+Cost of note-on in dense note patterns
+Plays one note every few samples on every instrument and times the song
+render against the same block without events. A note-on resets only the
+workspace words the instructions of the instrument use, so the cost per
+note-on should stay small next to the cost of a rendered sample.
+
+Run from the editor directory after building the extension:
+    python benchmarks/note_on_reset.py
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+# pylint: disable=wrong-import-position
+from editor.audio.engine_math import SAMPLES_PER_NOTE
+from editor.audio.note_events import NOTE_EVENT_DTYPE, NOTE_EVENT_END, NOTE_EVENT_ON
+from editor.audio.synth_wrapper import SynthWrapper
+
+NOTE_SPACINGS = (None, 1024, 256, 64, 16)
+
+
+def dense_events(spacing: int, note: int) -> np.ndarray:
+    """Build an event list starting a note every spacing samples of the first block
+
+    Args:
+        spacing: Samples between note-ons, None for no events
+        note: Note to start
+
+    Returns:
+        Event list with NOTE_EVENT_DTYPE, ending with the end marker
+    """
+    samples = np.arange(0, SAMPLES_PER_NOTE, spacing) if spacing else np.zeros(0)
+    events = np.zeros(len(samples) + 1, dtype=NOTE_EVENT_DTYPE)
+    events['sample'][:-1] = samples
+    events['note'][:-1] = note
+    events['kind'][:-1] = NOTE_EVENT_ON
+    events['sample'][-1] = NOTE_EVENT_END
+    return events
+
+
+def main():
+    """Print the block cost per note spacing and the cost of one note-on"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--blocks', type=int, default=20, help='blocks rendered per spacing')
+    parser.add_argument('--note', type=int, default=60, help='note started by the events')
+    args = parser.parse_args()
+
+    wrapper = SynthWrapper()
+    num_instruments = wrapper.engine.get_num_instruments()
+    baseline = None
+    print(f"{'spacing':>8} {'note-ons':>8} {'ms/block':>9} {'us/note-on':>10}")
+    for spacing in NOTE_SPACINGS:
+        events = dense_events(spacing, args.note)
+        for instrument in range(num_instruments):
+            wrapper.set_note_events(instrument, events)
+        wrapper.render_note()
+
+        start = time.perf_counter()
+        for _ in range(args.blocks):
+            wrapper.render_note()
+        block = (time.perf_counter() - start) / args.blocks
+        note_ons = (len(events) - 1) * num_instruments
+        if baseline is None:
+            baseline = block
+            cost = ''
+        else:
+            cost = f"{(block - baseline) / note_ons * 1e6:>10.3f}"
+        print(f"{spacing or '-':>8} {note_ons:>8} {block * 1e3:>9.3f} {cost:>10}")
+    wrapper.compile_note_events()
+
+
+if __name__ == '__main__':
+    main()
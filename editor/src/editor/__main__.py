@@ -2,14 +2,21 @@
 """
 Module entry point for running the 4K Softsynth Editor as a package
 Usage: python -m editor
+       python -m editor render [options] OUTPUT   (headless, see editor.render)
 """
 
 import sys
-from editor.gui.editor import Editor
 
 
-def main():
+def main(argv=None):
     """Main entry point"""
+    argv = sys.argv[1:] if argv is None else argv
+    # The renderer runs without a display, import nothing of the GUI for it
+    if argv and argv[0] == 'render':
+        from editor.render import main as render_main  # pylint: disable=import-outside-toplevel
+        return render_main(argv[1:])
+
+    from editor.gui.editor import Editor  # pylint: disable=import-outside-toplevel
     app = Editor()
     return app.run()
 
@@ -3,7 +3,15 @@ Audio package for 4K Softsynth Editor
 Contains audio processing and synthesizer integration components
 """
 
-from .synth_wrapper import SynthWrapper
-from .audio_device import AudioDevice
-
 __all__ = ['SynthWrapper', 'AudioDevice']
+
+
+def __getattr__(name):
+    """Import the components on first use, headless renders never load PyAudio"""
+    if name == 'SynthWrapper':
+        from .synth_wrapper import SynthWrapper  # pylint: disable=import-outside-toplevel
+        return SynthWrapper
+    if name == 'AudioDevice':
+        from .audio_device import AudioDevice  # pylint: disable=import-outside-toplevel
+        return AudioDevice
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -55,6 +55,10 @@ class AudioDevice:
         self._playback_thread = None
         self._stop_playback = threading.Event()
         self._playback_callback = None
+        # Samples handed to the running non-blocking playback by swap_samples
+        self._swap_lock = threading.Lock()
+        self._swap_open = False
+        self._swap_replacement = None
 
         # Logging
         self.logger = logging.getLogger(__name__)
@@ -116,6 +120,17 @@ class AudioDevice:
         if not isinstance(samples, np.ndarray):
             samples = np.array(samples, dtype=np.float32)
 
+        samples = self._prepare_samples(samples)
+
+        # Store callback
+        self._playback_callback = callback
+
+        if blocking:
+            return self._play_samples_blocking(samples)
+        return self._play_samples_async(samples)
+
+    def _prepare_samples(self, samples: np.ndarray) -> np.ndarray:
+        """Match the samples to the device channels and clip them to the valid range"""
         # Convert to correct number of channels if needed
         if len(samples.shape) == 1 and self.channels > 1:
             # Mono to multi-channel: duplicate the mono signal
@@ -130,29 +145,21 @@ class AudioDevice:
                 samples = samples[:, :self.channels]
 
         # Ensure samples are in valid range
-        samples = np.clip(samples, -1.0, 1.0)
+        return np.clip(samples, -1.0, 1.0)
 
-        # Store callback
-        self._playback_callback = callback
-
-        if blocking:
-            return self._play_samples_blocking(samples)
-        return self._play_samples_async(samples)
+    def _encode(self, samples: np.ndarray) -> bytes:
+        """Convert samples to the stream format"""
+        if self.format_bits == 16:
+            return (samples * self.sample_max).astype(np.int16).tobytes()
+        return samples.astype(np.float32).tobytes()
 
     def _play_samples_blocking(self, samples: np.ndarray) -> bool:
         """Play samples in blocking mode"""
         try:
             self.is_playing = True
 
-            # Convert samples to the correct format
-            if self.format_bits == 16:
-                audio_data = (samples * self.sample_max).astype(np.int16)
-            else:
-                audio_data = samples.astype(np.float32)
-
             # Convert to bytes and play
-            audio_bytes = audio_data.tobytes()
-            self.stream.write(audio_bytes)
+            self.stream.write(self._encode(samples))
 
             self.is_playing = False
 
@@ -173,6 +180,9 @@ class AudioDevice:
             self.stop()
 
         self._stop_playback.clear()
+        with self._swap_lock:
+            self._swap_open = True
+            self._swap_replacement = None
         self._playback_thread = threading.Thread(
             target=self._playback_worker,
             args=(samples,)
@@ -182,14 +192,72 @@ class AudioDevice:
         return True
 
     def _playback_worker(self, samples: np.ndarray):
-        """Worker thread for non-blocking playback"""
+        """Worker thread for non-blocking playback
+
+        Writes chunk by chunk so that stop() and swap_samples() take effect
+        within one chunk.
+        """
         try:
-            self._play_samples_blocking(samples)
+            self.is_playing = True
+            position = 0
+            while not self._stop_playback.is_set():
+                chunk = samples[position:position + self.chunk_size]
+                with self._swap_lock:
+                    replacement, self._swap_replacement = self._swap_replacement, None
+                if replacement is not None:
+                    samples = replacement
+                    chunk = self._crossfade(
+                        chunk, samples[position:position + self.chunk_size])
+                if len(chunk) == 0:
+                    break
+                self.stream.write(self._encode(chunk))
+                position += len(chunk)
+
+            if not self._stop_playback.is_set() and self._playback_callback:
+                self._playback_callback()
         except (OSError, IOError, ValueError) as e:
             self.logger.error("Playback worker error: %s", e)
         finally:
+            with self._swap_lock:
+                self._swap_open = False
             self.is_playing = False
 
+    @staticmethod
+    def _crossfade(old: np.ndarray, new: np.ndarray) -> np.ndarray:
+        """Fade from one chunk to another, the shorter one continues as silence"""
+        length = max(len(old), len(new))
+        ramp = np.linspace(0.0, 1.0, length, endpoint=False, dtype=np.float32)
+        if old.ndim == 2:
+            ramp = ramp[:, np.newaxis]
+        padding = [(0, 0)] * old.ndim
+        padding[0] = (0, length - len(old))
+        old = np.pad(old, padding)
+        padding[0] = (0, length - len(new))
+        new = np.pad(new, padding)
+        return old * (1.0 - ramp) + new * ramp
+
+    def swap_samples(self, samples: np.ndarray) -> bool:
+        """Replace the samples of the running non-blocking playback
+
+        Playback continues at the same position in the new samples, with one
+        chunk crossfaded, e.g. to swap an approximation of a note for the
+        exact render once it is ready. Safe to call from any thread.
+
+        Args:
+            samples: NumPy array of audio samples (float values -1.0 to 1.0)
+
+        Returns:
+            True if a non-blocking playback was running and takes the samples
+        """
+        if not isinstance(samples, np.ndarray):
+            samples = np.array(samples, dtype=np.float32)
+        samples = self._prepare_samples(samples)
+        with self._swap_lock:
+            if not self._swap_open:
+                return False
+            self._swap_replacement = samples
+        return True
+
     def stop(self):
         """Stop current audio playback"""
         if self.is_playing:
@@ -0,0 +1,96 @@
+"""
+Audio files written block by block
+Writes rendered samples as WAV or as raw float32 while they are rendered, so
+long renders never hold the whole song in memory
+"""
+
+import struct
+from pathlib import Path
+
+import numpy as np
+
+# Output formats: float32 WAV, 16-bit PCM WAV and headerless little-endian float32
+AUDIO_FORMATS = ('wav', 'wav16', 'raw')
+
+WAVE_FORMAT_PCM = 1
+WAVE_FORMAT_IEEE_FLOAT = 3
+# RIFF header, fmt chunk and the header of the data chunk
+_WAV_HEADER = struct.Struct('<4sI4s4sIHHIIHH4sI')
+
+
+def format_for_path(path) -> str:
+    """Get the output format implied by a file extension, raw for anything but .wav"""
+    return 'wav' if Path(path).suffix.lower() == '.wav' else 'raw'
+
+
+class AudioFileWriter:
+    """Mono audio file that is written one block of samples at a time
+
+    The WAV header is written first with empty sizes and completed when the
+    file is closed.
+    """
+
+    def __init__(self, path, sample_rate: int, audio_format: str = 'wav'):
+        """Create the file and write its header
+
+        Args:
+            path: Path of the file
+            sample_rate: Sample rate in Hz, stored in WAV headers
+            audio_format: One of AUDIO_FORMATS
+
+        Raises:
+            ValueError: For unknown formats
+            OSError: If the file cannot be created
+        """
+        if audio_format not in AUDIO_FORMATS:
+            raise ValueError(f"Unknown audio format {audio_format!r}, use one of {AUDIO_FORMATS}")
+        self.path = Path(path)
+        self.sample_rate = sample_rate
+        self.audio_format = audio_format
+        self.num_samples = 0
+        self._file = open(self.path, 'wb')  # pylint: disable=consider-using-with
+        if audio_format != 'raw':
+            self._file.write(self._header())
+
+    @property
+    def sample_size(self) -> int:
+        """Bytes per stored sample"""
+        return 2 if self.audio_format == 'wav16' else 4
+
+    def _header(self) -> bytes:
+        """Pack the WAV header for the samples written so far"""
+        data_size = self.num_samples * self.sample_size
+        tag = WAVE_FORMAT_PCM if self.audio_format == 'wav16' else WAVE_FORMAT_IEEE_FLOAT
+        return _WAV_HEADER.pack(b'RIFF', _WAV_HEADER.size - 8 + data_size, b'WAVE',
+                                b'fmt ', 16, tag, 1, self.sample_rate,
+                                self.sample_rate * self.sample_size, self.sample_size,
+                                8 * self.sample_size, b'data', data_size)
+
+    def write(self, samples: np.ndarray) -> None:
+        """Append a block of samples
+
+        Args:
+            samples: Float samples, clipped to [-1, 1] for 16-bit PCM
+        """
+        samples = np.asarray(samples, dtype=np.float32)
+        if self.audio_format == 'wav16':
+            data = (np.clip(samples, -1.0, 1.0) * 32767).astype('<i2')
+        else:
+            data = samples.astype('<f4', copy=False)
+        self._file.write(data.tobytes())
+        self.num_samples += len(samples)
+
+    def close(self) -> None:
+        """Complete the header and close the file"""
+        if self._file.closed:
+            return
+        if self.audio_format != 'raw':
+            self._file.seek(0)
+            self._file.write(self._header())
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,180 @@
+"""
+Float32 replicas of the ARM64 synthesizer math
+Mirrors the constants and helper routines in softsynth.asm so that editor
+views can be computed with NumPy instead of rendering audio
+"""
+
+import numpy as np
+
+# Engine constants (softsynth/include/defines.h)
+SAMPLE_RATE = 44100
+BEATS_PER_MINUTE = 125
+NOTES_PER_BEAT = 4
+SAMPLES_PER_NOTE = 60 * SAMPLE_RATE // (BEATS_PER_MINUTE * NOTES_PER_BEAT)
+MAX_NUM_INSTRUMENTS = 4
+PATTERNS_PER_INSTRUMENT = 62
+NOTES_PER_PATTERN = 16
+NOTES_PER_SONG = PATTERNS_PER_INSTRUMENT * NOTES_PER_PATTERN
+HLD = 1
+
+ENVELOPE_ID = 1
+OSCILLATOR_ID = 2
+STOREVAL_ID = 3
+OPERATION_ID = 4
+FILTER_ID = 5
+PANNING_ID = 6
+OUTPUT_ID = 7
+ACCUMULATE_ID = 8
+INSTRUMENT_END = 0
+
+OSCILLATOR_SINE = 0x01
+OSCILLATOR_SQUARE = 0x02
+OSCILLATOR_SAW = 0x04
+OSCILLATOR_TRIANGLE = 0x08
+OSCILLATOR_NOISE = 0x10
+OSCILLATOR_LFO = 0x20
+
+FILTER_LOWPASS = 1
+FILTER_HIGHPASS = 2
+FILTER_BANDSTOP = 3
+FILTER_BANDPASS = 4
+FILTER_ALLPASS = 7
+FILTER_PEAK = 8
+
+# Envelope states (softsynth/src/arm64/common.asm)
+ENV_STATE_ATTACK = 0
+ENV_STATE_DECAY = 1
+ENV_STATE_SUSTAIN = 2
+ENV_STATE_RELEASE = 3
+ENV_STATE_OFF = 4
+
+# Literal pool of softsynth.asm, rounded to float32 exactly like the assembler
+ZERO = np.float32(0.0)
+HALF = np.float32(0.5)
+ONE = np.float32(1.0)
+INV_128 = np.float32(0.0078125)
+INV_12 = np.float32(0.0833333)
+PI = np.float32(3.1415927)
+PI2 = np.float32(6.283185307)
+FREQUENCY_BASE = np.float32(0.000185392)
+LFO_FREQUENCY_BASE = np.float32(0.000041106)
+COS_C4 = np.float32(0.04166667)
+TWENTY_FOUR = np.float32(24.0)
+PWR_C1 = np.float32(0.693147)
+PWR_C2 = np.float32(0.240226)
+PWR_C3 = np.float32(0.0555041)
+PWR_C4 = np.float32(0.00961812)
+
+
+def samples_per_note(sample_rate: int = SAMPLE_RATE,
+                     beats_per_minute: int = BEATS_PER_MINUTE) -> int:
+    """Compute the note length of the engine at a sample rate and tempo
+
+    Args:
+        sample_rate: Sample rate in Hz
+        beats_per_minute: Tempo in BPM
+
+    Returns:
+        Number of samples per pattern row, like SynthEngine::update_timing
+    """
+    return 60 * sample_rate // (beats_per_minute * NOTES_PER_BEAT)
+
+
+def rate_constants(sample_rate: int = SAMPLE_RATE):
+    """Compute the sample-rate constants the editor engine keeps in synth_layout
+
+    The literals of softsynth.asm are tuned for SAMPLE_RATE. The ratio is
+    exactly 1 at SAMPLE_RATE, so the constants equal the literals there.
+
+    Args:
+        sample_rate: Sample rate in Hz
+
+    Returns:
+        Tuple of the float32 frequency base, LFO frequency base and the scale
+        of the envelope steps and filter frequencies
+    """
+    ratio = SAMPLE_RATE / sample_rate
+    return (np.float32(0.000185392 * ratio), np.float32(0.000041106 * ratio),
+            np.float32(ratio))
+
+
+def transform(values) -> np.ndarray:
+    """Scale raw parameter bytes to the [0..1] range used by the VM
+
+    Args:
+        values: Raw parameter byte values
+
+    Returns:
+        Float32 array of values * (1/128), as computed by transform_values
+    """
+    return np.asarray(values, dtype=np.float32) * INV_128
+
+
+def pwr(x) -> np.ndarray:
+    """Compute 2^x exactly as the engine's pwr routine does
+
+    The integer part is truncated towards zero and applied as a power of two
+    (clamped to +/-30), the fractional part goes through the engine's 4th
+    order polynomial. Every intermediate step is rounded to float32.
+
+    Args:
+        x: Exponent value(s)
+
+    Returns:
+        Float32 array with the engine approximation of 2^x
+    """
+    x = np.asarray(x, dtype=np.float32)
+    int_part = np.trunc(x)
+    frac = x - int_part
+
+    term = PWR_C1 * frac
+    result = ONE + term
+    term = PWR_C2 * (frac * frac)
+    result = result + term
+    term = PWR_C3 * (term * frac)
+    result = result + term
+    term = PWR_C4 * (term * frac)
+    result = result + term
+
+    exponent = np.clip(int_part, -30, 30).astype(np.int64)
+    scale = np.ldexp(ONE, np.abs(exponent)).astype(np.float32)
+    result = np.where(exponent > 0, result * scale,
+                      np.where(exponent < 0, result / scale, result))
+    return np.where(x == ZERO, ONE, result).astype(np.float32)
+
+
+def frac(x) -> np.ndarray:
+    """Wrap value(s) into [0..1) the way the oscillator wraps its phase
+
+    Args:
+        x: Values in the range [-1..1)
+
+    Returns:
+        Float32 array of (x + 1) - floor(x + 1)
+    """
+    shifted = np.asarray(x, dtype=np.float32) + ONE
+    return shifted - np.floor(shifted)
+
+
+def cosine_waveform(phase, color) -> np.ndarray:
+    """Evaluate the engine's polynomial cosine waveform
+
+    Args:
+        phase: Oscillator phase value(s) in [0..1)
+        color: Color value(s); the cosine cycle is squeezed into [0..color]
+
+    Returns:
+        Float32 array with the waveform, zero where phase > color
+    """
+    phase = np.asarray(phase, dtype=np.float32)
+    color = np.asarray(color, dtype=np.float32)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x = (phase / color) * PI2
+    upper_half = x > PI
+    x = np.where(upper_half, x - PI, x)
+    upper_quarter = x > PI * HALF
+    x = np.where(upper_quarter, PI - x, x)
+    x2 = x * x
+    result = (ONE - x2 * HALF) + (x2 * x2) * COS_C4
+    result = np.where(upper_half ^ upper_quarter, -result, result)
+    return np.where(phase <= color, result, ZERO).astype(np.float32)
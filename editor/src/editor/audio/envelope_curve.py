@@ -0,0 +1,114 @@
+"""
+Analytic ADSR envelope curves
+Reproduces the per-sample output of the ARM64 envelope_function with NumPy,
+so the editor can draw an envelope without rendering the instrument
+"""
+
+from typing import Optional, Sequence
+
+import numpy as np
+
+from .engine_math import (ENV_STATE_ATTACK, ENV_STATE_DECAY, ENV_STATE_SUSTAIN,
+                          ENV_STATE_RELEASE, ENV_STATE_OFF, ZERO, ONE, TWENTY_FOUR,
+                          pwr, transform)
+
+# Index of the gain byte in the ENVELOPE parameter list
+ENVELOPE_PARAM_GAIN = 4
+
+
+def _segment_finished(state: int, levels: np.ndarray, target: np.float32) -> np.ndarray:
+    """Evaluate the comparison that ends a segment in envelope_function"""
+    if state == ENV_STATE_ATTACK:
+        return ~(levels < target)
+    return ~(levels > target)
+
+
+def envelope_steps(params: Sequence[int]) -> np.ndarray:
+    """Compute the per-sample level step of each envelope state
+
+    Args:
+        params: Raw envelope parameters (attack, decay, sustain, release, gain)
+
+    Returns:
+        Float32 array indexed by envelope state, as computed by envelope_map
+    """
+    values = transform(params[:ENV_STATE_RELEASE + 1])
+    return pwr(-(values * TWENTY_FOUR))
+
+
+def envelope_levels(params: Sequence[int], num_samples: int,
+                    release_sample: Optional[int] = None) -> np.ndarray:
+    """Compute the envelope level (before gain) for every sample of a note
+
+    Each linear segment is accumulated with a float32 cumulative sum, which
+    matches the engine's sample-by-sample additions bit for bit.
+
+    Args:
+        params: Raw envelope parameters (attack, decay, sustain, release, gain)
+        num_samples: Number of samples to compute
+        release_sample: Sample index where the note is released, or None to hold
+
+    Returns:
+        Float32 array of envelope levels
+    """
+    steps = envelope_steps(params)
+    sustain = transform(params[ENV_STATE_SUSTAIN])
+    gate_end = num_samples if release_sample is None else min(max(release_sample, 0),
+                                                              num_samples)
+    levels = np.zeros(num_samples, dtype=np.float32)
+    level = ZERO
+    state = ENV_STATE_ATTACK
+    pos = 0
+
+    while pos < num_samples and state != ENV_STATE_OFF:
+        if pos >= gate_end:
+            state = ENV_STATE_RELEASE
+        if state == ENV_STATE_SUSTAIN:
+            levels[pos:gate_end] = level
+            pos = gate_end
+            continue
+
+        end = num_samples if state == ENV_STATE_RELEASE else gate_end
+        step = steps[state]
+        target = ONE if state == ENV_STATE_ATTACK else (
+            sustain if state == ENV_STATE_DECAY else ZERO)
+        # Only accumulate about as far as the segment can reach
+        if step > ZERO:
+            end = min(end, pos + int(abs(float(target) - float(level)) / float(step)) + 64)
+        increments = np.full(end - pos + 1, step if state == ENV_STATE_ATTACK else -step,
+                             dtype=np.float32)
+        increments[0] = level
+        segment = np.cumsum(increments, dtype=np.float32)[1:]
+
+        finished = _segment_finished(state, segment, target)
+        if finished.any():
+            index = int(np.argmax(finished))
+            segment[index] = target
+            levels[pos:pos + index + 1] = segment[:index + 1]
+            pos += index + 1
+            level = target
+            state += 1
+        else:
+            levels[pos:end] = segment
+            pos = end
+            level = segment[-1]
+
+    return levels
+
+
+def envelope_curve(params: Sequence[int], num_samples: int,
+                   release_sample: Optional[int] = None,
+                   gain_mod: float = 0.0) -> np.ndarray:
+    """Compute the envelope output for every sample of a note
+
+    Args:
+        params: Raw envelope parameters (attack, decay, sustain, release, gain)
+        num_samples: Number of samples to compute
+        release_sample: Sample index where the note is released, or None to hold
+        gain_mod: Constant value of the envelope gain modulation input
+
+    Returns:
+        Float32 array with the same values envelope_function pushes on the stack
+    """
+    gain = transform(params[ENVELOPE_PARAM_GAIN]) + np.float32(gain_mod)
+    return envelope_levels(params, num_samples, release_sample) * gain
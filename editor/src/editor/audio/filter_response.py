@@ -0,0 +1,126 @@
+"""
+Analytic frequency response of the SVF instruction
+Evaluates the transfer function of the ARM64 filter_function on a frequency
+grid with NumPy, so filters can be tuned without rendering audio
+"""
+
+from typing import Sequence, Tuple
+
+import numpy as np
+
+from .engine_math import (FILTER_LOWPASS, FILTER_HIGHPASS, FILTER_BANDPASS, FILTER_PEAK,
+                          SAMPLE_RATE, transform)
+
+# Parameter order of the FILTER instruction
+FILTER_PARAM_FREQUENCY = 0
+FILTER_PARAM_RESONANCE = 1
+FILTER_PARAM_TYPE = 2
+
+
+def svf_coefficients(params: Sequence[int], frequency_mod: float = 0.0,
+                     resonance_mod: float = 0.0) -> Tuple[np.float32, np.float32]:
+    """Derive the filter coefficients the same way filter_function does
+
+    Args:
+        params: Raw filter parameters (frequency, resonance, type)
+        frequency_mod: Value of the frequency modulation input
+        resonance_mod: Value of the resonance modulation input
+
+    Returns:
+        Tuple (g, r) with the squared frequency and the resonance
+    """
+    frequency, resonance = transform(params[:FILTER_PARAM_TYPE])
+    frequency = frequency + np.float32(frequency_mod)
+    return frequency * frequency, resonance + np.float32(resonance_mod)
+
+
+def svf_is_stable(g: float, r: float) -> bool:
+    """Check whether the SVF recursion is stable for the given coefficients
+
+    The denominator z^2 + (rg - 2)z + (1 - rg + g^2) is tested with the
+    Jury criterion for second order polynomials.
+
+    Args:
+        g: Squared frequency coefficient
+        r: Resonance coefficient
+
+    Returns:
+        True if both poles lie inside the unit circle
+    """
+    a1 = r * g - 2.0
+    a0 = 1.0 - r * g + g * g
+    return bool(abs(a0) < 1.0 and abs(a1) < 1.0 + a0)
+
+
+def log_frequency_grid(num_points: int = 512, low: float = 20.0,
+                       sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """Create a logarithmic frequency grid up to the Nyquist frequency
+
+    Args:
+        num_points: Number of frequencies
+        low: Lowest frequency in Hz
+        sample_rate: Sample rate in Hz
+
+    Returns:
+        Array of frequencies in Hz
+    """
+    return np.geomspace(low, sample_rate / 2.0, num_points)
+
+
+def svf_response(params: Sequence[int], frequencies: np.ndarray,
+                 sample_rate: int = SAMPLE_RATE, frequency_mod: float = 0.0,
+                 resonance_mod: float = 0.0) -> np.ndarray:
+    """Evaluate the complex frequency response of the filter instruction
+
+    With u = 1/z and d = 1 - u, the recursion in filter_function gives
+        D = d^2 + r*g*u*d + g^2*u^2
+        low = g^2*u / D, high = d^2 / D, band = g*d / D
+    and the output is the sum of the outputs selected by the type flags.
+
+    Args:
+        params: Raw filter parameters (frequency, resonance, type)
+        frequencies: Frequencies in Hz to evaluate
+        sample_rate: Sample rate in Hz
+        frequency_mod: Value of the frequency modulation input
+        resonance_mod: Value of the resonance modulation input
+
+    Returns:
+        Complex array with the response at each frequency
+    """
+    g, r = (float(value) for value in svf_coefficients(params, frequency_mod, resonance_mod))
+    filter_type = int(params[FILTER_PARAM_TYPE])
+
+    u = np.exp(-2j * np.pi * np.asarray(frequencies, dtype=np.float64) / sample_rate)
+    d = 1.0 - u
+    denominator = d * d + r * g * u * d + g * g * u * u
+    low = g * g * u / denominator
+    high = d * d / denominator
+    band = g * d / denominator
+
+    response = np.zeros_like(u)
+    if filter_type & FILTER_LOWPASS:
+        response += low
+    if filter_type & FILTER_HIGHPASS:
+        response += high
+    if filter_type & FILTER_BANDPASS:
+        response += band
+    if filter_type & FILTER_PEAK:
+        response += low - high
+    return response
+
+
+def svf_magnitude_db(params: Sequence[int], frequencies: np.ndarray,
+                     sample_rate: int = SAMPLE_RATE, floor_db: float = -120.0) -> np.ndarray:
+    """Evaluate the magnitude response of the filter instruction in dB
+
+    Args:
+        params: Raw filter parameters (frequency, resonance, type)
+        frequencies: Frequencies in Hz to evaluate
+        sample_rate: Sample rate in Hz
+        floor_db: Lowest magnitude returned, used instead of -inf
+
+    Returns:
+        Array of magnitudes in dB
+    """
+    magnitude = np.abs(svf_response(params, frequencies, sample_rate))
+    return np.maximum(20.0 * np.log10(np.maximum(magnitude, 1e-30)), floor_db)
@@ -0,0 +1,75 @@
+"""
+Note events compiled from the song patterns
+Builds the per-instrument event lists consumed by the ARM64 engine with
+NumPy, in the same binary layout as build_note_events in softsynth.asm
+"""
+
+from typing import Sequence
+
+import numpy as np
+
+from .engine_math import (HLD, NOTES_PER_PATTERN, NOTES_PER_SONG, PATTERNS_PER_INSTRUMENT,
+                          SAMPLES_PER_NOTE)
+
+# Note event kinds and list layout (softsynth/include/defines.h)
+NOTE_EVENT_ON = 1
+NOTE_EVENT_RELEASE = 2
+NOTE_EVENT_END = 0xFFFFFFFF
+NOTE_EVENTS_PER_INSTRUMENT = NOTES_PER_SONG + 1
+
+# One event: song sample it is due at, note to start, kind and a reserved half word
+NOTE_EVENT_DTYPE = np.dtype([('sample', '<u4'), ('note', 'u1'), ('kind', 'u1'),
+                             ('reserved', '<u2')])
+
+
+def build_note_events(instrument_patterns: Sequence[int],
+                      pattern_array: Sequence[int],
+                      patterns_per_instrument: int = PATTERNS_PER_INSTRUMENT,
+                      samples_per_note: int = SAMPLES_PER_NOTE) -> np.ndarray:
+    """Compile the patterns of every instrument into note event lists
+
+    A row with a note starts it, a zero row releases the playing note and a
+    HLD row has no event. Each list is sorted by sample and ends with a
+    NOTE_EVENT_END marker; the entries after the marker are markers too.
+
+    Args:
+        instrument_patterns: Pattern numbers, patterns_per_instrument per instrument
+        pattern_array: Rows of all patterns, NOTES_PER_PATTERN per pattern
+        patterns_per_instrument: Song length in patterns
+        samples_per_note: Samples per pattern row at the sample rate and tempo
+
+    Returns:
+        Array of NOTE_EVENT_DTYPE with shape (instruments, notes in the song + 1)
+    """
+    notes_per_song = patterns_per_instrument * NOTES_PER_PATTERN
+    patterns = np.asarray(instrument_patterns, dtype=np.intp).reshape(-1, patterns_per_instrument)
+    rows = np.asarray(pattern_array, dtype=np.uint8).reshape(-1, NOTES_PER_PATTERN)
+    values = rows[patterns].reshape(len(patterns), notes_per_song)
+
+    # Move the rows with an event to the front, keeping them in song order
+    has_event = values != HLD
+    order = np.argsort(~has_event, axis=1, kind='stable')
+    notes = np.take_along_axis(values, order, axis=1)
+    valid = np.arange(notes_per_song) < has_event.sum(axis=1, keepdims=True)
+
+    events = np.zeros((len(patterns), notes_per_song + 1), dtype=NOTE_EVENT_DTYPE)
+    events['sample'] = NOTE_EVENT_END
+    events['sample'][:, :-1] = np.where(valid, order * samples_per_note, NOTE_EVENT_END)
+    events['note'][:, :-1] = np.where(valid, notes, 0)
+    kinds = np.where(notes == 0, NOTE_EVENT_RELEASE, NOTE_EVENT_ON)
+    events['kind'][:, :-1] = np.where(valid, kinds, 0)
+    return events
+
+
+def note_event_words(events: np.ndarray) -> np.ndarray:
+    """Get the 32-bit words of one event list up to and including its end marker
+
+    Args:
+        events: Event list of one instrument with NOTE_EVENT_DTYPE
+
+    Returns:
+        Uint32 array with two words per event, as stored by the engine
+    """
+    ends = np.flatnonzero(events['sample'] == NOTE_EVENT_END)
+    length = ends[0] + 1 if len(ends) else len(events)
+    return np.ascontiguousarray(events[:length], dtype=NOTE_EVENT_DTYPE).view(np.uint32)
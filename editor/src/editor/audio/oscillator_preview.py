@@ -0,0 +1,163 @@
+"""
+Single-cycle oscillator previews
+Evaluates the ARM64 oscillator_function directly over a phase array, so a
+waveform change can be judged without rendering the instrument chain
+"""
+
+from typing import Sequence, Tuple
+
+import numpy as np
+
+from .engine_math import (FREQUENCY_BASE, LFO_FREQUENCY_BASE, HALF, INV_12, INV_128,
+                          OSCILLATOR_LFO, OSCILLATOR_NOISE, OSCILLATOR_SINE,
+                          SAMPLE_RATE, cosine_waveform, frac, pwr, transform)
+
+# Parameter order of the OSCILLATOR instruction
+OSCILLATOR_PARAM_TRANSPOSE = 0
+OSCILLATOR_PARAM_DETUNE = 1
+OSCILLATOR_PARAM_PHASE = 2
+OSCILLATOR_PARAM_GATES = 3
+OSCILLATOR_PARAM_COLOR = 4
+OSCILLATOR_PARAM_SHAPE = 5
+OSCILLATOR_PARAM_GAIN = 6
+OSCILLATOR_PARAM_TYPE = 7
+
+# Multiplier of the engine's noise generator
+NOISE_MULTIPLIER = 16007
+NOISE_DIVISOR = np.float32(2147483648.0)
+# Position of the note in a noise seed, above every workspace offset (defines.h)
+NOISE_SEED_NOTE_SHIFT = 20
+
+
+def oscillator_frequency(params: Sequence[int], note: int, transpose_mod: float = 0.0,
+                         detune_mod: float = 0.0) -> np.float32:
+    """Compute the phase increment per sample of an oscillator
+
+    Args:
+        params: Raw oscillator parameters (transpose, detune, phase, gates,
+            color, shape, gain, type)
+        note: Note number being played (ignored in LFO mode)
+        transpose_mod: Value of the transpose modulation input
+        detune_mod: Value of the detune modulation input
+
+    Returns:
+        Phase increment in cycles per sample
+    """
+    transpose, detune = transform(params[:OSCILLATOR_PARAM_PHASE])
+    offset = ((transpose - HALF) + np.float32(transpose_mod)) / INV_128
+    offset = (offset + (detune - HALF) / HALF) + np.float32(detune_mod)
+    lfo = int(params[OSCILLATOR_PARAM_TYPE]) & OSCILLATOR_LFO
+    if not lfo:
+        offset = offset + np.float32(note)
+    base = LFO_FREQUENCY_BASE if lfo else FREQUENCY_BASE
+    return np.float32(pwr(offset * INV_12) * base)
+
+
+def noise_seed(note: int, workspace_offset: int) -> int:
+    """Compute the state a noise oscillator starts a note with
+
+    Every oscillator keeps its generator in its workspace, which is cleared
+    when a note starts. The first sample seeds it from the note and the byte
+    offset of the workspace in synth_data.
+
+    Args:
+        note: Note number being played
+        workspace_offset: Byte offset of the oscillator workspace in synth_data
+
+    Returns:
+        Generator state before the first value
+    """
+    return (note << NOISE_SEED_NOTE_SHIFT | workspace_offset | 1) & 0xFFFFFFFF
+
+
+def noise_jump(seed: int, samples: int) -> int:
+    """Advance a noise generator state by a number of samples
+
+    Each sample multiplies the state by NOISE_MULTIPLIER modulo 2^32, so the
+    state at any sample is one modular exponentiation away.
+
+    Args:
+        seed: Generator state
+        samples: Number of samples to skip
+
+    Returns:
+        Generator state after the skipped samples
+    """
+    return seed * pow(NOISE_MULTIPLIER, samples, 1 << 32) & 0xFFFFFFFF
+
+
+def noise_sequence(count: int, seed: int = 1, start: int = 0) -> np.ndarray:
+    """Generate values of the engine's noise generator
+
+    Args:
+        count: Number of values to generate
+        seed: Generator state before the first value
+        start: Number of values to skip before the first one
+
+    Returns:
+        Float32 array of noise values in [-1..1)
+    """
+    multipliers = np.cumprod(np.full(count, NOISE_MULTIPLIER, dtype=np.uint32),
+                             dtype=np.uint32)
+    states = (multipliers * np.uint32(noise_jump(seed, start))).view(np.int32)
+    return states.astype(np.float32) / NOISE_DIVISOR
+
+
+def oscillator_waveform(params: Sequence[int], phase: np.ndarray,
+                        color_mod: float = 0.0, gain_mod: float = 0.0) -> np.ndarray:
+    """Evaluate the oscillator output for an array of accumulated phases
+
+    The shape and gates parameters are not used by the engine yet. Types
+    without a waveform of their own output the phase ramp, as the engine does.
+
+    Args:
+        params: Raw oscillator parameters
+        phase: Accumulated phase values in [0..1)
+        color_mod: Value of the color modulation input
+        gain_mod: Value of the gain modulation input
+
+    Returns:
+        Float32 array with the oscillator output
+    """
+    values = transform(params[:OSCILLATOR_PARAM_TYPE])
+    waveform_type = int(params[OSCILLATOR_PARAM_TYPE])
+
+    output = frac(np.asarray(phase, dtype=np.float32) + values[OSCILLATOR_PARAM_PHASE])
+    color = values[OSCILLATOR_PARAM_COLOR] + np.float32(color_mod)
+    if waveform_type & OSCILLATOR_SINE:
+        output = cosine_waveform(output, color)
+    if waveform_type & OSCILLATOR_NOISE:
+        output = noise_sequence(len(output))
+    return output * (values[OSCILLATOR_PARAM_GAIN] + np.float32(gain_mod))
+
+
+def oscillator_cycle(params: Sequence[int], num_periods: int = 2,
+                     points_per_period: int = 256) -> Tuple[np.ndarray, np.ndarray]:
+    """Evaluate a few periods of an oscillator on an evenly spaced phase grid
+
+    Args:
+        params: Raw oscillator parameters
+        num_periods: Number of periods to evaluate
+        points_per_period: Number of points per period
+
+    Returns:
+        Tuple (cycle_position, output) with the position in periods and the output
+    """
+    position = np.arange(num_periods * points_per_period, dtype=np.float32)
+    position /= np.float32(points_per_period)
+    return position, oscillator_waveform(params, frac(position))
+
+
+def oscillator_frequency_hz(params: Sequence[int], note: int,
+                            sample_rate: int = SAMPLE_RATE) -> float:
+    """Compute the oscillator frequency in Hz
+
+    Args:
+        params: Raw oscillator parameters
+        note: Note number being played
+        sample_rate: Sample rate in Hz
+
+    Returns:
+        Frequency in Hz
+    """
+    return float(oscillator_frequency(params, note)) * sample_rate
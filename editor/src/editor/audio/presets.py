@@ -0,0 +1,352 @@
+"""
+Preset library of instrument patches
+Keeps the program and parameter bytes of instruments under a hash of their
+content in one append-only file. The whole file is indexed in memory when the
+library opens, so browsing and searching never read the disk again
+"""
+
+import hashlib
+import re
+import struct
+import zlib
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Sequence, Set, Tuple
+
+import numpy as np
+
+from .engine_math import (ACCUMULATE_ID, ENVELOPE_ID, FILTER_ALLPASS, FILTER_BANDPASS,
+                          FILTER_BANDSTOP, FILTER_HIGHPASS, FILTER_ID, FILTER_LOWPASS,
+                          FILTER_PEAK, INSTRUMENT_END, OPERATION_ID, OSCILLATOR_ID,
+                          OSCILLATOR_LFO, OSCILLATOR_NOISE, OSCILLATOR_SAW, OSCILLATOR_SINE,
+                          OSCILLATOR_SQUARE, OSCILLATOR_TRIANGLE, OUTPUT_ID, PANNING_ID,
+                          STOREVAL_ID)
+from .song_asm import SongData
+
+DEFAULT_PRESET_PATH = Path.home() / '.softsynth' / 'presets.d4kl'
+
+# Instructions per program (softsynth/include/defines.h)
+MAX_COMMANDS = 32
+
+INSTRUCTION_NAMES = {ENVELOPE_ID: 'ENVELOPE', OSCILLATOR_ID: 'OSCILLATOR',
+                     STOREVAL_ID: 'STOREVAL', OPERATION_ID: 'OPERATION', FILTER_ID: 'FILTER',
+                     PANNING_ID: 'PANNING', OUTPUT_ID: 'OUTPUT', ACCUMULATE_ID: 'ACCUMULATE'}
+# Raw parameter bytes per instruction, see Instrument::get_instruction_memory_size
+INSTRUCTION_SIZES = {ENVELOPE_ID: 5, OSCILLATOR_ID: 8, STOREVAL_ID: 3, OPERATION_ID: 1,
+                     FILTER_ID: 3, PANNING_ID: 1, OUTPUT_ID: 1, ACCUMULATE_ID: 0}
+
+# Parameter byte holding the filter type, compared for equality
+FILTER_TYPE_PARAMETER = 2
+FILTER_TYPES = {'LOWPASS': FILTER_LOWPASS, 'HIGHPASS': FILTER_HIGHPASS,
+                'BANDSTOP': FILTER_BANDSTOP, 'BANDPASS': FILTER_BANDPASS,
+                'ALLPASS': FILTER_ALLPASS, 'PEAK': FILTER_PEAK}
+# Parameter byte holding the oscillator waveform flags, any of which may be set
+OSCILLATOR_TYPE_PARAMETER = 7
+OSCILLATOR_TYPES = {'SINE': OSCILLATOR_SINE, 'SQUARE': OSCILLATOR_SQUARE,
+                    'SAW': OSCILLATOR_SAW, 'TRIANGLE': OSCILLATOR_TRIANGLE,
+                    'NOISE': OSCILLATOR_NOISE, 'LFO': OSCILLATOR_LFO}
+
+# Magic, payload size and CRC-32 of the payload. The payload holds the content
+# hash, the program and the parameters, then the name and the tags
+_RECORD = struct.Struct('<4sII')
+RECORD_MAGIC = b'PRS1'
+HASH_SIZE = 16
+
+_SIZE_TABLE = np.zeros(256, dtype=np.int64)
+_SIZE_TABLE[list(INSTRUCTION_SIZES)] = list(INSTRUCTION_SIZES.values())
+_SIGNATURE_SEPARATOR = re.compile(r'\s*(?:,|\band\b)\s*', re.IGNORECASE)
+
+
+class Preset(NamedTuple):
+    """Instrument patch of the library"""
+    key: str               # Hex content hash of the program and the parameters
+    name: str
+    tags: Tuple[str, ...]  # Lowercase and sorted
+    instructions: bytes    # Instruction IDs without INSTRUMENT_END
+    parameters: bytes      # Raw parameter bytes, laid out like instrument_parameters
+
+
+def preset_key(instructions: bytes, parameters: bytes) -> str:
+    """Get the content hash under which a patch is stored"""
+    digest = hashlib.blake2b(bytes(instructions) + bytes([INSTRUMENT_END]) + bytes(parameters),
+                             digest_size=HASH_SIZE)
+    return digest.hexdigest()
+
+
+def parameter_size(instructions: Iterable[int]) -> int:
+    """Get the number of parameter bytes of a program"""
+    return sum(INSTRUCTION_SIZES.get(instruction, 0) for instruction in instructions)
+
+
+def signature_features(instructions: bytes, parameters: bytes) -> Set[str]:
+    """Get the features a signature search matches a patch by
+
+    Every instruction is a feature by its name, e.g. "FILTER". Filters add
+    their type, e.g. "FILTER LOWPASS", and oscillators every waveform they
+    mix, e.g. "OSCILLATOR SAW".
+    """
+    features = set()
+    offset = 0
+    for instruction in instructions:
+        name = INSTRUCTION_NAMES.get(instruction, str(instruction))
+        features.add(name)
+        if instruction == FILTER_ID:
+            value = parameters[offset + FILTER_TYPE_PARAMETER]
+            features.update(f'{name} {mode}' for mode, mode_value in FILTER_TYPES.items()
+                            if value == mode_value)
+        elif instruction == OSCILLATOR_ID:
+            value = parameters[offset + OSCILLATOR_TYPE_PARAMETER]
+            features.update(f'{name} {mode}' for mode, flag in OSCILLATOR_TYPES.items()
+                            if value & flag)
+        offset += INSTRUCTION_SIZES.get(instruction, 0)
+    return features
+
+
+def parse_signature(signature: str) -> Set[str]:
+    """Parse a signature query like "has FILTER LOWPASS and OSCILLATOR SAW"
+
+    Terms are separated by commas or "and". Each names an instruction,
+    optionally followed by a filter type or an oscillator waveform.
+
+    Returns:
+        Features a matching patch has all of
+
+    Raises:
+        ValueError: For unknown instructions or types
+    """
+    signature = re.sub(r'^\s*has\b', '', signature.strip(), flags=re.IGNORECASE)
+    features = set()
+    for term in _SIGNATURE_SEPARATOR.split(signature):
+        words = term.upper().split()
+        if not words:
+            continue
+        if words[0] not in INSTRUCTION_NAMES.values():
+            raise ValueError(f"Unknown instruction {words[0]!r}")
+        modes = {'FILTER': FILTER_TYPES, 'OSCILLATOR': OSCILLATOR_TYPES}.get(words[0], {})
+        if len(words) > 2 or (len(words) == 2 and words[1] not in modes):
+            raise ValueError(f"Unknown {words[0]} type {' '.join(words[1:])!r}")
+        features.add(' '.join(words))
+    return features
+
+
+def split_program(song: SongData, program_num: int) -> Tuple[Tuple[int, int], Tuple[int, int]]:
+    """Find the instructions and the parameters of a program in song data
+
+    Returns:
+        (start, end) of the instructions without INSTRUMENT_END and (start,
+        end) of the parameter bytes
+    """
+    ends = np.flatnonzero(song.instructions == INSTRUMENT_END)
+    if not 0 <= program_num < len(ends):
+        raise ValueError(f"The song has no program {program_num}")
+    start = 0 if program_num == 0 else int(ends[program_num - 1]) + 1
+    end = int(ends[program_num])
+    offsets = np.concatenate([[0], np.cumsum(_SIZE_TABLE[song.instructions])])
+    return (start, end), (int(offsets[start]), int(offsets[end]))
+
+
+def replace_program(song: SongData, program_num: int, instructions: bytes,
+                    parameters: bytes) -> SongData:
+    """Get song data with the program and parameters of one instrument replaced"""
+    (start, end), (first, last) = split_program(song, program_num)
+    return song._replace(
+        instructions=np.concatenate([song.instructions[:start],
+                                     np.frombuffer(bytes(instructions), dtype=np.uint8),
+                                     song.instructions[end:]]),
+        parameters=np.concatenate([song.parameters[:first],
+                                   np.frombuffer(bytes(parameters), dtype=np.uint8),
+                                   song.parameters[last:]]))
+
+
+def _normalize_tags(tags: Iterable[str]) -> Tuple[str, ...]:
+    """Lowercase, strip and sort tags, dropping empty ones and duplicates"""
+    return tuple(sorted({tag.strip().lower() for tag in tags} - {''}))
+
+
+class PresetLibrary:
+    """Presets stored in one append-only file and indexed in memory
+
+    Storing a patch whose content is already in the library only writes a
+    record if its name or tags changed. The newest record of a hash wins.
+    Damaged records are skipped, a record cut short by an interrupted write
+    at the end of the file is dropped on the next append.
+    """
+
+    def __init__(self, path=DEFAULT_PRESET_PATH):
+        """Open a library and index every record of its file
+
+        Args:
+            path: Path of the library file, created by the first add
+
+        Raises:
+            OSError: If the file exists but cannot be read
+        """
+        self.path = Path(path)
+        self._presets: Dict[str, Preset] = {}
+        self._features: Dict[str, Set[str]] = {}
+        self._tags: Dict[str, Set[str]] = {}
+        self._valid_size = 0
+        if self.path.exists():
+            self._read(self.path.read_bytes())
+
+    def _read(self, data: bytes) -> None:
+        """Index the intact records of the library file
+
+        A damaged record is skipped by searching for the magic of the next
+        one. A record cut short at the end of the file is left out of
+        _valid_size, so the next add drops it.
+        """
+        self._valid_size = len(data)
+        offset = 0
+        while offset < len(data):
+            payload_start = offset + _RECORD.size
+            if payload_start <= len(data):
+                magic, size, crc = _RECORD.unpack_from(data, offset)
+                payload = data[payload_start:payload_start + size]
+                if magic == RECORD_MAGIC and len(payload) == size and zlib.crc32(payload) == crc:
+                    try:
+                        self._index(self._unpack(payload))
+                        offset = payload_start + size
+                        continue
+                    except (IndexError, UnicodeDecodeError, struct.error):
+                        pass
+
+            next_record = data.find(RECORD_MAGIC, offset + 1)
+            if next_record < 0:
+                # An interrupted write leaves part of a header, or a record
+                # running past the end of the file
+                if payload_start > len(data) or (magic == RECORD_MAGIC and len(payload) != size):
+                    self._valid_size = offset
+                break
+            offset = next_record
+
+    @staticmethod
+    def _unpack(payload: bytes) -> Preset:
+        """Read a preset from a record payload"""
+        key = payload[:HASH_SIZE].hex()
+        fields = []
+        offset = HASH_SIZE
+        for length_format in ('<B', '<H', '<B'):
+            (length,) = struct.unpack_from(length_format, payload, offset)
+            offset += struct.calcsize(length_format)
+            fields.append(payload[offset:offset + length])
+            offset += length
+        instructions, parameters, name = fields
+        tags = []
+        for _ in range(payload[offset]):
+            length = payload[offset + 1]
+            tags.append(payload[offset + 2:offset + 2 + length].decode())
+            offset += 1 + length
+        return Preset(key, name.decode(), tuple(tags), instructions, parameters)
+
+    @staticmethod
+    def _pack(preset: Preset) -> bytes:
+        """Write a preset to a record"""
+        name = preset.name.encode()
+        payload = bytearray(bytes.fromhex(preset.key))
+        payload += struct.pack('<B', len(preset.instructions)) + preset.instructions
+        payload += struct.pack('<H', len(preset.parameters)) + preset.parameters
+        payload += struct.pack('<B', len(name)) + name
+        payload.append(len(preset.tags))
+        for tag in preset.tags:
+            payload += struct.pack('<B', len(tag.encode())) + tag.encode()
+        return _RECORD.pack(RECORD_MAGIC, len(payload), zlib.crc32(payload)) + bytes(payload)
+
+    def _index(self, preset: Preset) -> None:
+        """Add a preset to the in-memory indexes, replacing an older record"""
+        old = self._presets.get(preset.key)
+        if old is not None:
+            for tag in old.tags:
+                self._tags[tag].discard(old.key)
+        else:
+            for feature in signature_features(preset.instructions, preset.parameters):
+                self._features.setdefault(feature, set()).add(preset.key)
+        for tag in preset.tags:
+            self._tags.setdefault(tag, set()).add(preset.key)
+        self._presets[preset.key] = preset
+
+    def add(self, name: str, instructions: Sequence[int], parameters: Sequence[int],
+            tags: Iterable[str] = ()) -> Preset:
+        """Store a patch
+
+        Args:
+            name: Name shown when browsing
+            instructions: Instruction IDs without INSTRUMENT_END
+            parameters: Raw parameter bytes of the instructions
+            tags: Tags to search by, stored lowercase
+
+        Returns:
+            The stored preset
+
+        Raises:
+            ValueError: If the parameters do not fit the program, or a tag is
+                longer than 255 bytes
+            OSError: If the file cannot be written
+        """
+        instructions, parameters = bytes(instructions), bytes(parameters)
+        if len(instructions) > MAX_COMMANDS or any(
+                instruction not in INSTRUCTION_SIZES for instruction in instructions):
+            raise ValueError(f"Invalid program {list(instructions)}")
+        if len(parameters) != parameter_size(instructions):
+            raise ValueError(f"The program has {parameter_size(instructions)} parameter bytes, "
+                             f"{len(parameters)} given")
+        tags = _normalize_tags(tags)
+        if any(len(tag.encode()) > 255 for tag in tags) or len(tags) > 255:
+            raise ValueError("Tags are limited to 255 tags of 255 bytes")
+
+        # Names are cut to 255 bytes without splitting a character
+        name = name.strip().encode()[:255].decode(errors='ignore')
+        preset = Preset(preset_key(instructions, parameters), name, tags, instructions, parameters)
+        if self._presets.get(preset.key) == preset:
+            return preset
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, 'ab') as file:
+            # Drop a record cut short by an interrupted write
+            if file.tell() != self._valid_size:
+                file.truncate(self._valid_size)
+            file.write(self._pack(preset))
+            self._valid_size = file.tell()
+        self._index(preset)
+        return preset
+
+    def get(self, key: str) -> Preset:
+        """Get a preset by its key, raises KeyError if it is not stored"""
+        return self._presets[key]
+
+    def find(self, signature: str = '', tags: Iterable[str] = (), text: str = '') -> List[Preset]:
+        """Search the presets in memory
+
+        Args:
+            signature: Features every match has, see parse_signature
+            tags: Tags every match has
+            text: Text in the names of the matches, ignoring case
+
+        Returns:
+            Matching presets sorted by name
+
+        Raises:
+            ValueError: For unknown instructions or types in the signature
+        """
+        keys = None
+        for feature in parse_signature(signature):
+            matches = self._features.get(feature, set())
+            keys = set(matches) if keys is None else keys & matches
+        for tag in _normalize_tags(tags):
+            matches = self._tags.get(tag, set())
+            keys = set(matches) if keys is None else keys & matches
+        presets = self._presets.values() if keys is None else map(self._presets.get, keys)
+        text = text.strip().lower()
+        return sorted((preset for preset in presets if text in preset.name.lower()),
+                      key=lambda preset: (preset.name.lower(), preset.key))
+
+    def get_tags(self) -> List[str]:
+        """Get every tag a preset has, sorted"""
+        return sorted(tag for tag, keys in self._tags.items() if keys)
+
+    def __len__(self) -> int:
+        return len(self._presets)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._presets
+
+    def __iter__(self) -> Iterator[Preset]:
+        return iter(self.find())
@@ -0,0 +1,311 @@
+"""
+Binary project files
+Stores the song tables in the layout the engine plays them, so opening a
+project maps the file and hands the tables to the engine without parsing,
+and saving rewrites only the sections that changed
+"""
+
+import mmap
+import os
+import struct
+import zlib
+from pathlib import Path
+from typing import Dict, NamedTuple, Tuple
+
+import numpy as np
+
+from .engine_math import BEATS_PER_MINUTE, HLD, SAMPLE_RATE
+from .song_asm import SongData
+
+PROJECT_MAGIC = b'D4KP'
+PROJECT_VERSION = 1
+PROJECT_SUFFIX = '.d4kp'
+
+# Magic, version, section count, sample rate and tempo
+_HEADER = struct.Struct('<4sHHII')
+# Tag, encoding, offset, stored size, capacity, decoded size and CRC-32 of the stored bytes
+_SECTION = struct.Struct('<4sBxxxIIIII')
+
+# Sections in SongData order, the pattern tables are run-length encoded
+SECTION_TAGS = (b'PROG', b'PARM', b'PATS', b'NOTE')
+ENCODING_RAW = 0
+ENCODING_RUNS = 1
+_SECTION_ENCODINGS = (ENCODING_RAW, ENCODING_RAW, ENCODING_RUNS, ENCODING_RUNS)
+
+# Bytes stored as runs: silent pattern numbers and notes, and held notes.
+# A control byte below RUN_FLAG copies the next control + 1 bytes, else bit 6
+# selects HLD over 0 and the low bits hold the run length - 1
+RUN_FLAG = 0x80
+_RUN_HLD = 0x40
+MAX_RUN = 0x40
+MAX_LITERALS = 0x80
+# Shorter runs are cheaper as literals
+MIN_RUN = 2
+
+
+class ProjectData(NamedTuple):
+    """Contents of a project"""
+    song: SongData
+    sample_rate: int = SAMPLE_RATE
+    tempo: int = BEATS_PER_MINUTE
+
+
+class _Section(NamedTuple):
+    """Directory entry of a section"""
+    encoding: int
+    offset: int
+    stored_size: int
+    capacity: int
+    size: int
+    crc: int
+
+
+def encode_runs(table: np.ndarray) -> bytes:
+    """Run-length encode the runs of 0 and HLD in a table
+
+    Args:
+        table: Uint8 array
+
+    Returns:
+        Encoded bytes, see RUN_FLAG
+    """
+    table = np.asarray(table, dtype=np.uint8)
+    if len(table) == 0:
+        return b''
+    # Runs of equal bytes as (start, length, value)
+    starts = np.flatnonzero(np.diff(table, prepend=np.int16(table[0]) + 1))
+    lengths = np.diff(np.append(starts, len(table)))
+    data = table.tobytes()
+
+    encoded = bytearray()
+    literal_start = 0
+    for start, length in zip(starts.tolist(), lengths.tolist()):
+        value = data[start]
+        if value not in (0, HLD) or length < MIN_RUN:
+            continue
+        _encode_literals(encoded, data[literal_start:start])
+        control = RUN_FLAG | (_RUN_HLD if value == HLD else 0)
+        for run in range(start, start + length, MAX_RUN):
+            encoded.append(control | (min(MAX_RUN, start + length - run) - 1))
+        literal_start = start + length
+    _encode_literals(encoded, data[literal_start:])
+    return bytes(encoded)
+
+
+def _encode_literals(encoded: bytearray, literals: bytes) -> None:
+    """Append bytes that are copied as they are"""
+    for start in range(0, len(literals), MAX_LITERALS):
+        chunk = literals[start:start + MAX_LITERALS]
+        encoded.append(len(chunk) - 1)
+        encoded += chunk
+
+
+def decode_runs(encoded, size: int) -> np.ndarray:
+    """Decode a table encoded by encode_runs
+
+    Args:
+        encoded: Encoded bytes or a buffer of them
+        size: Number of decoded bytes
+
+    Returns:
+        Uint8 array of size bytes
+
+    Raises:
+        ValueError: If the data does not decode to size bytes
+    """
+    encoded = memoryview(encoded)
+    table = np.empty(size, dtype=np.uint8)
+    position = index = 0
+    while index < len(encoded):
+        control = encoded[index]
+        if control & RUN_FLAG:
+            length = (control & (MAX_RUN - 1)) + 1
+            value = HLD if control & _RUN_HLD else 0
+            index += 1
+        else:
+            length = control + 1
+            value = encoded[index + 1:index + 1 + length]
+            index += 1 + length
+            if len(value) != length:
+                raise ValueError("Run-length data ends inside literal bytes")
+        if position + length > size:
+            raise ValueError(f"Run-length data decodes to more than {size} bytes")
+        table[position:position + length] = value
+        position += length
+    if position != size:
+        raise ValueError(f"Run-length data decodes to {position} bytes, {size} expected")
+    return table
+
+
+class ProjectFile:
+    """A project file that is loaded by mapping it and saved incrementally
+
+    Saving after a load or save appends only the sections that changed,
+    then rewrites the directory. Until then the old directory points at
+    intact old data, so an interrupted save leaves the previous project. The
+    file is written from scratch when it is new, from another version or
+    mostly unused space.
+    """
+
+    def __init__(self, path):
+        """Refer to a project file, which does not need to exist yet
+
+        Args:
+            path: Path of the project file
+        """
+        self.path = Path(path)
+        self._sections: Dict[bytes, _Section] = {}
+        self._end = 0
+
+    def load(self) -> ProjectData:
+        """Map the file and read the project
+
+        The program and parameter tables are read-only views of the mapping,
+        which stays open as long as they are referenced. Hand them to the
+        engine before saving over them.
+
+        Returns:
+            ProjectData of the file
+
+        Raises:
+            OSError: If the file cannot be read
+            ValueError: If the file is not a project or is damaged
+        """
+        with open(self.path, 'rb') as file:
+            if os.fstat(file.fileno()).st_size < _HEADER.size:
+                raise ValueError(f"{self.path.name} is not a project file")
+            mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, count, sample_rate, tempo = _HEADER.unpack_from(mapping)
+        if magic != PROJECT_MAGIC:
+            raise ValueError(f"{self.path.name} is not a project file")
+        if version != PROJECT_VERSION:
+            raise ValueError(f"{self.path.name} has project version {version}, "
+                             f"version {PROJECT_VERSION} is supported")
+
+        sections = self._read_directory(mapping, count)
+        tables = []
+        for tag in SECTION_TAGS:
+            if tag not in sections:
+                raise ValueError(f"{self.path.name} has no {tag.decode()} section")
+            section = sections[tag]
+            stored = memoryview(mapping)[section.offset:section.offset + section.stored_size]
+            if zlib.crc32(stored) != section.crc:
+                raise ValueError(f"{self.path.name}: {tag.decode()} section is damaged")
+            if section.encoding == ENCODING_RUNS:
+                tables.append(decode_runs(stored, section.size))
+            else:
+                tables.append(np.frombuffer(mapping, dtype=np.uint8,
+                                            count=section.size, offset=section.offset))
+            stored.release()
+
+        self._sections = sections
+        self._end = max(section.offset + section.capacity for section in sections.values())
+        return ProjectData(SongData(*tables), sample_rate, tempo)
+
+    def _read_directory(self, mapping, count: int) -> Dict[bytes, _Section]:
+        """Read and check the directory after the header"""
+        if _HEADER.size + count * _SECTION.size > len(mapping):
+            raise ValueError(f"{self.path.name} is truncated")
+        sections = {}
+        for index in range(count):
+            tag, *entry = _SECTION.unpack_from(mapping, _HEADER.size + index * _SECTION.size)
+            section = _Section(*entry)
+            if (section.stored_size > section.capacity or
+                    section.offset + section.capacity > len(mapping) or
+                    (section.encoding == ENCODING_RAW and section.stored_size != section.size)):
+                raise ValueError(f"{self.path.name} is truncated")
+            sections[tag] = section
+        return sections
+
+    def save(self, project: ProjectData) -> int:
+        """Write a project to the file
+
+        Args:
+            project: Project to write
+
+        Returns:
+            Number of section bytes written, without the directory
+
+        Raises:
+            OSError: If the file cannot be written
+        """
+        encoded = {tag: (encoding, self._encode(table, encoding))
+                   for tag, encoding, table in zip(SECTION_TAGS, _SECTION_ENCODINGS, project.song)}
+        header = _HEADER.pack(PROJECT_MAGIC, PROJECT_VERSION, len(SECTION_TAGS),
+                              project.sample_rate, project.tempo)
+
+        if not self._can_update(encoded):
+            return self._write_all(header, encoded, project.song)
+
+        written = 0
+        sections = dict(self._sections)
+        end = self._end
+        with open(self.path, 'r+b') as file:
+            file.seek(end)
+            for tag, table in zip(SECTION_TAGS, project.song):
+                encoding, data = encoded[tag]
+                old = sections[tag]
+                crc = zlib.crc32(data)
+                if (old.encoding, old.stored_size, old.size, old.crc) == (encoding, len(data), len(table), crc):
+                    continue
+                file.write(data)
+                written += len(data)
+                sections[tag] = _Section(encoding, end, len(data), len(data), len(table), crc)
+                end += len(data)
+            # The directory points at the new data only once it is on disk
+            if written:
+                file.flush()
+                os.fsync(file.fileno())
+            file.seek(0)
+            file.write(header + self._pack_directory(sections))
+        self._sections = sections
+        self._end = end
+        return written
+
+    @staticmethod
+    def _encode(table: np.ndarray, encoding: int) -> bytes:
+        """Get the stored bytes of a table"""
+        if encoding == ENCODING_RUNS:
+            return encode_runs(table)
+        return np.asarray(table, dtype=np.uint8).tobytes()
+
+    def _can_update(self, encoded: Dict[bytes, Tuple[int, bytes]]) -> bool:
+        """Check if the sections read before can be updated in place"""
+        if set(self._sections) != set(SECTION_TAGS) or not self.path.exists():
+            return False
+        # Rewrite when more than half of the file would be unused
+        used = sum(len(data) for _, data in encoded.values())
+        return used * 2 >= self._end - _HEADER.size - len(SECTION_TAGS) * _SECTION.size
+
+    def _write_all(self, header: bytes, encoded: Dict[bytes, Tuple[int, bytes]],
+                   song: SongData) -> int:
+        """Write the whole file next to the old one and replace it"""
+        sections = {}
+        offset = _HEADER.size + len(SECTION_TAGS) * _SECTION.size
+        for tag, table in zip(SECTION_TAGS, song):
+            encoding, data = encoded[tag]
+            sections[tag] = _Section(encoding, offset, len(data), len(data), len(table),
+                                     zlib.crc32(data))
+            offset += len(data)
+
+        temporary = self.path.with_name(self.path.name + '.tmp')
+        with open(temporary, 'wb') as file:
+            file.write(header + self._pack_directory(sections))
+            for tag in SECTION_TAGS:
+                file.write(encoded[tag][1])
+        os.replace(temporary, self.path)
+        self._sections = sections
+        self._end = offset
+        return sum(len(data) for _, data in encoded.values())
+
+    @staticmethod
+    def _pack_directory(sections: Dict[bytes, _Section]) -> bytes:
+        """Pack the directory entries in SECTION_TAGS order"""
+        return b''.join(_SECTION.pack(tag, *sections[tag]) for tag in SECTION_TAGS)
+
+
+def load_project(path) -> ProjectData:
+    """Read a project file, see ProjectFile.load"""
+    return ProjectFile(path).load()
+
@@ -0,0 +1,54 @@
+"""
+Render budgets for display previews
+Describes how much of a note a view needs and reduces rendered samples to
+the resolution the view can show
+"""
+
+from typing import NamedTuple, Tuple
+
+import numpy as np
+
+
+class RenderBudget(NamedTuple):
+    """Portion of a note a view asks the engine to render"""
+    window_samples: int  # Number of samples from the note start to render
+    resolution: int      # Number of columns the samples are reduced to
+
+
+def peak_envelope(samples: np.ndarray, resolution: int) -> Tuple[np.ndarray, np.ndarray,
+                                                                 np.ndarray]:
+    """Reduce samples to per-column minimum and maximum values
+
+    Args:
+        samples: Rendered samples
+        resolution: Maximum number of columns
+
+    Returns:
+        Tuple (positions, minimum, maximum) where positions is the first sample
+        index of each column
+    """
+    samples = np.asarray(samples, dtype=np.float32)
+    if len(samples) <= resolution:
+        positions = np.arange(len(samples))
+        return positions, samples, samples
+
+    column_size = -(-len(samples) // resolution)
+    num_columns = -(-len(samples) // column_size)
+    padded = np.pad(samples, (0, num_columns * column_size - len(samples)), mode='edge')
+    columns = padded.reshape(num_columns, column_size)
+    positions = np.arange(num_columns) * column_size
+    return positions, columns.min(axis=1), columns.max(axis=1)
+
+
+def trim_silence(samples: np.ndarray, threshold: float = 1e-8) -> np.ndarray:
+    """Remove trailing silent samples, like Instrument::render_note does
+
+    Args:
+        samples: Rendered samples
+        threshold: Largest absolute value treated as silence
+
+    Returns:
+        Samples up to and including the last audible one
+    """
+    audible = np.flatnonzero(np.abs(samples) > threshold)
+    return samples[:audible[-1] + 1] if len(audible) else samples[:0]
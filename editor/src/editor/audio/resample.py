@@ -0,0 +1,112 @@
+"""
+Resampling of rendered samples
+Upsamples draft renders made at a fraction of the sample rate back to the
+rate of the audio device and pitch-shifts rendered notes for auditions
+"""
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Input samples weighted for every output sample
+POLYPHASE_TAPS = 8
+
+# Interpolations offered by pitch_shift
+INTERPOLATIONS = ('linear', 'sinc')
+
+
+def polyphase_kernel(factor: int, taps: int = POLYPHASE_TAPS) -> np.ndarray:
+    """Compute the windowed-sinc interpolation filter, split into its phases
+
+    Args:
+        factor: Upsampling factor
+        taps: Input samples per output sample, an even number
+
+    Returns:
+        Float32 array of shape (factor, taps). Row p weights the inputs
+        n - taps/2 + 1 to n + taps/2 for the output p/factor after input n
+    """
+    half = taps // 2
+    offsets = np.arange(-half + 1, half + 1)
+    distance = offsets[np.newaxis, :] - np.arange(factor)[:, np.newaxis] / factor
+    kernel = np.sinc(distance) * (0.5 + 0.5 * np.cos(np.pi * distance / half))
+    # np.sinc is not exactly zero at the integers, phase 0 copies the input
+    kernel[0] = offsets == 0
+    # Every phase passes DC unchanged
+    return (kernel / kernel.sum(axis=1, keepdims=True)).astype(np.float32)
+
+
+def polyphase_upsample(samples: np.ndarray, factor: int,
+                       taps: int = POLYPHASE_TAPS) -> np.ndarray:
+    """Upsample by an integer factor with a polyphase windowed-sinc filter
+
+    Phase 0 keeps the input samples, the other phases are interpolated from
+    the taps around them. Samples outside the input count as silence.
+
+    Args:
+        samples: Samples at the lower rate
+        factor: Upsampling factor
+        taps: Input samples per output sample, an even number
+
+    Returns:
+        Float32 array of len(samples) * factor samples
+    """
+    samples = np.asarray(samples, dtype=np.float32)
+    if factor == 1 or len(samples) == 0:
+        return samples.copy()
+
+    half = taps // 2
+    padded = np.pad(samples, (half - 1, half))
+    windows = sliding_window_view(padded, taps)
+    return (windows @ polyphase_kernel(factor, taps).T).reshape(-1)
+
+
+def pitch_shift(samples: np.ndarray, semitones: float, num_samples: int = None,
+                interpolation: str = 'linear', taps: int = POLYPHASE_TAPS) -> np.ndarray:
+    """Shift samples in pitch by resampling them at a fractional step
+
+    Output sample i reads the input at i * 2**(semitones / 12), so the pitch
+    and the speed change together. Reads past the end of the input are
+    silent.
+
+    Args:
+        samples: Samples to shift
+        semitones: Pitch shift, positive shifts up
+        num_samples: Number of output samples, defaults to len(samples)
+        interpolation: One of INTERPOLATIONS
+        taps: Input samples per output sample of the windowed-sinc
+            interpolation at unity step, an even number
+
+    Returns:
+        Float32 array of num_samples samples
+    """
+    if interpolation not in INTERPOLATIONS:
+        raise ValueError(f"Unknown interpolation {interpolation!r}")
+    samples = np.asarray(samples, dtype=np.float32)
+    if num_samples is None:
+        num_samples = len(samples)
+    if len(samples) == 0:
+        return np.zeros(num_samples, dtype=np.float32)
+
+    step = 2.0 ** (semitones / 12.0)
+    positions = np.arange(num_samples) * step
+    if interpolation == 'linear':
+        return np.interp(positions, np.arange(len(samples)), samples,
+                         left=0.0, right=0.0).astype(np.float32)
+
+    # Shifting up reads faster than the input rate, lower the cutoff and
+    # widen the window to keep the same number of zero crossings
+    cutoff = min(1.0, 1.0 / step)
+    half = int(np.ceil(taps / 2 / cutoff))
+    index = np.floor(positions).astype(np.int64)
+    fraction = positions - index
+    offsets = np.arange(-half + 1, half + 1)
+    distance = offsets[np.newaxis, :] - fraction[:, np.newaxis]
+    kernel = cutoff * np.sinc(cutoff * distance) * (0.5 + 0.5 * np.cos(np.pi * distance / half))
+    if cutoff == 1.0:
+        # As in polyphase_kernel, reads at the input samples copy them
+        kernel[fraction == 0] = offsets == 0
+    kernel /= kernel.sum(axis=1, keepdims=True)
+
+    padded = np.pad(samples, (half - 1, half + 1))
+    reads = np.clip(index[:, np.newaxis] + offsets + half - 1, 0, len(padded) - 1)
+    return np.sum(padded[reads] * kernel, axis=1).astype(np.float32)
@@ -0,0 +1,322 @@
+"""
+Song data read from song.asm
+Assembles the instrument and pattern tables of song.asm with the macros and
+constants of common.asm and defines.h, so that edits to the song can be
+loaded into the engine without running the assembler and rebuilding
+"""
+
+import ast
+import operator
+import os
+import re
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+# song.asm of the softsynth sources next to the editor
+DEFAULT_SONG_PATH = (Path(__file__).resolve().parents[4] /
+                     'softsynth' / 'src' / 'arm64' / 'song.asm')
+
+# Labels of the tables loaded into the engine, in SongData order
+SONG_TABLES = ('instrument_instructions', 'instrument_parameters',
+               'instrument_patterns', 'pattern_array')
+
+# Bytes emitted per value by the data directives
+DATA_DIRECTIVES = {'.byte': 1, '.hword': 2, '.word': 4, '.quad': 8}
+
+# Directives without data, and preprocessor conditionals, which are not evaluated
+IGNORED_DIRECTIVES = ('.global', '.globl', '.data', '.text', '.section',
+                      '#ifdef', '#ifndef', '#if', '#else', '#endif')
+
+_LABEL = re.compile(r'(\w+):\s*(.*)')
+_DEFINE = re.compile(r'#define\s+(\w+)(?:\(([^)]*)\))?\s*(.*)')
+_MACRO_ARGUMENT = re.compile(r'\\(\w+)')
+_NAME = re.compile(r'[A-Za-z_]\w*')
+
+_BINARY_OPERATORS = {
+    ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul,
+    # Integer division of the assembler, truncated towards zero
+    ast.Div: lambda a, b: int(a / b), ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod, ast.LShift: operator.lshift, ast.RShift: operator.rshift,
+    ast.BitOr: operator.or_, ast.BitAnd: operator.and_, ast.BitXor: operator.xor,
+}
+_UNARY_OPERATORS = {ast.USub: operator.neg, ast.UAdd: operator.pos, ast.Invert: operator.invert}
+
+
+class SongData(NamedTuple):
+    """Tables of a song, uint8 arrays laid out like the tables of song.asm"""
+    instructions: np.ndarray   # Programs of the instruments and the song, INSTRUMENT_END after each
+    parameters: np.ndarray     # Parameter bytes of every instruction
+    patterns: np.ndarray       # Rows of PATTERNS_PER_INSTRUMENT pattern numbers
+    pattern_array: np.ndarray  # NOTES_PER_PATTERN notes per pattern
+
+
+def _split_arguments(text: str) -> List[str]:
+    """Split comma separated arguments, keeping commas inside parentheses"""
+    arguments, depth, start = [], 0, 0
+    for index, char in enumerate(text):
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif char == ',' and depth == 0:
+            arguments.append(text[start:index].strip())
+            start = index + 1
+    arguments.append(text[start:].strip())
+    return [argument for argument in arguments if argument]
+
+
+class SongAssembler:
+    """Assembler for the directives, macros and constants song.asm uses
+
+    Covers #include, object- and function-like #define, .equ, .macro with
+    backslash arguments, labels and the .byte, .hword, .word and .quad data
+    directives. Preprocessor conditionals are ignored, so everything they
+    enclose is assembled.
+    """
+
+    def __init__(self):
+        """Initialize an assembler without symbols or data"""
+        self.data = bytearray()
+        self.labels: Dict[str, int] = {}
+        self.files: List[Path] = []
+        self._symbols: Dict[str, str] = {}
+        self._functions: Dict[str, Tuple[List[str], str]] = {}
+        self._macros: Dict[str, Tuple[List[str], List[str]]] = {}
+        self._values: Dict[str, int] = {}
+        self._resolving: set = set()
+        self._parsed: Dict[str, ast.AST] = {}
+
+    def assemble(self, path) -> None:
+        """Assemble a source file and the files it includes
+
+        Args:
+            path: Path of the source file
+
+        Raises:
+            OSError: If a file cannot be read
+            ValueError: For unsupported or malformed lines, with file and line number
+        """
+        path = Path(path)
+        self.files.append(path)
+        macro = None
+        for number, line in enumerate(path.read_text().splitlines(), 1):
+            line = line.split('//', 1)[0].strip()
+            if not line:
+                continue
+            try:
+                macro = self._assemble_line(line, path, macro)
+            except (ValueError, SyntaxError, KeyError, ZeroDivisionError) as e:
+                raise ValueError(f"{path.name}:{number}: {e}") from e
+        if macro is not None:
+            raise ValueError(f"{path.name}: .macro {macro[0]} is not closed")
+
+    def table(self, label: str, end: Optional[int] = None) -> np.ndarray:
+        """Get the bytes from a label to the next label of SONG_TABLES or the end
+
+        Args:
+            label: Label at the start of the table
+            end: Offset after the table, found from the other tables if None
+
+        Returns:
+            Uint8 array of the table bytes
+        """
+        start = self._label_offset(label)
+        if end is None:
+            starts = [self._label_offset(name) for name in SONG_TABLES if self._has_label(name)]
+            end = min([offset for offset in starts if offset > start], default=len(self.data))
+        return np.frombuffer(bytes(self.data[start:end]), dtype=np.uint8)
+
+    def evaluate(self, text: str) -> int:
+        """Evaluate an expression of numbers, symbols, labels and #define calls"""
+        text = text.strip()
+        # Fast paths for the numbers and names that fill the pattern tables
+        if text.isdigit():
+            return int(text)
+        if _NAME.fullmatch(text):
+            return self._symbol(text)
+        return self._evaluate_node(self._parse(text), {})
+
+    def _parse(self, text: str):
+        """Parse an expression once, macro bodies repeat the same ones"""
+        if text not in self._parsed:
+            self._parsed[text] = ast.parse(text, mode='eval').body
+        return self._parsed[text]
+
+    def _assemble_line(self, line: str, path: Path, macro):
+        """Assemble one line without comment, returns the macro being defined"""
+        if macro is not None:
+            if line.startswith(('.endmacro', '.endm')):
+                name, parameters, body = macro
+                self._macros[name] = (parameters, body)
+                return None
+            macro[2].append(line)
+            return macro
+
+        label = _LABEL.match(line)
+        if label:
+            self.labels[self._alias(label.group(1))] = len(self.data)
+            line = label.group(2)
+            if not line:
+                return None
+
+        directive, _, rest = line.replace('\t', ' ').partition(' ')
+        rest = rest.strip()
+        if directive == '#include':
+            self.assemble(path.parent / rest.strip('"<>'))
+        elif directive == '#define':
+            self._define(line)
+        elif directive in ('.equ', '.set'):
+            name, expression = rest.split(',', 1)
+            self._symbols[name.strip()] = expression.strip()
+        elif directive == '.macro':
+            name, _, parameters = rest.partition(' ')
+            return (name.strip(), [parameter.split('=')[0].strip()
+                                   for parameter in re.split(r'[,\s]+', parameters) if parameter], [])
+        elif directive in DATA_DIRECTIVES:
+            self._emit(DATA_DIRECTIVES[directive], _split_arguments(rest))
+        elif directive in self._macros:
+            self._expand(directive, _split_arguments(rest), path)
+        elif not directive.startswith(IGNORED_DIRECTIVES):
+            raise ValueError(f"Unsupported instruction {directive!r}")
+        return None
+
+    def _define(self, line: str) -> None:
+        """Record an object- or function-like #define"""
+        match = _DEFINE.match(line)
+        if match is None:
+            raise ValueError(f"Malformed #define {line!r}")
+        name, parameters, body = match.groups()
+        if parameters is not None:
+            self._functions[name] = ([parameter.strip() for parameter in parameters.split(',')],
+                                     body.strip())
+        else:
+            self._symbols[name] = body.strip()
+
+    def _expand(self, name: str, arguments: List[str], path: Path) -> None:
+        """Assemble the body of a macro with its arguments substituted"""
+        parameters, body = self._macros[name]
+        if len(arguments) != len(parameters):
+            raise ValueError(f"{name} takes {len(parameters)} arguments, {len(arguments)} given")
+        values = dict(zip(parameters, arguments))
+        for line in body:
+            self._assemble_line(_MACRO_ARGUMENT.sub(lambda match: values[match.group(1)], line),
+                                path, None)
+
+    def _emit(self, size: int, arguments: List[str]) -> None:
+        """Append values of size bytes, little-endian"""
+        for argument in arguments:
+            value = self.evaluate(argument)
+            if not -(1 << (8 * size - 1)) <= value < (1 << (8 * size)):
+                raise ValueError(f"{argument} = {value} does not fit in {size} bytes")
+            self.data += (value & ((1 << (8 * size)) - 1)).to_bytes(size, 'little')
+
+    def _alias(self, name: str) -> str:
+        """Follow object-like #defines of a name to another name, like the preprocessor"""
+        while _NAME.fullmatch(self._symbols.get(name, '')):
+            name = self._symbols[name]
+        return name
+
+    def _has_label(self, name: str) -> bool:
+        """Check if a label is defined, directly or through #defines"""
+        return self._alias(name) in self.labels
+
+    def _label_offset(self, name: str) -> int:
+        """Get the offset of a label in the assembled data"""
+        if not self._has_label(name):
+            raise ValueError(f"Label {name} is not defined")
+        return self.labels[self._alias(name)]
+
+    def _symbol(self, name: str) -> int:
+        """Get the value of a #define, .equ or label"""
+        if name in self._values:
+            return self._values[name]
+        if name in self._symbols:
+            if name in self._resolving:
+                raise ValueError(f"{name} is defined in terms of itself")
+            self._resolving.add(name)
+            try:
+                value = self.evaluate(self._symbols[name])
+            finally:
+                self._resolving.discard(name)
+            self._values[name] = value
+            return value
+        if name in self.labels:
+            return self.labels[name]
+        raise ValueError(f"Unknown symbol {name}")
+
+    def _evaluate_node(self, node, scope: Dict[str, int]) -> int:
+        """Evaluate a parsed expression, scope holds #define call arguments"""
+        if isinstance(node, ast.Constant) and isinstance(node.value, int):
+            return node.value
+        if isinstance(node, ast.Name):
+            return scope[node.id] if node.id in scope else self._symbol(node.id)
+        if isinstance(node, ast.BinOp) and type(node.op) in _BINARY_OPERATORS:
+            return _BINARY_OPERATORS[type(node.op)](self._evaluate_node(node.left, scope),
+                                                    self._evaluate_node(node.right, scope))
+        if isinstance(node, ast.UnaryOp) and type(node.op) in _UNARY_OPERATORS:
+            return _UNARY_OPERATORS[type(node.op)](self._evaluate_node(node.operand, scope))
+        if (isinstance(node, ast.Call) and isinstance(node.func, ast.Name)
+                and node.func.id in self._functions):
+            parameters, body = self._functions[node.func.id]
+            if len(node.args) != len(parameters):
+                raise ValueError(f"{node.func.id} takes {len(parameters)} arguments")
+            arguments = {parameter: self._evaluate_node(argument, scope)
+                         for parameter, argument in zip(parameters, node.args)}
+            return self._evaluate_node(self._parse(body), arguments)
+        raise ValueError(f"Unsupported expression {ast.dump(node)}")
+
+
+def parse_song(path=DEFAULT_SONG_PATH) -> SongData:
+    """Assemble the song tables of a song.asm
+
+    Args:
+        path: Path of the song source, including common.asm for the macros
+
+    Returns:
+        SongData with the four tables
+
+    Raises:
+        OSError: If a source file cannot be read
+        ValueError: If the source does not assemble or lacks a table
+    """
+    assembler = SongAssembler()
+    assembler.assemble(path)
+    return SongData(*(assembler.table(label) for label in SONG_TABLES))
+
+
+class SongWatcher:
+    """Detects changes of a song file by polling its modification time and size"""
+
+    def __init__(self, path=DEFAULT_SONG_PATH):
+        """Start watching a file, its current state counts as seen
+
+        Args:
+            path: Path of the file to watch
+        """
+        self.path = Path(path)
+        self._stamp = self._read_stamp()
+
+    def _read_stamp(self):
+        """Get the modification time and size of the file, None if it is missing"""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def exists(self) -> bool:
+        """Check if the watched file exists"""
+        return self._stamp is not None
+
+    def poll(self) -> bool:
+        """Check if the file changed since the last poll
+
+        Returns:
+            True if the file was written since the last poll and still exists
+        """
+        stamp = self._read_stamp()
+        changed = stamp is not None and stamp != self._stamp
+        self._stamp = stamp
+        return changed
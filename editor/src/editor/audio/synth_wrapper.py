@@ -3,21 +3,63 @@ Wrapper for the ARM64 synthesizer engine
 Provides Python interface to the native 4K softsynth ARM64 assembly
 """
 
+import logging
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
 import numpy as np
 import synth_engine  # pylint: disable=import-error
+from .engine_math import MAX_NUM_INSTRUMENTS, PATTERNS_PER_INSTRUMENT
+from .note_events import NOTE_EVENT_DTYPE, build_note_events, note_event_words
+from .presets import Preset, replace_program
+from .project import ProjectData
+from .resample import INTERPOLATIONS, pitch_shift, polyphase_upsample
+from .song_asm import SongData
+from .voice_batch import VoiceBatch
+
+# Parameter type of the two-byte STOREVAL destination (ParameterType::UINT16)
+PARAMETER_TYPE_UINT16 = 1
+
+# Sample rate divisors offered for draft renders, see render_draft_note_window
+DRAFT_FACTORS = (1, 2, 4)
+DEFAULT_DRAFT_FACTOR = 2
+
+# Interpolation of the approximate notes played by audition_note
+DEFAULT_AUDITION_INTERPOLATION = 'linear'
 
 class SynthWrapper:
     """Python wrapper for the ARM64 synthesizer engine"""
 
-    def __init__(self):
+    def __init__(self, num_instruments: int = MAX_NUM_INSTRUMENTS,
+                 patterns_per_instrument: int = PATTERNS_PER_INSTRUMENT):
         """Initialize the synthesizer wrapper
+
+        The engine buffers are sized for the instruments and the song length.
+        Instruments the song has no program for start as copies of the first
+        ones and patterns past the end of the song are silent.
+
+        Args:
+            num_instruments: Number of instruments, up to MAX_INSTRUMENTS
+            patterns_per_instrument: Song length in patterns, up to
+                MAX_PATTERNS_PER_INSTRUMENT
         """
         print(f"🔍 DEBUG: Python Process ID = {os.getpid()}")
         print("   Use this PID to attach C++ debugger")
         # Create the ARM64 synth engine instance
-        self.engine = synth_engine.SynthEngine()  # pylint: disable=c-extension-no-member
+        self.engine = synth_engine.SynthEngine(  # pylint: disable=c-extension-no-member
+            num_instruments, patterns_per_instrument)
         self.is_initialized = self.engine.initialize()
+        self.draft_factor = DEFAULT_DRAFT_FACTOR
+        # Renders run on the audition worker too, the engine renders one at a time
+        self.engine_lock = threading.RLock()
+        # Exact notes by (instrument, note) with the generation they were rendered in
+        self._note_cache = {}
+        self._note_generations = {}
+        self._pending_notes = {}
+        self._cache_lock = threading.Lock()
+        self._audition_worker = None
+        self.logger = logging.getLogger(__name__)
         print("ARM64 Synthesizer initialized")
 
     def render_note(self) -> np.ndarray:
@@ -27,9 +69,105 @@ class SynthWrapper:
             NumPy array of mono audio samples
         """
         # Get samples from ARM64 engine
-        samples = self.engine.render_note()
+        with self.engine_lock:
+            samples = self.engine.render_note()
         return np.array(samples, dtype=np.float32)
 
+    def render(self, num_samples: int, out: np.ndarray = None) -> np.ndarray:
+        """Render the next samples of the song and advance the song position
+
+        Blocks of any size continue where the previous block ended. Samples
+        past the end of the song are silent.
+
+        Args:
+            num_samples: Number of samples to render
+            out: Float32 buffer of at least num_samples to render into, or None
+                to allocate one
+
+        Returns:
+            The first num_samples of out
+
+        Raises:
+            ValueError: If out is not a writable float32 buffer of num_samples
+        """
+        if out is None:
+            out = np.zeros(num_samples, dtype=np.float32)
+        if out.dtype != np.float32 or out.ndim != 1 or len(out) < num_samples:
+            raise ValueError(f"Cannot render {num_samples} samples into {out.dtype} {out.shape}")
+        with self.engine_lock:
+            self.engine.render(num_samples, out)
+        return out[:num_samples]
+
+    def set_position(self, sample: int) -> bool:
+        """Move the song position rendered next by render
+
+        Sounding notes and voices are stopped, so the render from the new
+        position does not depend on what was rendered before.
+
+        Args:
+            sample: Song sample, up to the song length
+
+        Returns:
+            True if the position is within the song
+        """
+        return self.engine.set_position(sample)
+
+    def get_position(self) -> int:
+        """Get the song sample rendered next by render"""
+        return self.engine.get_position()
+
+    def get_song_length(self) -> int:
+        """Get the length of the song in samples"""
+        return self.engine.get_song_length()
+
+    def set_sample_rate(self, rate: int) -> bool:
+        """Change the sample rate of the renders without rebuilding the engine
+
+        The oscillator frequencies, envelope steps and filter frequencies
+        follow the rate, the note events and the song position move to the new
+        note length. Sounding notes are stopped.
+
+        Args:
+            rate: Sample rate in Hz, MIN_SAMPLE_RATE to MAX_SAMPLE_RATE
+
+        Returns:
+            True if the rate was accepted
+        """
+        with self.engine_lock:
+            accepted = self.engine.set_sample_rate(rate)
+        if accepted:
+            self.invalidate_note_cache()
+        return accepted
+
+    def get_sample_rate(self) -> int:
+        """Get the sample rate of the renders in Hz"""
+        return self.engine.get_sample_rate()
+
+    def set_tempo(self, beats_per_minute: int) -> bool:
+        """Change the tempo of the song without rebuilding the engine
+
+        The note events and the song position move to the new note length.
+
+        Args:
+            beats_per_minute: Tempo in BPM, MIN_TEMPO to MAX_TEMPO
+
+        Returns:
+            True if the tempo was accepted
+        """
+        with self.engine_lock:
+            accepted = self.engine.set_tempo(beats_per_minute)
+        if accepted:
+            self.invalidate_note_cache()
+        return accepted
+
+    def get_tempo(self) -> int:
+        """Get the tempo of the song in BPM"""
+        return self.engine.get_tempo()
+
+    def get_samples_per_note(self) -> int:
+        """Get the number of samples per pattern row at the sample rate and tempo"""
+        return self.engine.get_samples_per_note()
+
     def render_instrument_note(self, instrument_num: int, note_num: int) -> np.ndarray:
         """Render audio samples for one note from the ARM64 synthesizer
 
@@ -37,14 +175,622 @@ class SynthWrapper:
             NumPy array of mono audio samples
         """
         # Get samples from ARM64 engine
-        samples = self.engine.render_instrument_note(instrument_num, note_num)
+        with self.engine_lock:
+            samples = self.engine.render_instrument_note(instrument_num, note_num)
         # samples = self.engine.render_instrument_note(1, note_num)
         return np.array(samples, dtype=np.float32)
 
+    def render_instrument_note_window(self, instrument_num: int, note_num: int,
+                                      start_sample: int, num_samples: int,
+                                      release_sample: int) -> np.ndarray:
+        """Render a window of samples of one note
+
+        Consecutive windows of the same note continue from the engine state of
+        the previous window; a window starting at sample 0 restarts the note.
+
+        Args:
+            instrument_num: The instrument number (0-3)
+            note_num: The note number to play
+            start_sample: First sample of the window
+            num_samples: Number of samples to render
+            release_sample: Sample index where the note is released
+
+        Returns:
+            NumPy array of mono audio samples
+        """
+        with self.engine_lock:
+            samples = self.engine.render_instrument_note_window(
+                instrument_num, note_num, start_sample, num_samples, release_sample)
+        return np.array(samples, dtype=np.float32)
+
+    def set_draft_factor(self, factor: int) -> bool:
+        """Set the sample rate divisor of the draft renders
+
+        Args:
+            factor: One of DRAFT_FACTORS, 1 renders drafts at full quality
+
+        Returns:
+            True if the factor was accepted
+        """
+        if factor not in DRAFT_FACTORS:
+            return False
+        self.draft_factor = factor
+        return True
+
+    def get_draft_factor(self) -> int:
+        """Get the sample rate divisor of the draft renders"""
+        return self.draft_factor
+
+    def render_draft_note_window(self, instrument_num: int, note_num: int,
+                                 num_samples: int, release_sample: int) -> np.ndarray:
+        """Render the start of a note quickly, at a fraction of the sample rate
+
+        The engine renders at 1/draft_factor of the sample rate with the
+        oscillator, envelope and filter constants rescaled, and the result is
+        upsampled with a polyphase interpolator. Drafts cost about
+        1/draft_factor of a full render and do not disturb the resumable
+        full-rate windows, which restart after a draft.
+
+        Args:
+            instrument_num: The instrument number (0-3)
+            note_num: The note number to play
+            num_samples: Number of samples from the note start, at the full rate
+            release_sample: Sample index where the note is released, at the full rate
+
+        Returns:
+            NumPy array of num_samples mono audio samples
+        """
+        with self.engine_lock:
+            samples = self.engine.render_instrument_note_draft(
+                instrument_num, note_num, num_samples, release_sample, self.draft_factor)
+        return polyphase_upsample(np.array(samples, dtype=np.float32),
+                                  self.draft_factor)[:num_samples]
+
+    def audition_note(self, instrument_num: int, note_num: int, on_exact=None,
+                      interpolation: str = DEFAULT_AUDITION_INTERPOLATION) -> np.ndarray:
+        """Get samples to play for a key press without waiting for a render
+
+        A note rendered since the last change of the instrument is returned as
+        is. Otherwise the exact note is rendered on the audition worker and the
+        nearest note rendered for the instrument before, possibly before the
+        last change, is pitch-shifted to stand in for it. The exact render is
+        cached and passed to on_exact when it completes.
+
+        Args:
+            instrument_num: The instrument number (0-3)
+            note_num: The note number to play
+            on_exact: Called as on_exact(instrument_num, note_num, samples) from
+                the audition worker when the exact render completes, with
+                samples None if it failed, not called if the exact note is
+                returned
+            interpolation: One of INTERPOLATIONS, for the pitch shift
+
+        Returns:
+            NumPy array of mono audio samples as long as the exact note, empty
+            if nothing was rendered for the instrument yet
+
+        Raises:
+            ValueError: If the interpolation is unknown
+        """
+        if interpolation not in INTERPOLATIONS:
+            raise ValueError(f"Unknown interpolation {interpolation!r}")
+        key = (instrument_num, note_num)
+        with self._cache_lock:
+            generation = self._note_generations.get(instrument_num, 0)
+            cached = self._note_cache.get(key)
+            if cached is not None and cached[0] == generation:
+                return cached[1]
+
+            callbacks = self._pending_notes.get(key, (None, None))[1]
+            if callbacks is None:
+                callbacks = []
+                self._pending_notes[key] = (generation, callbacks)
+                if self._audition_worker is None:
+                    self._audition_worker = ThreadPoolExecutor(
+                        max_workers=1, thread_name_prefix='audition')
+                self._audition_worker.submit(self._render_exact_note, key, generation)
+            if on_exact is not None:
+                callbacks.append(on_exact)
+
+            candidates = [(abs(note - note_num), -entry[0], note, entry[1])
+                          for (instrument, note), entry in self._note_cache.items()
+                          if instrument == instrument_num]
+        if not candidates:
+            return np.zeros(0, dtype=np.float32)
+        _, _, nearest, samples = min(candidates, key=lambda candidate: candidate[:3])
+        return pitch_shift(samples, note_num - nearest, interpolation=interpolation)
+
+    def _render_exact_note(self, key, generation):
+        """Render a note on the audition worker and hand it to the waiting callbacks"""
+        try:
+            samples = self.render_instrument_note(*key)
+        except (RuntimeError, ValueError) as e:
+            self.logger.error("Audition render of note %d of instrument %d failed: %s",
+                              key[1], key[0], e)
+            samples = None
+        with self._cache_lock:
+            # The instrument changed during the render, a new press renders again
+            if generation != self._note_generations.get(key[0], 0):
+                return
+            callbacks = self._pending_notes.pop(key)[1]
+            if samples is not None:
+                self._note_cache[key] = (generation, samples)
+        for callback in callbacks:
+            callback(key[0], key[1], samples)
+
+    def invalidate_note_cache(self, instrument_num: Optional[int] = None):
+        """Mark the notes rendered for audition_note as outdated
+
+        Outdated notes still stand in for the exact notes until these are
+        rendered again.
+
+        Args:
+            instrument_num: The instrument that changed, None for all
+        """
+        with self._cache_lock:
+            instruments = ({instrument for instrument, _ in self._note_cache} |
+                           {instrument for instrument, _ in self._pending_notes} |
+                           set(self._note_generations))
+            if instrument_num is not None:
+                instruments = {instrument_num}
+            for instrument in instruments:
+                self._note_generations[instrument] = self._note_generations.get(instrument, 0) + 1
+            for key in [key for key in self._pending_notes if key[0] in instruments]:
+                del self._pending_notes[key]
+
+    def set_control_rate(self, rate: int) -> bool:
+        """Set how often envelopes and stored values are evaluated
+
+        Between control points, envelope steps are reused and stored values are
+        ramped linearly. A rate of 1 evaluates everything on every sample.
+
+        Args:
+            rate: Number of samples between control points (1 to MAX_CONTROL_RATE)
+
+        Returns:
+            True if the rate was accepted
+        """
+        with self.engine_lock:
+            accepted = self.engine.set_control_rate(rate)
+        if accepted:
+            self.invalidate_note_cache()
+        return accepted
+
+    def get_control_rate(self) -> int:
+        """Get the number of samples between control points"""
+        return self.engine.get_control_rate()
+
+    def measure_control_rate_error(self, instrument_num: int, note_num: int,
+                                   rate: int) -> dict:
+        """Compare a note rendered at a control rate with the full-rate rendering
+
+        Args:
+            instrument_num: The instrument number (0-3)
+            note_num: The note number to play
+            rate: Number of samples between control points
+
+        Returns:
+            Dictionary with the maximum and RMS sample error and the RMS of the
+            full-rate rendering
+        """
+        error = self.engine.measure_control_rate_error(instrument_num, note_num, rate)
+        return {
+            'max_error': error.max_error,
+            'rms_error': error.rms_error,
+            'reference_rms': error.reference_rms,
+        }
+
+    def set_wavetable_mode(self, enabled: bool):
+        """Evaluate oscillator waveforms from band-limited tables
+
+        Tables cover sine, square, saw and triangle at the same cost per sample.
+        The table sine differs from the polynomial sine by at most 0.0201.
+
+        Args:
+            enabled: True to use the wavetables, False for the polynomial path
+        """
+        with self.engine_lock:
+            self.engine.set_wavetable_mode(enabled)
+        self.invalidate_note_cache()
+
+    def get_wavetable_mode(self) -> bool:
+        """Check if oscillator waveforms are evaluated from wavetables"""
+        return self.engine.get_wavetable_mode()
+
+    def get_parameter_bytes(self, instrument_num: int) -> np.ndarray:
+        """Get the raw parameter bytes of an instrument and the instruments after it
+
+        Args:
+            instrument_num: The instrument number (0-3)
+
+        Returns:
+            Uint8 array laid out like instrument_parameters in the engine
+        """
+        values = []
+        for instrument in range(instrument_num, self.engine.get_num_instruments()):
+            for index in range(len(self.engine.get_instrument_instructions(instrument))):
+                types = self.engine.get_instrument_instruction_parameter_types(instrument, index)
+                full = self.engine.get_instrument_instruction_parameters_full(instrument, index)
+                for value, parameter_type in zip(full, types):
+                    values.append(value & 0xFF)
+                    if parameter_type == PARAMETER_TYPE_UINT16:
+                        values.append(value >> 8)
+        return np.array(values, dtype=np.uint8)
+
+    def render_voices(self, instrument_num: int, notes, num_samples: int,
+                      release_sample: Optional[int] = None) -> np.ndarray:
+        """Render several notes of an instrument at once
+
+        The notes are rendered as lanes of a VoiceBatch, which costs about the
+        same for one voice as for a few hundred. The noise of a voice is seeded
+        from its note, like a render_instrument_note call.
+
+        Args:
+            instrument_num: The instrument number (0-3)
+            notes: Note number of each voice
+            num_samples: Number of samples to render
+            release_sample: Sample index where all voices are released, or None to hold
+
+        Returns:
+            Float32 array of shape (voices, num_samples)
+        """
+        batch = VoiceBatch(self.engine.get_instrument_instructions(instrument_num),
+                           self.get_parameter_bytes(instrument_num),
+                           flush_to_zero=self.engine.get_flush_to_zero(),
+                           data_offset=self.engine.get_instrument_data_offset(instrument_num),
+                           sample_rate=self.engine.get_sample_rate())
+        releases = None if release_sample is None else [release_sample] * len(notes)
+        return batch.render(notes, num_samples, releases)
+
+    def check_voice_parity(self, instrument_num: int, notes) -> bool:
+        """Check that batched voices render like single-voice engine notes
+
+        Renders every note with render_instrument_note and all of them with
+        render_voices, then compares the samples bit for bit.
+
+        Args:
+            instrument_num: The instrument number (0-3)
+            notes: Note numbers to compare
+
+        Returns:
+            True if every voice matches its engine rendering
+        """
+        single = [self.render_instrument_note(instrument_num, note) for note in notes]
+        # render_note plays 10 notes and releases the last two, trimming the silence
+        samples_per_note = self.get_samples_per_note()
+        batched = self.render_voices(instrument_num, notes, samples_per_note * 10,
+                                     samples_per_note * 8)
+        return all(np.array_equal(voice[:len(samples)].view(np.uint32), samples.view(np.uint32))
+                   and not np.any(np.abs(voice[len(samples):]) > 1e-8)
+                   for voice, samples in zip(batched, single))
+
+    def set_flush_to_zero(self, enabled: bool):
+        """Flush subnormal results to zero while rendering
+
+        Flushing is enabled by default, so decaying filter and envelope tails do
+        not slow rendering down. Disable it to find the instructions that
+        produce subnormal values with count_subnormals.
+
+        Args:
+            enabled: True to flush subnormal results to zero
+        """
+        self.engine.set_flush_to_zero(enabled)
+
+    def get_flush_to_zero(self) -> bool:
+        """Check if subnormal results are flushed to zero"""
+        return self.engine.get_flush_to_zero()
+
+    def set_program_compiler(self, enabled: bool):
+        """Run the instrument programs with fused kernels
+
+        Common instruction chains run as one kernel and instruments that can
+        only output zero are skipped. The renderings are the same as with the
+        interpreter. Enabled by default, but only active while subnormals are
+        flushed to zero, as the kernels do not count them per instruction.
+
+        Args:
+            enabled: True to run the compiled programs, False to interpret
+        """
+        self.engine.set_program_compiler(enabled)
+
+    def get_program_compiler(self) -> bool:
+        """Check if the compiled instrument programs are requested"""
+        return self.engine.get_program_compiler()
+
+    def get_compiled_instructions(self, instrument_num: int) -> list:
+        """Get the compiled opcodes of an instrument
+
+        Args:
+            instrument_num: The instrument number (0-3)
+
+        Returns:
+            List with one opcode per instruction, kernels replace the first
+            opcode of the chain they run
+        """
+        return list(self.engine.get_compiled_instructions(instrument_num))
+
+    def count_subnormals(self, instrument_num: int, note_num: int) -> list:
+        """Render a note and count the subnormal results of each instruction
+
+        Args:
+            instrument_num: The instrument number (0-3)
+            note_num: The note number to play
+
+        Returns:
+            List with the number of subnormal values left on the VM stack by
+            each instruction of the instrument
+        """
+        self.engine.reset_subnormal_counts()
+        self.engine.render_instrument_note(instrument_num, note_num)
+        return list(self.engine.get_subnormal_counts(instrument_num))
+
+    def get_note_events(self, instrument_num: int) -> np.ndarray:
+        """Get the note events the engine plays for an instrument
+
+        Args:
+            instrument_num: The instrument number (0-3)
+
+        Returns:
+            Array of NOTE_EVENT_DTYPE up to and including the end marker
+        """
+        words = np.array(self.engine.get_note_events(instrument_num), dtype=np.uint32)
+        return words.view(NOTE_EVENT_DTYPE)
+
+    def set_note_events(self, instrument_num: int, events: np.ndarray) -> bool:
+        """Replace the note events the engine plays for an instrument
+
+        Events may be due at any sample, not only at the start of a row.
+
+        Args:
+            instrument_num: The instrument number (0-3)
+            events: Event list sorted by sample and ending with an end marker
+
+        Returns:
+            True if the engine accepted the list
+        """
+        return self.engine.set_note_events(instrument_num, note_event_words(events).tolist())
+
+    def compile_note_events(self) -> bool:
+        """Compile the engine's song patterns into note events and upload them
+
+        The events are spaced at the current sample rate and tempo.
+
+        Returns:
+            True if the engine accepted the lists of all instruments
+        """
+        num_instruments = self.engine.get_num_instruments()
+        patterns = [self.engine.get_instrument_patterns(i) for i in range(num_instruments)]
+        events = build_note_events(np.concatenate(patterns), self.engine.get_pattern_array(),
+                                   self.engine.get_patterns_per_instrument(),
+                                   self.engine.get_samples_per_note())
+        return all([self.set_note_events(i, events[i]) for i in range(num_instruments)])
+
+    def load_song(self, song: SongData) -> bool:
+        """Replace the song data the instruments and patterns are built from
+
+        The engine rebuilds its buffers in place, so instruments returned by
+        get_instrument stay valid and show the new programs. Sounding voices
+        are stopped and the note events are compiled from the new patterns.
+
+        Args:
+            song: Tables of the song, e.g. from parse_song
+
+        Returns:
+            True if the engine accepted the song data
+        """
+        with self.engine_lock:
+            # The engine copies each table once, views of a mapped file included
+            loaded = self.engine.load_song(*(np.ascontiguousarray(table, dtype=np.uint8)
+                                             for table in song))
+        if loaded:
+            self.invalidate_note_cache()
+        return loaded
+
+    def get_song(self) -> SongData:
+        """Get the song data the engine plays, with the parameter edits made since loading it
+
+        Returns:
+            SongData that load_song takes back. The pattern rows hold the
+            first PATTERNS_PER_INSTRUMENT patterns of every instrument.
+        """
+        num_instruments = self.engine.get_num_instruments()
+        rows = np.zeros((num_instruments, PATTERNS_PER_INSTRUMENT), dtype=np.uint8)
+        for i in range(num_instruments):
+            patterns = self.engine.get_instrument_patterns(i)[:PATTERNS_PER_INSTRUMENT]
+            rows[i, :len(patterns)] = patterns
+        return SongData(np.array(self.engine.get_program_bytes(), dtype=np.uint8),
+                        np.array(self.engine.get_parameter_bytes(), dtype=np.uint8),
+                        rows.reshape(-1),
+                        np.array(self.engine.get_pattern_array(), dtype=np.uint8))
+
+    def load_project(self, project: ProjectData) -> bool:
+        """Load the song, sample rate and tempo of a project
+
+        Args:
+            project: Project, e.g. from ProjectFile.load
+
+        Returns:
+            True if the engine accepted the song, the sample rate and the tempo,
+            a rejected project leaves the engine as it was
+        """
+        # pylint: disable=c-extension-no-member
+        if not (synth_engine.MIN_SAMPLE_RATE <= project.sample_rate <= synth_engine.MAX_SAMPLE_RATE
+                and synth_engine.MIN_TEMPO <= project.tempo <= synth_engine.MAX_TEMPO):
+            return False
+        with self.engine_lock:
+            return (self.load_song(project.song) and
+                    self.set_sample_rate(project.sample_rate) and
+                    self.set_tempo(project.tempo))
+
+    def get_project(self) -> ProjectData:
+        """Get the song, sample rate and tempo the engine plays as a project"""
+        with self.engine_lock:
+            return ProjectData(self.get_song(), self.get_sample_rate(), self.get_tempo())
+
+    def get_patch(self, instrument_num: int) -> Tuple[bytes, bytes]:
+        """Get the program and the parameter bytes of an instrument, e.g. to store a preset
+
+        Args:
+            instrument_num: The instrument number (0-3)
+
+        Returns:
+            Instruction IDs without INSTRUMENT_END and the raw parameter bytes
+        """
+        return (bytes(self.engine.get_instrument_instructions(instrument_num)),
+                bytes(self.engine.get_instrument_parameter_bytes(instrument_num)))
+
+    def load_preset(self, instrument_num: int, preset: Preset) -> bool:
+        """Load the patch of a preset into an instrument
+
+        A preset with the program of the instrument is written into its
+        parameters at once. Another program changes the layout of the engine
+        buffers, so the song data is rebuilt with it, see load_song.
+
+        Args:
+            instrument_num: The instrument number (0-3)
+            preset: Preset to load
+
+        Returns:
+            True if the engine accepted the patch
+        """
+        if list(preset.instructions) != list(self.engine.get_instrument_instructions(instrument_num)):
+            with self.engine_lock:
+                song = replace_program(self.get_song(), instrument_num,
+                                       preset.instructions, preset.parameters)
+                return self.load_song(song)
+
+        with self.engine_lock:
+            loaded = self.engine.set_instrument_parameter_bytes(instrument_num,
+                                                                list(preset.parameters))
+        if loaded:
+            self.invalidate_note_cache(instrument_num)
+        return loaded
+
+    def set_voice_count(self, instrument_num: int, voices: int) -> bool:
+        """Set how many notes of an instrument may sound at once
+
+        Args:
+            instrument_num: The instrument number (0-3)
+            voices: Number of voices, 1 to MAX_VOICES
+
+        Returns:
+            True if the count was accepted
+        """
+        return self.engine.set_voice_count(instrument_num, voices)
+
+    def get_voice_count(self, instrument_num: int) -> int:
+        """Get the number of voices of an instrument"""
+        return self.engine.get_voice_count(instrument_num)
+
+    def set_voice_stealing(self, stealing: int) -> bool:
+        """Choose the voice a new note takes over when all voices sound
+
+        Args:
+            stealing: VOICE_STEAL_OLDEST or VOICE_STEAL_QUIETEST
+
+        Returns:
+            True if the mode was accepted
+        """
+        return self.engine.set_voice_stealing(stealing)
+
+    def set_cpu_budget(self, budget: float) -> bool:
+        """Limit the time render_voice_block may spend on a block
+
+        Voices that do not fit in the budget are stopped, starting with the
+        ones a new note would steal. The first voice is always rendered.
+
+        Args:
+            budget: Share of the block's playback time, 0 to render every voice
+
+        Returns:
+            True if the budget was accepted
+        """
+        return self.engine.set_cpu_budget(budget)
+
+    def get_cpu_budget(self) -> float:
+        """Get the share of a block's playback time voices may use"""
+        return self.engine.get_cpu_budget()
+
+    def voice_note_on(self, instrument_num: int, note_num: int) -> bool:
+        """Start a note in the voice pool of an instrument"""
+        return self.engine.voice_note_on(instrument_num, note_num)
+
+    def voice_note_off(self, instrument_num: int, note_num: int) -> bool:
+        """Release the voices of an instrument playing a note"""
+        return self.engine.voice_note_off(instrument_num, note_num)
+
+    def stop_voices(self):
+        """Silence every voice immediately"""
+        self.engine.stop_voices()
+
+    def render_voice_block(self, num_samples: int) -> np.ndarray:
+        """Render the next block of all sounding voices
+
+        Args:
+            num_samples: Number of samples to render
+
+        Returns:
+            Mix of the voices of all instruments
+        """
+        with self.engine_lock:
+            samples = self.engine.render_voice_block(num_samples)
+        return np.array(samples, dtype=np.float32)
+
+    def get_voice_stats(self, instrument_num: int) -> dict:
+        """Get the voice usage of an instrument since the last reset
+
+        Args:
+            instrument_num: The instrument number (0-3)
+
+        Returns:
+            Dictionary with the sounding voices, the most voices sounding at
+            once and the voices stolen by new notes and by the CPU budget
+        """
+        stats = self.engine.get_voice_stats(instrument_num)
+        return {
+            'active_voices': stats.active_voices,
+            'peak_voices': stats.peak_voices,
+            'steals': stats.steals,
+            'budget_steals': stats.budget_steals,
+        }
+
+    def reset_voice_stats(self):
+        """Restart the voice statistics of all instruments"""
+        self.engine.reset_voice_stats()
+
     def is_ready(self) -> bool:
         """Check if the synthesizer is ready for use"""
         return self.engine.is_initialized()
 
+    def get_num_instruments(self) -> int:
+        """Get the number of instruments the engine was sized for"""
+        return self.engine.get_num_instruments()
+
+    def update_parameter(self, instrument_num: int, instruction_index: int, param_index: int,
+                         value) -> bool:
+        """Set one parameter of an instrument
+
+        Args:
+            instrument_num: The instrument number (0-3)
+            instruction_index: Index of the instruction in the program
+            param_index: Index of the parameter of the instruction
+            value: Raw value, or the name of an enum value
+
+        Returns:
+            True if the instrument exists and the value was set, False also for
+            STOREVAL destinations past the synth data
+        """
+        with self.engine_lock:
+            if isinstance(value, str):
+                updated = self.engine.update_instrument_parameter_with_string(
+                    instrument_num, instruction_index, param_index, value)
+            else:
+                updated = self.engine.update_instrument_parameter(
+                    instrument_num, instruction_index, param_index, value)
+        if updated:
+            self.invalidate_note_cache(instrument_num)
+        return updated
+
     def get_constants(self) -> dict:
         """Get synthesizer constants from the ARM64 code
 
@@ -76,6 +822,24 @@ class SynthWrapper:
         """
         return self.engine.get_instrument(instrument_num)
 
+    def find_instruction_parameters(self, instrument_num: int, instruction_id: int):
+        """Get the parameters of the first instruction of a given type
+
+        Args:
+            instrument_num: The instrument number (0-3)
+            instruction_id: Instruction ID to look for (e.g. ENVELOPE_ID)
+
+        Returns:
+            List of raw parameter values or None if the instrument has no such instruction
+        """
+        instrument = self.get_instrument(instrument_num)
+        if not instrument:
+            return None
+        for index, instruction in enumerate(instrument.get_instructions()):
+            if instruction == instruction_id:
+                return list(instrument.get_instruction_parameters_full(index))
+        return None
+
     def has_instruments(self) -> bool:
         """Check if the synthesizer has instrument data available
         
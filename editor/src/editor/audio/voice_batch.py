@@ -0,0 +1,350 @@
+"""
+Voice-batched instrument rendering
+Runs the program of an instrument for many voices at once. The workspaces
+are laid out as structure of arrays, one row per workspace word and one lane
+per voice, so every instruction is evaluated for all voices with a few NumPy
+operations. Each lane matches a single-voice render of the ARM64 engine bit
+for bit
+"""
+
+from typing import Callable, List, Optional, Sequence
+
+import numpy as np
+
+from .engine_math import (ENV_STATE_ATTACK, ENV_STATE_DECAY, ENV_STATE_RELEASE,
+                          ENV_STATE_SUSTAIN, ENV_STATE_OFF, ENVELOPE_ID, FILTER_BANDPASS,
+                          FILTER_HIGHPASS, FILTER_ID, FILTER_LOWPASS, FILTER_PEAK, HALF, INV_12,
+                          INV_128, ONE, OPERATION_ID, OSCILLATOR_ID, OSCILLATOR_LFO,
+                          OSCILLATOR_NOISE, OSCILLATOR_SINE, OUTPUT_ID, SAMPLE_RATE, STOREVAL_ID,
+                          TWENTY_FOUR, ZERO, cosine_waveform, pwr, rate_constants, transform)
+from .oscillator_preview import NOISE_DIVISOR, NOISE_MULTIPLIER, noise_seed
+
+# Workspace layout (softsynth/include/defines.h, softsynth/src/arm64/common.asm)
+MAX_COMMANDS = 32
+MAX_COMMAND_PARAMS = 16
+INSTRUMENT_WORKSPACES = 12  # Byte offset of the workspaces in the instrument data
+WORKSPACE_SIZE = MAX_COMMAND_PARAMS * 4
+# Instrument data length of the player, the editor engine packs one workspace per instruction
+INSTRUMENT_LENGTH = INSTRUMENT_WORKSPACES + MAX_COMMANDS * WORKSPACE_SIZE
+
+ENVELOPE_WS_STATE = 0
+ENVELOPE_WS_LEVEL = 1
+ENVELOPE_WS_GAIN_MOD = 2
+OSCILLATOR_WS_PHASE = 0
+OSCILLATOR_WS_GAIN_MOD = 1
+OSCILLATOR_WS_TRANSPOSE_MOD = 2
+OSCILLATOR_WS_DETUNE_MOD = 3
+OSCILLATOR_WS_FREQUENCY_MOD = 4
+OSCILLATOR_WS_COLOR_MOD = 5
+OSCILLATOR_WS_PHASE_MOD = 6
+OSCILLATOR_WS_NOISE_SEED = 13
+STOREVAL_WS_CONTROL_VALUE = 0
+FILTER_WS_LOW = 0
+FILTER_WS_BAND = 1
+FILTER_WS_FREQUENCY_MOD = 2
+FILTER_WS_RESONANCE_MOD = 3
+OUTPUT_WS_GAIN_MOD = 0
+
+# Raw parameter bytes per instruction and the STOREVAL destination word
+PARAMETER_SIZES = {ENVELOPE_ID: 5, OSCILLATOR_ID: 8, STOREVAL_ID: 3, OPERATION_ID: 1,
+                   FILTER_ID: 3, OUTPUT_ID: 1}
+OPERATOR_MULP = 2
+STOREVAL_POP = 0x4000
+STOREVAL_ADD = 0x8000
+STOREVAL_MASK = 0x3FFF
+
+# Smallest normal float32, smaller results are flushed to zero like the FPCR FZ mode
+FLUSH_LIMIT = np.finfo(np.float32).tiny
+
+
+class VoiceBatch:
+    """Instrument program compiled for a batch of voices
+
+    Covers the instructions of a voice: ENVELOPE, OSCILLATOR, STOREVAL,
+    OPERATION, FILTER and OUTPUT, at full control rate with the polynomial
+    waveforms, which are the defaults of the engine. The noise generator
+    state lives in the oscillator workspace, like in the engine.
+    """
+
+    def __init__(self, instructions: Sequence[int], parameters: Sequence[int],
+                 flush_to_zero: bool = True, data_offset: int = 0,
+                 sample_rate: int = SAMPLE_RATE):
+        """Compile the program of an instrument
+
+        Args:
+            instructions: Instruction IDs of the instrument, without INSTRUMENT_END
+            parameters: Raw parameter bytes of the instructions. OPERATION loads
+                8 bytes, the bytes following in memory may be appended
+            flush_to_zero: Flush subnormal results to zero, like the engine does
+                by default
+            data_offset: Byte offset of the instrument data in the engine's
+                synth data, the noise generators are seeded from the position
+                of their workspace
+            sample_rate: Sample rate of the engine in Hz
+
+        Raises:
+            ValueError: If the program uses an instruction or STOREVAL
+                destination that has no batched implementation
+        """
+        self.flush_to_zero = flush_to_zero
+        self.data_offset = data_offset
+        self.frequency_base, self.lfo_frequency_base, self.rate_scale = \
+            rate_constants(sample_rate)
+        # The instrument data of the engine holds one workspace per instruction
+        self.data_length = INSTRUMENT_WORKSPACES + max(len(instructions), 1) * WORKSPACE_SIZE
+        self._raw = np.zeros(sum(PARAMETER_SIZES.get(i, 0) for i in instructions) + 8,
+                             dtype=np.uint8)
+        parameters = np.asarray(parameters, dtype=np.uint8)[:len(self._raw)]
+        self._raw[:len(parameters)] = parameters
+        self._steps: List[Callable[[list], None]] = []
+
+        offset = 0
+        for index, instruction_id in enumerate(instructions):
+            if instruction_id not in PARAMETER_SIZES:
+                raise ValueError(f"Instruction {instruction_id} has no batched implementation")
+            size = PARAMETER_SIZES[instruction_id]
+            raw = self._raw[offset:offset + size]
+            row = index * MAX_COMMAND_PARAMS
+            if instruction_id == ENVELOPE_ID:
+                self._steps.append(self._envelope(row, raw))
+            elif instruction_id == OSCILLATOR_ID:
+                self._steps.append(self._oscillator(row, raw))
+            elif instruction_id == STOREVAL_ID:
+                self._steps.append(self._storeval(row, raw))
+            elif instruction_id == OPERATION_ID:
+                self._steps.append(self._operation(self._raw[offset:offset + 8]))
+            elif instruction_id == FILTER_ID:
+                self._steps.append(self._filter(row, raw))
+            else:
+                self._steps.append(self._output(row, raw))
+            offset += size
+
+        self.workspace = np.zeros((0, 0), dtype=np.float32)
+        self.notes = np.zeros(0, dtype=np.int32)
+        self.output = np.zeros(0, dtype=np.float32)
+        self._release = np.zeros(0, dtype=bool)
+
+    def start(self, notes: Sequence[int]):
+        """Start one voice per note with cleared workspaces
+
+        Args:
+            notes: Note number of each voice
+        """
+        num_voices = len(notes)
+        self.workspace = np.zeros((MAX_COMMANDS * MAX_COMMAND_PARAMS, num_voices),
+                                  dtype=np.float32)
+        self.notes = np.array(notes, dtype=np.int32)
+        self.output = np.zeros(num_voices, dtype=np.float32)
+        self._release = np.zeros(num_voices, dtype=bool)
+
+    def next_sample(self, release: np.ndarray) -> np.ndarray:
+        """Render the next sample of every voice, like debug_next_instrument_sample
+
+        Args:
+            release: Boolean array, True for the voices in release
+
+        Returns:
+            Float32 array with the output of each voice
+        """
+        self._release = np.asarray(release, dtype=bool)
+        # Voices without a note whose output decayed to silence skip the program
+        words = self.output.view(np.uint32)
+        active = (self.notes != 0) | ((words & 0x7FFFFFFF) != 0)
+        if not active.all():
+            saved_workspace = self.workspace.copy()
+            saved_output = self.output.copy()
+
+        stack: list = []
+        for step in self._steps:
+            step(stack)
+
+        if not active.all():
+            self.workspace[:, ~active] = saved_workspace[:, ~active]
+            self.output[~active] = saved_output[~active]
+        # The note ends when the state word of the first workspace is ENV_STATE_OFF
+        self.notes[self.workspace[0].view(np.uint32) == ENV_STATE_OFF] = 0
+        return self.output.copy()
+
+    def render(self, notes: Sequence[int], num_samples: int,
+               release_samples: Optional[Sequence[int]] = None) -> np.ndarray:
+        """Render a note on every voice
+
+        Args:
+            notes: Note number of each voice
+            num_samples: Number of samples to render
+            release_samples: Sample index where each voice is released, or
+                None to hold all notes
+
+        Returns:
+            Float32 array of shape (voices, num_samples)
+        """
+        self.start(notes)
+        releases = np.full(len(notes), num_samples) if release_samples is None else \
+            np.asarray(release_samples)
+        output = np.zeros((num_samples, len(notes)), dtype=np.float32)
+        for sample in range(num_samples):
+            output[sample] = self.next_sample(sample >= releases)
+        return output.T.copy()
+
+    def _flush(self, values: np.ndarray) -> np.ndarray:
+        """Flush subnormal values to zero, keeping the sign"""
+        if self.flush_to_zero:
+            values = np.where(np.abs(values) < FLUSH_LIMIT, values * ZERO, values)
+        return values
+
+    def _envelope(self, row: int, raw: np.ndarray) -> Callable[[list], None]:
+        """Batched envelope_function"""
+        values = transform(raw)
+        steps = self._flush(pwr(-(values[:ENV_STATE_RELEASE + 1] * TWENTY_FOUR)) *
+                            self.rate_scale)
+        sustain = values[ENV_STATE_SUSTAIN]
+        gain = values[4]
+
+        def envelope(stack: list):
+            state = self.workspace[row + ENVELOPE_WS_STATE].view(np.uint32)
+            playing = self.notes != 0
+            state[playing & self._release] = ENV_STATE_RELEASE
+            level = self.workspace[row + ENVELOPE_WS_LEVEL]
+
+            attack = playing & (state == ENV_STATE_ATTACK)
+            decay = playing & (state == ENV_STATE_DECAY)
+            release = playing & (state == ENV_STATE_RELEASE)
+            rising = self._flush(level + steps[ENV_STATE_ATTACK])
+            falling = self._flush(level - np.where(decay, steps[ENV_STATE_DECAY],
+                                                   steps[ENV_STATE_RELEASE]))
+            done_attack = attack & ~(rising < ONE)
+            done_decay = decay & ~(falling > sustain)
+            done_release = release & ~(falling > ZERO)
+            level = np.where(attack, np.where(done_attack, ONE, rising), level)
+            level = np.where(decay, np.where(done_decay, sustain, falling), level)
+            level = np.where(release, np.where(done_release, ZERO, falling), level)
+            state += (done_attack | done_decay | done_release).astype(np.uint32)
+            self.workspace[row + ENVELOPE_WS_LEVEL] = level
+
+            amount = self._flush(gain + self.workspace[row + ENVELOPE_WS_GAIN_MOD])
+            stack.append(np.where(playing, self._flush(level * amount), ZERO))
+
+        return envelope
+
+    def _oscillator(self, row: int, raw: np.ndarray) -> Callable[[list], None]:
+        """Batched oscillator_function"""
+        values = transform(raw[:7])
+        transpose, detune, phase_offset, _, color, _, gain = values
+        waveform_type = int(raw[7])
+        lfo = bool(waveform_type & OSCILLATOR_LFO)
+        base = self.lfo_frequency_base if lfo else self.frequency_base
+        workspace_offset = self.data_offset + INSTRUMENT_WORKSPACES + row * 4
+        # The increment only changes with the note and the transpose and detune inputs
+        cache: dict = {}
+
+        def increment() -> np.ndarray:
+            transpose_mod = self.workspace[row + OSCILLATOR_WS_TRANSPOSE_MOD]
+            detune_mod = self.workspace[row + OSCILLATOR_WS_DETUNE_MOD]
+            key = (self.notes.tobytes(), transpose_mod.tobytes(), detune_mod.tobytes())
+            if cache.get('key') != key:
+                offset = self._flush((transpose - HALF) + transpose_mod) / INV_128
+                offset = self._flush(offset + (detune - HALF) / HALF)
+                offset = self._flush(offset + detune_mod)
+                if not lfo:
+                    offset = self._flush(offset + self.notes.astype(np.float32))
+                cache['key'] = key
+                cache['value'] = self._flush(pwr(offset * INV_12) * base)
+            return cache['value']
+
+        def oscillator(stack: list):
+            ws = self.workspace
+            phase = self._flush(increment() + ws[row + OSCILLATOR_WS_PHASE])
+            phase = self._flush(phase + ws[row + OSCILLATOR_WS_FREQUENCY_MOD]) + ONE
+            phase = self._flush(phase - np.floor(phase))
+            ws[row + OSCILLATOR_WS_PHASE] = phase
+            phase = self._flush(self._flush(phase + ws[row + OSCILLATOR_WS_PHASE_MOD]) +
+                                phase_offset) + ONE
+            output = self._flush(phase - np.floor(phase))
+            if waveform_type & OSCILLATOR_SINE:
+                shape = self._flush(color + ws[row + OSCILLATOR_WS_COLOR_MOD])
+                output = self._flush(cosine_waveform(output, shape))
+            if waveform_type & OSCILLATOR_NOISE:
+                seeds = ws[row + OSCILLATOR_WS_NOISE_SEED].view(np.uint32)
+                # A cleared workspace is seeded from the note on the first sample
+                unseeded = seeds == 0
+                seeds[unseeded] = [noise_seed(int(note), workspace_offset)
+                                   for note in self.notes[unseeded]]
+                seeds *= np.uint32(NOISE_MULTIPLIER)
+                output = seeds.view(np.int32).astype(np.float32) / NOISE_DIVISOR
+            amount = self._flush(gain + ws[row + OSCILLATOR_WS_GAIN_MOD])
+            stack.append(self._flush(output * amount))
+
+        return oscillator
+
+    def _storeval(self, row: int, raw: np.ndarray) -> Callable[[list], None]:
+        """Batched storeval_function at full control rate"""
+        amount = (transform(raw[0]) - HALF) / HALF
+        destination = int(raw[1]) | int(raw[2]) << 8
+        offset = destination & STOREVAL_MASK
+        if offset < INSTRUMENT_WORKSPACES or offset >= self.data_length or offset % 4:
+            raise ValueError(f"STOREVAL destination {offset} is not a workspace value")
+        target = (offset - INSTRUMENT_WORKSPACES) // 4
+
+        def storeval(stack: list):
+            value = self._flush(amount * stack[-1])
+            # The control-rate ramp keeps the value in the own workspace
+            self.workspace[row + STOREVAL_WS_CONTROL_VALUE] = value
+            if destination & STOREVAL_POP:
+                stack.pop()
+            if destination & STOREVAL_ADD:
+                value = self._flush(value + self.workspace[target])
+            self.workspace[target] = value
+
+        return storeval
+
+    def _operation(self, raw: np.ndarray) -> Callable[[list], None]:
+        """Batched operation_function, which compares 8 bytes with the operator"""
+        multiply = int.from_bytes(raw.tobytes(), 'little') != OPERATOR_MULP
+
+        def operation(stack: list):
+            if multiply:
+                value = stack.pop()
+                stack[-1] = self._flush(stack[-1] * value)
+
+        return operation
+
+    def _filter(self, row: int, raw: np.ndarray) -> Callable[[list], None]:
+        """Batched filter_function"""
+        frequency, resonance = transform(raw[:2])
+        filter_type = int(raw[2])
+
+        def svf(stack: list):
+            ws = self.workspace
+            g = self._flush(frequency + ws[row + FILTER_WS_FREQUENCY_MOD])
+            g = self._flush(g * g)
+            # Lower rates keep the scaled frequency at max(frequency, 1), like the engine
+            g = np.minimum(self._flush(g * self.rate_scale), np.maximum(g, ONE))
+            r = self._flush(resonance + ws[row + FILTER_WS_RESONANCE_MOD])
+            band, low = ws[row + FILTER_WS_BAND], ws[row + FILTER_WS_LOW]
+            high = self._flush(self._flush(stack[-1] - low) - self._flush(r * band))
+            new_band = self._flush(band + self._flush(g * high))
+            new_low = self._flush(low + self._flush(g * band))
+            ws[row + FILTER_WS_LOW] = new_low
+            ws[row + FILTER_WS_BAND] = new_band
+            output = np.zeros_like(new_low)
+            if filter_type & FILTER_LOWPASS:
+                output = self._flush(output + new_low)
+            if filter_type & FILTER_HIGHPASS:
+                output = self._flush(output + high)
+            if filter_type & FILTER_BANDPASS:
+                output = self._flush(output + new_band)
+            if filter_type & FILTER_PEAK:
+                output = self._flush(self._flush(output + new_low) - high)
+            stack[-1] = output
+
+        return svf
+
+    def _output(self, row: int, raw: np.ndarray) -> Callable[[list], None]:
+        """Batched output_function"""
+        gain = transform(raw[0])
+
+        def output(stack: list):
+            amount = self._flush(gain + self.workspace[row + OUTPUT_WS_GAIN_MOD])
+            self.output = self._flush(stack.pop() * amount)
+
+        return output
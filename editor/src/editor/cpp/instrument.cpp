@@ -7,6 +7,7 @@
 #include "parameters.h"
 #include <iostream>
 #include <iomanip>
+#include <algorithm>
 #include <cmath>
 
 // Debug logging macro
@@ -26,9 +27,54 @@ extern "C"
 #include "../../softsynth/include/defines.h"
 }
 
-Instrument::Instrument(uint32_t instrument_id) : id_(instrument_id)
+uint64_t Instrument::render_generation_ = 0;
+
+// STOREVAL destination word of common.asm: byte offset and flags
+static constexpr uint16_t STOREVAL_POP = 0x4000;
+static constexpr uint16_t STOREVAL_MASK = 0x3FFF;
+
+// Flushes subnormal results to zero while rendering sample by sample, like
+// dope4ks_render does, and restores the previous mode when leaving the scope
+class FlushToZeroScope
+{
+public:
+    FlushToZeroScope()
+    {
+#if defined(__aarch64__)
+        asm volatile("mrs %0, fpcr" : "=r"(saved_fpcr_));
+        uint64_t fpcr = flush_to_zero ? (saved_fpcr_ | FPCR_FZ) : (saved_fpcr_ & ~FPCR_FZ);
+        asm volatile("msr fpcr, %0" : : "r"(fpcr));
+#endif
+    }
+
+    ~FlushToZeroScope()
+    {
+#if defined(__aarch64__)
+        asm volatile("msr fpcr, %0" : : "r"(saved_fpcr_));
+#endif
+    }
+
+private:
+    static constexpr uint64_t FPCR_FZ = 1ull << 24;
+    uint64_t saved_fpcr_ = 0;
+};
+
+Instrument::Instrument(uint32_t instrument_id, const engine_layout *layout) : id_(instrument_id), layout_(layout)
 {
     DEBUG_LOG("Creating Instrument " << instrument_id);
+    reload();
+}
+
+void Instrument::reload()
+{
+    const instrument_layout &instrument = layout_->instruments[id_];
+    data_offset_ = static_cast<uint32_t>(instrument.data);
+    parameter_slot_ = static_cast<uint32_t>(instrument.parameters / DATA_WORKSPACE_SIZE);
+    workspaces_ = static_cast<uint32_t>(instrument.workspaces);
+    instructions_.clear();
+    parameters_.clear();
+    external_targets_.clear();
+    window_generation_ = 0;
     load_instructions_and_parameters();
 }
 
@@ -292,10 +338,38 @@ void Instrument::update_parameter(uint32_t instruction_index, uint32_t param_ind
                                                     << " param " << param_index << " (enum) to " << static_cast<int>(value & 0xFF));
                 }
             }
+
+            // The engine reads the transformed values, keep them in sync
+            transform_instruction_parameters(instruction_index);
+            compile_program(external_targets_);
         }
     }
 }
 
+std::vector<uint8_t> Instrument::get_parameter_bytes() const
+{
+    const uint8_t *first = layout_->instrument_parameters + parameter_offset_;
+    return std::vector<uint8_t>(first, first + parameter_size_);
+}
+
+bool Instrument::set_parameter_bytes(const std::vector<uint8_t> &bytes)
+{
+    if (bytes.size() != parameter_size_)
+    {
+        DEBUG_LOG("Instrument " << id_ << " has " << parameter_size_ << " parameter bytes, "
+                                << bytes.size() << " given");
+        return false;
+    }
+
+    std::copy(bytes.begin(), bytes.end(), layout_->instrument_parameters + parameter_offset_);
+    for (uint32_t i = 0; i < instructions_.size(); ++i)
+    {
+        transform_instruction_parameters(i);
+    }
+    compile_program(external_targets_);
+    return true;
+}
+
 void Instrument::update_parameter_with_string(uint32_t instruction_index, uint32_t param_index, const std::string &value)
 {
     if (instruction_index < parameters_.size())
@@ -332,19 +406,32 @@ void Instrument::update_parameter_with_string(uint32_t instruction_index, uint32
     }
 }
 
+void Instrument::select_layout(const engine_layout &layout)
+{
+    if (synth_layout.synth_data != layout.synth_data)
+    {
+        synth_layout = layout;
+        invalidate_render_state();
+    }
+}
+
 std::vector<float> Instrument::render_note(uint32_t note_num)
 {
     int num_notes = 10;
-    int num_samples = SAMPLES_PER_NOTE * num_notes;
+    int samples_per_note = static_cast<int>(layout_->samples_per_note);
+    int num_samples = samples_per_note * num_notes;
     DEBUG_LOG("Instrument " << id_ << " rendering " << num_samples << " samples for note " << note_num);
     std::vector<float> output(num_samples);
 
+    select_layout(*layout_);
     debug_start_instrument_note(id_, note_num);
+    invalidate_render_state();
+    FlushToZeroScope flush_to_zero_scope;
 
     // Render samples with hold and release phases
     for (int i = 0; i < num_samples; i++)
     {
-        uint8_t release = (i >= SAMPLES_PER_NOTE * (num_notes - 2)) ? 1 : 0;
+        uint8_t release = (i >= samples_per_note * (num_notes - 2)) ? 1 : 0;
         debug_next_instrument_sample(id_, &output[i], release);
     }
 
@@ -358,12 +445,68 @@ std::vector<float> Instrument::render_note(uint32_t note_num)
     return output;
 }
 
+std::vector<float> Instrument::render_note_window(uint32_t note_num, uint32_t start_sample,
+                                                  uint32_t num_samples, uint32_t release_sample)
+{
+    DEBUG_LOG("Instrument " << id_ << " rendering samples " << start_sample << "-"
+                            << start_sample + num_samples << " for note " << note_num);
+
+    // Resume from the previous window if the engine still holds its state,
+    // otherwise restart the note and run up to the start of the window.
+    // A window starting at sample 0 always restarts, e.g. after a parameter change.
+    select_layout(*layout_);
+    bool resume = start_sample > 0 &&
+                  window_generation_ == render_generation_ &&
+                  window_note_ == note_num &&
+                  window_release_ == release_sample &&
+                  window_position_ <= start_sample;
+    if (!resume)
+    {
+        debug_start_instrument_note(id_, note_num);
+        invalidate_render_state();
+        window_generation_ = render_generation_;
+        window_note_ = note_num;
+        window_release_ = release_sample;
+        window_position_ = 0;
+    }
+
+    FlushToZeroScope flush_to_zero_scope;
+    float discarded;
+    for (; window_position_ < start_sample; window_position_++)
+    {
+        debug_next_instrument_sample(id_, &discarded, window_position_ >= release_sample ? 1 : 0);
+    }
+
+    std::vector<float> output(num_samples);
+    for (uint32_t i = 0; i < num_samples; i++, window_position_++)
+    {
+        debug_next_instrument_sample(id_, &output[i], window_position_ >= release_sample ? 1 : 0);
+    }
+    return output;
+}
+
+void Instrument::render_voice(std::vector<uint8_t> &data, uint8_t release, float *output, uint32_t num_samples)
+{
+    select_layout(*layout_);
+    uint8_t *slot = reinterpret_cast<uint8_t *>(layout_->synth_data) + data_offset_;
+    std::swap_ranges(data.begin(), data.end(), slot);
+    invalidate_render_state();
+    {
+        FlushToZeroScope flush_to_zero_scope;
+        for (uint32_t i = 0; i < num_samples; i++)
+        {
+            debug_next_instrument_sample(id_, &output[i], release);
+        }
+    }
+    std::swap_ranges(data.begin(), data.end(), slot);
+}
+
 void Instrument::load_instructions_and_parameters()
 {
     DEBUG_LOG("Loading instructions and parameters for instrument " << id_);
 
     // Load instructions
-    uint8_t *instr_ptr = instrument_instructions;
+    uint8_t *instr_ptr = layout_->instrument_instructions;
     uint32_t current_instrument = 0;
 
     // Navigate to the correct instrument
@@ -378,6 +521,7 @@ void Instrument::load_instructions_and_parameters()
     }
 
     // Read instructions for this instrument
+    instruction_offset_ = static_cast<uint32_t>(instr_ptr - layout_->instrument_instructions);
     while (*instr_ptr != INSTRUMENT_END)
     {
         instructions_.push_back(static_cast<int>(*instr_ptr));
@@ -392,13 +536,13 @@ void Instrument::load_instructions_and_parameters()
 
 void Instrument::load_parameters_for_instructions()
 {
-    uint8_t *param_ptr = instrument_parameters;
+    uint8_t *param_ptr = layout_->instrument_parameters;
     uint32_t current_instrument = 0;
 
     // Navigate to the correct instrument's parameters
     while (current_instrument < id_)
     {
-        uint8_t *temp_instr_ptr = instrument_instructions;
+        uint8_t *temp_instr_ptr = layout_->instrument_instructions;
         uint32_t temp_instrument = 0;
 
         // Skip to current instrument in instruction stream
@@ -422,6 +566,9 @@ void Instrument::load_parameters_for_instructions()
         current_instrument++;
     }
 
+    parameter_offset_ = static_cast<uint32_t>(param_ptr - layout_->instrument_parameters);
+    parameter_size_ = 0;
+
     // Load parameter pointers for our instrument
     for (size_t i = 0; i < instructions_.size(); ++i)
     {
@@ -450,7 +597,164 @@ void Instrument::load_parameters_for_instructions()
         // This should match the original memory layout from the ARM64 assembly
         uint32_t memory_size = get_instruction_memory_size(instruction_id);
         param_ptr += memory_size;
+        parameter_size_ += memory_size;
+    }
+}
+
+void Instrument::transform_instruction_parameters(uint32_t instruction_index)
+{
+    if (instruction_index >= parameters_.size() || parameters_[instruction_index].empty())
+    {
+        return;
+    }
+
+    // Same conversion as transform_parameters in the engine, one slot per instruction
+    const uint8_t *bytes = parameters_[instruction_index][0];
+    uint32_t size = get_instruction_memory_size(instructions_[instruction_index]);
+    float *transformed = &layout_->transformed_parameters[(parameter_slot_ + instruction_index) * MAX_COMMAND_PARAMS];
+    for (uint32_t i = 0; i < size; i++)
+    {
+        transformed[i] = bytes[i] * (1.0f / 128.0f);
+    }
+}
+
+std::vector<uint32_t> Instrument::get_storeval_targets() const
+{
+    return get_storeval_targets(&layout_->instrument_instructions[instruction_offset_],
+                                &layout_->instrument_parameters[parameter_offset_]);
+}
+
+std::vector<uint32_t> Instrument::get_storeval_targets(const std::vector<uint8_t> &parameter_bytes) const
+{
+    if (parameter_bytes.size() != parameter_size_)
+    {
+        return std::vector<uint32_t>();
+    }
+    return get_storeval_targets(&layout_->instrument_instructions[instruction_offset_], parameter_bytes.data());
+}
+
+std::vector<uint32_t> Instrument::get_storeval_targets(const uint8_t *instructions, const uint8_t *parameters)
+{
+    std::vector<uint32_t> targets;
+    for (; *instructions != INSTRUMENT_END; ++instructions)
+    {
+        if (*instructions == STOREVAL_ID)
+        {
+            targets.push_back((parameters[1] | (parameters[2] << 8)) & STOREVAL_MASK);
+        }
+        parameters += get_instruction_memory_size(*instructions);
+    }
+    return targets;
+}
+
+void Instrument::compile_program(const std::vector<uint32_t> &external_targets)
+{
+    external_targets_ = external_targets;
+    std::vector<uint8_t> previous = get_compiled_instructions();
+    uint8_t *program = &layout_->compiled_instructions[instruction_offset_];
+    std::copy(instructions_.begin(), instructions_.end(), program);
+
+    if (is_silent())
+    {
+        // The kernel skips the whole program, the other opcodes are never read
+        program[0] = KERNEL_SILENT;
+    }
+    else
+    {
+        // The opcodes after a kernel stay, process_stack continues after them
+        for (size_t i = 0; i < instructions_.size(); ++i)
+        {
+            uint32_t kernel = match_voice_kernel(i);
+            if (kernel != 0)
+            {
+                program[i] = static_cast<uint8_t>(kernel);
+            }
+        }
+    }
+
+    if (get_compiled_instructions() != previous)
+    {
+        DEBUG_LOG("Instrument " << id_ << " compiled to " << get_compiled_instructions().size() << " opcodes");
+        invalidate_render_state();
+    }
+}
+
+std::vector<uint8_t> Instrument::get_compiled_instructions() const
+{
+    const uint8_t *program = &layout_->compiled_instructions[instruction_offset_];
+    return std::vector<uint8_t>(program, program + instructions_.size());
+}
+
+bool Instrument::is_silent() const
+{
+    // Only the last OUTPUT decides what the instrument outputs. With gain 0 its
+    // output is zero, unless a STOREVAL modulates the gain. Writes outside the
+    // instrument or from other instruments could change other state, keep those
+    auto last_output = std::find(instructions_.rbegin(), instructions_.rend(), OUTPUT_ID);
+    if (last_output == instructions_.rend() || !external_targets_.empty())
+    {
+        return false;
+    }
+    size_t output_index = instructions_.size() - 1 - (last_output - instructions_.rbegin());
+    if (*parameters_[output_index][0] != 0)
+    {
+        return false;
+    }
+
+    uint32_t output_workspace = DATA_WORKSPACES + static_cast<uint32_t>(output_index) * DATA_WORKSPACE_SIZE;
+    for (uint32_t target : get_storeval_targets())
+    {
+        if (target >= get_data_length() ||
+            (target >= output_workspace && target < output_workspace + DATA_WORKSPACE_SIZE))
+        {
+            return false;
+        }
+    }
+    return true;
+}
+
+uint32_t Instrument::match_voice_kernel(size_t instruction_index) const
+{
+    // ENVELOPE, [STOREVAL], OSCILLATOR, OPERATION, [FILTER], OUTPUT
+    uint32_t kernel = KERNEL_VOICE;
+    size_t i = instruction_index;
+    auto next_is = [&](int instruction_id)
+    {
+        return i < instructions_.size() && instructions_[i] == instruction_id;
+    };
+
+    if (!next_is(ENVELOPE_ID))
+    {
+        return 0;
+    }
+    i++;
+    if (next_is(STOREVAL_ID))
+    {
+        // The kernel keeps the envelope value, a popping STOREVAL stays interpreted
+        const uint8_t *bytes = parameters_[i][0];
+        if ((bytes[1] | (bytes[2] << 8)) & STOREVAL_POP)
+        {
+            return 0;
+        }
+        kernel += KERNEL_VOICE_STOREVAL;
+        i++;
+    }
+    if (!next_is(OSCILLATOR_ID))
+    {
+        return 0;
+    }
+    i++;
+    if (!next_is(OPERATION_ID))
+    {
+        return 0;
+    }
+    i++;
+    if (next_is(FILTER_ID))
+    {
+        kernel += KERNEL_VOICE_FILTER;
+        i++;
     }
+    return next_is(OUTPUT_ID) ? kernel : 0;
 }
 
 uint32_t Instrument::get_instruction_param_count(int instruction_id) const
@@ -476,7 +780,7 @@ uint32_t Instrument::get_instruction_param_count(int instruction_id) const
     }
 }
 
-uint32_t Instrument::get_instruction_memory_size(int instruction_id) const
+uint32_t Instrument::get_instruction_memory_size(int instruction_id)
 {
     switch (instruction_id)
     {
@@ -9,11 +9,18 @@
 #include <string>
 #include <cstdint>
 #include "parameters.h"
+#include "../../softsynth/include/defines.h"
+
+struct engine_layout;
 
 class Instrument
 {
 public:
-    Instrument(uint32_t instrument_id);
+    Instrument(uint32_t instrument_id, const engine_layout *layout);
+
+    // Read the program and the position of the instrument again, after the
+    // engine rebuilt its buffers for new song data
+    void reload();
 
     uint32_t get_id() const { return id_; }
 
@@ -41,20 +48,86 @@ public:
 
     void update_parameter_with_string(uint32_t instruction_index, uint32_t param_index, const std::string &value);
 
+    // Parameter bytes of the whole program, laid out like instrument_parameters.
+    // set_parameter_bytes writes them at once and returns false if the size
+    // does not match the program
+    std::vector<uint8_t> get_parameter_bytes() const;
+    bool set_parameter_bytes(const std::vector<uint8_t> &bytes);
+
     std::vector<float> render_note(uint32_t note_num);
 
+    std::vector<float> render_note_window(uint32_t note_num, uint32_t start_sample,
+                                          uint32_t num_samples, uint32_t release_sample);
+
+    // Render a note kept outside synth_data, e.g. one voice of a VoicePool. The
+    // data is swapped into the instrument's slot for the block and swapped back
+    void render_voice(std::vector<uint8_t> &data, uint8_t release, float *output, uint32_t num_samples);
+
+    // Must be called when the engine state is modified outside of Instrument rendering
+    static void invalidate_render_state() { render_generation_++; }
+    // Point the ARM64 code at the buffers of an engine, see synth_layout
+    static void select_layout(const engine_layout &layout);
+
+    // Byte offsets into the instrument data written by the STOREVAL instructions
+    std::vector<uint32_t> get_storeval_targets() const;
+    // The same for a program laid out like instrument_instructions, ending with
+    // INSTRUMENT_END, and its parameters
+    static std::vector<uint32_t> get_storeval_targets(const uint8_t *instructions, const uint8_t *parameters);
+    // The same for parameter bytes laid out like get_parameter_bytes, empty if
+    // their size does not match the program
+    std::vector<uint32_t> get_storeval_targets(const std::vector<uint8_t> &parameter_bytes) const;
+
+    // Write the opcodes of the instrument to compiled_instructions, with common
+    // instruction chains replaced by fused kernels. external_targets are the
+    // offsets into the instrument data written by other instruments
+    void compile_program(const std::vector<uint32_t> &external_targets);
+
+    std::vector<uint8_t> get_compiled_instructions() const;
+
+    // Position of the instrument data in synth_data and its length, one workspace per instruction
+    uint32_t get_data_offset() const { return data_offset_; }
+    uint32_t get_data_length() const { return DATA_WORKSPACES + workspaces_ * DATA_WORKSPACE_SIZE; }
+
+    // Number of parameter bytes of an instruction
+    static uint32_t get_instruction_memory_size(int instruction_id);
+
+    // Instrument data layout of common.asm: note, release and output words, then the workspaces
+    static constexpr uint32_t DATA_WORKSPACES = 12;
+    static constexpr uint32_t DATA_WORKSPACE_SIZE = MAX_COMMAND_PARAMS * 4;
+    // Data length of the player, which has room for MAX_COMMANDS workspaces per instrument
+    static constexpr uint32_t DATA_LENGTH = DATA_WORKSPACES + MAX_COMMANDS * DATA_WORKSPACE_SIZE;
+
 private:
     uint32_t id_;
+    const engine_layout *layout_;                     // Buffers of the engine the instrument belongs to
+    uint32_t data_offset_;                            // Offset of the instrument data in synth_data
+    uint32_t parameter_slot_;                         // First transformed parameters slot
+    uint32_t workspaces_;                             // Workspaces in the instrument data, see synth_layout
     std::vector<int> instructions_;
     std::vector<std::vector<uint8_t *>> parameters_; // Store pointers to actual parameter locations
+    uint32_t instruction_offset_ = 0;                 // First opcode in instrument_instructions
+    uint32_t parameter_offset_ = 0;                   // First byte in instrument_parameters
+    uint32_t parameter_size_ = 0;                     // Parameter bytes of the program
+    std::vector<uint32_t> external_targets_;          // Kept to recompile after parameter updates
+
+    // Engine state left behind by the last render_note_window call, used to resume windows
+    static uint64_t render_generation_;
+    uint64_t window_generation_ = 0;
+    uint32_t window_note_ = 0;
+    uint32_t window_release_ = 0;
+    uint32_t window_position_ = 0;
 
     void load_instructions_and_parameters();
 
     void load_parameters_for_instructions();
 
-    uint32_t get_instruction_param_count(int instruction_id) const;
+    void transform_instruction_parameters(uint32_t instruction_index);
+
+    bool is_silent() const;
 
-    uint32_t get_instruction_memory_size(int instruction_id) const;
+    uint32_t match_voice_kernel(size_t instruction_index) const;
+
+    uint32_t get_instruction_param_count(int instruction_id) const;
 
     std::string get_instruction_name_by_id(int instruction_id) const;
 
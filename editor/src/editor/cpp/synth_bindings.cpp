@@ -72,6 +72,28 @@ PYBIND11_MODULE(synth_engine, m)
         .def("__repr__", [](const ParameterEnum &pe)
              { return "ParameterEnum(values=" + std::to_string(pe.values.size()) + " items)"; });
 
+    // Expose ControlRateError struct
+    py::class_<ControlRateError>(m, "ControlRateError")
+        .def_readonly("max_error", &ControlRateError::max_error)
+        .def_readonly("rms_error", &ControlRateError::rms_error)
+        .def_readonly("reference_rms", &ControlRateError::reference_rms)
+        .def("__repr__", [](const ControlRateError &cre)
+             { return "ControlRateError(max=" + std::to_string(cre.max_error) +
+                      ", rms=" + std::to_string(cre.rms_error) +
+                      ", reference_rms=" + std::to_string(cre.reference_rms) + ")"; });
+
+    // Expose VoiceStats struct
+    py::class_<VoiceStats>(m, "VoiceStats")
+        .def_readonly("active_voices", &VoiceStats::active_voices)
+        .def_readonly("peak_voices", &VoiceStats::peak_voices)
+        .def_readonly("steals", &VoiceStats::steals)
+        .def_readonly("budget_steals", &VoiceStats::budget_steals)
+        .def("__repr__", [](const VoiceStats &vs)
+             { return "VoiceStats(active=" + std::to_string(vs.active_voices) +
+                      ", peak=" + std::to_string(vs.peak_voices) +
+                      ", steals=" + std::to_string(vs.steals) +
+                      ", budget_steals=" + std::to_string(vs.budget_steals) + ")"; });
+
     py::class_<Instrument>(m, "Instrument")
         .def("get_id", &Instrument::get_id)
         .def("get_instructions", &Instrument::get_instructions)
@@ -85,16 +107,44 @@ PYBIND11_MODULE(synth_engine, m)
         .def("get_instruction_name", &Instrument::get_instruction_name, py::arg("instruction_index"))
         .def("update_parameter", &Instrument::update_parameter, py::arg("instruction_index"), py::arg("param_index"), py::arg("value"))
         .def("update_parameter_with_string", &Instrument::update_parameter_with_string, py::arg("instruction_index"), py::arg("param_index"), py::arg("value"))
-        .def("render_note", &Instrument::render_note, py::arg("note_num"));
+        .def("get_parameter_bytes", &Instrument::get_parameter_bytes)
+        .def("set_parameter_bytes", &Instrument::set_parameter_bytes, py::arg("bytes"))
+        .def("render_note", &Instrument::render_note, py::arg("note_num"))
+        .def("render_note_window", &Instrument::render_note_window, py::arg("note_num"), py::arg("start_sample"), py::arg("num_samples"), py::arg("release_sample"))
+        .def("get_compiled_instructions", &Instrument::get_compiled_instructions);
 
     py::class_<SynthEngine>(m, "SynthEngine")
-        .def(py::init<>())
+        .def(py::init<uint32_t, uint32_t>(), py::arg("num_instruments") = MAX_NUM_INSTRUMENTS,
+             py::arg("patterns_per_instrument") = PATTERNS_PER_INSTRUMENT)
         .def("initialize", &SynthEngine::initialize)
         .def("render_note", &SynthEngine::render_note)
+        .def("render", [](SynthEngine &engine, uint32_t num_samples, py::array_t<float, py::array::c_style> output)
+             {
+                 if (output.ndim() != 1 || !output.writeable() || static_cast<size_t>(output.size()) < num_samples)
+                 {
+                     throw py::value_error("render needs a writable 1D float32 buffer of at least num_samples");
+                 }
+                 return engine.render(num_samples, output.mutable_data(), output.size()); }, py::arg("num_samples"), py::arg("output"))
+        .def("set_position", &SynthEngine::set_position, py::arg("sample"))
+        .def("get_position", &SynthEngine::get_position)
+        .def("get_song_length", &SynthEngine::get_song_length)
+        .def("set_sample_rate", &SynthEngine::set_sample_rate, py::arg("rate"))
+        .def("get_sample_rate", &SynthEngine::get_sample_rate)
+        .def("set_tempo", &SynthEngine::set_tempo, py::arg("beats_per_minute"))
+        .def("get_tempo", &SynthEngine::get_tempo)
+        .def("get_samples_per_note", &SynthEngine::get_samples_per_note)
         .def("is_initialized", &SynthEngine::is_initialized)
-        .def("render_instrument_note", &SynthEngine::render_instrument_note, py::arg("instrument_num"), py::arg("note_num"))
+        // Auditions render on a worker thread while the editor keeps running,
+        // SynthWrapper serializes the renders
+        .def("render_instrument_note", &SynthEngine::render_instrument_note, py::arg("instrument_num"), py::arg("note_num"), py::call_guard<py::gil_scoped_release>())
+        .def("render_instrument_note_window", &SynthEngine::render_instrument_note_window, py::arg("instrument_num"), py::arg("note_num"), py::arg("start_sample"), py::arg("num_samples"), py::arg("release_sample"))
+        .def("render_instrument_note_draft", &SynthEngine::render_instrument_note_draft, py::arg("instrument_num"), py::arg("note_num"), py::arg("num_samples"), py::arg("release_sample"), py::arg("factor"))
         .def("get_instrument", &SynthEngine::get_instrument, py::arg("instrument_id"), py::return_value_policy::reference_internal)
         .def("get_num_instruments", &SynthEngine::get_num_instruments)
+        .def("get_patterns_per_instrument", &SynthEngine::get_patterns_per_instrument)
+        .def("get_instrument_data_offset", &SynthEngine::get_instrument_data_offset, py::arg("instrument_num"))
+        .def("get_instrument_data_length", &SynthEngine::get_instrument_data_length, py::arg("instrument_num"))
+        .def("get_synth_data_size", &SynthEngine::get_synth_data_size)
         .def("get_instrument_instructions", &SynthEngine::get_instrument_instructions, py::arg("instrument_num"))
         .def("get_instrument_instruction_parameters", &SynthEngine::get_instrument_instruction_parameters, py::arg("instrument_num"), py::arg("instruction_index"))
         .def("get_instrument_instruction_parameters_full", &SynthEngine::get_instrument_instruction_parameters_full, py::arg("instrument_num"), py::arg("instruction_index"))
@@ -103,7 +153,49 @@ PYBIND11_MODULE(synth_engine, m)
         .def("get_instrument_instruction_parameter_enums", &SynthEngine::get_instrument_instruction_parameter_enums, py::arg("instrument_num"), py::arg("instruction_index"))
         .def("get_instrument_instruction_parameters_as_strings", &SynthEngine::get_instrument_instruction_parameters_as_strings, py::arg("instrument_num"), py::arg("instruction_index"))
         .def("update_instrument_parameter", &SynthEngine::update_instrument_parameter, py::arg("instrument_num"), py::arg("instruction_index"), py::arg("param_index"), py::arg("value"))
-        .def("update_instrument_parameter_with_string", &SynthEngine::update_instrument_parameter_with_string, py::arg("instrument_num"), py::arg("instruction_index"), py::arg("param_index"), py::arg("value"));
+        .def("update_instrument_parameter_with_string", &SynthEngine::update_instrument_parameter_with_string, py::arg("instrument_num"), py::arg("instruction_index"), py::arg("param_index"), py::arg("value"))
+        .def("get_instrument_parameter_bytes", &SynthEngine::get_instrument_parameter_bytes, py::arg("instrument_num"))
+        .def("set_instrument_parameter_bytes", &SynthEngine::set_instrument_parameter_bytes, py::arg("instrument_num"), py::arg("bytes"))
+        .def("set_control_rate", &SynthEngine::set_control_rate, py::arg("rate"))
+        .def("get_control_rate", &SynthEngine::get_control_rate)
+        .def("measure_control_rate_error", &SynthEngine::measure_control_rate_error, py::arg("instrument_num"), py::arg("note_num"), py::arg("rate"))
+        .def("set_wavetable_mode", &SynthEngine::set_wavetable_mode, py::arg("enabled"))
+        .def("get_wavetable_mode", &SynthEngine::get_wavetable_mode)
+        .def("set_flush_to_zero", &SynthEngine::set_flush_to_zero, py::arg("enabled"))
+        .def("get_flush_to_zero", &SynthEngine::get_flush_to_zero)
+        .def("reset_subnormal_counts", &SynthEngine::reset_subnormal_counts)
+        .def("get_subnormal_counts", &SynthEngine::get_subnormal_counts, py::arg("instrument_num"))
+        .def("set_program_compiler", &SynthEngine::set_program_compiler, py::arg("enabled"))
+        .def("get_program_compiler", &SynthEngine::get_program_compiler)
+        .def("get_compiled_instructions", &SynthEngine::get_compiled_instructions, py::arg("instrument_num"))
+        .def("load_song", [](SynthEngine &engine, py::array_t<uint8_t, py::array::c_style | py::array::forcecast> instructions,
+                             py::array_t<uint8_t, py::array::c_style | py::array::forcecast> parameters,
+                             py::array_t<uint8_t, py::array::c_style | py::array::forcecast> patterns,
+                             py::array_t<uint8_t, py::array::c_style | py::array::forcecast> pattern_array)
+             {
+                 // One copy from any buffer, e.g. a memory-mapped project file, into the song data
+                 auto bytes = [](const py::array_t<uint8_t, py::array::c_style | py::array::forcecast> &table)
+                 { return std::vector<uint8_t>(table.data(), table.data() + table.size()); };
+                 return engine.load_song(bytes(instructions), bytes(parameters), bytes(patterns), bytes(pattern_array)); },
+             py::arg("instructions"), py::arg("parameters"), py::arg("patterns"), py::arg("pattern_array"))
+        .def("get_program_bytes", &SynthEngine::get_program_bytes)
+        .def("get_parameter_bytes", &SynthEngine::get_parameter_bytes)
+        .def("get_instrument_patterns", &SynthEngine::get_instrument_patterns, py::arg("instrument_num"))
+        .def("get_pattern_array", &SynthEngine::get_pattern_array)
+        .def("get_note_events", &SynthEngine::get_note_events, py::arg("instrument_num"))
+        .def("set_note_events", &SynthEngine::set_note_events, py::arg("instrument_num"), py::arg("words"))
+        .def("set_voice_count", &SynthEngine::set_voice_count, py::arg("instrument_num"), py::arg("voices"))
+        .def("get_voice_count", &SynthEngine::get_voice_count, py::arg("instrument_num"))
+        .def("set_voice_stealing", &SynthEngine::set_voice_stealing, py::arg("stealing"))
+        .def("get_voice_stealing", &SynthEngine::get_voice_stealing)
+        .def("set_cpu_budget", &SynthEngine::set_cpu_budget, py::arg("budget"))
+        .def("get_cpu_budget", &SynthEngine::get_cpu_budget)
+        .def("voice_note_on", &SynthEngine::voice_note_on, py::arg("instrument_num"), py::arg("note_num"))
+        .def("voice_note_off", &SynthEngine::voice_note_off, py::arg("instrument_num"), py::arg("note_num"))
+        .def("stop_voices", &SynthEngine::stop_voices)
+        .def("render_voice_block", &SynthEngine::render_voice_block, py::arg("num_samples"))
+        .def("get_voice_stats", &SynthEngine::get_voice_stats, py::arg("instrument_num"))
+        .def("reset_voice_stats", &SynthEngine::reset_voice_stats);
 
     // Expose constants from defines.h
     m.attr("SAMPLE_RATE") = SAMPLE_RATE;
@@ -116,6 +208,24 @@ PYBIND11_MODULE(synth_engine, m)
     m.attr("PATTERNS_PER_INSTRUMENT") = PATTERNS_PER_INSTRUMENT;
     m.attr("NOTES_PER_PATTERN") = NOTES_PER_PATTERN;
     m.attr("HLD") = HLD;
+    m.attr("NOTE_EVENT_ON") = NOTE_EVENT_ON;
+    m.attr("NOTE_EVENT_RELEASE") = NOTE_EVENT_RELEASE;
+    m.attr("NOTE_EVENTS_PER_INSTRUMENT") = NOTE_EVENTS_PER_INSTRUMENT;
+    m.attr("KERNEL_VOICE") = KERNEL_VOICE;
+    m.attr("KERNEL_VOICE_STOREVAL") = KERNEL_VOICE_STOREVAL;
+    m.attr("KERNEL_VOICE_FILTER") = KERNEL_VOICE_FILTER;
+    m.attr("KERNEL_SILENT") = KERNEL_SILENT;
+    m.attr("MAX_CONTROL_RATE") = SynthEngine::MAX_CONTROL_RATE;
+    m.attr("MAX_VOICES") = VoicePool::MAX_VOICES;
+    m.attr("MAX_INSTRUMENTS") = SynthEngine::MAX_INSTRUMENTS;
+    m.attr("MAX_PATTERNS_PER_INSTRUMENT") = SynthEngine::MAX_PATTERNS_PER_INSTRUMENT;
+    m.attr("MIN_SAMPLE_RATE") = SynthEngine::MIN_SAMPLE_RATE;
+    m.attr("MAX_SAMPLE_RATE") = SynthEngine::MAX_SAMPLE_RATE;
+    m.attr("MIN_TEMPO") = SynthEngine::MIN_TEMPO;
+    m.attr("MAX_TEMPO") = SynthEngine::MAX_TEMPO;
+    m.attr("MAX_DRAFT_FACTOR") = SynthEngine::MAX_DRAFT_FACTOR;
+    m.attr("VOICE_STEAL_OLDEST") = static_cast<uint32_t>(VOICE_STEAL_OLDEST);
+    m.attr("VOICE_STEAL_QUIETEST") = static_cast<uint32_t>(VOICE_STEAL_QUIETEST);
 
     // Instruction IDs
     m.attr("ENVELOPE_ID") = ENVELOPE_ID;
@@ -5,6 +5,9 @@
 
 #include "synth_engine.h"
 #include "parameters.h"
+#include <algorithm>
+#include <chrono>
+#include <cmath>
 #include <iostream>
 #include <memory>
 
@@ -23,23 +26,78 @@ extern "C"
 {
 #include "../../softsynth/include/softsynth.h"
 #include "../../softsynth/include/defines.h"
+#include "../../softsynth/include/wavetable.h"
 }
 
-SynthEngine::SynthEngine()
-    : initialized_(false)
+// Static buffers of the player, restored when the engine using its own goes away
+static const engine_layout player_layout = synth_layout;
+
+// Noise seeds keep the note above the workspace offsets, see oscillator_function
+static_assert((SynthEngine::MAX_INSTRUMENTS + 1) * Instrument::DATA_LENGTH <= 1u << NOISE_SEED_NOTE_SHIFT,
+              "Workspace offsets of the largest layout overlap the note of noise seeds");
+
+// STOREVAL stores at its destination in the instrument data without bounds
+// checks. Destinations in other instruments are legal, past synth_data are not
+static bool storeval_targets_fit(uint64_t data_offset, const std::vector<uint32_t> &targets, uint64_t data_size)
 {
-    DEBUG_LOG("Constructor called");
+    for (uint32_t target : targets)
+    {
+        if (data_offset + target + sizeof(float) > data_size)
+        {
+            DEBUG_LOG("STOREVAL destination " << target << " of the data at " << data_offset
+                                              << " is past the " << data_size << " bytes of synth data");
+            return false;
+        }
+    }
+    return true;
+}
+
+SynthEngine::SynthEngine(uint32_t num_instruments, uint32_t patterns_per_instrument)
+    : initialized_(false), program_compiler_(true),
+      num_instruments_(std::clamp<uint32_t>(num_instruments, 1, MAX_INSTRUMENTS)),
+      patterns_per_instrument_(std::clamp<uint32_t>(patterns_per_instrument, 1, MAX_PATTERNS_PER_INSTRUMENT)),
+      voice_stealing_(VOICE_STEAL_OLDEST), cpu_budget_(DEFAULT_CPU_BUDGET), voices_started_(0)
+{
+    DEBUG_LOG("Constructor called for " << num_instruments_ << " instruments and "
+                                        << patterns_per_instrument_ << " patterns");
+    update_timing(SAMPLE_RATE, BEATS_PER_MINUTE);
+    copy_assembled_song();
     // Initialize output buffer
     // output_buffer_.resize(buffer_size * 2); // Stereo output
 }
 
+SynthEngine::~SynthEngine()
+{
+    if (synth_layout.synth_data == layout_.synth_data)
+    {
+        synth_layout = player_layout;
+    }
+}
+
 bool SynthEngine::initialize(void)
 {
     DEBUG_LOG("Initialize called");
 
+    // Size the engine buffers for the instruments and the song length
+    build_layout();
+
     // Create all instruments
     create_instruments();
 
+    // Convert all instrument parameters, later edits update single instructions
+    transform_parameters();
+
+    // Tables for the optional wavetable oscillator mode
+    build_wavetables(wavetables);
+
+    // Compile the song patterns into note events once
+    build_note_events();
+
+    // Fused kernels for the instrument programs, see Instrument::compile_program.
+    // The song instrument and the END opcodes stay as build_layout copied them
+    compile_programs();
+    update_program_compiler();
+
     // The ARM64 softsynth doesn't require explicit initialization
     // but we can set up any needed state here
     initialized_ = true;
@@ -66,10 +124,30 @@ uint32_t SynthEngine::get_num_instruments() const
     return static_cast<uint32_t>(instruments_.size());
 }
 
+uint32_t SynthEngine::get_patterns_per_instrument() const
+{
+    return patterns_per_instrument_;
+}
+
+uint32_t SynthEngine::get_instrument_data_offset(uint32_t instrument_num) const
+{
+    return instrument_num < instruments_.size() ? instruments_[instrument_num]->get_data_offset() : 0;
+}
+
+uint32_t SynthEngine::get_instrument_data_length(uint32_t instrument_num) const
+{
+    return instrument_num < instruments_.size() ? instruments_[instrument_num]->get_data_length() : 0;
+}
+
+uint32_t SynthEngine::get_synth_data_size() const
+{
+    return static_cast<uint32_t>(synth_data_.size() * sizeof(uint32_t));
+}
+
 std::vector<float> SynthEngine::render_note(void)
 {
     DEBUG_LOG("render_note called");
-    std::vector<float> output(SAMPLES_PER_NOTE); // Mono output
+    std::vector<float> output(layout_.samples_per_note); // Mono output
 
     if (!initialized_)
     {
@@ -77,18 +155,113 @@ std::vector<float> SynthEngine::render_note(void)
         return output; // Return silence if not initialized
     }
 
-    // Call the actual ARM64 softsynth render function
-    // dope4ks_render expects (userdata, stream, len)
-    // where len is in bytes, not samples
-    int len_bytes = SAMPLES_PER_NOTE * 2 * sizeof(float); // Stereo float samples
-    DEBUG_LOG("Calling dope4ks_render with " << len_bytes << " bytes");
-
-    dope4ks_render(nullptr, reinterpret_cast<unsigned char *>(output.data()), len_bytes);
-    DEBUG_LOG("dope4ks_render completed");
+    // The first note of the song, the song position is left as it is
+    Instrument::select_layout(layout_);
+    debug_render_samples(0, output.data(), 0, static_cast<uint32_t>(layout_.samples_per_note));
+    Instrument::invalidate_render_state();
+    DEBUG_LOG("render_note completed");
 
     return output;
 }
 
+uint32_t SynthEngine::render(uint32_t num_samples, float *output, size_t output_size)
+{
+    if (!output || num_samples > output_size)
+    {
+        DEBUG_LOG("Cannot render " << num_samples << " samples into a buffer of " << output_size);
+        return 0;
+    }
+    std::fill(output, output + num_samples, 0.0f);
+    if (!initialized_)
+    {
+        return 0;
+    }
+
+    // dope4ks_render works on one note at a time, split the block at the note boundaries
+    uint32_t rendered = static_cast<uint32_t>(std::min<uint64_t>(num_samples, get_song_length() - position_));
+    const uint32_t samples_per_note = get_samples_per_note();
+    Instrument::select_layout(layout_);
+    for (uint32_t done = 0; done < rendered;)
+    {
+        uint32_t note = static_cast<uint32_t>(position_ / samples_per_note);
+        uint32_t first = static_cast<uint32_t>(position_ % samples_per_note);
+        uint32_t end = std::min<uint32_t>(samples_per_note, first + rendered - done);
+        debug_render_samples(note, output + done, first, end);
+        done += end - first;
+        position_ += end - first;
+    }
+    Instrument::invalidate_render_state();
+    return rendered;
+}
+
+bool SynthEngine::set_position(uint64_t sample)
+{
+    if (sample > get_song_length())
+    {
+        return false;
+    }
+    position_ = sample;
+    // Notes sounding at the previous position would play on from the new one,
+    // start every instrument silent like a new engine
+    std::fill(synth_data_.begin(), synth_data_.end(), 0);
+    stop_voices();
+    Instrument::invalidate_render_state();
+    return true;
+}
+
+uint64_t SynthEngine::get_position() const
+{
+    return position_;
+}
+
+uint64_t SynthEngine::get_song_length() const
+{
+    return static_cast<uint64_t>(patterns_per_instrument_) * NOTES_PER_PATTERN * layout_.samples_per_note;
+}
+
+bool SynthEngine::set_sample_rate(uint32_t rate)
+{
+    if (rate < MIN_SAMPLE_RATE || rate > MAX_SAMPLE_RATE)
+    {
+        DEBUG_LOG("Invalid sample rate " << rate);
+        return false;
+    }
+    if (rate != sample_rate_)
+    {
+        update_timing(rate, tempo_);
+        // The sounding notes cache their phase increments, start them over
+        std::fill(synth_data_.begin(), synth_data_.end(), 0);
+        stop_voices();
+    }
+    return true;
+}
+
+uint32_t SynthEngine::get_sample_rate() const
+{
+    return sample_rate_;
+}
+
+bool SynthEngine::set_tempo(uint32_t beats_per_minute)
+{
+    if (beats_per_minute < MIN_TEMPO || beats_per_minute > MAX_TEMPO)
+    {
+        DEBUG_LOG("Invalid tempo " << beats_per_minute);
+        return false;
+    }
+    update_timing(sample_rate_, beats_per_minute);
+    return true;
+}
+
+uint32_t SynthEngine::get_tempo() const
+{
+    return tempo_;
+}
+
+uint32_t SynthEngine::get_samples_per_note() const
+{
+    return static_cast<uint32_t>(layout_.samples_per_note);
+}
+
 std::vector<float> SynthEngine::render_instrument_note(uint32_t instrument_num, uint32_t note_num)
 {
     DEBUG_LOG("render_instrument_note called for instrument " << instrument_num);
@@ -96,19 +269,55 @@ std::vector<float> SynthEngine::render_instrument_note(uint32_t instrument_num,
     if (!initialized_)
     {
         DEBUG_LOG("Not initialized, returning silence");
-        return std::vector<float>(SAMPLES_PER_NOTE * 4); // Return silence
+        return std::vector<float>(layout_.samples_per_note * 4); // Return silence
     }
 
     Instrument *instrument = get_instrument(instrument_num);
     if (!instrument)
     {
         DEBUG_LOG("Invalid instrument " << instrument_num << ", returning silence");
-        return std::vector<float>(SAMPLES_PER_NOTE * 4); // Return silence
+        return std::vector<float>(layout_.samples_per_note * 4); // Return silence
     }
 
     return instrument->render_note(note_num);
 }
 
+std::vector<float> SynthEngine::render_instrument_note_window(uint32_t instrument_num, uint32_t note_num,
+                                                             uint32_t start_sample, uint32_t num_samples,
+                                                             uint32_t release_sample)
+{
+    Instrument *instrument = get_instrument(instrument_num);
+    if (!initialized_ || !instrument)
+    {
+        DEBUG_LOG("Cannot render window for instrument " << instrument_num << ", returning silence");
+        return std::vector<float>(num_samples);
+    }
+
+    return instrument->render_note_window(note_num, start_sample, num_samples, release_sample);
+}
+
+std::vector<float> SynthEngine::render_instrument_note_draft(uint32_t instrument_num, uint32_t note_num,
+                                                            uint32_t num_samples, uint32_t release_sample,
+                                                            uint32_t factor)
+{
+    Instrument *instrument = get_instrument(instrument_num);
+    if (!initialized_ || !instrument || factor < 1 || factor > MAX_DRAFT_FACTOR)
+    {
+        DEBUG_LOG("Cannot render draft for instrument " << instrument_num << ", returning silence");
+        return std::vector<float>((num_samples + factor - 1) / std::max<uint32_t>(factor, 1));
+    }
+
+    // Only the rate constants change, the note events and the song keep their timing.
+    // The window restarts the note, which clears the cached phase increments
+    apply_rate_constants(sample_rate_ / factor);
+    std::vector<float> output = instrument->render_note_window(note_num, 0, (num_samples + factor - 1) / factor,
+                                                               release_sample / factor);
+    apply_rate_constants(sample_rate_);
+    // Full-rate windows must not resume from the draft
+    Instrument::invalidate_render_state();
+    return output;
+}
+
 std::vector<int> SynthEngine::get_instrument_instructions(uint32_t instrument_num)
 {
     Instrument *instrument = get_instrument(instrument_num);
@@ -184,7 +393,16 @@ bool SynthEngine::update_instrument_parameter(uint32_t instrument_num, uint32_t
     Instrument *instrument = get_instrument(instrument_num);
     if (instrument)
     {
+        std::vector<uint8_t> previous = instrument->get_parameter_bytes();
         instrument->update_parameter(instruction_index, param_index, value);
+        if (!storeval_targets_fit(instrument->get_data_offset(), instrument->get_storeval_targets(),
+                                  get_synth_data_size()))
+        {
+            instrument->set_parameter_bytes(previous);
+            return false;
+        }
+        // A STOREVAL destination may reach into the other instruments
+        compile_programs();
         return true;
     }
     return false;
@@ -195,26 +413,691 @@ bool SynthEngine::update_instrument_parameter_with_string(uint32_t instrument_nu
     Instrument *instrument = get_instrument(instrument_num);
     if (instrument)
     {
+        std::vector<uint8_t> previous = instrument->get_parameter_bytes();
         instrument->update_parameter_with_string(instruction_index, param_index, value);
+        if (!storeval_targets_fit(instrument->get_data_offset(), instrument->get_storeval_targets(),
+                                  get_synth_data_size()))
+        {
+            instrument->set_parameter_bytes(previous);
+            return false;
+        }
+        compile_programs();
+        return true;
+    }
+    return false;
+}
+
+std::vector<uint8_t> SynthEngine::get_instrument_parameter_bytes(uint32_t instrument_num)
+{
+    Instrument *instrument = get_instrument(instrument_num);
+    if (instrument)
+    {
+        return instrument->get_parameter_bytes();
+    }
+    return std::vector<uint8_t>();
+}
+
+bool SynthEngine::set_instrument_parameter_bytes(uint32_t instrument_num, const std::vector<uint8_t> &bytes)
+{
+    Instrument *instrument = get_instrument(instrument_num);
+    if (instrument &&
+        storeval_targets_fit(instrument->get_data_offset(), instrument->get_storeval_targets(bytes),
+                             get_synth_data_size()) &&
+        instrument->set_parameter_bytes(bytes))
+    {
+        compile_programs();
         return true;
     }
     return false;
 }
 
+bool SynthEngine::set_control_rate(uint32_t rate)
+{
+    if (rate < 1 || rate > MAX_CONTROL_RATE)
+    {
+        DEBUG_LOG("Invalid control rate " << rate);
+        return false;
+    }
+
+    DEBUG_LOG("Control rate set to " << rate << " samples");
+    control_rate = rate;
+    Instrument::invalidate_render_state();
+    return true;
+}
+
+uint32_t SynthEngine::get_control_rate() const
+{
+    return control_rate;
+}
+
+ControlRateError SynthEngine::measure_control_rate_error(uint32_t instrument_num, uint32_t note_num, uint32_t rate)
+{
+    ControlRateError error = {0.0f, 0.0f, 0.0f};
+    Instrument *instrument = get_instrument(instrument_num);
+    if (!initialized_ || !instrument || rate < 1 || rate > MAX_CONTROL_RATE)
+    {
+        DEBUG_LOG("Cannot measure control rate error for instrument " << instrument_num);
+        return error;
+    }
+
+    // Noise is seeded per note, so both versions get the same noise
+    uint32_t previous_rate = control_rate;
+    control_rate = 1;
+    std::vector<float> reference = instrument->render_note(note_num);
+    control_rate = rate;
+    std::vector<float> reduced = instrument->render_note(note_num);
+    control_rate = previous_rate;
+
+    // Trailing silence is trimmed, so the renderings may differ in length
+    size_t length = std::max(reference.size(), reduced.size());
+    reference.resize(length);
+    reduced.resize(length);
+    double error_sum = 0.0;
+    double reference_sum = 0.0;
+    for (size_t i = 0; i < length; i++)
+    {
+        double difference = reduced[i] - reference[i];
+        error.max_error = std::max(error.max_error, static_cast<float>(std::fabs(difference)));
+        error_sum += difference * difference;
+        reference_sum += static_cast<double>(reference[i]) * reference[i];
+    }
+    if (length > 0)
+    {
+        error.rms_error = static_cast<float>(std::sqrt(error_sum / length));
+        error.reference_rms = static_cast<float>(std::sqrt(reference_sum / length));
+    }
+
+    DEBUG_LOG("Control rate " << rate << " error: max " << error.max_error << ", rms " << error.rms_error);
+    return error;
+}
+
+void SynthEngine::set_wavetable_mode(bool enabled)
+{
+    DEBUG_LOG("Wavetable mode " << (enabled ? "enabled" : "disabled"));
+    wavetable_mode = enabled ? 1 : 0;
+    Instrument::invalidate_render_state();
+}
+
+bool SynthEngine::get_wavetable_mode() const
+{
+    return wavetable_mode != 0;
+}
+
+void SynthEngine::set_flush_to_zero(bool enabled)
+{
+    DEBUG_LOG("Flush to zero " << (enabled ? "enabled" : "disabled"));
+    flush_to_zero = enabled ? 1 : 0;
+    update_program_compiler();
+    Instrument::invalidate_render_state();
+}
+
+bool SynthEngine::get_flush_to_zero() const
+{
+    return flush_to_zero != 0;
+}
+
+void SynthEngine::reset_subnormal_counts()
+{
+    std::fill(subnormal_counts_.begin(), subnormal_counts_.end(), 0);
+}
+
+std::vector<uint32_t> SynthEngine::get_subnormal_counts(uint32_t instrument_num)
+{
+    std::vector<uint32_t> counts;
+    Instrument *instrument = get_instrument(instrument_num);
+    if (instrument)
+    {
+        // One counter per instruction, laid out like the transformed parameters
+        const uint32_t *first = &subnormal_counts_[instrument_layouts_[instrument_num].parameters /
+                                                   Instrument::DATA_WORKSPACE_SIZE];
+        counts.assign(first, first + instrument->get_instructions().size());
+    }
+    return counts;
+}
+
+void SynthEngine::set_program_compiler(bool enabled)
+{
+    DEBUG_LOG("Program compiler " << (enabled ? "enabled" : "disabled"));
+    program_compiler_ = enabled;
+    update_program_compiler();
+    Instrument::invalidate_render_state();
+}
+
+bool SynthEngine::get_program_compiler() const
+{
+    return program_compiler_;
+}
+
+std::vector<uint8_t> SynthEngine::get_compiled_instructions(uint32_t instrument_num)
+{
+    Instrument *instrument = get_instrument(instrument_num);
+    if (instrument)
+    {
+        return instrument->get_compiled_instructions();
+    }
+    return std::vector<uint8_t>();
+}
+
+std::vector<uint8_t> SynthEngine::get_instrument_patterns(uint32_t instrument_num)
+{
+    std::vector<uint8_t> patterns;
+    if (instrument_num < num_instruments_)
+    {
+        auto first = instrument_patterns_.begin() + instrument_num * patterns_per_instrument_;
+        patterns.assign(first, first + patterns_per_instrument_);
+    }
+    return patterns;
+}
+
+std::vector<uint8_t> SynthEngine::get_pattern_array()
+{
+    // The song data has no pattern count, return every pattern an instrument uses
+    uint8_t last = *std::max_element(instrument_patterns_.begin(), instrument_patterns_.end());
+    return std::vector<uint8_t>(layout_.pattern_array, layout_.pattern_array + (last + 1) * NOTES_PER_PATTERN);
+}
+
+std::vector<uint32_t> SynthEngine::get_note_events(uint32_t instrument_num)
+{
+    std::vector<uint32_t> words;
+    if (instrument_num < num_instruments_)
+    {
+        // Two words per event, up to and including the end marker
+        const uint32_t *event = &note_events_[instrument_num * get_note_events_per_instrument() * NOTE_EVENT_SIZE / 4];
+        do
+        {
+            words.push_back(event[0]);
+            words.push_back(event[1]);
+            event += NOTE_EVENT_SIZE / 4;
+        } while (words[words.size() - 2] != NOTE_EVENT_END);
+    }
+    return words;
+}
+
+bool SynthEngine::set_note_events(uint32_t instrument_num, const std::vector<uint32_t> &words)
+{
+    const size_t event_words = NOTE_EVENT_SIZE / 4;
+    const size_t events_per_instrument = get_note_events_per_instrument();
+    if (instrument_num >= num_instruments_ || words.empty() ||
+        words.size() % event_words != 0 ||
+        words.size() > events_per_instrument * event_words ||
+        words[words.size() - event_words] != NOTE_EVENT_END)
+    {
+        DEBUG_LOG("Invalid note events for instrument " << instrument_num);
+        return false;
+    }
+
+    // dope4ks_render seeks the cursors again at the start of every block
+    std::copy(words.begin(), words.end(), &note_events_[instrument_num * events_per_instrument * event_words]);
+    return true;
+}
+
+bool SynthEngine::set_voice_count(uint32_t instrument_num, uint32_t voices)
+{
+    if (instrument_num >= voice_pools_.size() || !voice_pools_[instrument_num].set_size(voices))
+    {
+        DEBUG_LOG("Invalid voice count " << voices << " for instrument " << instrument_num);
+        return false;
+    }
+    return true;
+}
+
+uint32_t SynthEngine::get_voice_count(uint32_t instrument_num) const
+{
+    return instrument_num < voice_pools_.size() ? voice_pools_[instrument_num].get_size() : 0;
+}
+
+bool SynthEngine::set_voice_stealing(uint32_t stealing)
+{
+    if (stealing != VOICE_STEAL_OLDEST && stealing != VOICE_STEAL_QUIETEST)
+    {
+        DEBUG_LOG("Invalid voice stealing " << stealing);
+        return false;
+    }
+    voice_stealing_ = static_cast<VoiceStealing>(stealing);
+    return true;
+}
+
+uint32_t SynthEngine::get_voice_stealing() const
+{
+    return voice_stealing_;
+}
+
+bool SynthEngine::set_cpu_budget(float budget)
+{
+    // 0 renders every voice however long it takes
+    if (!(budget >= 0.0f))
+    {
+        DEBUG_LOG("Invalid CPU budget " << budget);
+        return false;
+    }
+    cpu_budget_ = budget;
+    return true;
+}
+
+float SynthEngine::get_cpu_budget() const
+{
+    return cpu_budget_;
+}
+
+bool SynthEngine::voice_note_on(uint32_t instrument_num, uint32_t note_num)
+{
+    if (!initialized_ || instrument_num >= voice_pools_.size() || note_num < 1 || note_num > 255)
+    {
+        DEBUG_LOG("Cannot start note " << note_num << " on instrument " << instrument_num);
+        return false;
+    }
+    voice_pools_[instrument_num].note_on(static_cast<uint8_t>(note_num), ++voices_started_, voice_stealing_);
+    return true;
+}
+
+bool SynthEngine::voice_note_off(uint32_t instrument_num, uint32_t note_num)
+{
+    if (instrument_num >= voice_pools_.size() || note_num < 1 || note_num > 255)
+    {
+        return false;
+    }
+    voice_pools_[instrument_num].note_off(static_cast<uint8_t>(note_num));
+    return true;
+}
+
+void SynthEngine::stop_voices()
+{
+    for (VoicePool &pool : voice_pools_)
+    {
+        pool.stop_all();
+    }
+}
+
+std::vector<float> SynthEngine::render_voice_block(uint32_t num_samples)
+{
+    std::vector<float> output(num_samples);
+    if (!initialized_ || num_samples == 0)
+    {
+        return output;
+    }
+
+    // Render the voices that would be stolen last first, so that running out
+    // of time stops the voices a new note would have taken over anyway
+    std::vector<std::pair<uint32_t, uint32_t>> order;
+    for (uint32_t pool = 0; pool < voice_pools_.size(); ++pool)
+    {
+        for (uint32_t voice : voice_pools_[pool].get_active_voices())
+        {
+            order.emplace_back(pool, voice);
+        }
+    }
+    std::stable_sort(order.begin(), order.end(), [this](const auto &a, const auto &b)
+                     { return VoicePool::steal_before(voice_pools_[b.first].get_voice(b.second),
+                                                      voice_pools_[a.first].get_voice(a.second),
+                                                      voice_stealing_); });
+
+    // The budget is a share of the time the block takes to play
+    using Clock = std::chrono::steady_clock;
+    const auto deadline = Clock::now() + std::chrono::duration_cast<Clock::duration>(
+                                             std::chrono::duration<double>(cpu_budget_ * num_samples / sample_rate_));
+    std::vector<float> scratch(num_samples);
+    for (size_t i = 0; i < order.size(); ++i)
+    {
+        VoicePool &pool = voice_pools_[order[i].first];
+        // The first voice always plays, even if the budget cannot fit a single one
+        if (i > 0 && cpu_budget_ > 0.0f && Clock::now() >= deadline)
+        {
+            pool.steal_for_budget(order[i].second);
+            continue;
+        }
+        pool.render_voice(order[i].second, output.data(), scratch.data(), num_samples);
+    }
+    return output;
+}
+
+VoiceStats SynthEngine::get_voice_stats(uint32_t instrument_num) const
+{
+    if (instrument_num >= voice_pools_.size())
+    {
+        return {0, 0, 0, 0};
+    }
+    return voice_pools_[instrument_num].get_stats();
+}
+
+void SynthEngine::reset_voice_stats()
+{
+    for (VoicePool &pool : voice_pools_)
+    {
+        pool.reset_stats();
+    }
+}
+
 bool SynthEngine::is_initialized() const
 {
     return initialized_;
 }
 
+bool SynthEngine::load_song(const std::vector<uint8_t> &instructions, const std::vector<uint8_t> &parameters,
+                            const std::vector<uint8_t> &patterns, const std::vector<uint8_t> &pattern_array)
+{
+    // Every program ends with INSTRUMENT_END and the song program comes last
+    uint32_t programs = 0;
+    uint32_t count = 0;
+    size_t parameter_size = 0;
+    for (uint8_t instruction : instructions)
+    {
+        if (instruction == INSTRUMENT_END)
+        {
+            ++programs;
+            count = 0;
+        }
+        else if (instruction > ACCUMULATE_ID || ++count > MAX_COMMANDS)
+        {
+            DEBUG_LOG("load_song: invalid instruction " << static_cast<int>(instruction));
+            return false;
+        }
+        parameter_size += Instrument::get_instruction_memory_size(instruction);
+    }
+    if (programs < 2 || instructions.back() != INSTRUMENT_END || parameters.size() != parameter_size)
+    {
+        DEBUG_LOG("load_song: " << programs << " programs with " << parameters.size()
+                                << " parameter bytes, " << parameter_size << " expected");
+        return false;
+    }
+    if (!song_storeval_targets_fit(instructions, parameters, programs))
+    {
+        return false;
+    }
+
+    // Bytes after the last full row are not played, like in the player
+    size_t num_patterns = pattern_array.size() / NOTES_PER_PATTERN;
+    size_t rows = patterns.size() / PATTERNS_PER_INSTRUMENT;
+    if (rows == 0 || pattern_array.size() % NOTES_PER_PATTERN != 0 ||
+        *std::max_element(patterns.begin(), patterns.begin() + rows * PATTERNS_PER_INSTRUMENT) >= num_patterns)
+    {
+        DEBUG_LOG("load_song: " << patterns.size() << " pattern numbers for " << num_patterns << " patterns");
+        return false;
+    }
+
+    song_instructions_ = instructions;
+    song_parameters_ = parameters;
+    song_patterns_ = patterns;
+    song_pattern_array_ = pattern_array;
+    song_programs_ = programs - 1;
+    song_rows_ = static_cast<uint32_t>(rows);
+    if (!initialized_)
+    {
+        return true;
+    }
+
+    // Same steps as initialize, the Instrument objects stay valid for the bindings
+    build_layout();
+    for (auto &instrument : instruments_)
+    {
+        instrument->reload();
+    }
+    for (VoicePool &pool : voice_pools_)
+    {
+        // Resizing to the same count fits the voices to the new data length
+        pool.stop_all();
+        pool.set_size(pool.get_size());
+    }
+    transform_parameters();
+    build_note_events();
+    compile_programs();
+    position_ = std::min(position_, get_song_length());
+    DEBUG_LOG("load_song: " << song_programs_ << " programs, " << song_rows_ << " pattern rows, "
+                            << num_patterns << " patterns");
+    return true;
+}
+
+std::vector<uint8_t> SynthEngine::get_program_bytes() const
+{
+    return instructions_;
+}
+
+std::vector<uint8_t> SynthEngine::get_parameter_bytes() const
+{
+    // Without the padding OPERATION reads past the last parameter
+    return std::vector<uint8_t>(parameters_.begin(), parameters_.end() - 8);
+}
+
+void SynthEngine::copy_assembled_song()
+{
+    const uint8_t *instruction = instrument_instructions;
+    size_t parameter_size = 0;
+    for (uint32_t i = 0; i <= MAX_NUM_INSTRUMENTS; ++i, ++instruction)
+    {
+        for (; *instruction != INSTRUMENT_END; ++instruction)
+        {
+            parameter_size += Instrument::get_instruction_memory_size(*instruction);
+        }
+    }
+    song_instructions_.assign(static_cast<const uint8_t *>(instrument_instructions), instruction);
+    song_parameters_.assign(instrument_parameters, instrument_parameters + parameter_size);
+    song_patterns_.assign(instrument_patterns, instrument_patterns + SONG_INSTRUMENTS * PATTERNS_PER_INSTRUMENT);
+    uint8_t last = *std::max_element(song_patterns_.begin(), song_patterns_.end());
+    song_pattern_array_.assign(pattern_array, pattern_array + (last + 1) * NOTES_PER_PATTERN);
+}
+
+bool SynthEngine::song_storeval_targets_fit(const std::vector<uint8_t> &instructions,
+                                            const std::vector<uint8_t> &parameters, uint32_t programs) const
+{
+    // Programs of the song and their instruction counts
+    std::vector<std::pair<const uint8_t *, const uint8_t *>> song_programs;
+    std::vector<uint64_t> counts;
+    const uint8_t *instruction = instructions.data();
+    const uint8_t *parameter = parameters.data();
+    for (uint32_t i = 0; i < programs; ++i)
+    {
+        song_programs.emplace_back(instruction, parameter);
+        uint64_t count = 0;
+        for (; *instruction != INSTRUMENT_END; ++instruction, ++count)
+        {
+            parameter += Instrument::get_instruction_memory_size(*instruction);
+        }
+        ++instruction;
+        counts.push_back(count);
+    }
+
+    // Instrument data as build_layout would place it, the song program comes last
+    std::vector<uint32_t> sources;
+    std::vector<uint64_t> offsets;
+    uint64_t data_size = 0;
+    for (uint32_t i = 0; i <= num_instruments_; ++i)
+    {
+        uint32_t source = i == num_instruments_ ? programs - 1 : i % (programs - 1);
+        sources.push_back(source);
+        offsets.push_back(data_size);
+        data_size += Instrument::DATA_WORKSPACES + std::max<uint64_t>(counts[source], 1) * Instrument::DATA_WORKSPACE_SIZE;
+    }
+    for (uint32_t i = 0; i <= num_instruments_; ++i)
+    {
+        const auto &program = song_programs[sources[i]];
+        if (!storeval_targets_fit(offsets[i], Instrument::get_storeval_targets(program.first, program.second), data_size))
+        {
+            DEBUG_LOG("load_song: a STOREVAL of program " << sources[i] << " writes past the synth data");
+            return false;
+        }
+    }
+    return true;
+}
+
+void SynthEngine::build_layout()
+{
+    // Programs of the song, the instruments followed by the song instrument
+    std::vector<std::pair<const uint8_t *, const uint8_t *>> song_programs;
+    const uint8_t *instruction = song_instructions_.data();
+    const uint8_t *parameter = song_parameters_.data();
+    for (uint32_t i = 0; i <= song_programs_; ++i)
+    {
+        song_programs.emplace_back(instruction, parameter);
+        for (; *instruction != INSTRUMENT_END; ++instruction)
+        {
+            parameter += Instrument::get_instruction_memory_size(*instruction);
+        }
+        ++instruction;
+    }
+
+    // Instruments the song has no program for start as copies of the first ones.
+    // Every instrument gets one workspace and parameters slot per instruction
+    instrument_layouts_.clear();
+    instructions_.clear();
+    parameters_.clear();
+    uint64_t data_size = 0;
+    uint64_t slots = 0;
+    for (uint32_t i = 0; i <= num_instruments_; ++i)
+    {
+        uint32_t source = i == num_instruments_ ? song_programs_ : i % song_programs_;
+        instruction = song_programs[source].first;
+        parameter = song_programs[source].second;
+        uint64_t count = 0;
+        for (; *instruction != INSTRUMENT_END; ++instruction, ++count)
+        {
+            uint32_t size = Instrument::get_instruction_memory_size(*instruction);
+            instructions_.push_back(*instruction);
+            parameters_.insert(parameters_.end(), parameter, parameter + size);
+            parameter += size;
+        }
+        instructions_.push_back(INSTRUMENT_END);
+
+        // render_instrument reads the envelope state of the first workspace, even without instructions
+        uint64_t workspaces = std::max<uint64_t>(count, 1);
+        instrument_layouts_.push_back({data_size, slots * Instrument::DATA_WORKSPACE_SIZE, workspaces, 0});
+        data_size += Instrument::DATA_WORKSPACES + workspaces * Instrument::DATA_WORKSPACE_SIZE;
+        slots += workspaces;
+    }
+    // OPERATION loads 8 bytes for its operand
+    parameters_.resize(parameters_.size() + 8);
+    compiled_instructions_ = instructions_;
+
+    // The song rows repeat for instruments past them, patterns past the song are silent
+    instrument_patterns_.assign(num_instruments_ * patterns_per_instrument_, 0);
+    uint32_t song_patterns = std::min<uint32_t>(patterns_per_instrument_, PATTERNS_PER_INSTRUMENT);
+    for (uint32_t i = 0; i < num_instruments_; ++i)
+    {
+        const uint8_t *row = &song_patterns_[(i % song_rows_) * PATTERNS_PER_INSTRUMENT];
+        std::copy(row, row + song_patterns, instrument_patterns_.begin() + i * patterns_per_instrument_);
+    }
+
+    synth_data_.assign(data_size / sizeof(uint32_t), 0);
+    transformed_parameters_.assign(slots * MAX_COMMAND_PARAMS, 0.0f);
+    subnormal_counts_.assign(slots, 0);
+    skip_data_.assign((num_instruments_ + 1) * 4, 0);
+    note_events_.assign(num_instruments_ * get_note_events_per_instrument() * NOTE_EVENT_SIZE / 4, 0);
+    note_event_cursors_.assign(num_instruments_, 0);
+
+    layout_.synth_data = synth_data_.data();
+    layout_.transformed_parameters = transformed_parameters_.data();
+    layout_.subnormal_counts = subnormal_counts_.data();
+    layout_.compiled_instructions = compiled_instructions_.data();
+    layout_.instrument_instructions = instructions_.data();
+    layout_.instrument_parameters = parameters_.data();
+    layout_.instrument_patterns = instrument_patterns_.data();
+    layout_.pattern_array = song_pattern_array_.data();
+    layout_.skip_data = skip_data_.data();
+    layout_.note_events = note_events_.data();
+    layout_.note_event_cursors = note_event_cursors_.data();
+    layout_.instruments = instrument_layouts_.data();
+    layout_.num_instruments = num_instruments_;
+    layout_.patterns_per_instrument = patterns_per_instrument_;
+    layout_.note_event_stride = get_note_events_per_instrument() * NOTE_EVENT_SIZE;
+    // Rebuilt buffers can move while synth_data stays, see Instrument::select_layout
+    synth_layout = layout_;
+    Instrument::invalidate_render_state();
+    DEBUG_LOG("Layout: " << data_size << " bytes of instrument data, " << slots << " workspaces");
+}
+
+void SynthEngine::update_timing(uint32_t sample_rate, uint32_t tempo)
+{
+    uint64_t previous = layout_.samples_per_note;
+    sample_rate_ = sample_rate;
+    tempo_ = tempo;
+    layout_.samples_per_note = 60ull * sample_rate / (tempo * NOTES_PER_BEAT);
+
+    // Keep the events at the same rows, events between rows keep their share of the row
+    if (previous != 0 && previous != layout_.samples_per_note)
+    {
+        for (size_t i = 0; i < note_events_.size(); i += NOTE_EVENT_SIZE / 4)
+        {
+            if (note_events_[i] != NOTE_EVENT_END)
+            {
+                note_events_[i] = static_cast<uint32_t>(note_events_[i] * layout_.samples_per_note / previous);
+            }
+        }
+        position_ = std::min(position_ * layout_.samples_per_note / previous, get_song_length());
+    }
+
+    apply_rate_constants(sample_rate);
+    Instrument::invalidate_render_state();
+    DEBUG_LOG("Timing: " << sample_rate_ << " Hz, " << tempo_ << " BPM, "
+                         << layout_.samples_per_note << " samples per note");
+}
+
+void SynthEngine::apply_rate_constants(uint32_t sample_rate)
+{
+    // The constants of the ARM64 code are tuned for SAMPLE_RATE. The ratio is
+    // exactly 1 at SAMPLE_RATE, so the default renders match the player
+    double ratio = static_cast<double>(SAMPLE_RATE) / sample_rate;
+    layout_.frequency_base = static_cast<float>(FREQUENCY_BASE * ratio);
+    layout_.lfo_frequency_base = static_cast<float>(LFO_FREQUENCY_BASE * ratio);
+    layout_.rate_scale = static_cast<float>(ratio);
+
+    // A selected layout is not copied again by Instrument::select_layout
+    if (layout_.synth_data && synth_layout.synth_data == layout_.synth_data)
+    {
+        synth_layout = layout_;
+    }
+}
+
+uint32_t SynthEngine::get_note_events_per_instrument() const
+{
+    // One event per row and the end marker
+    return patterns_per_instrument_ * NOTES_PER_PATTERN + 1;
+}
+
 void SynthEngine::create_instruments()
 {
-    DEBUG_LOG("Creating " << MAX_NUM_INSTRUMENTS << " instruments");
+    DEBUG_LOG("Creating " << num_instruments_ << " instruments");
     instruments_.clear();
 
-    for (uint32_t i = 0; i < MAX_NUM_INSTRUMENTS; ++i)
+    for (uint32_t i = 0; i < num_instruments_; ++i)
+    {
+        instruments_.push_back(std::make_unique<Instrument>(i, &layout_));
+    }
+
+    voice_pools_.clear();
+    for (auto &instrument : instruments_)
     {
-        instruments_.push_back(std::make_unique<Instrument>(i));
+        voice_pools_.emplace_back(instrument.get(), DEFAULT_VOICES);
     }
 
     DEBUG_LOG("All instruments created successfully");
+}
+
+void SynthEngine::compile_programs()
+{
+    // STOREVAL destinations are offsets from the data of the writing instrument
+    std::vector<std::vector<uint32_t>> external_targets(instruments_.size());
+    for (uint32_t writer = 0; writer < instruments_.size(); ++writer)
+    {
+        for (uint32_t target : instruments_[writer]->get_storeval_targets())
+        {
+            uint32_t offset = instruments_[writer]->get_data_offset() + target;
+            for (uint32_t owner = 0; owner < instruments_.size(); ++owner)
+            {
+                uint32_t start = instruments_[owner]->get_data_offset();
+                if (owner != writer && offset >= start && offset < start + instruments_[owner]->get_data_length())
+                {
+                    external_targets[owner].push_back(offset - start);
+                }
+            }
+        }
+    }
+    for (uint32_t i = 0; i < instruments_.size(); ++i)
+    {
+        instruments_[i]->compile_program(external_targets[i]);
+    }
+}
+
+void SynthEngine::update_program_compiler()
+{
+    // The kernels skip the per-instruction subnormal counts, which are only
+    // collected while flushing to zero is off
+    program_compiler = (program_compiler_ && flush_to_zero) ? 1 : 0;
 }
\ No newline at end of file
@@ -9,21 +9,70 @@
 #include <memory>
 #include <cstdint>
 #include "instrument.h"
+#include "voice_pool.h"
 #include "parameters.h"
 
+extern "C"
+{
+#include "../../softsynth/include/softsynth.h"
+}
+
+// Difference between a note rendered at control rate and at full rate
+struct ControlRateError
+{
+    float max_error;     // Largest absolute sample difference
+    float rms_error;     // RMS of the sample difference
+    float reference_rms; // RMS of the full-rate rendering
+};
+
+// The engine buffers are sized when the engine is created and allocated when it
+// is initialized. Every render points synth_layout at the buffers of its engine,
+// so several engines of different sizes can be used side by side
 class SynthEngine
 {
 public:
-    SynthEngine();
+    SynthEngine(uint32_t num_instruments = MAX_NUM_INSTRUMENTS,
+                uint32_t patterns_per_instrument = PATTERNS_PER_INSTRUMENT);
+    ~SynthEngine();
 
     bool initialize(void);
 
     Instrument *get_instrument(uint32_t instrument_id);
     const std::vector<std::unique_ptr<Instrument>> &get_all_instruments() const;
     uint32_t get_num_instruments() const;
+    uint32_t get_patterns_per_instrument() const;
+    uint32_t get_instrument_data_offset(uint32_t instrument_num) const;
+    uint32_t get_instrument_data_length(uint32_t instrument_num) const;
+    uint32_t get_synth_data_size() const;
 
     std::vector<float> render_note(void);
+    // Render num_samples from the song position into output and advance the position.
+    // Samples past the end of the song are silent. Returns the number of song samples
+    // rendered, 0 without rendering if output holds fewer than num_samples
+    uint32_t render(uint32_t num_samples, float *output, size_t output_size);
+    // Move the song position. Sounding notes and voices are stopped, the notes
+    // starting from the position on are played
+    bool set_position(uint64_t sample);
+    uint64_t get_position() const;
+    uint64_t get_song_length() const;
+
+    // Sample rate and tempo of the renders. Changing them recomputes the
+    // constants derived from them and moves the note events and the song
+    // position to the new note length
+    bool set_sample_rate(uint32_t rate);
+    uint32_t get_sample_rate() const;
+    bool set_tempo(uint32_t beats_per_minute);
+    uint32_t get_tempo() const;
+    uint32_t get_samples_per_note() const;
     std::vector<float> render_instrument_note(uint32_t instrument_num, uint32_t note_num);
+    std::vector<float> render_instrument_note_window(uint32_t instrument_num, uint32_t note_num,
+                                                     uint32_t start_sample, uint32_t num_samples,
+                                                     uint32_t release_sample);
+    // Render the start of a note at 1/factor of the sample rate. Returns
+    // num_samples / factor samples, rounded up, for the caller to upsample
+    std::vector<float> render_instrument_note_draft(uint32_t instrument_num, uint32_t note_num,
+                                                    uint32_t num_samples, uint32_t release_sample,
+                                                    uint32_t factor);
 
     std::vector<int> get_instrument_instructions(uint32_t instrument_num);
     std::vector<uint8_t> get_instrument_instruction_parameters(uint32_t instrument_num, uint32_t instruction_index);
@@ -35,13 +84,130 @@ public:
 
     bool update_instrument_parameter(uint32_t instrument_num, uint32_t instruction_index, uint32_t param_index, uint32_t value);
     bool update_instrument_parameter_with_string(uint32_t instrument_num, uint32_t instruction_index, uint32_t param_index, const std::string &value);
+    std::vector<uint8_t> get_instrument_parameter_bytes(uint32_t instrument_num);
+    // Replace the parameters of an instrument in one write, see Instrument::set_parameter_bytes.
+    // False also if a STOREVAL destination would point past the synth data
+    bool set_instrument_parameter_bytes(uint32_t instrument_num, const std::vector<uint8_t> &bytes);
+
+    bool set_control_rate(uint32_t rate);
+    uint32_t get_control_rate() const;
+    ControlRateError measure_control_rate_error(uint32_t instrument_num, uint32_t note_num, uint32_t rate);
+
+    void set_wavetable_mode(bool enabled);
+    bool get_wavetable_mode() const;
+
+    void set_flush_to_zero(bool enabled);
+    bool get_flush_to_zero() const;
+    void reset_subnormal_counts();
+
+    void set_program_compiler(bool enabled);
+    bool get_program_compiler() const;
+    std::vector<uint8_t> get_compiled_instructions(uint32_t instrument_num);
+    std::vector<uint32_t> get_subnormal_counts(uint32_t instrument_num);
+
+    // Replace the song data the instruments and patterns are built from, laid
+    // out like the tables of song.asm: the programs of the instruments and the
+    // song program, their parameter bytes, rows of PATTERNS_PER_INSTRUMENT
+    // pattern numbers and NOTES_PER_PATTERN notes per pattern. An initialized
+    // engine rebuilds its buffers and instruments in place, stops the voices
+    // and recompiles the note events. Returns false for malformed data
+    bool load_song(const std::vector<uint8_t> &instructions, const std::vector<uint8_t> &parameters,
+                   const std::vector<uint8_t> &patterns, const std::vector<uint8_t> &pattern_array);
+    // Programs of the instruments followed by the song program, and their
+    // parameter bytes with the edits made since, in the layout load_song takes
+    std::vector<uint8_t> get_program_bytes() const;
+    std::vector<uint8_t> get_parameter_bytes() const;
+
+    std::vector<uint8_t> get_instrument_patterns(uint32_t instrument_num);
+    std::vector<uint8_t> get_pattern_array();
+    std::vector<uint32_t> get_note_events(uint32_t instrument_num);
+    bool set_note_events(uint32_t instrument_num, const std::vector<uint32_t> &words);
+
+    bool set_voice_count(uint32_t instrument_num, uint32_t voices);
+    uint32_t get_voice_count(uint32_t instrument_num) const;
+    bool set_voice_stealing(uint32_t stealing);
+    uint32_t get_voice_stealing() const;
+    bool set_cpu_budget(float budget);
+    float get_cpu_budget() const;
+    bool voice_note_on(uint32_t instrument_num, uint32_t note_num);
+    bool voice_note_off(uint32_t instrument_num, uint32_t note_num);
+    void stop_voices();
+    std::vector<float> render_voice_block(uint32_t num_samples);
+    VoiceStats get_voice_stats(uint32_t instrument_num) const;
+    void reset_voice_stats();
 
     bool is_initialized() const;
 
+    // Largest number of samples between control-rate updates
+    static constexpr uint32_t MAX_CONTROL_RATE = 256;
+
+    // Limits of the engine size, instrument numbers are bytes in the debug entry points
+    static constexpr uint32_t MAX_INSTRUMENTS = 255;
+    static constexpr uint32_t MAX_PATTERNS_PER_INSTRUMENT = 1024;
+    // Pattern rows in song.asm, the player plays the first MAX_NUM_INSTRUMENTS
+    static constexpr uint32_t SONG_INSTRUMENTS = 9;
+
+    // Limits of the sample rate and the tempo, the sample offsets of the note
+    // events of the longest song must fit in 32 bits
+    static constexpr uint32_t MIN_SAMPLE_RATE = 8000;
+    static constexpr uint32_t MAX_SAMPLE_RATE = 192000;
+    static constexpr uint32_t MIN_TEMPO = 20;
+    static constexpr uint32_t MAX_TEMPO = 999;
+    // Largest sample rate divisor of the draft renders
+    static constexpr uint32_t MAX_DRAFT_FACTOR = 4;
+
+    // Voices per instrument until set_voice_count is called
+    static constexpr uint32_t DEFAULT_VOICES = 4;
+    // Share of a block's playback time that render_voice_block may spend
+    static constexpr float DEFAULT_CPU_BUDGET = 0.5f;
+
 private:
     bool initialized_;
+    bool program_compiler_; // Requested, only active while flushing subnormals to zero
+    uint32_t num_instruments_;
+    uint32_t patterns_per_instrument_;
     std::vector<float> output_buffer_;
     std::vector<std::unique_ptr<Instrument>> instruments_;
+    std::vector<VoicePool> voice_pools_;
+    VoiceStealing voice_stealing_;
+    float cpu_budget_;
+    uint64_t voices_started_; // Note-on counter ordering the voices of all pools
+    uint64_t position_ = 0;   // Song sample rendered next by render
+    uint32_t sample_rate_ = SAMPLE_RATE;
+    uint32_t tempo_ = BEATS_PER_MINUTE;
+
+    // Buffers of the engine, selected into synth_layout by the renders
+    engine_layout layout_ = {};
+    std::vector<instrument_layout> instrument_layouts_;
+    std::vector<uint8_t> instructions_;
+    std::vector<uint8_t> parameters_;
+    std::vector<uint8_t> compiled_instructions_;
+    std::vector<uint8_t> instrument_patterns_;
+    std::vector<uint32_t> synth_data_;
+    std::vector<float> transformed_parameters_;
+    std::vector<uint32_t> subnormal_counts_;
+    std::vector<uint64_t> skip_data_;
+    std::vector<uint32_t> note_events_;
+    std::vector<uint64_t> note_event_cursors_;
+
+    // Song data the buffers are built from, the assembled song.asm until
+    // load_song replaces it
+    std::vector<uint8_t> song_instructions_;
+    std::vector<uint8_t> song_parameters_;
+    std::vector<uint8_t> song_patterns_;
+    std::vector<uint8_t> song_pattern_array_;
+    uint32_t song_programs_ = MAX_NUM_INSTRUMENTS; // Instrument programs before the song program
+    uint32_t song_rows_ = SONG_INSTRUMENTS;        // Pattern rows of song_patterns_
 
+    void copy_assembled_song();
+    void build_layout();
+    // Whether the STOREVAL destinations of song data stay in the synth data build_layout makes for it
+    bool song_storeval_targets_fit(const std::vector<uint8_t> &instructions, const std::vector<uint8_t> &parameters,
+                                   uint32_t programs) const;
+    void update_timing(uint32_t sample_rate, uint32_t tempo);
+    void apply_rate_constants(uint32_t sample_rate);
+    uint32_t get_note_events_per_instrument() const;
     void create_instruments();
+    void compile_programs();
+    void update_program_compiler();
 };
\ No newline at end of file
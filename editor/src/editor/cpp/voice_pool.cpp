@@ -0,0 +1,150 @@
+/*
+ * VoicePool implementation for 4K Softsynth
+ * Plays overlapping notes of one instrument, each in its own copy of the instrument data
+ */
+
+#include "voice_pool.h"
+#include <algorithm>
+#include <cmath>
+#include <cstring>
+#include <limits>
+
+VoicePool::VoicePool(Instrument *instrument, uint32_t size) : instrument_(instrument)
+{
+    set_size(size);
+}
+
+bool VoicePool::set_size(uint32_t size)
+{
+    if (size < 1 || size > MAX_VOICES)
+    {
+        return false;
+    }
+    // Shrinking keeps the voices least likely to be stolen
+    std::stable_sort(voices_.begin(), voices_.end(), [](const Voice &a, const Voice &b)
+                     { return steal_before(b, a, VOICE_STEAL_OLDEST); });
+    voices_.resize(size);
+    for (Voice &voice : voices_)
+    {
+        voice.data.resize(instrument_->get_data_length());
+    }
+    return true;
+}
+
+void VoicePool::note_on(uint8_t note, uint64_t started, VoiceStealing stealing)
+{
+    auto voice = std::find_if(voices_.begin(), voices_.end(), [](const Voice &v)
+                              { return v.note == 0; });
+    if (voice == voices_.end())
+    {
+        voice = std::min_element(voices_.begin(), voices_.end(), [stealing](const Voice &a, const Voice &b)
+                                 { return steal_before(a, b, stealing); });
+        steals_++;
+    }
+
+    // Like debug_start_instrument_note: cleared data with the note in the first word
+    std::fill(voice->data.begin(), voice->data.end(), 0);
+    uint32_t note_word = note;
+    std::memcpy(voice->data.data(), &note_word, sizeof(note_word));
+    voice->started = started;
+    // Not rendered yet, so not a candidate for quietest
+    voice->level = std::numeric_limits<float>::infinity();
+    voice->note = note;
+    voice->release = 0;
+    update_peak_voices();
+}
+
+void VoicePool::note_off(uint8_t note)
+{
+    for (Voice &voice : voices_)
+    {
+        if (voice.note == note && note != 0)
+        {
+            voice.release = 1;
+        }
+    }
+}
+
+void VoicePool::stop_all()
+{
+    for (Voice &voice : voices_)
+    {
+        voice.note = 0;
+    }
+}
+
+std::vector<uint32_t> VoicePool::get_active_voices() const
+{
+    std::vector<uint32_t> active;
+    for (uint32_t i = 0; i < voices_.size(); ++i)
+    {
+        if (voices_[i].note != 0)
+        {
+            active.push_back(i);
+        }
+    }
+    return active;
+}
+
+void VoicePool::render_voice(uint32_t index, float *output, float *scratch, uint32_t num_samples)
+{
+    Voice &voice = voices_[index];
+    instrument_->render_voice(voice.data, voice.release, scratch, num_samples);
+
+    float level = 0.0f;
+    for (uint32_t i = 0; i < num_samples; ++i)
+    {
+        output[i] += scratch[i];
+        level = std::max(level, std::fabs(scratch[i]));
+    }
+    voice.level = level;
+
+    // render_instrument clears the note when the envelope has finished
+    uint32_t note_word;
+    std::memcpy(&note_word, voice.data.data(), sizeof(note_word));
+    if (note_word == 0)
+    {
+        voice.note = 0;
+    }
+}
+
+void VoicePool::steal_for_budget(uint32_t index)
+{
+    voices_[index].note = 0;
+    budget_steals_++;
+}
+
+VoiceStats VoicePool::get_stats() const
+{
+    return {static_cast<uint32_t>(get_active_voices().size()), peak_voices_, steals_, budget_steals_};
+}
+
+void VoicePool::reset_stats()
+{
+    peak_voices_ = static_cast<uint32_t>(get_active_voices().size());
+    steals_ = 0;
+    budget_steals_ = 0;
+}
+
+bool VoicePool::steal_before(const Voice &a, const Voice &b, VoiceStealing stealing)
+{
+    // Free voices first, then released ones
+    if ((a.note == 0) != (b.note == 0))
+    {
+        return a.note == 0;
+    }
+    if (a.release != b.release)
+    {
+        return a.release > b.release;
+    }
+    if (stealing == VOICE_STEAL_QUIETEST && a.level != b.level)
+    {
+        return a.level < b.level;
+    }
+    return a.started < b.started;
+}
+
+void VoicePool::update_peak_voices()
+{
+    peak_voices_ = std::max(peak_voices_, static_cast<uint32_t>(get_active_voices().size()));
+}
@@ -0,0 +1,76 @@
+/*
+ * VoicePool class for 4K Softsynth
+ * Plays overlapping notes of one instrument, each in its own copy of the instrument data
+ */
+
+#pragma once
+
+#include <vector>
+#include <cstdint>
+#include "instrument.h"
+
+// Which sounding voice a new note takes over when every voice is busy.
+// Released voices are always taken before held ones
+enum VoiceStealing : uint32_t
+{
+    VOICE_STEAL_OLDEST = 0,   // The voice started first
+    VOICE_STEAL_QUIETEST = 1, // The voice with the lowest peak in the last block
+};
+
+// Voice usage of an instrument since the last reset
+struct VoiceStats
+{
+    uint32_t active_voices; // Voices sounding now
+    uint32_t peak_voices;   // Most voices sounding at once
+    uint32_t steals;        // Notes that took over a sounding voice
+    uint32_t budget_steals; // Voices stopped to stay within the CPU budget
+};
+
+struct Voice
+{
+    std::vector<uint8_t> data; // Note, release, output and workspaces, like synth_data
+    uint64_t started = 0;      // Note-on order, larger is newer
+    float level = 0.0f;        // Peak output of the last rendered block
+    uint8_t note = 0;          // Note the voice was started with, 0 when free
+    uint8_t release = 0;
+};
+
+class VoicePool
+{
+public:
+    VoicePool(Instrument *instrument, uint32_t size);
+
+    bool set_size(uint32_t size);
+    uint32_t get_size() const { return static_cast<uint32_t>(voices_.size()); }
+
+    // Start a note in a free voice, or steal one. started orders the notes of all pools
+    void note_on(uint8_t note, uint64_t started, VoiceStealing stealing);
+    // Release every held voice playing the note
+    void note_off(uint8_t note);
+    void stop_all();
+
+    // Indices of the sounding voices
+    std::vector<uint32_t> get_active_voices() const;
+    const Voice &get_voice(uint32_t index) const { return voices_[index]; }
+
+    // Add num_samples of a voice to output, scratch holds the voice samples
+    void render_voice(uint32_t index, float *output, float *scratch, uint32_t num_samples);
+    void steal_for_budget(uint32_t index);
+
+    VoiceStats get_stats() const;
+    void reset_stats();
+
+    // True if voice a is taken over before voice b
+    static bool steal_before(const Voice &a, const Voice &b, VoiceStealing stealing);
+
+    static constexpr uint32_t MAX_VOICES = 16;
+
+private:
+    Instrument *instrument_;
+    std::vector<Voice> voices_;
+    uint32_t peak_voices_ = 0;
+    uint32_t steals_ = 0;
+    uint32_t budget_steals_ = 0;
+
+    void update_peak_voices();
+};
@@ -3,9 +3,14 @@ Main Editor Application for 4K Softsynth
 Refactored with component architecture using CustomTkinter
 """
 
+import queue
+import time
 from typing import Optional, NamedTuple
 import customtkinter as ctk
 
+from editor.audio.presets import Preset, PresetLibrary
+from editor.audio.project import ProjectData, ProjectFile
+from editor.audio.song_asm import SongWatcher, parse_song
 from editor.audio.synth_wrapper import SynthWrapper
 from editor.audio.audio_device import AudioDevice
 from editor.utils.logger import setup_logger
@@ -16,6 +21,12 @@ from .instrument_panel import InstrumentPanel
 from .status_panel import StatusPanel
 
 
+# Interval of the checks for changes of song.asm
+SONG_POLL_MS = 250
+# Interval of the checks for exact renders of key presses
+AUDITION_POLL_MS = 10
+
+
 class UIComponents(NamedTuple):
     """Container for UI component instances."""
     menu_manager: MenuManager
@@ -38,6 +49,16 @@ class Editor:
         self.audio: Optional[AudioDevice] = None
         self.logger = setup_logger()
         self.current_instrument = 0
+        # Note of the last key press until its exact render is played
+        self.audition_key = None
+        self.audition_stand_in = False
+        # Exact renders handed from the audition worker to the Tk thread
+        self.audition_results = queue.SimpleQueue()
+        self.song_watcher: Optional[SongWatcher] = None
+        # Project file of the last open or save, saved to incrementally
+        self.project_file: Optional[ProjectFile] = None
+        # Preset library, indexed when it is first used
+        self.presets: Optional[PresetLibrary] = None
         self.components: Optional[UIComponents] = None
 
     def initialize_synth(self) -> bool:
@@ -108,6 +129,16 @@ class Editor:
         # Initial waveform update - show current instrument waveform at startup
         self.components.waveform_display.auto_update_waveform_from_synth()
 
+        # Exact renders of key presses are played from the Tk thread
+        self.root.after(AUDITION_POLL_MS, self._poll_auditions)
+
+        # Reload the song data when song.asm is saved
+        self.song_watcher = SongWatcher()
+        if self.song_watcher.exists():
+            self.components.status_panel.log_output(
+                f"👀 Watching {self.song_watcher.path.name} for changes")
+            self.root.after(SONG_POLL_MS, self._watch_song)
+
     def _configure_grid_weights(self, main_frame: ctk.CTkFrame) -> None:
         """Configure grid weights for responsive layout."""
         self.root.columnconfigure(0, weight=1)
@@ -155,31 +186,199 @@ class Editor:
         # Currently handled by specific key bindings like 'q'
 
     def on_q_key_press(self, _event) -> None:
-        """Handle 'q' key press - play synthesizer note."""
+        """Handle 'q' key press - play synthesizer note.
+
+        A note that is not rendered yet starts as the nearest rendered note,
+        pitch-shifted, and the exact render replaces it while it plays.
+        """
         try:
             self.components.status_panel.log_output("🎵 Playing note (Q key pressed)...")
 
             # Get audio data from synthesizer
-            audio_data = self.synth.render_instrument_note(self.current_instrument, 69)
-
-            if audio_data is not None and len(audio_data) > 0:
-                # Play the audio if audio system is available
-                if self.audio and self.audio.is_initialized:
-                    success = self.audio.play_samples(audio_data, blocking=False)
-                    if success:
-                        self.components.status_panel.log_output(
-                            f"✓ Playing {len(audio_data)} samples")
-                    else:
-                        self.components.status_panel.log_output("✗ Audio playback failed")
-                else:
-                    self.components.status_panel.log_output("✗ Audio system not available")
+            key = (self.current_instrument, 69)
+            self.audition_key = key
+            self.audition_stand_in = False
+            audio_data = self.synth.audition_note(*key, on_exact=self.on_exact_note)
+
+            if len(audio_data) > 0:
+                self.audition_stand_in = True
+                self.play_audition(audio_data)
             else:
-                self.components.status_panel.log_output("✗ No audio data generated")
+                # Nothing to stand in yet, play the exact render when it is ready
+                self.components.status_panel.log_output("⏳ Rendering note...")
 
         except (RuntimeError, ValueError, OSError) as e:
             self.logger.error("Error playing note: %s", e)
             self.components.status_panel.log_output(f"✗ Error playing note: {e}")
 
+    def play_audition(self, audio_data) -> None:
+        """Start playing the samples of a key press."""
+        # Play the audio if audio system is available
+        if self.audio and self.audio.is_initialized:
+            success = self.audio.play_samples(audio_data, blocking=False)
+            if success:
+                self.components.status_panel.log_output(
+                    f"✓ Playing {len(audio_data)} samples")
+            else:
+                self.components.status_panel.log_output("✗ Audio playback failed")
+        else:
+            self.components.status_panel.log_output("✗ Audio system not available")
+
+    def on_exact_note(self, instrument_num: int, note_num: int, audio_data) -> None:
+        """Queue the exact render of a key press, called from the audition worker.
+
+        Tk is not thread-safe, the render is handled by _poll_auditions.
+        """
+        self.audition_results.put((instrument_num, note_num, audio_data))
+
+    def _poll_auditions(self) -> None:
+        """Swap in or play the queued exact renders, then check again later."""
+        while True:
+            try:
+                instrument_num, note_num, audio_data = self.audition_results.get_nowait()
+            except queue.Empty:
+                break
+            if self.audition_key != (instrument_num, note_num):
+                continue
+            self.audition_key = None
+            if audio_data is None:
+                self.components.status_panel.log_output(
+                    f"✗ Error rendering note {note_num}, see the log")
+            elif self.audition_stand_in:
+                # Nothing changes if the stand-in already finished
+                if self.audio and self.audio.is_initialized:
+                    self.audio.swap_samples(audio_data)
+            else:
+                self.play_audition(audio_data)
+        self.root.after(AUDITION_POLL_MS, self._poll_auditions)
+
+    def _watch_song(self) -> None:
+        """Reload song.asm if it changed, then check again later."""
+        if self.song_watcher.poll():
+            self.reload_song()
+        self.root.after(SONG_POLL_MS, self._watch_song)
+
+    def reload_song(self) -> bool:
+        """Load the song data of the watched song.asm into the synthesizer."""
+        start = time.perf_counter()
+        try:
+            song = parse_song(self.song_watcher.path)
+        except (OSError, ValueError) as e:
+            self.logger.error("Error reading song: %s", e)
+            self.components.status_panel.log_output(f"✗ Song not reloaded: {e}")
+            return False
+
+        if not self.synth.load_song(song):
+            self.components.status_panel.log_output(
+                "✗ Song not reloaded: the engine rejected the song data")
+            return False
+
+        self.components.instrument_panel.reload_instrument()
+        elapsed = (time.perf_counter() - start) * 1000
+        self.components.status_panel.log_output(
+            f"🔄 Reloaded {self.song_watcher.path.name} in {elapsed:.1f} ms")
+        return True
+
+    def new_project(self) -> bool:
+        """Start a project from the song.asm next to the editor."""
+        try:
+            song = parse_song()
+        except (OSError, ValueError) as e:
+            self.logger.error("Error reading song: %s", e)
+            self.components.status_panel.log_output(f"✗ No new project: {e}")
+            return False
+        if not self._apply_project(ProjectData(song)):
+            return False
+        self.project_file = None
+        self.components.status_panel.log_output("New project created")
+        return True
+
+    def open_project(self, path) -> bool:
+        """Load a project file into the synthesizer."""
+        start = time.perf_counter()
+        project_file = ProjectFile(path)
+        try:
+            project = project_file.load()
+        except (OSError, ValueError) as e:
+            self.logger.error("Error opening project: %s", e)
+            self.components.status_panel.log_output(f"✗ Project not opened: {e}")
+            return False
+        if not self._apply_project(project):
+            return False
+
+        self.project_file = project_file
+        elapsed = (time.perf_counter() - start) * 1000
+        self.components.status_panel.log_output(
+            f"📂 Opened {project_file.path.name} in {elapsed:.1f} ms")
+        return True
+
+    def save_project(self, path=None) -> bool:
+        """Save the synthesizer's song to a project file.
+
+        Saving again to the file of the last open or save writes only the
+        sections that changed.
+        """
+        if path is not None and (self.project_file is None or self.project_file.path != path):
+            self.project_file = ProjectFile(path)
+        if self.project_file is None:
+            return False
+
+        start = time.perf_counter()
+        try:
+            written = self.project_file.save(self.synth.get_project())
+        except OSError as e:
+            self.logger.error("Error saving project: %s", e)
+            self.components.status_panel.log_output(f"✗ Project not saved: {e}")
+            return False
+        elapsed = (time.perf_counter() - start) * 1000
+        self.components.status_panel.log_output(
+            f"💾 Saved {self.project_file.path.name} ({written} bytes written) in {elapsed:.1f} ms")
+        return True
+
+    def get_presets(self) -> Optional[PresetLibrary]:
+        """Get the preset library, reading its index on first use."""
+        if self.presets is None:
+            try:
+                self.presets = PresetLibrary()
+            except OSError as e:
+                self.logger.error("Error reading presets: %s", e)
+                self.components.status_panel.log_output(f"✗ Presets not available: {e}")
+        return self.presets
+
+    def save_preset(self, name: str, tags) -> bool:
+        """Store the patch of the current instrument in the preset library."""
+        presets = self.get_presets()
+        if presets is None:
+            return False
+        try:
+            preset = presets.add(name, *self.synth.get_patch(self.current_instrument), tags=tags)
+        except (OSError, ValueError) as e:
+            self.logger.error("Error saving preset: %s", e)
+            self.components.status_panel.log_output(f"✗ Preset not saved: {e}")
+            return False
+        self.components.status_panel.log_output(f"⭐ Saved preset {preset.name} ({preset.key[:8]})")
+        return True
+
+    def load_preset(self, preset: Preset) -> bool:
+        """Load a preset into the current instrument."""
+        if not self.synth.load_preset(self.current_instrument, preset):
+            self.components.status_panel.log_output(
+                f"✗ The engine rejected preset {preset.name}")
+            return False
+        self.components.instrument_panel.reload_instrument()
+        self.components.status_panel.log_output(
+            f"🎛 Loaded preset {preset.name} into instrument {self.current_instrument}")
+        return True
+
+    def _apply_project(self, project: ProjectData) -> bool:
+        """Load a project into the synthesizer and show its instruments."""
+        if not self.synth.load_project(project):
+            self.components.status_panel.log_output(
+                "✗ The engine rejected the project data")
+            return False
+        self.components.instrument_panel.reload_instrument()
+        return True
+
     def run(self) -> int:
         """Main application entry point."""
         if not self.initialize_synth():
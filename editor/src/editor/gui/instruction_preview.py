@@ -0,0 +1,114 @@
+"""Instruction preview plots for the instrument panel using CustomTkinter."""
+
+import customtkinter as ctk
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from matplotlib.figure import Figure
+
+from ..audio.engine_math import FILTER_ID, OSCILLATOR_ID
+from ..audio.filter_response import (log_frequency_grid, svf_coefficients, svf_is_stable,
+                                     svf_magnitude_db)
+from ..audio.oscillator_preview import oscillator_cycle, oscillator_frequency_hz
+
+# Note used to report the oscillator frequency (the note played with 'Q')
+PREVIEW_NOTE = 69
+
+
+class InstructionPreview:
+    """Shows live previews of single instructions computed without rendering."""
+
+    def __init__(self, main_editor):
+        """Initialize the instruction preview.
+
+        Args:
+            main_editor: Reference to the main editor controller
+        """
+        self.main_editor = main_editor
+        self.preview_fig = None
+        self.oscillator_ax = None
+        self.filter_ax = None
+        self.preview_canvas = None
+        self.frequencies = log_frequency_grid()
+
+    def create_preview_section(self, parent_frame, row):
+        """Create the preview plots below the parameter controls.
+
+        Args:
+            parent_frame: Frame to place the previews in
+            row: Grid row to use in the parent frame
+        """
+        preview_frame = ctk.CTkFrame(parent_frame, corner_radius=10)
+        preview_frame.grid(row=row, column=0, columnspan=2, sticky="ew",
+                           padx=15, pady=(0, 15))
+
+        self.preview_fig = Figure(figsize=(8, 2), dpi=80, layout='constrained')
+        self.oscillator_ax, self.filter_ax = self.preview_fig.subplots(1, 2)
+
+        self.preview_canvas = FigureCanvasTkAgg(self.preview_fig, preview_frame)
+        self.preview_canvas.get_tk_widget().pack(fill="both", expand=True, padx=5, pady=5)
+
+        self.update_previews()
+
+    def update_previews(self):
+        """Recompute all previews from the current instrument parameters."""
+        if not self.preview_fig or not self.preview_canvas:
+            return
+
+        self._update_oscillator_cycle()
+        self._update_filter_response()
+        self.preview_canvas.draw_idle()
+
+    def _find_parameters(self, instruction_id):
+        """Get the parameters of the first matching instruction of the current instrument."""
+        synth = getattr(self.main_editor, 'synth', None)
+        if not synth:
+            return None
+        return synth.find_instruction_parameters(self.main_editor.current_instrument,
+                                                 instruction_id)
+
+    def _show_missing_instruction(self, axes, message):
+        """Show a placeholder text when the instrument lacks an instruction."""
+        axes.text(0.5, 0.5, message,
+                  horizontalalignment='center',
+                  verticalalignment='center',
+                  transform=axes.transAxes,
+                  fontsize=10, alpha=0.7)
+
+    def _update_oscillator_cycle(self):
+        """Plot two periods of the first oscillator of the instrument."""
+        self.oscillator_ax.clear()
+        self.oscillator_ax.set_xlabel('Period')
+        self.oscillator_ax.set_ylabel('Amplitude')
+        self.oscillator_ax.grid(True, alpha=0.3)
+
+        params = self._find_parameters(OSCILLATOR_ID)
+        if params is None:
+            self.oscillator_ax.set_title('Oscillator')
+            self._show_missing_instruction(self.oscillator_ax, 'No oscillator in this instrument')
+            return
+
+        position, output = oscillator_cycle(params)
+        frequency = oscillator_frequency_hz(params, PREVIEW_NOTE)
+        self.oscillator_ax.plot(position, output, 'b-', linewidth=1.0)
+        self.oscillator_ax.set_xlim([0, position[-1]])
+        self.oscillator_ax.set_ylim([-1.1, 1.1])
+        self.oscillator_ax.set_title(f'Oscillator ({frequency:.1f} Hz at note {PREVIEW_NOTE})')
+
+    def _update_filter_response(self):
+        """Plot the analytic frequency response of the instrument filter."""
+        self.filter_ax.clear()
+        self.filter_ax.set_xlabel('Frequency (Hz)')
+        self.filter_ax.set_ylabel('Magnitude (dB)')
+        self.filter_ax.grid(True, which='both', alpha=0.3)
+
+        params = self._find_parameters(FILTER_ID)
+        if params is None:
+            self.filter_ax.set_title('Filter Response')
+            self._show_missing_instruction(self.filter_ax, 'No filter in this instrument')
+            return
+
+        magnitude = svf_magnitude_db(params, self.frequencies)
+        stable = svf_is_stable(*svf_coefficients(params))
+        self.filter_ax.semilogx(self.frequencies, magnitude, 'g-', linewidth=1.0)
+        self.filter_ax.set_xlim([self.frequencies[0], self.frequencies[-1]])
+        self.filter_ax.set_ylim([-60, 40])
+        self.filter_ax.set_title('Filter Response' if stable else 'Filter Response (unstable)')
@@ -2,6 +2,7 @@
 
 import customtkinter as ctk
 from .parameter_control import ParameterControl
+from .instruction_preview import InstructionPreview
 
 try:
     import synth_engine
@@ -23,6 +24,7 @@ class InstrumentPanel:
         self.scrollable_frame = None
         self.container_frame = None
         self.adsr_controls = {}
+        self.instruction_preview = InstructionPreview(main_editor)
 
     def create_instrument_section(self, parent_frame):
         """Create instrument control section."""
@@ -51,6 +53,7 @@ class InstrumentPanel:
             row=2, column=0, columnspan=2, sticky="w", padx=(15, 5), pady=(15, 5))
 
         self._create_instrument_controllers(instrument_frame)
+        self.instruction_preview.create_preview_section(instrument_frame, row=4)
         instrument_frame.columnconfigure(1, weight=1)
 
     def _create_instrument_controllers(self, parent_frame):
@@ -319,24 +322,27 @@ class InstrumentPanel:
 
         # Update the instrument parameter
         try:
-            instrument = self.main_editor.synth.get_instrument(self.main_editor.current_instrument)
+            synth = self.main_editor.synth
+            instrument = synth.get_instrument(self.main_editor.current_instrument)
             if not instrument:
                 return
 
-            # Check if this is an enum parameter
+            # Updates go through the wrapper, which holds the engine lock
+            # against the audition worker. Check if this is an enum parameter
             if (synth_engine and hasattr(control, 'is_enum') and control.is_enum):
                 # For enum parameters, use string-based update
                 selected_text = control.var.get()
                 if selected_text and selected_text != "UNKNOWN":
-                    instrument.update_parameter_with_string(
-                        instruction_index, param_index, selected_text)
+                    synth.update_parameter(self.main_editor.current_instrument,
+                                           instruction_index, param_index, selected_text)
                     param_display_value = selected_text
                 else:
                     return  # Don't update if invalid selection
             else:
                 # For numeric parameters, use integer value
                 param_value = control.get_value()
-                instrument.update_parameter(instruction_index, param_index, param_value)
+                synth.update_parameter(self.main_editor.current_instrument,
+                                       instruction_index, param_index, param_value)
                 param_display_value = str(param_value)
 
             # Log the change with human-readable names
@@ -349,8 +355,16 @@ class InstrumentPanel:
                 self.main_editor.logger.debug("Updated %s.%s = %s", instr_name,
                                                param_name, param_display_value)
 
-            # Update synthesizer and refresh visualization
-            self.update_synth_parameters()
+            # Analytic previews first, they do not need a render
+            self.instruction_preview.update_previews()
+            if (hasattr(self.main_editor, 'components') and
+                self.main_editor.components and
+                hasattr(self.main_editor.components, 'waveform_display')):
+                self.main_editor.components.waveform_display.update_envelope_overlay()
+
+            # Update synthesizer and refresh visualization, with a draft while
+            # the control keeps changing
+            self.update_synth_parameters(draft=True)
 
         except (AttributeError, IndexError, ValueError) as e:
             if hasattr(self.main_editor, 'logger'):
@@ -390,6 +404,7 @@ class InstrumentPanel:
 
             # Recreate controls for the new instrument
             self._create_controls_for_current_instrument()
+            self.instruction_preview.update_previews()
 
             # Update synthesizer parameters and refresh waveform
             self.update_synth_parameters()
@@ -398,6 +413,12 @@ class InstrumentPanel:
             if hasattr(self.main_editor, 'logger'):
                 self.main_editor.logger.error("Error changing instrument: %s", e)
 
+    def reload_instrument(self):
+        """Recreate the controls after the song data of the instruments changed."""
+        self._create_controls_for_current_instrument()
+        self.instruction_preview.update_previews()
+        self.update_synth_parameters()
+
     def get_parameter_value(self, param_name):
         """Get a parameter value by name.
 
@@ -430,20 +451,25 @@ class InstrumentPanel:
                 return True
         return False
 
-    def update_synth_parameters(self):
-        """Update synthesizer parameters and refresh displays."""
+    def update_synth_parameters(self, draft=False):
+        """Update synthesizer parameters and refresh displays.
+
+        Args:
+            draft: Refresh the waveform with a draft render first, e.g. while
+                a slider is dragged
+        """
         try:
             # Update the synthesizer with current parameters
             if hasattr(self.main_editor, 'synth') and self.main_editor.synth:
-                # Get current instrument parameters and update synth
-                # This would typically involve calling synth update methods
-                pass
+                # Key presses render the changed instrument again
+                self.main_editor.synth.invalidate_note_cache(self.main_editor.current_instrument)
 
             # Refresh waveform display if available
             if (hasattr(self.main_editor, 'components') and
                 self.main_editor.components and
                 hasattr(self.main_editor.components, 'waveform_display')):
-                self.main_editor.components.waveform_display.auto_update_waveform_from_synth()
+                self.main_editor.components.waveform_display.auto_update_waveform_from_synth(
+                    draft=draft)
 
         except (RuntimeError, ValueError) as e:
             if hasattr(self.main_editor, 'logger'):
@@ -1,7 +1,13 @@
 """Menu management component for the audio editor using CustomTkinter."""
 
+from pathlib import Path
 import tkinter as tk
-from tkinter import messagebox
+from tkinter import filedialog, messagebox, simpledialog
+
+from editor.audio.project import PROJECT_SUFFIX
+from .preset_browser import PresetBrowser
+
+PROJECT_FILE_TYPES = [("Softsynth projects", f"*{PROJECT_SUFFIX}"), ("All files", "*")]
 
 
 class MenuManager:
@@ -17,6 +23,7 @@ class MenuManager:
         self.root = root
         self.main_editor = main_editor
         self.menubar = None
+        self.preset_browser = PresetBrowser(root, main_editor)
 
     def create_menu_bar(self):
         """Create and configure the menu bar."""
@@ -30,9 +37,16 @@ class MenuManager:
         file_menu.add_command(label="Open Project", command=self.open_project)
         file_menu.add_separator()
         file_menu.add_command(label="Save Project", command=self.save_project)
+        file_menu.add_command(label="Save Project As...", command=self.save_project_as)
         file_menu.add_separator()
         file_menu.add_command(label="Exit", command=self.on_window_close)
 
+        # Presets menu
+        preset_menu = tk.Menu(self.menubar, tearoff=0)
+        self.menubar.add_cascade(label="Presets", menu=preset_menu)
+        preset_menu.add_command(label="Save Instrument as Preset...", command=self.save_preset)
+        preset_menu.add_command(label="Browse Presets...", command=self.preset_browser.show)
+
         # Help menu
         help_menu = tk.Menu(self.menubar, tearoff=0)
         self.menubar.add_cascade(label="Help", menu=help_menu)
@@ -40,18 +54,38 @@ class MenuManager:
 
     def new_project(self):
         """Create a new project."""
-        if hasattr(self.main_editor, 'status_panel'):
-            self.main_editor.status_panel.log_output("New project created")
+        self.main_editor.new_project()
 
     def open_project(self):
         """Open an existing project."""
-        if hasattr(self.main_editor, 'status_panel'):
-            self.main_editor.status_panel.log_output("Open project dialog")
+        path = filedialog.askopenfilename(parent=self.root, title="Open Project",
+                                          filetypes=PROJECT_FILE_TYPES)
+        if path:
+            self.main_editor.open_project(Path(path))
 
     def save_project(self):
         """Save the current project."""
-        if hasattr(self.main_editor, 'status_panel'):
-            self.main_editor.status_panel.log_output("Project saved")
+        if self.main_editor.project_file is None:
+            self.save_project_as()
+        else:
+            self.main_editor.save_project()
+
+    def save_project_as(self):
+        """Save the current project to a new file."""
+        path = filedialog.asksaveasfilename(parent=self.root, title="Save Project",
+                                            filetypes=PROJECT_FILE_TYPES,
+                                            defaultextension=PROJECT_SUFFIX)
+        if path:
+            self.main_editor.save_project(Path(path))
+
+    def save_preset(self):
+        """Store the current instrument in the preset library."""
+        name = simpledialog.askstring("Save Preset", "Preset name:", parent=self.root)
+        if not name:
+            return
+        tags = simpledialog.askstring("Save Preset", "Tags, separated by commas:",
+                                      parent=self.root)
+        self.main_editor.save_preset(name, (tags or "").split(","))
 
     def show_about(self):
         """Show about dialog."""
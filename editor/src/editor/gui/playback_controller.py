@@ -1,8 +1,18 @@
 """Playback controller component for the audio editor using CustomTkinter."""
 
+import math
 import tkinter as tk
 import customtkinter as ctk
 
+# Control-rate choices offered for previews, in samples between control points
+CONTROL_RATE_CHOICES = {"Full": 1, "16": 16, "32": 32, "64": 64}
+
+# Tempo of the song until the user changes it (BEATS_PER_MINUTE in defines.h)
+DEFAULT_TEMPO = 125
+
+# Note used to measure the control-rate error (the note of the waveform preview)
+CONTROL_RATE_TEST_NOTE = 20
+
 
 class PlaybackController:
     """Manages transport controls and playback state."""
@@ -16,6 +26,8 @@ class PlaybackController:
         self.main_editor = main_editor
         self.play_button = None
         self.tempo_var = None
+        self.control_rate_var = None
+        self.wavetable_var = None
         self.is_playing = False
         self.playing = False
 
@@ -46,12 +58,98 @@ class PlaybackController:
 
         ctk.CTkLabel(button_frame, text="Tempo:").pack(side="left", padx=(0, 5))
         
-        self.tempo_var = tk.IntVar(value=125)
-        tempo_spinbox = ctk.CTkEntry(button_frame, width=60, justify="center")
-        tempo_spinbox.insert(0, "125")
+        self.tempo_var = tk.StringVar(value=str(DEFAULT_TEMPO))
+        tempo_spinbox = ctk.CTkEntry(button_frame, width=60, justify="center",
+                                     textvariable=self.tempo_var)
+        tempo_spinbox.bind("<Return>", self.on_tempo_change)
+        tempo_spinbox.bind("<FocusOut>", self.on_tempo_change)
         tempo_spinbox.pack(side="left", padx=(0, 5))
         
-        ctk.CTkLabel(button_frame, text="BPM").pack(side="left")
+        ctk.CTkLabel(button_frame, text="BPM").pack(side="left", padx=(0, 20))
+
+        ctk.CTkLabel(button_frame, text="Control rate:").pack(side="left", padx=(0, 5))
+
+        self.control_rate_var = tk.StringVar(value="Full")
+        control_rate_menu = ctk.CTkOptionMenu(button_frame, width=80,
+                                              values=list(CONTROL_RATE_CHOICES),
+                                              variable=self.control_rate_var,
+                                              command=self.on_control_rate_change)
+        control_rate_menu.pack(side="left", padx=(0, 20))
+
+        self.wavetable_var = tk.BooleanVar(value=False)
+        wavetable_checkbox = ctk.CTkCheckBox(button_frame, text="Wavetables",
+                                             variable=self.wavetable_var,
+                                             command=self.on_wavetable_mode_change)
+        wavetable_checkbox.pack(side="left")
+
+    def on_tempo_change(self, _event=None):
+        """Apply the tempo entry to the engine, restoring the entry if it is rejected."""
+        synth = getattr(self.main_editor, 'synth', None)
+        if not synth:
+            return
+
+        try:
+            tempo = int(self.tempo_var.get())
+        except ValueError:
+            tempo = 0
+        if tempo == synth.get_tempo():
+            return
+        if not synth.set_tempo(tempo):
+            self.tempo_var.set(str(synth.get_tempo()))
+            return
+
+        self.main_editor.components.status_panel.log_output(
+            f"Tempo: {tempo} BPM, {synth.get_samples_per_note()} samples per note")
+
+    def on_control_rate_change(self, choice):
+        """Switch the engine control rate and report the error against full rate.
+
+        Args:
+            choice: Selected entry of CONTROL_RATE_CHOICES
+        """
+        synth = getattr(self.main_editor, 'synth', None)
+        if not synth:
+            return
+
+        rate = CONTROL_RATE_CHOICES[choice]
+        if not synth.set_control_rate(rate):
+            return
+
+        components = self.main_editor.components
+        if rate == 1:
+            components.status_panel.log_output("Control rate: full rate")
+        else:
+            instrument = self.main_editor.current_instrument
+            error = synth.measure_control_rate_error(instrument, CONTROL_RATE_TEST_NOTE, rate)
+            components.status_panel.log_output(
+                f"Control rate: {rate} samples, instrument {instrument} error "
+                f"max {error['max_error']:.6f}, "
+                f"{self._relative_error_db(error)} relative to the full-rate signal")
+
+        components.waveform_display.auto_update_waveform_from_synth()
+
+    def on_wavetable_mode_change(self):
+        """Switch oscillators between the polynomial and the wavetable waveforms."""
+        synth = getattr(self.main_editor, 'synth', None)
+        if not synth:
+            return
+
+        enabled = self.wavetable_var.get()
+        synth.set_wavetable_mode(enabled)
+
+        components = self.main_editor.components
+        components.status_panel.log_output(
+            "Oscillators: band-limited wavetables" if enabled else "Oscillators: polynomial")
+        components.waveform_display.auto_update_waveform_from_synth()
+
+    @staticmethod
+    def _relative_error_db(error):
+        """Format the RMS error relative to the full-rate RMS in dB."""
+        if error['rms_error'] == 0.0:
+            return "exact"
+        if error['reference_rms'] == 0.0:
+            return "silent reference"
+        return f"{20 * math.log10(error['rms_error'] / error['reference_rms']):.1f} dB"
 
     def toggle_play(self):
         """Toggle play/pause state."""
@@ -0,0 +1,88 @@
+"""Preset browser component for the audio editor using CustomTkinter."""
+
+import tkinter as tk
+import customtkinter as ctk
+
+
+class PresetBrowser:
+    """Window to search the preset library and load presets into the current instrument."""
+
+    def __init__(self, root, main_editor):
+        """Initialize the preset browser.
+
+        Args:
+            root: The tkinter root window
+            main_editor: Reference to the main editor controller
+        """
+        self.root = root
+        self.main_editor = main_editor
+        self.window = None
+        self.signature_entry = None
+        self.tags_entry = None
+        self.text_entry = None
+        self.result_list = None
+        self.message_label = None
+        self.results = []
+
+    def show(self):
+        """Open the browser window, or raise it if it is open."""
+        if self.window is not None and self.window.winfo_exists():
+            self.window.lift()
+            self.update_results()
+            return
+
+        self.window = ctk.CTkToplevel(self.root)
+        self.window.title("Presets")
+        self.window.geometry("420x520")
+        self.window.columnconfigure(1, weight=1)
+        self.window.rowconfigure(3, weight=1)
+
+        # Search fields, the results follow every key press
+        self.signature_entry = self._create_search_field(
+            0, "Signature:", "e.g. has FILTER LOWPASS")
+        self.tags_entry = self._create_search_field(1, "Tags:", "e.g. bass, dark")
+        self.text_entry = self._create_search_field(2, "Name:", "")
+
+        self.result_list = tk.Listbox(self.window, activestyle="none")
+        self.result_list.grid(row=3, column=0, columnspan=2, sticky="nsew", padx=10, pady=5)
+        self.result_list.bind("<Double-Button-1>", lambda _: self.load_selected())
+
+        self.message_label = ctk.CTkLabel(self.window, text="", anchor="w")
+        self.message_label.grid(row=4, column=0, sticky="ew", padx=10)
+        ctk.CTkButton(self.window, text="Load into Instrument",
+                      command=self.load_selected).grid(row=4, column=1, sticky="e",
+                                                       padx=10, pady=10)
+        self.update_results()
+
+    def _create_search_field(self, row, label, placeholder):
+        """Create a labelled entry that updates the results."""
+        ctk.CTkLabel(self.window, text=label).grid(row=row, column=0, sticky="w",
+                                                   padx=(10, 5), pady=5)
+        entry = ctk.CTkEntry(self.window, placeholder_text=placeholder)
+        entry.grid(row=row, column=1, sticky="ew", padx=(5, 10), pady=5)
+        entry.bind("<KeyRelease>", lambda _: self.update_results())
+        return entry
+
+    def update_results(self):
+        """Show the presets matching the search fields."""
+        presets = self.main_editor.get_presets()
+        if presets is None:
+            return
+        tags = [tag for tag in self.tags_entry.get().split(',') if tag.strip()]
+        try:
+            self.results = presets.find(self.signature_entry.get(), tags, self.text_entry.get())
+        except ValueError as e:
+            self.message_label.configure(text=str(e))
+            return
+
+        self.result_list.delete(0, tk.END)
+        for preset in self.results:
+            tags = f"  [{', '.join(preset.tags)}]" if preset.tags else ""
+            self.result_list.insert(tk.END, f"{preset.name}{tags}")
+        self.message_label.configure(text=f"{len(self.results)} of {len(presets)} presets")
+
+    def load_selected(self):
+        """Load the selected preset into the current instrument."""
+        selection = self.result_list.curselection()
+        if selection:
+            self.main_editor.load_preset(self.results[selection[0]])
@@ -8,6 +8,21 @@ import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from matplotlib.figure import Figure
 
+from ..audio.engine_math import ENVELOPE_ID, SAMPLES_PER_NOTE
+from ..audio.envelope_curve import envelope_curve
+from ..audio.render_budget import RenderBudget, peak_envelope, trim_silence
+
+# Note length and release point used by Instrument::render_note
+PREVIEW_NOTES = 10
+PREVIEW_RELEASE_NOTE = PREVIEW_NOTES - 2
+PREVIEW_NOTE_NUMBER = 20
+# Number of points drawn for the envelope overlay
+ENVELOPE_OVERLAY_POINTS = 2000
+# Interactive edits render this many notes, the rest is rendered while idle
+INTERACTIVE_WINDOW_NOTES = 2
+REFINE_CHUNK_NOTES = 2
+REFINE_DELAY_MS = 150
+
 
 class WaveformDisplay:
     """Manages audio waveform visualization and display."""
@@ -22,6 +37,10 @@ class WaveformDisplay:
         self.waveform_fig = None
         self.waveform_ax = None
         self.waveform_canvas = None
+        self.envelope_line = None
+        self.preview_samples = None
+        self.preview_is_draft = False
+        self.refine_job = None
 
     def create_visualization_section(self, parent_frame):
         """Create visualization section."""
@@ -60,28 +79,122 @@ class WaveformDisplay:
         self._show_empty_waveform_state()
 
 
+    def _samples_per_note(self):
+        """Get the note length at the sample rate and tempo of the synthesizer."""
+        synth = getattr(self.main_editor, 'synth', None)
+        return synth.get_samples_per_note() if synth else SAMPLES_PER_NOTE
+
+    def get_render_budget(self, window_samples):
+        """Get the render budget for a window of the preview note.
 
-    def auto_update_waveform_from_synth(self):
-        """Automatically update waveform display from current synth parameters."""
+        Args:
+            window_samples: Number of samples the view needs
+
+        Returns:
+            RenderBudget with the window and the plot width in pixels
+        """
+        resolution = int(self.waveform_fig.get_figwidth() * self.waveform_fig.dpi)
+        if self.waveform_canvas:
+            resolution = max(resolution, self.waveform_canvas.get_tk_widget().winfo_width())
+        return RenderBudget(window_samples, resolution)
+
+    def auto_update_waveform_from_synth(self, draft=False):
+        """Automatically update waveform display from current synth parameters.
+
+        Only the start of the note is rendered right away, the remaining
+        samples are rendered in chunks while the editor is idle.
+
+        Args:
+            draft: Render the start of the note at a reduced sample rate, e.g.
+                while a control is dragged. Once the editor is idle the draft
+                is replaced by a full render
+        """
+        self._cancel_refinement()
         try:
-            if not self.main_editor.synth:
+            if not self.main_editor.synth or not self.waveform_fig:
                 return
 
-            # Get audio data from synthesizer
-            audio_data = self.main_editor.synth.render_instrument_note(
-                self.main_editor.current_instrument, 20)
+            samples_per_note = self._samples_per_note()
+            budget = self.get_render_budget(PREVIEW_NOTES * samples_per_note)
+            window = min(budget.window_samples, INTERACTIVE_WINDOW_NOTES * samples_per_note)
+            if draft:
+                self.preview_samples = self.main_editor.synth.render_draft_note_window(
+                    self.main_editor.current_instrument, PREVIEW_NOTE_NUMBER, window,
+                    PREVIEW_RELEASE_NOTE * samples_per_note)
+            else:
+                self.preview_samples = self._render_preview_window(0, window)
+            self.preview_is_draft = draft
+            self._update_waveform_plot(self.preview_samples, budget)
+            self._schedule_refinement()
+
+        except (RuntimeError, ValueError) as e:
+            if hasattr(self.main_editor, 'status_panel'):
+                self.main_editor.status_panel.log_output(f"Auto-waveform update failed: {e}")
+
+    def _render_preview_window(self, start_sample, num_samples):
+        """Render part of the preview note of the current instrument."""
+        return self.main_editor.synth.render_instrument_note_window(
+            self.main_editor.current_instrument, PREVIEW_NOTE_NUMBER, start_sample,
+            num_samples, PREVIEW_RELEASE_NOTE * self._samples_per_note())
+
+    def _schedule_refinement(self):
+        """Schedule rendering of the next chunk while the editor is idle."""
+        root = getattr(self.main_editor, 'root', None)
+        if root:
+            self.refine_job = root.after(REFINE_DELAY_MS, self._refine_waveform)
+
+    def _cancel_refinement(self):
+        """Cancel a pending refinement, e.g. because parameters changed."""
+        if self.refine_job is not None:
+            self.main_editor.root.after_cancel(self.refine_job)
+            self.refine_job = None
+
+    def _refine_waveform(self):
+        """Extend the preview by one chunk and redraw it."""
+        self.refine_job = None
+        try:
+            samples_per_note = self._samples_per_note()
+            budget = self.get_render_budget(PREVIEW_NOTES * samples_per_note)
+            if self.preview_is_draft:
+                # Replace the draft before extending the preview
+                self.preview_samples = self._render_preview_window(0, len(self.preview_samples))
+                self.preview_is_draft = False
+                self._update_waveform_plot(self.preview_samples, budget)
+                self._schedule_refinement()
+                return
 
-            if audio_data is not None and len(audio_data) > 0:
-                self._update_waveform_plot(audio_data)
+            start = len(self.preview_samples)
+            count = min(REFINE_CHUNK_NOTES * samples_per_note, budget.window_samples - start)
+            chunk = self._render_preview_window(start, count)
+            self.preview_samples = np.concatenate((self.preview_samples, chunk))
+
+            # Stop when the window is covered or a chunk after the release is silent
+            released = start >= PREVIEW_RELEASE_NOTE * samples_per_note
+            if start + count < budget.window_samples and not (
+                    released and len(trim_silence(chunk)) == 0):
+                self._update_waveform_plot(self.preview_samples, budget)
+                self._schedule_refinement()
+                return
+
+            self.preview_samples = trim_silence(self.preview_samples)
+            if len(self.preview_samples) > 0:
+                self._update_waveform_plot(
+                    self.preview_samples, budget._replace(window_samples=len(self.preview_samples)))
             else:
                 self._show_empty_waveform_state()
 
         except (RuntimeError, ValueError) as e:
             if hasattr(self.main_editor, 'status_panel'):
-                self.main_editor.status_panel.log_output(f"Auto-waveform update failed: {e}")
+                self.main_editor.status_panel.log_output(f"Waveform refinement failed: {e}")
 
-    def _update_waveform_plot(self, audio_data):
-        """Update the waveform plot with new data."""
+    def _update_waveform_plot(self, audio_data, budget=None):
+        """Update the waveform plot with new data.
+
+        Args:
+            audio_data: Rendered samples from the start of the note, possibly
+                covering only part of the budget window
+            budget: RenderBudget of the view, None to plot every sample
+        """
         if not self.waveform_ax or not self.waveform_canvas:
             return
 
@@ -93,15 +206,65 @@ class WaveformDisplay:
         self.waveform_ax.set_ylabel('Amplitude')
         self.waveform_ax.grid(True, alpha=0.3)
 
-        # Plot the waveform
-        display_samples = len(audio_data)
-        time_axis = np.arange(display_samples)
-        self.waveform_ax.plot(time_axis, audio_data[:display_samples],
-                             'b-', linewidth=0.8)
+        # Plot the waveform, reduced to one min/max pair per pixel column
+        if budget is None:
+            budget = RenderBudget(len(audio_data), len(audio_data))
+        columns = max(1, budget.resolution * len(audio_data) // max(budget.window_samples, 1))
+        time_axis, minimum, maximum = peak_envelope(audio_data, columns)
+        if len(time_axis) < len(audio_data):
+            self.waveform_ax.fill_between(time_axis, minimum, maximum,
+                                          color='b', linewidth=0.8)
+        else:
+            self.waveform_ax.plot(time_axis, audio_data, 'b-', linewidth=0.8)
+        self.waveform_ax.set_xlim([0, max(budget.window_samples, len(audio_data))])
+        self._draw_envelope_overlay()
 
         # Update canvas
         self.waveform_canvas.draw()
 
+    def update_envelope_overlay(self):
+        """Redraw the envelope overlay from the current instrument parameters.
+
+        The curve is computed analytically, so this is cheap enough to call on
+        every slider movement.
+        """
+        if not self.waveform_ax or not self.waveform_canvas:
+            return
+
+        self._draw_envelope_overlay()
+        self.waveform_canvas.draw_idle()
+
+    def _draw_envelope_overlay(self):
+        """Plot the analytic ADSR curve of the current instrument."""
+        synth = getattr(self.main_editor, 'synth', None)
+        params = None
+        if synth:
+            params = synth.find_instruction_parameters(
+                self.main_editor.current_instrument, ENVELOPE_ID)
+
+        line_visible = (self.envelope_line is not None and
+                        self.envelope_line in self.waveform_ax.lines)
+        if params is None:
+            if line_visible:
+                self.envelope_line.remove()
+            self.envelope_line = None
+            return
+
+        samples_per_note = self._samples_per_note()
+        curve = envelope_curve(params, PREVIEW_NOTES * samples_per_note,
+                               PREVIEW_RELEASE_NOTE * samples_per_note)
+        active = np.flatnonzero(curve)
+        length = int(active[-1]) + 1 if len(active) else 1
+        step = max(1, length // ENVELOPE_OVERLAY_POINTS)
+        time_axis = np.arange(0, length, step)
+
+        if line_visible:
+            self.envelope_line.set_data(time_axis, curve[:length:step])
+        else:
+            self.envelope_line, = self.waveform_ax.plot(
+                time_axis, curve[:length:step], 'r-', linewidth=1.2, alpha=0.8,
+                label='Envelope')
+
     def _show_empty_waveform_state(self):
         """Show empty state when no audio data is available."""
         if not self.waveform_ax or not self.waveform_canvas:
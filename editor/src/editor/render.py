@@ -0,0 +1,277 @@
+"""
+Headless renderer for the 4K Softsynth Editor
+Renders notes, instruments, stems or the whole song to audio files without
+importing the GUI, for batch jobs on machines without a display
+
+Usage:
+    python -m editor render song.wav
+    python -m editor render --note 0:60 --note 1:48 note.wav
+    python -m editor render --project song.d4kp --stems stem.wav
+    python -m editor render --set 0:FILTER:Frequency=90 --duration 10 song.raw
+"""
+
+import argparse
+import contextlib
+import os
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Iterable, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+from editor.audio.audio_file import AUDIO_FORMATS, AudioFileWriter, format_for_path
+from editor.audio.note_events import NOTE_EVENT_DTYPE, NOTE_EVENT_END
+from editor.audio.project import ProjectFile
+from editor.audio.song_asm import parse_song
+from editor.audio.synth_wrapper import SynthWrapper
+
+# Samples rendered and written per block of a song render
+DEFAULT_CHUNK_SAMPLES = 65536
+
+_OVERRIDE = re.compile(r'(\d+):(\w+):(\w+)=(.+)')
+_NOTE = re.compile(r'(\d+):(\d+)')
+
+
+class ParameterOverride(NamedTuple):
+    """Parameter value given on the command line"""
+    instrument: int
+    instruction: str  # Index in the program, or the name of the first such instruction
+    parameter: str    # Index of the parameter, or its name
+    value: str        # Raw value, or the name of an enum value
+
+
+def parse_override(text: str) -> ParameterOverride:
+    """Parse INSTRUMENT:INSTRUCTION:PARAMETER=VALUE, e.g. 0:FILTER:Frequency=90"""
+    match = _OVERRIDE.fullmatch(text.strip())
+    if match is None:
+        raise argparse.ArgumentTypeError(
+            f"{text!r} is not INSTRUMENT:INSTRUCTION:PARAMETER=VALUE")
+    instrument, instruction, parameter, value = match.groups()
+    return ParameterOverride(int(instrument), instruction, parameter, value)
+
+
+def parse_note(text: str):
+    """Parse INSTRUMENT:NOTE, e.g. 0:60"""
+    match = _NOTE.fullmatch(text.strip())
+    if match is None:
+        raise argparse.ArgumentTypeError(f"{text!r} is not INSTRUMENT:NOTE")
+    return int(match.group(1)), int(match.group(2))
+
+
+def _find_index(reference: str, names: Sequence[str], kind: str) -> int:
+    """Resolve an index or a case-insensitive name"""
+    if reference.isdigit():
+        if int(reference) >= len(names):
+            raise ValueError(f"There is no {kind} {reference}")
+        return int(reference)
+    for index, name in enumerate(names):
+        if name.upper() == reference.upper():
+            return index
+    raise ValueError(f"There is no {kind} {reference}, use one of {', '.join(names)}")
+
+
+def apply_override(synth: SynthWrapper, override: ParameterOverride) -> None:
+    """Set a parameter given on the command line
+
+    Raises:
+        ValueError: If the instrument, instruction or parameter does not exist
+    """
+    instrument = synth.get_instrument(override.instrument)
+    if instrument is None:
+        raise ValueError(f"There is no instrument {override.instrument}")
+    names = [instrument.get_instruction_name(i) for i in range(len(instrument.get_instructions()))]
+    instruction = _find_index(override.instruction, names, "instruction")
+    parameter = _find_index(override.parameter,
+                            instrument.get_instruction_parameter_names(instruction),
+                            f"{names[instruction]} parameter")
+    value = int(override.value) if override.value.isdigit() else override.value
+    synth.update_parameter(override.instrument, instruction, parameter, value)
+
+
+def output_path(path: Path, label: Optional[str]) -> Path:
+    """Get the path of one of several outputs, e.g. stem_1.wav for stem.wav"""
+    return path if label is None else path.with_name(f"{path.stem}_{label}{path.suffix}")
+
+
+@contextlib.contextmanager
+def solo(synth: SynthWrapper, instruments: Iterable[int]):
+    """Silence every instrument but the given ones while rendering the song"""
+    end = np.zeros(1, dtype=NOTE_EVENT_DTYPE)
+    end['sample'] = NOTE_EVENT_END
+    muted = [i for i in range(synth.get_num_instruments()) if i not in set(instruments)]
+    saved = {i: synth.get_note_events(i) for i in muted}
+    try:
+        for i in muted:
+            synth.set_note_events(i, end)
+        yield
+    finally:
+        for i, events in saved.items():
+            synth.set_note_events(i, events)
+
+
+@contextlib.contextmanager
+def stdout_to_stderr():
+    """Send everything written to stdout to stderr, including the C++ std::cout"""
+    sys.stdout.flush()
+    saved = os.dup(1)
+    try:
+        os.dup2(2, 1)
+        with contextlib.redirect_stdout(sys.stderr):
+            yield
+    finally:
+        sys.stdout.flush()
+        os.dup2(saved, 1)
+        os.close(saved)
+
+
+def render_song(synth: SynthWrapper, writer: AudioFileWriter, num_samples: int,
+                chunk_samples: int = DEFAULT_CHUNK_SAMPLES) -> None:
+    """Render the song from its start into a file, one block at a time"""
+    synth.set_position(0)
+    buffer = np.zeros(chunk_samples, dtype=np.float32)
+    for start in range(0, num_samples, chunk_samples):
+        writer.write(synth.render(min(chunk_samples, num_samples - start), buffer))
+
+
+class RenderReport:
+    """Timing of the renders, printed to stderr so stdout stays free"""
+
+    def __init__(self, sample_rate: int, stream=None):
+        """Start an empty report
+
+        Args:
+            sample_rate: Sample rate of the rendered files in Hz
+            stream: Text stream to print to, stderr if None
+        """
+        self.sample_rate = sample_rate
+        self.stream = stream if stream is not None else sys.stderr
+        self.total_samples = 0
+        self.total_seconds = 0.0
+
+    def add(self, path: Path, num_samples: int, seconds: float) -> None:
+        """Report one written file"""
+        audio_seconds = num_samples / self.sample_rate
+        speed = audio_seconds / seconds if seconds > 0 else float('inf')
+        print(f"{path}: {audio_seconds:.2f} s of audio in {seconds * 1000:.1f} ms "
+              f"({speed:.1f}x realtime)", file=self.stream)
+        self.total_samples += num_samples
+        self.total_seconds += seconds
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Create the parser of the render subcommand"""
+    parser = argparse.ArgumentParser(
+        prog='python -m editor render',
+        description="Render the synthesizer to audio files without the GUI")
+    parser.add_argument('output', type=Path,
+                        help="Output file; notes and stems add _<label> before the extension")
+    what = parser.add_mutually_exclusive_group()
+    what.add_argument('--note', type=parse_note, action='append', metavar='INSTRUMENT:NOTE',
+                      help="Render one note of an instrument, may be repeated")
+    what.add_argument('--instrument', type=int, action='append', metavar='N',
+                      help="Render the song with only these instruments, may be repeated")
+    what.add_argument('--stems', action='store_true',
+                      help="Render the song once per instrument, each alone")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('--project', type=Path, help="Load a project file first")
+    source.add_argument('--song-asm', type=Path, help="Load the song data of a song.asm first")
+    parser.add_argument('--set', type=parse_override, action='append', default=[],
+                        dest='overrides', metavar='INSTRUMENT:INSTRUCTION:PARAMETER=VALUE',
+                        help="Override a parameter by index or name, e.g. 0:FILTER:Frequency=90")
+    parser.add_argument('--sample-rate', type=int, help="Sample rate in Hz")
+    parser.add_argument('--tempo', type=int, help="Tempo in beats per minute")
+    parser.add_argument('--duration', type=float,
+                        help="Seconds of the song to render, the whole song by default")
+    parser.add_argument('--format', choices=AUDIO_FORMATS,
+                        help="Output format, from the extension by default: .wav is float WAV")
+    parser.add_argument('--chunk', type=int, default=DEFAULT_CHUNK_SAMPLES,
+                        help="Samples rendered and written at a time")
+    return parser
+
+
+def _configure(synth: SynthWrapper, args) -> None:
+    """Load the song data, settings and overrides the arguments name"""
+    if args.project is not None and not synth.load_project(ProjectFile(args.project).load()):
+        raise ValueError(f"The engine rejected the project {args.project}")
+    if args.song_asm is not None and not synth.load_song(parse_song(args.song_asm)):
+        raise ValueError(f"The engine rejected the song data of {args.song_asm}")
+    if args.sample_rate is not None and not synth.set_sample_rate(args.sample_rate):
+        raise ValueError(f"Unsupported sample rate {args.sample_rate}")
+    if args.tempo is not None and not synth.set_tempo(args.tempo):
+        raise ValueError(f"Unsupported tempo {args.tempo}")
+    for override in args.overrides:
+        apply_override(synth, override)
+
+
+def run(args, synth: SynthWrapper, report: RenderReport) -> List[Path]:
+    """Render the outputs the parsed arguments ask for
+
+    Returns:
+        Paths of the written files
+    """
+    audio_format = args.format or format_for_path(args.output)
+    sample_rate = synth.get_sample_rate()
+    written = []
+
+    def write(label, render):
+        path = output_path(args.output, label)
+        start = time.perf_counter()
+        with AudioFileWriter(path, sample_rate, audio_format) as writer:
+            render(writer)
+        report.add(path, writer.num_samples, time.perf_counter() - start)
+        written.append(path)
+
+    if args.note:
+        for instrument, note in args.note:
+            label = None if len(args.note) == 1 else f"{instrument}_{note}"
+            write(label, lambda writer, i=instrument, n=note:
+                  writer.write(synth.render_instrument_note(i, n)))
+        return written
+
+    num_instruments = synth.get_num_instruments()
+    for instrument in args.instrument or ():
+        if not 0 <= instrument < num_instruments:
+            raise ValueError(f"There is no instrument {instrument}")
+    num_samples = synth.get_song_length()
+    if args.duration is not None:
+        num_samples = min(num_samples, int(args.duration * sample_rate))
+    if args.stems:
+        groups = [(str(i), [i]) for i in range(num_instruments)]
+    else:
+        groups = [(None, args.instrument or range(num_instruments))]
+    for label, instruments in groups:
+        with solo(synth, instruments):
+            write(label, lambda writer: render_song(synth, writer, num_samples, args.chunk))
+    return written
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Entry point of the render subcommand"""
+    start = time.perf_counter()
+    args = build_parser().parse_args(argv)
+    if args.chunk <= 0:
+        print("error: --chunk must be positive", file=sys.stderr)
+        return 2
+
+    try:
+        # The engine announces itself and logs on stdout, keep stdout for the caller
+        with stdout_to_stderr():
+            synth = SynthWrapper()
+            if not synth.is_ready():
+                print("error: the synthesizer engine did not initialize", file=sys.stderr)
+                return 1
+            _configure(synth, args)
+            report = RenderReport(synth.get_sample_rate())
+            print(f"Engine ready in {(time.perf_counter() - start) * 1000:.1f} ms",
+                  file=sys.stderr)
+            run(args, synth, report)
+    except (OSError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+
+    print(f"Rendered {report.total_samples / report.sample_rate:.2f} s of audio in "
+          f"{report.total_seconds * 1000:.1f} ms, {(time.perf_counter() - start) * 1000:.1f} ms "
+          "in total", file=sys.stderr)
+    return 0
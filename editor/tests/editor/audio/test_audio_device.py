@@ -6,6 +6,7 @@ This test suite validates the AudioDevice functionality, including:
 - Initialization and configuration
 - Audio format handling
 - Sample playback (blocking and non-blocking)
+- Swapping the samples of a running playback
 - Device information retrieval
 - Error handling and edge cases
 - Resource cleanup
@@ -364,6 +365,28 @@ class TestAudioDeviceControl:
 
         assert mock_device.is_playing is False
 
+    def test_swap_samples(self, mock_device):
+        """Test that swapped samples continue at the playback position after a crossfade"""
+        written = []
+
+        def write(data):
+            written.append(np.frombuffer(data, dtype=np.float32))
+            if len(written) == 1:
+                assert mock_device.swap_samples(np.full(3000, -0.5, dtype=np.float32))
+
+        mock_device.stream.write.side_effect = write
+        assert not mock_device.swap_samples(np.zeros(4, dtype=np.float32))
+
+        mock_device.play_samples(np.full(2048, 0.5, dtype=np.float32), blocking=False)
+        mock_device._playback_thread.join(timeout=1.0)  # pylint: disable=protected-access
+
+        assert [len(chunk) for chunk in written] == [1024, 1024, 952]
+        np.testing.assert_array_equal(written[0], 0.5)
+        assert written[1][0] == 0.5
+        assert written[1][-1] < -0.49
+        np.testing.assert_array_equal(written[2], -0.5)
+        assert mock_device.is_playing is False
+
     def test_set_volume(self, mock_device):
         """Test volume setting (placeholder implementation)"""
         # Test valid volume range
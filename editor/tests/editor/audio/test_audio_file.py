@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Tests for the audio files written block by block
+
+This test suite validates that:
+- WAV files written in blocks read back with the standard library and NumPy
+- Raw files hold the float32 samples without a header
+- The format follows the file extension
+
+Running Tests:
+    pytest tests/editor/audio/test_audio_file.py -v
+"""
+
+import wave
+
+import numpy as np
+import pytest
+
+from editor.audio.audio_file import AudioFileWriter, format_for_path
+
+
+@pytest.fixture(name='samples')
+def fixture_samples():
+    """A second of a sine at 440 Hz, a little too loud"""
+    return (1.2 * np.sin(2 * np.pi * 440 * np.arange(44100) / 44100)).astype(np.float32)
+
+
+class TestAudioFileWriter:
+    """Test writing audio files in blocks"""
+
+    def test_pcm_wav(self, tmp_path, samples):
+        """Test that 16-bit WAV files are readable by the wave module and clipped"""
+        path = tmp_path / 'out.wav'
+        with AudioFileWriter(path, 44100, 'wav16') as writer:
+            for start in range(0, len(samples), 1000):
+                writer.write(samples[start:start + 1000])
+
+        with wave.open(str(path)) as wav:
+            assert (wav.getnchannels(), wav.getsampwidth(), wav.getframerate()) == (1, 2, 44100)
+            assert wav.getnframes() == len(samples)
+            frames = np.frombuffer(wav.readframes(wav.getnframes()), dtype='<i2')
+        np.testing.assert_array_equal(frames, (np.clip(samples, -1, 1) * 32767).astype(np.int16))
+
+    def test_float_wav(self, tmp_path, samples):
+        """Test that float WAV files hold the samples after a 44 byte header"""
+        path = tmp_path / 'out.wav'
+        with AudioFileWriter(path, 48000) as writer:
+            writer.write(samples[:100])
+            writer.write(samples[100:])
+
+        data = path.read_bytes()
+        assert data[:4] == b'RIFF' and data[8:16] == b'WAVEfmt '
+        assert int.from_bytes(data[4:8], 'little') == len(data) - 8
+        assert int.from_bytes(data[20:22], 'little') == 3
+        assert int.from_bytes(data[24:28], 'little') == 48000
+        assert int.from_bytes(data[40:44], 'little') == 4 * len(samples)
+        np.testing.assert_array_equal(np.frombuffer(data[44:], dtype='<f4'), samples)
+
+    def test_raw(self, tmp_path, samples):
+        """Test that raw files hold only the samples"""
+        path = tmp_path / 'out.raw'
+        with AudioFileWriter(path, 44100, format_for_path(path)) as writer:
+            writer.write(samples)
+        np.testing.assert_array_equal(np.fromfile(path, dtype='<f4'), samples)
+
+    def test_formats(self, tmp_path):
+        """Test that the extension selects the format and unknown formats are rejected"""
+        assert format_for_path('song.WAV') == 'wav'
+        assert format_for_path('song.f32') == 'raw'
+        with pytest.raises(ValueError):
+            AudioFileWriter(tmp_path / 'out.mp3', 44100, 'mp3')
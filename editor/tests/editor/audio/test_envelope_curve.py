@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Tests for the analytic envelope curve and the float32 engine math helpers
+
+This test suite validates that:
+- pwr and cosine_waveform follow the ARM64 implementations
+- The vectorized ADSR curve matches a sample-by-sample model of
+  envelope_function bit for bit
+- Known engine output values are reproduced
+
+Running Tests:
+    pytest tests/editor/audio/test_envelope_curve.py -v
+"""
+
+import numpy as np
+import pytest
+
+from editor.audio.engine_math import (ENV_STATE_ATTACK, ENV_STATE_DECAY,
+                                      ENV_STATE_SUSTAIN, ENV_STATE_RELEASE,
+                                      ENV_STATE_OFF, cosine_waveform, pwr, transform)
+from editor.audio.envelope_curve import envelope_curve, envelope_levels, envelope_steps
+
+
+def reference_envelope(params, num_samples, release_sample):
+    """Sample-by-sample port of envelope_function used as test oracle"""
+    steps = envelope_steps(params)
+    sustain = transform(params[2])
+    gain = transform(params[4])
+    state, level = ENV_STATE_ATTACK, np.float32(0.0)
+    output = np.zeros(num_samples, dtype=np.float32)
+    for i in range(num_samples):
+        if state == ENV_STATE_OFF:
+            break
+        if i >= release_sample:
+            state = ENV_STATE_RELEASE
+        if state == ENV_STATE_ATTACK:
+            level = np.float32(level + steps[state])
+            if not level < 1.0:
+                level, state = np.float32(1.0), state + 1
+        elif state == ENV_STATE_DECAY:
+            level = np.float32(level - steps[state])
+            if not level > sustain:
+                level, state = sustain, state + 1
+        elif state == ENV_STATE_RELEASE:
+            level = np.float32(level - steps[state])
+            if not level > 0.0:
+                level, state = np.float32(0.0), state + 1
+        output[i] = level * gain
+    return output
+
+
+class TestEngineMath:
+    """Test the float32 replicas of the engine helpers"""
+
+    def test_pwr_special_values(self):
+        """Test exact results at integer exponents"""
+        result = pwr([0.0, 1.0, -1.0, 3.0, -24.0])
+        np.testing.assert_array_equal(result, np.float32([1.0, 2.0, 0.5, 8.0, 2.0**-24]))
+
+    def test_pwr_accuracy(self):
+        """Test the polynomial stays within the engine's coarse error bound of 2^x"""
+        x = np.linspace(-10.0, 10.0, 1001, dtype=np.float32)
+        np.testing.assert_allclose(pwr(x), np.exp2(x), rtol=0.07)
+
+    def test_pwr_clamps_exponent(self):
+        """Test that the integer exponent is clamped to +/-30 like the engine"""
+        assert pwr(40.0) == np.float32(2.0**30)
+        assert pwr(-40.0) == np.float32(2.0**-30)
+
+    def test_cosine_waveform(self):
+        """Test the cosine shape and the color cut-off"""
+        phase = np.float32([0.0, 0.25, 0.5, 0.75, 0.9])
+        result = cosine_waveform(phase, np.float32(0.8))
+        np.testing.assert_allclose(result[:4], np.cos(2 * np.pi * phase[:4] / 0.8), atol=0.03)
+        assert result[4] == 0.0
+
+
+class TestEnvelopeCurve:
+    """Test the analytic ADSR curve"""
+
+    @pytest.mark.parametrize("params,release_sample", [
+        ((70, 70, 70, 70, 128), 6000),
+        ((72, 96, 96, 88, 128), 4000),
+        ((0, 76, 0, 0, 32), 168),
+        ((10, 20, 64, 30, 100), 1800),
+        ((0, 0, 128, 0, 128), 100),
+        ((40, 50, 0, 60, 77), 152),
+        ((128, 128, 128, 128, 128), 32),
+    ])
+    def test_matches_sample_by_sample_model(self, params, release_sample):
+        """Test the vectorized curve against the per-sample state machine"""
+        expected = reference_envelope(params, 12000, release_sample)
+        result = envelope_curve(params, 12000, release_sample)
+        np.testing.assert_array_equal(result, expected)
+
+    def test_known_engine_output(self):
+        """Test values captured from the ARM64 envelope_function"""
+        result = envelope_curve((70, 70, 70, 70, 128), 3, None)
+        np.testing.assert_array_equal(
+            result, np.float32([0.00011194875, 0.0002238975, 0.00033584624]))
+
+        result = envelope_curve((10, 20, 64, 30, 100), 6, None)
+        np.testing.assert_array_equal(
+            result[2:], np.float32([0.6662838, 0.78125, 0.7217107, 0.66217136]))
+
+    def test_holds_sustain_without_release(self):
+        """Test that the level stays at sustain when the note is never released"""
+        levels = envelope_levels((0, 0, 64, 0, 128), 1000)
+        assert levels[-1] == np.float32(0.5)
+        assert np.all(levels[10:] == np.float32(0.5))
+
+    def test_release_reaches_zero(self):
+        """Test that the curve ends at zero after the release segment"""
+        result = envelope_curve((0, 20, 64, 20, 128), 5000, 1000)
+        assert result[999] > 0.0
+        assert np.all(result[-100:] == 0.0)
+
+    def test_gain_modulation(self):
+        """Test that the gain modulation is added to the gain parameter"""
+        base = envelope_curve((20, 20, 64, 20, 64), 2000, 1500)
+        modulated = envelope_curve((20, 20, 64, 20, 64), 2000, 1500, gain_mod=0.5)
+        np.testing.assert_allclose(modulated, base * 2.0, rtol=1e-6)
+
+    def test_state_steps(self):
+        """Test that the steps are indexed by envelope state"""
+        steps = envelope_steps((0, 128, 64, 64, 128))
+        assert steps[ENV_STATE_ATTACK] == 1.0
+        assert steps[ENV_STATE_DECAY] == np.float32(2.0**-24)
+        assert steps[ENV_STATE_SUSTAIN] == steps[ENV_STATE_RELEASE]
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Tests for the analytic SVF frequency response
+
+This test suite validates that:
+- The coefficients follow filter_function
+- The transfer function matches the FFT of the simulated filter recursion
+- Stability detection and the frequency grid behave as expected
+
+Running Tests:
+    pytest tests/editor/audio/test_filter_response.py -v
+"""
+
+import numpy as np
+import pytest
+
+from editor.audio.engine_math import (FILTER_LOWPASS, FILTER_HIGHPASS, FILTER_BANDSTOP,
+                                      FILTER_BANDPASS, FILTER_ALLPASS, FILTER_PEAK)
+from editor.audio.filter_response import (log_frequency_grid, svf_coefficients,
+                                          svf_is_stable, svf_magnitude_db, svf_response)
+
+
+def simulated_impulse_response(params, num_samples):
+    """Run the filter_function recursion on a unit impulse"""
+    g, r = (float(value) for value in svf_coefficients(params))
+    filter_type = params[2]
+    low = band = 0.0
+    output = np.zeros(num_samples)
+    for i in range(num_samples):
+        value = 1.0 if i == 0 else 0.0
+        high = value - low - r * band
+        band, low = band + g * high, low + g * band
+        if filter_type & FILTER_LOWPASS:
+            output[i] += low
+        if filter_type & FILTER_HIGHPASS:
+            output[i] += high
+        if filter_type & FILTER_BANDPASS:
+            output[i] += band
+        if filter_type & FILTER_PEAK:
+            output[i] += low - high
+    return output
+
+
+class TestFilterResponse:
+    """Test the SVF frequency response"""
+
+    def test_coefficients(self):
+        """Test that frequency is squared and resonance is scaled"""
+        g, r = svf_coefficients((64, 32, FILTER_LOWPASS))
+        assert g == np.float32(0.25)
+        assert r == np.float32(0.25)
+
+        g, r = svf_coefficients((64, 32, FILTER_LOWPASS), frequency_mod=0.5,
+                                resonance_mod=0.25)
+        assert g == np.float32(1.0)
+        assert r == np.float32(0.5)
+
+    @pytest.mark.parametrize("params", [
+        (80, 128, FILTER_LOWPASS),
+        (80, 128, FILTER_HIGHPASS),
+        (80, 128, FILTER_BANDPASS),
+        (80, 128, FILTER_BANDSTOP),
+        (80, 128, FILTER_ALLPASS),
+        (80, 128, FILTER_PEAK),
+        (40, 64, FILTER_LOWPASS),
+    ])
+    def test_matches_simulated_filter(self, params):
+        """Test the transfer function against the FFT of the impulse response"""
+        num_samples = 4096
+        spectrum = np.fft.rfft(simulated_impulse_response(params, num_samples))
+        frequencies = np.fft.rfftfreq(num_samples, 1.0 / 44100)
+        np.testing.assert_allclose(svf_response(params, frequencies), spectrum, atol=1e-6)
+
+    def test_lowpass_shape(self):
+        """Test that the lowpass passes DC and attenuates high frequencies"""
+        magnitude = svf_magnitude_db((40, 128, FILTER_LOWPASS), np.array([1.0, 20000.0]))
+        assert abs(magnitude[0]) < 0.01
+        assert magnitude[1] < -20.0
+
+    def test_highpass_blocks_dc(self):
+        """Test that the highpass magnitude is clamped at the floor for DC"""
+        magnitude = svf_magnitude_db((40, 128, FILTER_HIGHPASS), np.array([0.0]))
+        assert magnitude[0] == -120.0
+
+    def test_stability(self):
+        """Test the stability check of the filter recursion"""
+        assert svf_is_stable(*svf_coefficients((80, 128, FILTER_LOWPASS)))
+        assert not svf_is_stable(*svf_coefficients((128, 0, FILTER_LOWPASS)))
+
+    def test_log_frequency_grid(self):
+        """Test the grid bounds"""
+        grid = log_frequency_grid(100)
+        assert len(grid) == 100
+        assert grid[0] == pytest.approx(20.0)
+        assert grid[-1] == pytest.approx(22050.0)
+        assert np.all(np.diff(grid) > 0)
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Tests for the note event builder
+
+This test suite validates that:
+- Rows with notes start them, zero rows release and HLD rows are skipped
+- Every list is in song order and ends with an end marker
+- The binary layout matches the engine's event words
+
+Running Tests:
+    pytest tests/editor/audio/test_note_events.py -v
+"""
+
+import numpy as np
+
+from editor.audio.engine_math import (HLD, NOTES_PER_PATTERN, NOTES_PER_SONG,
+                                      PATTERNS_PER_INSTRUMENT, SAMPLES_PER_NOTE)
+from editor.audio.note_events import (NOTE_EVENT_DTYPE, NOTE_EVENT_END, NOTE_EVENT_ON,
+                                      NOTE_EVENT_RELEASE, NOTE_EVENTS_PER_INSTRUMENT,
+                                      build_note_events, note_event_words)
+
+# Pattern 0 of the engine unit tests and an all-HLD pattern
+PATTERN_ARRAY = [60, HLD, 62, HLD, 64, 0, 65, HLD, 67, HLD, 69, HLD, 71, HLD, 72, HLD] + \
+    [HLD] * NOTES_PER_PATTERN
+
+
+def reference_note_events(instrument_patterns, pattern_array):
+    """Scalar port of the per-note pattern lookup, one row at a time"""
+    lists = []
+    for instrument in range(len(instrument_patterns) // PATTERNS_PER_INSTRUMENT):
+        events = []
+        for note in range(NOTES_PER_SONG):
+            pattern = instrument_patterns[instrument * PATTERNS_PER_INSTRUMENT +
+                                          note // NOTES_PER_PATTERN]
+            value = pattern_array[pattern * NOTES_PER_PATTERN + note % NOTES_PER_PATTERN]
+            if value != HLD:
+                kind = NOTE_EVENT_ON if value else NOTE_EVENT_RELEASE
+                events.append((note * SAMPLES_PER_NOTE, value, kind))
+        lists.append(events)
+    return lists
+
+
+class TestBuildNoteEvents:
+    """Test the vectorized event builder"""
+
+    def test_first_pattern(self):
+        """Test the events of a single pattern followed by silence"""
+        patterns = [0] + [1] * (PATTERNS_PER_INSTRUMENT - 1)
+        events = build_note_events(patterns, PATTERN_ARRAY)
+
+        assert events.shape == (1, NOTE_EVENTS_PER_INSTRUMENT)
+        assert events.dtype == NOTE_EVENT_DTYPE
+        rows = [0, 2, 4, 5, 6, 8, 10, 12, 14]
+        np.testing.assert_array_equal(events[0]['sample'][:9], np.array(rows) * SAMPLES_PER_NOTE)
+        np.testing.assert_array_equal(events[0]['note'][:9], [60, 62, 64, 0, 65, 67, 69, 71, 72])
+        assert events[0]['kind'][3] == NOTE_EVENT_RELEASE
+        assert np.all(np.delete(events[0]['kind'][:9], 3) == NOTE_EVENT_ON)
+        assert np.all(events[0]['sample'][9:] == NOTE_EVENT_END)
+
+    def test_matches_row_walk(self):
+        """Test several instruments against the scalar row walk"""
+        rng = np.random.default_rng(7)
+        pattern_array = rng.choice([0, HLD, 48, 60, 72], size=5 * NOTES_PER_PATTERN)
+        patterns = rng.integers(0, 5, size=3 * PATTERNS_PER_INSTRUMENT)
+        events = build_note_events(patterns, pattern_array)
+
+        for instrument, expected in enumerate(reference_note_events(patterns, pattern_array)):
+            built = events[instrument][:len(expected)]
+            assert list(zip(built['sample'], built['note'], built['kind'])) == expected
+            assert events[instrument]['sample'][len(expected)] == NOTE_EVENT_END
+
+    def test_song_length(self):
+        """Test that a shorter song gets one event per row and the end marker"""
+        events = build_note_events([0, 1, 0, 1, 1, 0], PATTERN_ARRAY, patterns_per_instrument=3)
+
+        assert events.shape == (2, 3 * NOTES_PER_PATTERN + 1)
+        assert events[1]['sample'][0] == 2 * NOTES_PER_PATTERN * SAMPLES_PER_NOTE
+        assert events[1]['sample'][9] == NOTE_EVENT_END
+        np.testing.assert_array_equal(events[0][9:18], events[1][:9])
+        assert events[0]['sample'][18] == NOTE_EVENT_END
+
+    def test_tempo(self):
+        """Test that the events are spaced by the given note length"""
+        patterns = [0] + [1] * (PATTERNS_PER_INSTRUMENT - 1)
+        events = build_note_events(patterns, PATTERN_ARRAY, samples_per_note=1000)
+        np.testing.assert_array_equal(events[0]['sample'][:3], [0, 2000, 4000])
+
+    def test_hold_only(self):
+        """Test that an instrument holding forever has only the end marker"""
+        events = build_note_events([1] * PATTERNS_PER_INSTRUMENT, PATTERN_ARRAY)
+        assert np.all(events['sample'] == NOTE_EVENT_END)
+        assert np.all(events['kind'] == 0)
+
+
+class TestNoteEventWords:
+    """Test the binary layout"""
+
+    def test_layout(self):
+        """Test the sample word and the packed note, kind and reserved bytes"""
+        events = np.zeros(2, dtype=NOTE_EVENT_DTYPE)
+        events[0] = (SAMPLES_PER_NOTE, 61, NOTE_EVENT_ON, 0)
+        events[1]['sample'] = NOTE_EVENT_END
+        np.testing.assert_array_equal(note_event_words(events),
+                                      [SAMPLES_PER_NOTE, 61 | NOTE_EVENT_ON << 8, NOTE_EVENT_END, 0])
+
+    def test_trims_after_end_marker(self):
+        """Test that only the events up to the first end marker are kept"""
+        patterns = [0] + [1] * (PATTERNS_PER_INSTRUMENT - 1)
+        words = note_event_words(build_note_events(patterns, PATTERN_ARRAY)[0])
+        assert len(words) == 2 * 10
+        assert words[-2] == NOTE_EVENT_END
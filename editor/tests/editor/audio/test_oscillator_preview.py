@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Tests for the single-cycle oscillator preview
+
+This test suite validates that:
+- The phase increment follows oscillator_function
+- Waveforms are evaluated over the phase grid with phase, color and gain
+- The noise generator follows the engine's integer recursion and can start at any sample
+- Noise seeds differ for every note and oscillator workspace of the largest engine
+
+Running Tests:
+    pytest tests/editor/audio/test_oscillator_preview.py -v
+"""
+
+import numpy as np
+import pytest
+
+from editor.audio.engine_math import (OSCILLATOR_LFO, OSCILLATOR_NOISE, OSCILLATOR_SAW,
+                                      OSCILLATOR_SINE, cosine_waveform, pwr)
+from editor.audio.oscillator_preview import (noise_jump, noise_seed, noise_sequence,
+                                             oscillator_cycle, oscillator_frequency,
+                                             oscillator_frequency_hz, oscillator_waveform)
+from editor.audio.voice_batch import (INSTRUMENT_LENGTH, INSTRUMENT_WORKSPACES, MAX_COMMANDS,
+                                      WORKSPACE_SIZE)
+
+# transpose, detune, phase, gates, color, shape, gain, type
+SINE_PARAMS = (64, 64, 0, 0, 128, 64, 128, OSCILLATOR_SINE)
+
+# SynthEngine::MAX_INSTRUMENTS
+MAX_INSTRUMENTS = 255
+
+
+class TestOscillatorFrequency:
+    """Test the oscillator phase increment"""
+
+    def test_a4_frequency(self):
+        """Test that note 69 with centered transpose/detune is close to 440 Hz"""
+        assert oscillator_frequency_hz(SINE_PARAMS, 69) == pytest.approx(440.0, rel=0.07)
+
+    def test_matches_engine_formula(self):
+        """Test the exact float32 operation order of oscillator_function"""
+        params = (70, 80, 0, 0, 128, 64, 128, OSCILLATOR_SINE)
+        transpose = (np.float32(70 / 128) - np.float32(0.5)) / np.float32(0.0078125)
+        detune = (np.float32(80 / 128) - np.float32(0.5)) / np.float32(0.5)
+        expected = pwr((transpose + detune + np.float32(60)) * np.float32(0.0833333))
+        expected = expected * np.float32(0.000185392)
+        assert oscillator_frequency(params, 60) == expected
+
+    def test_transpose_octave(self):
+        """Test that transposing by 12 semitones doubles the frequency"""
+        up = (64 + 12, 64, 0, 0, 128, 64, 128, OSCILLATOR_SINE)
+        ratio = oscillator_frequency(up, 60) / oscillator_frequency(SINE_PARAMS, 60)
+        assert ratio == pytest.approx(2.0, rel=1e-5)
+
+    def test_lfo_ignores_note(self):
+        """Test that LFO mode ignores the note and uses the LFO base"""
+        lfo = (64, 64, 0, 0, 128, 64, 128, OSCILLATOR_SINE | OSCILLATOR_LFO)
+        assert oscillator_frequency(lfo, 30) == oscillator_frequency(lfo, 90)
+        assert oscillator_frequency(lfo, 0) == np.float32(0.000041106)
+
+
+class TestOscillatorWaveform:
+    """Test the waveform evaluation"""
+
+    def test_cycle_shape(self):
+        """Test a full color sine over two periods"""
+        position, output = oscillator_cycle(SINE_PARAMS, num_periods=2, points_per_period=64)
+        assert len(position) == len(output) == 128
+        assert position[-1] == pytest.approx(2.0 - 1.0 / 64)
+        np.testing.assert_allclose(output, np.cos(2 * np.pi * position), atol=0.03)
+
+    def test_phase_color_and_gain(self):
+        """Test that phase offset, color and gain are applied like the engine"""
+        params = (64, 64, 32, 0, 96, 64, 64, OSCILLATOR_SINE)
+        phase = np.linspace(0.0, 1.0, 50, endpoint=False, dtype=np.float32)
+        shifted = (phase + np.float32(0.25)) + np.float32(1.0)
+        shifted = shifted - np.floor(shifted)
+        expected = cosine_waveform(shifted, np.float32(0.75)) * np.float32(0.5)
+        np.testing.assert_array_equal(oscillator_waveform(params, phase), expected)
+
+    def test_ramp_for_unimplemented_types(self):
+        """Test that types without waveform output the phase ramp"""
+        params = (64, 64, 0, 0, 128, 64, 128, OSCILLATOR_SAW)
+        phase = np.float32([0.0, 0.25, 0.5, 0.75])
+        np.testing.assert_array_equal(oscillator_waveform(params, phase), phase)
+
+    def test_noise(self):
+        """Test that noise replaces the waveform with the engine generator"""
+        params = (64, 64, 0, 0, 128, 64, 128, OSCILLATOR_SINE | OSCILLATOR_NOISE)
+        output = oscillator_waveform(params, np.zeros(16, dtype=np.float32))
+        np.testing.assert_array_equal(output, noise_sequence(16))
+
+
+class TestNoiseSequence:
+    """Test the noise generator"""
+
+    def test_matches_integer_recursion(self):
+        """Test against a scalar port of the 32-bit multiply"""
+        seed = 1
+        expected = []
+        for _ in range(100):
+            seed = (seed * 16007) & 0xFFFFFFFF
+            signed = seed - (1 << 32) if seed & 0x80000000 else seed
+            expected.append(np.float32(signed) / np.float32(2147483648.0))
+        np.testing.assert_array_equal(noise_sequence(100), np.float32(expected))
+
+    def test_custom_seed(self):
+        """Test that the sequence continues from a given state"""
+        sequence = noise_sequence(10)
+        state = (16007 ** 5) & 0xFFFFFFFF
+        np.testing.assert_array_equal(noise_sequence(5, seed=state), sequence[5:])
+
+    def test_jump_ahead(self):
+        """Test that a sequence can start at any sample"""
+        seed = noise_seed(45, 76)
+        assert seed == 45 << 20 | 77
+        sequence = noise_sequence(3000, seed)
+        for start in (0, 1, 1234, 2999):
+            np.testing.assert_array_equal(noise_sequence(3000 - start, seed, start),
+                                          sequence[start:])
+        assert noise_jump(seed, 3000) == (seed * 16007 ** 3000) & 0xFFFFFFFF
+
+    def test_unique_seeds_in_largest_layout(self):
+        """Test that no two notes or oscillator workspaces start from the same seed"""
+        # Every instrument and the song instrument with all their workspaces
+        instruments = np.arange(MAX_INSTRUMENTS + 1)[:, np.newaxis] * INSTRUMENT_LENGTH
+        offsets = (instruments + INSTRUMENT_WORKSPACES + np.arange(MAX_COMMANDS) * WORKSPACE_SIZE)
+        seeds = np.concatenate([noise_seed(note, offsets.ravel()) for note in range(1, 256)])
+        assert len(np.unique(seeds)) == len(seeds)
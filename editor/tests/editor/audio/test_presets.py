@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Tests for the preset library
+
+This test suite validates that:
+- Patches are stored once under the hash of their content
+- The library file is indexed in memory and survives reopening
+- Searches match instruction signatures, tags and names
+- Programs are replaced in song data with their parameters
+
+Running Tests:
+    pytest tests/editor/audio/test_presets.py -v
+"""
+
+import numpy as np
+import pytest
+
+from editor.audio.engine_math import (ENVELOPE_ID, FILTER_HIGHPASS, FILTER_ID, FILTER_LOWPASS,
+                                      OSCILLATOR_ID, OSCILLATOR_SAW, OSCILLATOR_SINE, OUTPUT_ID)
+from editor.audio.presets import (PresetLibrary, parse_signature, preset_key, replace_program,
+                                  signature_features, split_program)
+from editor.audio.song_asm import parse_song
+
+ENVELOPE = [10, 20, 64, 30, 128]
+OUTPUT = [100]
+
+
+def patch(waveform=OSCILLATOR_SAW, filter_type=None):
+    """Program and parameters of an oscillator through an optional filter"""
+    instructions = [ENVELOPE_ID, OSCILLATOR_ID]
+    parameters = ENVELOPE + [0, 0, 0, 0, 64, 64, 128, waveform]
+    if filter_type is not None:
+        instructions.append(FILTER_ID)
+        parameters += [90, 40, filter_type]
+    return instructions + [OUTPUT_ID], parameters + OUTPUT
+
+
+class TestPresetLibrary:
+    """Test storing and finding presets"""
+
+    def test_content_is_stored_once(self, tmp_path):
+        """Test that the same patch is written once unless its name or tags change"""
+        path = tmp_path / 'presets.d4kl'
+        library = PresetLibrary(path)
+        preset = library.add('Bass', *patch(), tags=['Bass', ' dark '])
+        size = path.stat().st_size
+
+        assert preset.key == preset_key(*patch())
+        assert preset.tags == ('bass', 'dark')
+        assert library.add('Bass', *patch(), tags=['dark', 'bass']) == preset
+        assert path.stat().st_size == size
+
+        renamed = library.add('Deep bass', *patch(), tags=['bass'])
+        assert len(library) == 1
+        assert library.get(preset.key) == renamed
+        assert not library.find(tags=['dark'])
+
+    def test_reopen_and_damaged_tail(self, tmp_path):
+        """Test that a reopened library has the newest records and drops a torn write"""
+        path = tmp_path / 'presets.d4kl'
+        library = PresetLibrary(path)
+        first = library.add('Saw', *patch(), tags=['lead'])
+        library.add('Saw lead', *patch(), tags=['lead', 'bright'])
+        second = library.add('Sine', *patch(OSCILLATOR_SINE))
+
+        with open(path, 'ab') as file:
+            file.write(b'PRS1\x40\x00')
+        reopened = PresetLibrary(path)
+        assert len(reopened) == 2
+        assert reopened.get(first.key).name == 'Saw lead'
+        assert reopened.get(second.key).parameters == second.parameters
+
+        third = reopened.add('Filtered', *patch(filter_type=FILTER_LOWPASS))
+        assert third.key in PresetLibrary(path)
+
+    def test_damaged_record_is_skipped(self, tmp_path):
+        """Test that a damaged record loses only itself, also when the library grows"""
+        path = tmp_path / 'presets.d4kl'
+        library = PresetLibrary(path)
+        presets = []
+        for attack in range(5):
+            instructions, parameters = patch()
+            parameters[0] = attack
+            presets.append(library.add(f'Pad {attack}', instructions, parameters))
+        data = bytearray(path.read_bytes())
+        data[2 * len(data) // 5 + 20] ^= 0xFF
+        path.write_bytes(data)
+
+        reopened = PresetLibrary(path)
+        assert len(reopened) == 4 and presets[2].key not in reopened
+        reopened.add('Sine', *patch(OSCILLATOR_SINE))
+        assert path.stat().st_size > len(data)
+        assert len(PresetLibrary(path)) == 5
+
+    def test_find(self, tmp_path):
+        """Test searches by signature, tags and name"""
+        library = PresetLibrary(tmp_path / 'presets.d4kl')
+        saw = library.add('Saw', *patch(), tags=['lead'])
+        low = library.add('Low pad', *patch(OSCILLATOR_SINE | OSCILLATOR_SAW, FILTER_LOWPASS),
+                          tags=['pad'])
+        high = library.add('High pad', *patch(OSCILLATOR_SINE, FILTER_HIGHPASS), tags=['pad'])
+
+        assert library.find() == [high, low, saw]
+        assert library.find('has FILTER LOWPASS') == [low]
+        assert library.find('filter') == [high, low]
+        assert library.find('OSCILLATOR SAW and FILTER') == [low]
+        assert library.find('oscillator saw', tags=['lead']) == [saw]
+        assert library.find(tags=['pad'], text='HIGH') == [high]
+        assert library.find(tags=['unknown']) == []
+        assert library.get_tags() == ['lead', 'pad']
+
+    def test_invalid_patches(self, tmp_path):
+        """Test that parameters that do not fit the program are rejected"""
+        library = PresetLibrary(tmp_path / 'presets.d4kl')
+        instructions, parameters = patch()
+        with pytest.raises(ValueError):
+            library.add('Short', instructions, parameters[:-1])
+        with pytest.raises(ValueError):
+            library.add('Unknown', instructions + [99], parameters)
+        assert len(library) == 0
+        assert not (tmp_path / 'presets.d4kl').exists()
+
+
+class TestSignatures:
+    """Test the features signature searches match"""
+
+    def test_features(self):
+        """Test that filter types and oscillator waveforms become features"""
+        features = signature_features(*map(bytes, patch(OSCILLATOR_SINE | OSCILLATOR_SAW,
+                                                        FILTER_LOWPASS)))
+        assert features == {'ENVELOPE', 'OSCILLATOR', 'OSCILLATOR SINE', 'OSCILLATOR SAW',
+                            'FILTER', 'FILTER LOWPASS', 'OUTPUT'}
+
+    @pytest.mark.parametrize('signature', ['has DELAY', 'FILTER SAW', 'OSCILLATOR SAW SINE'])
+    def test_unknown_terms(self, signature):
+        """Test that misspelled signatures are rejected instead of matching nothing"""
+        with pytest.raises(ValueError):
+            parse_signature(signature)
+
+
+class TestReplaceProgram:
+    """Test splicing a patch into song data"""
+
+    def test_replace_program(self):
+        """Test that one program and its parameters are replaced"""
+        song = parse_song()
+        instructions, parameters = patch(filter_type=FILTER_LOWPASS)
+        replaced = replace_program(song, 1, bytes(instructions), bytes(parameters))
+
+        (start, end), (first, last) = split_program(replaced, 1)
+        assert replaced.instructions[start:end].tolist() == instructions
+        assert replaced.parameters[first:last].tolist() == parameters
+        for program in (0, 2):
+            (old, _), (old_parameters, _) = split_program(song, program)
+            (new, _), (new_parameters, _) = split_program(replaced, program)
+            np.testing.assert_array_equal(replaced.instructions[new:new + 3],
+                                          song.instructions[old:old + 3])
+            np.testing.assert_array_equal(replaced.parameters[new_parameters:new_parameters + 5],
+                                          song.parameters[old_parameters:old_parameters + 5])
+        with pytest.raises(ValueError):
+            split_program(song, 99)
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Tests for the binary project files
+
+This test suite validates that:
+- Runs of silence and held notes are run-length encoded losslessly
+- Projects load back with their song tables, sample rate and tempo
+- Saves rewrite only the sections that changed
+- Damaged files and other versions are rejected
+
+Running Tests:
+    pytest tests/editor/audio/test_project.py -v
+"""
+
+import struct
+
+import numpy as np
+import pytest
+
+from editor.audio.engine_math import HLD, NOTES_PER_PATTERN
+from editor.audio.project import (MAX_RUN, PROJECT_VERSION, ProjectData, ProjectFile,
+                                  decode_runs, encode_runs, load_project)
+from editor.audio.song_asm import parse_song
+
+
+@pytest.fixture(name='project')
+def fixture_project():
+    """Project of the song.asm next to the editor"""
+    return ProjectData(parse_song(), 48000, 140)
+
+
+class TestRunLength:
+    """Test the run-length encoding of the pattern tables"""
+
+    def test_round_trip(self):
+        """Test that random tables of notes, holds and silence decode unchanged"""
+        rng = np.random.default_rng(3)
+        for _ in range(100):
+            table = rng.choice([0, HLD, HLD, 60, 255], size=rng.integers(0, 500)).astype(np.uint8)
+            np.testing.assert_array_equal(decode_runs(encode_runs(table), len(table)), table)
+
+    def test_silent_patterns_and_holds_are_compressed(self):
+        """Test that a silent pattern and a held note take a few bytes"""
+        table = np.zeros(4 * NOTES_PER_PATTERN, dtype=np.uint8)
+        table[NOTES_PER_PATTERN] = 60
+        table[NOTES_PER_PATTERN + 1:2 * NOTES_PER_PATTERN] = HLD
+        encoded = encode_runs(table)
+
+        # Zero run, one literal note, HLD run, zero run
+        assert len(encoded) == 5
+        assert len(encode_runs(np.zeros(MAX_RUN + 1, dtype=np.uint8))) == 2
+
+    def test_malformed_data(self):
+        """Test that data decoding to another size is rejected"""
+        encoded = encode_runs(np.full(20, HLD, dtype=np.uint8))
+        with pytest.raises(ValueError):
+            decode_runs(encoded, 19)
+        with pytest.raises(ValueError):
+            decode_runs(encoded, 21)
+        with pytest.raises(ValueError):
+            decode_runs(b'\x03\x3c', 4)
+
+
+class TestProjectFile:
+    """Test saving and loading project files"""
+
+    def test_round_trip(self, tmp_path, project):
+        """Test that a saved project loads with the same tables and settings"""
+        path = tmp_path / 'song.d4kp'
+        ProjectFile(path).save(project)
+        loaded = load_project(path)
+
+        assert (loaded.sample_rate, loaded.tempo) == (48000, 140)
+        for table, expected in zip(loaded.song, project.song):
+            assert table.dtype == np.uint8
+            np.testing.assert_array_equal(table, expected)
+
+    def test_incremental_save(self, tmp_path, project):
+        """Test that only changed sections are written, after the others"""
+        path = tmp_path / 'song.d4kp'
+        project_file = ProjectFile(path)
+        project_file.save(project)
+        size = path.stat().st_size
+
+        assert project_file.save(project._replace(tempo=120)) == 0
+        assert path.stat().st_size == size
+        parameters = project.song.parameters.copy()
+        parameters[0] = 12
+        assert project_file.save(project._replace(song=project.song._replace(
+            parameters=parameters))) == len(parameters)
+        assert path.stat().st_size == size + len(parameters)
+
+        pattern_array = np.concatenate([project.song.pattern_array,
+                                        np.arange(2, 2 + NOTES_PER_PATTERN, dtype=np.uint8)])
+        song = project.song._replace(parameters=parameters, pattern_array=pattern_array)
+        assert project_file.save(project._replace(song=song)) > 0
+
+        loaded = ProjectFile(path).load()
+        assert loaded.tempo == 140
+        np.testing.assert_array_equal(loaded.song.parameters, parameters)
+        np.testing.assert_array_equal(loaded.song.pattern_array, pattern_array)
+
+    def test_interrupted_save(self, tmp_path, project):
+        """Test that the old directory still reads the old project after a save"""
+        path = tmp_path / 'song.d4kp'
+        project_file = ProjectFile(path)
+        project_file.save(project)
+        old = path.read_bytes()
+
+        parameters = project.song.parameters.copy()
+        parameters[0] = 12
+        project_file.save(project._replace(song=project.song._replace(parameters=parameters)))
+        # The save stopped before the directory was written
+        path.write_bytes(old + path.read_bytes()[len(old):])
+
+        loaded = load_project(path)
+        np.testing.assert_array_equal(loaded.song.parameters, project.song.parameters)
+
+    def test_unused_space_is_reclaimed(self, tmp_path, project):
+        """Test that the file is rewritten once most of it is replaced sections"""
+        path = tmp_path / 'song.d4kp'
+        project_file = ProjectFile(path)
+        project_file.save(project)
+        size = path.stat().st_size
+        for attack in range(1, 20):
+            parameters = project.song.parameters.copy()
+            parameters[0] = attack
+            project_file.save(project._replace(song=project.song._replace(
+                parameters=parameters)))
+        assert path.stat().st_size <= 2 * size + len(project.song.parameters)
+        assert load_project(path).song.parameters[0] == 19
+
+    def test_rejects_damaged_files(self, tmp_path, project):
+        """Test that other files, other versions and damaged sections are rejected"""
+        path = tmp_path / 'song.d4kp'
+        ProjectFile(path).save(project)
+        data = bytearray(path.read_bytes())
+
+        path.write_bytes(b'not a project')
+        with pytest.raises(ValueError, match='not a project'):
+            load_project(path)
+
+        newer = bytearray(data)
+        struct.pack_into('<H', newer, 4, PROJECT_VERSION + 1)
+        path.write_bytes(newer)
+        with pytest.raises(ValueError, match='version'):
+            load_project(path)
+
+        data[-1] ^= 0xFF
+        path.write_bytes(data)
+        with pytest.raises(ValueError, match='damaged'):
+            load_project(path)
+
+        path.write_bytes(data[:40])
+        with pytest.raises(ValueError, match='truncated'):
+            load_project(path)
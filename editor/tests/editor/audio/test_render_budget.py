@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Tests for the render budget helpers used by display previews
+
+Running Tests:
+    pytest tests/editor/audio/test_render_budget.py -v
+"""
+
+import numpy as np
+
+from editor.audio.render_budget import RenderBudget, peak_envelope, trim_silence
+
+
+class TestPeakEnvelope:
+    """Test the min/max reduction of rendered samples"""
+
+    def test_short_input_is_unchanged(self):
+        """Test that inputs within the resolution are returned as they are"""
+        samples = np.float32([0.1, -0.2, 0.3])
+        positions, minimum, maximum = peak_envelope(samples, 10)
+        np.testing.assert_array_equal(positions, [0, 1, 2])
+        np.testing.assert_array_equal(minimum, samples)
+        np.testing.assert_array_equal(maximum, samples)
+
+    def test_reduces_to_resolution(self):
+        """Test that every column holds the extremes of its samples"""
+        samples = np.sin(np.arange(10000) * 0.01).astype(np.float32)
+        positions, minimum, maximum = peak_envelope(samples, 640)
+        assert len(positions) <= 640
+        column = positions[1] - positions[0]
+        for index in (0, 100, len(positions) - 1):
+            part = samples[positions[index]:positions[index] + column]
+            assert minimum[index] == part.min()
+            assert maximum[index] == part.max()
+
+    def test_budget_fields(self):
+        """Test the budget tuple"""
+        budget = RenderBudget(window_samples=10584, resolution=640)
+        assert budget.window_samples == 10584
+        assert budget._replace(resolution=320).resolution == 320
+
+
+class TestTrimSilence:
+    """Test removal of the silent tail of a note"""
+
+    def test_trims_trailing_zeros(self):
+        """Test that only trailing silence is removed"""
+        samples = np.float32([0.0, 0.5, 0.0, -0.25, 0.0, 1e-9])
+        np.testing.assert_array_equal(trim_silence(samples), samples[:4])
+
+    def test_all_silent(self):
+        """Test that a silent note becomes empty"""
+        assert len(trim_silence(np.zeros(100, dtype=np.float32))) == 0
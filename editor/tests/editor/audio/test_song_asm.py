@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Tests for the song data read from song.asm
+
+This test suite validates that:
+- The tables of song.asm assemble to the layout the engine expects
+- Macros, #defines and .equ constants expand like in the assembler
+- Malformed sources are reported with their file and line
+- Changes of the song file are detected by polling
+
+Running Tests:
+    pytest tests/editor/audio/test_song_asm.py -v
+"""
+
+import os
+
+import numpy as np
+import pytest
+
+from editor.audio.engine_math import (ENVELOPE_ID, HLD, NOTES_PER_PATTERN, OUTPUT_ID,
+                                      PATTERNS_PER_INSTRUMENT)
+from editor.audio.song_asm import (DEFAULT_SONG_PATH, SongAssembler, SongWatcher,
+                                   parse_song)
+
+COMMON_ASM = DEFAULT_SONG_PATH.parent / 'common.asm'
+
+
+def write_song(tmp_path, body):
+    """Write a song source including the common.asm of the softsynth"""
+    path = tmp_path / 'song.asm'
+    path.write_text(f'#include "{COMMON_ASM}"\n{body}')
+    return path
+
+
+class TestParseSong:
+    """Test the tables assembled from song.asm"""
+
+    def test_song_tables(self):
+        """Test that the programs, parameters and patterns of song.asm are assembled"""
+        song = parse_song()
+
+        assert all(table.dtype == np.uint8 for table in song)
+        assert song.instructions[:5].tolist() == [ENVELOPE_ID, 2, 4, OUTPUT_ID, 0]
+        assert song.instructions[-1] == 0
+        # ENVELOPE of the first instrument, then its OSCILLATOR
+        assert song.parameters[:6].tolist() == [70, 70, 70, 70, 128, 64]
+        assert len(song.patterns) >= 9 * PATTERNS_PER_INSTRUMENT
+        assert len(song.pattern_array) % NOTES_PER_PATTERN == 0
+        assert song.pattern_array[NOTES_PER_PATTERN:NOTES_PER_PATTERN + 4].tolist() == \
+            [76, HLD, HLD, HLD]
+
+    def test_storeval_destination(self, tmp_path):
+        """Test that a STOREVAL destination expression becomes a little-endian half word"""
+        path = write_song(tmp_path, '''
+instrument_instructions:
+    .byte STOREVAL_ID, INSTRUMENT_END
+instrument_parameters:
+    STOREVAL STORE_AMOUNT(96), STORE_DEST(instrument_workspaces + 2 * MAX_COMMAND_PARAMS * 4 + STOREVAL_ADD)
+instrument_patterns:
+pattern_array:
+''')
+        song = parse_song(path)
+
+        destination = 12 + 2 * 16 * 4 + 0x8000
+        assert song.instructions.tolist() == [3, 0]
+        assert song.parameters.tolist() == [96, destination & 0xFF, destination >> 8]
+        assert len(song.patterns) == 0
+
+    def test_defines_rename_labels(self, tmp_path):
+        """Test that labels follow #defines like after the preprocessor"""
+        path = write_song(tmp_path, '''
+#define instrument_instructions _instrument_instructions
+#define TWICE(x) ((x) * 2)
+_unused: .byte 5
+instrument_instructions:    .byte TWICE(HLD + 1), -1
+instrument_parameters:      .hword 0x1234
+instrument_patterns:        .byte 1, 2
+pattern_array:              .word 7
+''')
+        assembler = SongAssembler()
+        assembler.assemble(path)
+
+        assert '_instrument_instructions' in assembler.labels
+        assert assembler.table('instrument_instructions').tolist() == [4, 255]
+        assert assembler.table('instrument_parameters').tolist() == [0x34, 0x12]
+        assert assembler.table('pattern_array').tolist() == [7, 0, 0, 0]
+
+    @pytest.mark.parametrize('line, message', [
+        ('    .byte 256', 'does not fit'),
+        ('    ENVELOPE 1, 2', 'takes 5 arguments'),
+        ('    .byte UNDEFINED_NAME', 'Unknown symbol'),
+        ('    mov x0, x1', 'Unsupported instruction'),
+    ])
+    def test_errors_name_the_line(self, tmp_path, line, message):
+        """Test that malformed lines are reported with their file and line number"""
+        path = write_song(tmp_path, f'instrument_instructions:\n{line}\n')
+
+        with pytest.raises(ValueError, match=f'song.asm:3: .*{message}'):
+            parse_song(path)
+
+    def test_missing_table(self, tmp_path):
+        """Test that a source without the song tables is rejected"""
+        with pytest.raises(ValueError, match='instrument_parameters'):
+            parse_song(write_song(tmp_path, 'instrument_instructions:\n    .byte 0\n'))
+
+
+class TestSongWatcher:
+    """Test the polling for song file changes"""
+
+    def test_poll_detects_writes(self, tmp_path):
+        """Test that only writes after the last poll are reported"""
+        path = tmp_path / 'song.asm'
+        path.write_text('.data\n')
+        watcher = SongWatcher(path)
+        assert watcher.exists()
+        assert not watcher.poll()
+
+        path.write_text('.data\n.byte 1\n')
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+        assert watcher.poll()
+        assert not watcher.poll()
+
+    def test_missing_file(self, tmp_path):
+        """Test that a missing file is never reported as changed"""
+        path = tmp_path / 'song.asm'
+        watcher = SongWatcher(path)
+        assert not watcher.exists()
+        assert not watcher.poll()
+
+        path.write_text('.data\n')
+        assert watcher.poll()
+        path.unlink()
+        assert not watcher.poll()
@@ -19,12 +19,21 @@ Running Tests:
    pytest tests/editor/audio/test_synth_wrapper.py::TestSynthWrapperInitialization -v
 """
 
-from unittest.mock import Mock, patch
+import threading
+import time
+from unittest.mock import Mock, call, patch
 
 import pytest
 import numpy as np
 
 import synth_engine  # pylint: disable=import-error,c-extension-no-member,unused-import,wrong-import-position
+from editor.audio.engine_math import (ENVELOPE_ID, HLD, MAX_NUM_INSTRUMENTS, OUTPUT_ID,
+                                      PATTERNS_PER_INSTRUMENT, SAMPLES_PER_NOTE, STOREVAL_ID,
+                                      samples_per_note)
+from editor.audio.note_events import NOTE_EVENT_END, NOTE_EVENT_ON
+from editor.audio.presets import Preset, PresetLibrary
+from editor.audio.project import ProjectData, ProjectFile
+from editor.audio.song_asm import SongData, parse_song
 from editor.audio.synth_wrapper import SynthWrapper  # pylint: disable=wrong-import-position
 
 
@@ -93,6 +102,50 @@ class TestSynthWrapperAudioRendering:
         assert len(result) == len(test_samples)
         np.testing.assert_array_equal(result, np.array(test_samples, dtype=np.float32))
 
+    @patch('editor.audio.synth_wrapper.synth_engine.SynthEngine')
+    def test_render_into_buffer(self, mock_engine_class):
+        """Test that blocks are rendered into the caller's buffer"""
+        mock_engine = Mock()
+        mock_engine.initialize.return_value = True
+        mock_engine_class.return_value = mock_engine
+
+        wrapper = SynthWrapper()
+        out = np.ones(512, dtype=np.float32)
+        block = wrapper.render(256, out)
+
+        mock_engine.render.assert_called_once_with(256, out)
+        assert np.shares_memory(block, out)
+        assert len(block) == 256
+        assert len(wrapper.render(100)) == 100
+        with pytest.raises(ValueError):
+            wrapper.render(513, out)
+        with pytest.raises(ValueError):
+            wrapper.render(256, np.zeros(512, dtype=np.float64))
+
+    def test_render_blocks_with_real_engine(self):
+        """Test that blocks of any size continue the song like one long block"""
+        total = SAMPLES_PER_NOTE * 2 + 17
+        whole = SynthWrapper().render(total)
+        assert np.any(whole != 0)
+
+        wrapper = SynthWrapper()
+        sizes = (1000, 333, SAMPLES_PER_NOTE, total - 1333 - SAMPLES_PER_NOTE)
+        blocks = [wrapper.render(size).copy() for size in sizes]
+        assert wrapper.get_position() == total
+        np.testing.assert_array_equal(np.concatenate(blocks), whole)
+
+    def test_render_past_song_end_with_real_engine(self):
+        """Test that the song end is silent and the position stays in the song"""
+        wrapper = SynthWrapper()
+        length = wrapper.get_song_length()
+        assert not wrapper.set_position(length + 1)
+        assert wrapper.set_position(length - 100)
+
+        out = np.ones(300, dtype=np.float32)
+        wrapper.render(300, out)
+        assert np.all(out[100:] == 0)
+        assert wrapper.get_position() == length
+
     @patch('editor.audio.synth_wrapper.synth_engine.SynthEngine')
     def test_render_instrument_note_returns_numpy_array(self, mock_engine_class):
         """Test that render_instrument_note returns proper numpy array"""
@@ -136,6 +189,31 @@ class TestSynthWrapperAudioRendering:
                 # Engine might fail to render with invalid parameters, which is expected
                 pass
 
+    @patch('editor.audio.synth_wrapper.synth_engine.SynthEngine')
+    def test_render_instrument_note_window(self, mock_engine_class):
+        """Test that windowed renders are passed through to the engine"""
+        mock_engine = Mock()
+        mock_engine.initialize.return_value = True
+        mock_engine.render_instrument_note_window.return_value = [0.5, -0.5]
+        mock_engine_class.return_value = mock_engine
+
+        wrapper = SynthWrapper()
+        result = wrapper.render_instrument_note_window(1, 20, 100, 2, 42336)
+
+        assert result.dtype == np.float32
+        np.testing.assert_array_equal(result, np.float32([0.5, -0.5]))
+        mock_engine.render_instrument_note_window.assert_called_once_with(1, 20, 100, 2, 42336)
+
+    def test_render_windows_match_full_note_with_real_engine(self, wrapper):
+        """Test that consecutive windows continue the note seamlessly"""
+        samples_per_note = synth_engine.SAMPLES_PER_NOTE  # pylint: disable=c-extension-no-member
+        full = wrapper.render_instrument_note(0, 60)
+        release = samples_per_note * 8
+        first = wrapper.render_instrument_note_window(0, 60, 0, 1000, release)
+        second = wrapper.render_instrument_note_window(0, 60, 1000, 2000, release)
+
+        np.testing.assert_array_equal(np.concatenate((first, second)), full[:3000])
+
     @patch('editor.audio.synth_wrapper.synth_engine.SynthEngine')
     def test_render_empty_samples(self, mock_engine_class):
         """Test handling of empty sample arrays"""
@@ -185,6 +263,50 @@ class TestSynthWrapperInstrumentAccess:
         assert result is mock_instrument
         mock_engine.get_instrument.assert_called_once_with(1)
 
+    @patch('editor.audio.synth_wrapper.synth_engine.SynthEngine')
+    def test_find_instruction_parameters(self, mock_engine_class):
+        """Test that the first instruction of the requested type is returned"""
+        mock_instrument = Mock()
+        mock_instrument.get_instructions.return_value = [1, 3, 2, 7]
+        mock_instrument.get_instruction_parameters_full.return_value = [64, 64, 64, 0]
+        mock_engine = Mock()
+        mock_engine.initialize.return_value = True
+        mock_engine.get_instrument.return_value = mock_instrument
+        mock_engine_class.return_value = mock_engine
+
+        wrapper = SynthWrapper()
+        result = wrapper.find_instruction_parameters(0, 2)
+
+        assert result == [64, 64, 64, 0]
+        mock_instrument.get_instruction_parameters_full.assert_called_once_with(2)
+
+    @patch('editor.audio.synth_wrapper.synth_engine.SynthEngine')
+    def test_find_instruction_parameters_missing(self, mock_engine_class):
+        """Test that None is returned when the instruction is not used"""
+        mock_instrument = Mock()
+        mock_instrument.get_instructions.return_value = [1, 7]
+        mock_engine = Mock()
+        mock_engine.initialize.return_value = True
+        mock_engine.get_instrument.return_value = mock_instrument
+        mock_engine_class.return_value = mock_engine
+
+        wrapper = SynthWrapper()
+
+        assert wrapper.find_instruction_parameters(0, 5) is None
+
+    def test_parameter_update_reaches_render_with_real_engine(self, wrapper):
+        """Test that an edited parameter is used by the next render"""
+        instrument = wrapper.get_instrument(0)
+        transpose = instrument.get_instruction_parameters_full(1)[0]
+        original = wrapper.render_instrument_note(0, 60)
+
+        instrument.update_parameter(1, 0, transpose + 12)
+        transposed = wrapper.render_instrument_note(0, 60)
+        instrument.update_parameter(1, 0, transpose)
+
+        assert not np.array_equal(transposed[:1000], original[:1000])
+        np.testing.assert_array_equal(wrapper.render_instrument_note(0, 60), original)
+
     def test_has_instruments_when_available(self, wrapper):
         """Test has_instruments returns True when instruments are available"""
         # SynthWrapper should have instruments available if engine is initialized
@@ -255,6 +377,790 @@ class TestSynthWrapperStatus:
         assert result is True
 
 
+class TestSynthWrapperControlRate:
+    """Test control-rate evaluation"""
+
+    @pytest.fixture
+    def wrapper(self):
+        """Fixture providing initialized SynthWrapper"""
+        return SynthWrapper()
+
+    @patch('editor.audio.synth_wrapper.synth_engine.SynthEngine')
+    def test_measure_control_rate_error(self, mock_engine_class):
+        """Test that the engine error report is converted to a dictionary"""
+        mock_engine = Mock()
+        mock_engine.initialize.return_value = True
+        mock_engine.measure_control_rate_error.return_value = Mock(
+            max_error=0.25, rms_error=0.125, reference_rms=0.5)
+        mock_engine_class.return_value = mock_engine
+
+        wrapper = SynthWrapper()
+        result = wrapper.measure_control_rate_error(1, 20, 32)
+
+        assert result == {'max_error': 0.25, 'rms_error': 0.125, 'reference_rms': 0.5}
+        mock_engine.measure_control_rate_error.assert_called_once_with(1, 20, 32)
+
+    def test_control_rate_range_with_real_engine(self, wrapper):
+        """Test that full rate is the default and invalid rates are rejected"""
+        max_rate = synth_engine.MAX_CONTROL_RATE  # pylint: disable=c-extension-no-member
+        assert wrapper.get_control_rate() == 1
+        assert not wrapper.set_control_rate(0)
+        assert not wrapper.set_control_rate(max_rate + 1)
+        assert wrapper.set_control_rate(32)
+        assert wrapper.get_control_rate() == 32
+        assert wrapper.set_control_rate(1)
+
+    def test_envelope_is_exact_at_control_rate_with_real_engine(self, wrapper):
+        """Test that an envelope without modulation renders identically"""
+        full = wrapper.render_instrument_note(0, 60)
+        result = wrapper.measure_control_rate_error(0, 60, 64)
+
+        assert result['max_error'] == 0.0
+        assert result['reference_rms'] > 0.0
+        assert wrapper.get_control_rate() == 1
+        np.testing.assert_array_equal(wrapper.render_instrument_note(0, 60), full)
+
+
+class TestSynthWrapperWavetable:
+    """Test the wavetable oscillator mode"""
+
+    @pytest.fixture
+    def wrapper(self):
+        """Fixture providing initialized SynthWrapper"""
+        return SynthWrapper()
+
+    def test_wavetable_mode_with_real_engine(self, wrapper):
+        """Test that the mode is opt-in and switching back restores the rendering"""
+        polynomial = wrapper.render_instrument_note(0, 60)
+        assert not wrapper.get_wavetable_mode()
+
+        wrapper.set_wavetable_mode(True)
+        assert wrapper.get_wavetable_mode()
+        wavetable = wrapper.render_instrument_note(0, 60)
+        assert len(wavetable) > 0
+        assert not np.array_equal(wavetable[:len(polynomial)], polynomial[:len(wavetable)])
+
+        wrapper.set_wavetable_mode(False)
+        np.testing.assert_array_equal(wrapper.render_instrument_note(0, 60), polynomial)
+
+
+class TestSynthWrapperSubnormals:
+    """Test flush-to-zero and subnormal counting"""
+
+    @pytest.fixture
+    def wrapper(self):
+        """Fixture providing initialized SynthWrapper"""
+        return SynthWrapper()
+
+    @patch('editor.audio.synth_wrapper.synth_engine.SynthEngine')
+    def test_count_subnormals(self, mock_engine_class):
+        """Test that counters are reset before the note is rendered"""
+        mock_engine = Mock()
+        mock_engine.initialize.return_value = True
+        mock_engine.get_subnormal_counts.return_value = [0, 12, 3]
+        mock_engine_class.return_value = mock_engine
+
+        wrapper = SynthWrapper()
+        result = wrapper.count_subnormals(2, 40)
+
+        assert result == [0, 12, 3]
+        assert mock_engine.method_calls[-3:] == [
+            call.reset_subnormal_counts(),
+            call.render_instrument_note(2, 40),
+            call.get_subnormal_counts(2),
+        ]
+
+    def test_flush_to_zero_with_real_engine(self, wrapper):
+        """Test that flushing is the default and leaves no subnormal results"""
+        assert wrapper.get_flush_to_zero()
+        counts = wrapper.count_subnormals(0, 60)
+        assert len(counts) == len(wrapper.get_instrument(0).get_instructions())
+        assert not any(counts)
+
+
+class TestSynthWrapperVoicePool:
+    """Test the polyphonic voice pools"""
+
+    @pytest.fixture
+    def wrapper(self):
+        """Fixture providing SynthWrapper rendering every voice"""
+        wrapper = SynthWrapper()
+        wrapper.set_cpu_budget(0.0)
+        return wrapper
+
+    @patch('editor.audio.synth_wrapper.synth_engine.SynthEngine')
+    def test_get_voice_stats(self, mock_engine_class):
+        """Test that the statistics are returned as a dictionary"""
+        mock_engine = Mock()
+        mock_engine.initialize.return_value = True
+        mock_engine.get_voice_stats.return_value = Mock(active_voices=2, peak_voices=4,
+                                                        steals=3, budget_steals=1)
+        mock_engine_class.return_value = mock_engine
+
+        wrapper = SynthWrapper()
+        assert wrapper.get_voice_stats(1) == {'active_voices': 2, 'peak_voices': 4,
+                                              'steals': 3, 'budget_steals': 1}
+        mock_engine.get_voice_stats.assert_called_once_with(1)
+
+    def test_single_voice_matches_note_with_real_engine(self, wrapper):
+        """Test that a voice renders like render_instrument_note"""
+        expected = wrapper.render_instrument_note(2, 45)
+
+        assert wrapper.voice_note_on(2, 45)
+        held = wrapper.render_voice_block(SAMPLES_PER_NOTE * 8)
+        wrapper.voice_note_off(2, 45)
+        released = wrapper.render_voice_block(SAMPLES_PER_NOTE * 2)
+        samples = np.concatenate((held, released))
+        np.testing.assert_array_equal(samples[:len(expected)], expected)
+        assert wrapper.get_voice_stats(2)['active_voices'] == 0
+
+    def test_overlapping_voices_with_real_engine(self, wrapper):
+        """Test that a new note leaves the release of the previous one playing"""
+        released = wrapper.render_instrument_note_window(0, 48, 0, 1024, 0)
+        held = wrapper.render_instrument_note(0, 55)[:1024]
+
+        wrapper.voice_note_on(0, 48)
+        wrapper.voice_note_off(0, 48)
+        wrapper.voice_note_on(0, 55)
+        mix = wrapper.render_voice_block(1024)
+        assert wrapper.get_voice_stats(0)['peak_voices'] == 2
+        np.testing.assert_array_equal(mix, held + released)
+        assert np.any(released)
+
+    def test_voice_stealing_with_real_engine(self, wrapper):
+        """Test that full pools take over released, then old or quiet voices"""
+        assert wrapper.set_voice_count(0, 2)
+        assert not wrapper.set_voice_count(0, 0)
+        assert not wrapper.set_voice_count(0, synth_engine.MAX_VOICES + 1)
+        wrapper.voice_note_on(0, 40)
+        wrapper.voice_note_on(0, 50)
+        wrapper.voice_note_off(0, 50)
+        wrapper.voice_note_on(0, 60)
+        wrapper.voice_note_on(0, 70)
+        stats = wrapper.get_voice_stats(0)
+        assert stats['active_voices'] == 2
+        assert stats['peak_voices'] == 2
+        assert stats['steals'] == 2
+
+        wrapper.stop_voices()
+        wrapper.reset_voice_stats()
+        assert wrapper.set_voice_stealing(synth_engine.VOICE_STEAL_QUIETEST)
+        assert not wrapper.set_voice_stealing(2)
+        wrapper.voice_note_on(0, 60)
+        wrapper.render_voice_block(SAMPLES_PER_NOTE)
+        wrapper.voice_note_on(0, 62)
+        wrapper.voice_note_on(0, 64)
+        assert wrapper.get_voice_stats(0) == {'active_voices': 2, 'peak_voices': 2,
+                                              'steals': 1, 'budget_steals': 0}
+
+    def test_cpu_budget_with_real_engine(self, wrapper):
+        """Test that voices beyond the budget are stopped"""
+        assert not wrapper.set_cpu_budget(-1.0)
+        for note in (48, 52, 55):
+            wrapper.voice_note_on(0, note)
+        wrapper.voice_note_on(1, 60)
+        assert wrapper.set_cpu_budget(1e-9)
+        assert np.any(wrapper.render_voice_block(256))
+
+        stats = [wrapper.get_voice_stats(i) for i in range(2)]
+        assert sum(s['active_voices'] for s in stats) == 1
+        assert sum(s['budget_steals'] for s in stats) == 3
+
+
+class TestSynthWrapperProgramCompiler:
+    """Test the compiled instrument programs"""
+
+    @pytest.fixture
+    def wrapper(self):
+        """Fixture providing initialized SynthWrapper"""
+        return SynthWrapper()
+
+    @patch('editor.audio.synth_wrapper.synth_engine.SynthEngine')
+    def test_get_compiled_instructions(self, mock_engine_class):
+        """Test that the opcodes are returned as a list"""
+        mock_engine = Mock()
+        mock_engine.initialize.return_value = True
+        mock_engine.get_compiled_instructions.return_value = (9, 2, 4, 7)
+        mock_engine_class.return_value = mock_engine
+
+        wrapper = SynthWrapper()
+        assert wrapper.get_compiled_instructions(1) == [9, 2, 4, 7]
+        mock_engine.get_compiled_instructions.assert_called_once_with(1)
+
+    def test_compiled_renders_match_interpreter_with_real_engine(self, wrapper):
+        """Test that every instrument and the song render the same either way"""
+        assert wrapper.get_program_compiler()
+        assert wrapper.get_compiled_instructions(0)[0] == synth_engine.KERNEL_VOICE
+        compiled = [wrapper.render_instrument_note(i, 60) for i in range(MAX_NUM_INSTRUMENTS)]
+        song = wrapper.render_note()
+
+        wrapper.set_program_compiler(False)
+        for instrument, samples in enumerate(compiled):
+            np.testing.assert_array_equal(wrapper.render_instrument_note(instrument, 60), samples)
+        np.testing.assert_array_equal(wrapper.render_note(), song)
+
+    def test_silent_instrument_with_real_engine(self, wrapper):
+        """Test that an instrument whose last OUTPUT has gain 0 is skipped"""
+        instrument = wrapper.get_instrument(0)
+        instructions = instrument.get_instructions()
+        output = len(instructions) - 1 - instructions[::-1].index(OUTPUT_ID)
+        gain = instrument.get_instruction_parameters(output)[0]
+        instrument.update_parameter(output, 0, 0)
+        try:
+            assert wrapper.get_compiled_instructions(0)[0] == synth_engine.KERNEL_SILENT
+            assert len(wrapper.render_instrument_note(0, 60)) == 0
+        finally:
+            # The engine data is shared by all wrappers
+            instrument.update_parameter(output, 0, gain)
+        assert wrapper.get_compiled_instructions(0)[0] == synth_engine.KERNEL_VOICE
+
+
+class TestSynthWrapperVoiceBatch:
+    """Test the voice-batched renders"""
+
+    @pytest.fixture
+    def wrapper(self):
+        """Fixture providing initialized SynthWrapper"""
+        return SynthWrapper()
+
+    @patch('editor.audio.synth_wrapper.synth_engine.SynthEngine')
+    def test_get_parameter_bytes(self, mock_engine_class):
+        """Test that two-byte destinations are split like in the engine data"""
+        mock_engine = Mock()
+        mock_engine.initialize.return_value = True
+        mock_engine.get_num_instruments.return_value = 2
+        mock_engine.get_instrument_instructions.side_effect = lambda i: [[1, 4], [5]][i]
+        mock_engine.get_instrument_instruction_parameter_types.side_effect = \
+            lambda i, j: [[[0, 0], [0, 1]], [[0]]][i][j]
+        mock_engine.get_instrument_instruction_parameters_full.side_effect = \
+            lambda i, j: [[[70, 80], [128, 0x4014]], [[64]]][i][j]
+        mock_engine_class.return_value = mock_engine
+
+        wrapper = SynthWrapper()
+        assert list(wrapper.get_parameter_bytes(0)) == [70, 80, 128, 0x14, 0x40, 64]
+        assert list(wrapper.get_parameter_bytes(1)) == [64]
+
+    def test_voice_parity_with_real_engine(self, wrapper):
+        """Test that batched voices match the engine for every instrument"""
+        for instrument in range(wrapper.engine.get_num_instruments()):
+            assert wrapper.check_voice_parity(instrument, [60, 20, 45])
+
+    def test_noise_repeats_with_real_engine(self, wrapper):
+        """Test that a noise note renders the same regardless of earlier renders"""
+        first = wrapper.render_instrument_note(2, 45)
+        wrapper.render_instrument_note(2, 60)
+        wrapper.render_instrument_note(1, 45)
+        np.testing.assert_array_equal(wrapper.render_instrument_note(2, 45), first)
+
+    def test_render_voices_with_real_engine(self, wrapper):
+        """Test that every voice of a batch has its own note"""
+        voices = wrapper.render_voices(0, [48, 60], SAMPLES_PER_NOTE, SAMPLES_PER_NOTE // 2)
+        assert voices.shape == (2, SAMPLES_PER_NOTE)
+        assert voices.dtype == np.float32
+        assert not np.array_equal(voices[0], voices[1])
+
+
+class TestSynthWrapperLayout:
+    """Test engines sized for the instruments and the song length"""
+
+    @patch('editor.audio.synth_wrapper.synth_engine.SynthEngine')
+    def test_engine_size(self, mock_engine_class):
+        """Test that the sizes are passed to the engine"""
+        mock_engine_class.return_value = Mock()
+
+        SynthWrapper(64, 120)
+        mock_engine_class.assert_called_once_with(64, 120)
+
+    def test_packed_workspaces_with_real_engine(self):
+        """Test that every instrument has one workspace per instruction, back to back"""
+        wrapper = SynthWrapper(64, 4)
+        engine = wrapper.engine
+        assert engine.get_num_instruments() == 64
+        assert engine.get_patterns_per_instrument() == 4
+        assert len(engine.get_instrument_patterns(63)) == 4
+
+        offset = 0
+        for instrument in range(64):
+            workspaces = max(len(engine.get_instrument_instructions(instrument)), 1)
+            assert engine.get_instrument_data_offset(instrument) == offset
+            assert engine.get_instrument_data_length(instrument) == 12 + workspaces * 64
+            offset += engine.get_instrument_data_length(instrument)
+        # The song instrument follows the instruments
+        assert engine.get_synth_data_size() > offset
+
+    def test_engines_side_by_side_with_real_engine(self):
+        """Test that instruments past the song render like the ones they copy"""
+        small = SynthWrapper()
+        expected = small.render_instrument_note(1, 45)
+        large = SynthWrapper(64)
+
+        np.testing.assert_array_equal(large.render_instrument_note(MAX_NUM_INSTRUMENTS + 1, 45),
+                                      expected)
+        np.testing.assert_array_equal(small.render_instrument_note(1, 45), expected)
+        assert large.check_voice_parity(62, [60, 45])
+
+
+class TestSynthWrapperTiming:
+    """Test the sample rate and tempo chosen at runtime"""
+
+    @pytest.fixture
+    def wrapper(self):
+        """Fixture providing initialized SynthWrapper"""
+        return SynthWrapper()
+
+    def test_default_timing_with_real_engine(self, wrapper):
+        """Test that a new engine uses the constants of defines.h"""
+        assert wrapper.get_sample_rate() == 44100
+        assert wrapper.get_tempo() == 125
+        assert wrapper.get_samples_per_note() == SAMPLES_PER_NOTE
+
+    def test_tempo_moves_note_events_with_real_engine(self, wrapper):
+        """Test that the events stay on their rows at a new tempo"""
+        rows = wrapper.get_note_events(0)['sample'][:-1] // SAMPLES_PER_NOTE
+        wrapper.set_position(SAMPLES_PER_NOTE * 3)
+
+        assert wrapper.set_tempo(250)
+        note_length = samples_per_note(44100, 250)
+        assert wrapper.get_samples_per_note() == note_length
+        assert wrapper.get_song_length() == PATTERNS_PER_INSTRUMENT * 16 * note_length
+        assert wrapper.get_position() == note_length * 3
+        np.testing.assert_array_equal(wrapper.get_note_events(0)['sample'][:-1], rows * note_length)
+
+    def test_invalid_timing_with_real_engine(self, wrapper):
+        """Test that rates and tempos out of range are rejected"""
+        # pylint: disable=c-extension-no-member
+        assert not wrapper.set_tempo(synth_engine.MIN_TEMPO - 1)
+        assert not wrapper.set_tempo(synth_engine.MAX_TEMPO + 1)
+        assert not wrapper.set_sample_rate(synth_engine.MIN_SAMPLE_RATE - 1)
+        assert not wrapper.set_sample_rate(synth_engine.MAX_SAMPLE_RATE + 1)
+        assert wrapper.get_tempo() == 125
+        assert wrapper.get_sample_rate() == 44100
+
+    def test_sample_rate_with_real_engine(self, wrapper):
+        """Test that other rates render like the batched voices and 44.1 kHz returns"""
+        expected = wrapper.render_instrument_note(1, 45)
+
+        assert wrapper.set_sample_rate(22050)
+        assert wrapper.get_samples_per_note() == SAMPLES_PER_NOTE // 2
+        assert wrapper.check_voice_parity(1, [60, 45])
+        assert wrapper.set_sample_rate(48000)
+        assert wrapper.check_voice_parity(2, [60, 45])
+
+        assert wrapper.set_sample_rate(44100)
+        np.testing.assert_array_equal(wrapper.render_instrument_note(1, 45), expected)
+
+
+class TestSynthWrapperDraft:
+    """Test the draft renders at a reduced sample rate"""
+
+    @patch('editor.audio.synth_wrapper.synth_engine.SynthEngine')
+    def test_draft_is_upsampled(self, mock_engine_class):
+        """Test that the engine renders the reduced window and the wrapper upsamples it"""
+        mock_engine = Mock()
+        mock_engine.initialize.return_value = True
+        mock_engine.render_instrument_note_draft.return_value = [0.5] * 26
+        mock_engine_class.return_value = mock_engine
+
+        wrapper = SynthWrapper()
+        assert wrapper.get_draft_factor() == 2
+        assert wrapper.set_draft_factor(4)
+        assert not wrapper.set_draft_factor(3)
+        draft = wrapper.render_draft_note_window(1, 20, 101, 80)
+
+        mock_engine.render_instrument_note_draft.assert_called_once_with(1, 20, 101, 80, 4)
+        assert draft.dtype == np.float32
+        assert len(draft) == 101
+        np.testing.assert_array_equal(draft[0:80:4], np.float32([0.5] * 20))
+
+    def test_draft_follows_full_render_with_real_engine(self):
+        """Test that a draft is close to the full render and leaves it unchanged"""
+        wrapper = SynthWrapper()
+        num_samples = SAMPLES_PER_NOTE * 2
+        full = wrapper.render_instrument_note_window(0, 20, 0, num_samples, SAMPLES_PER_NOTE)
+
+        draft = wrapper.render_draft_note_window(0, 20, num_samples, SAMPLES_PER_NOTE)
+        assert len(draft) == num_samples
+        assert np.sqrt(np.mean((draft - full) ** 2)) < 0.1 * np.sqrt(np.mean(full ** 2))
+
+        # A window resumed after the draft continues the full render
+        rest = wrapper.render_instrument_note_window(0, 20, num_samples, 100, SAMPLES_PER_NOTE)
+        whole = wrapper.render_instrument_note_window(0, 20, 0, num_samples + 100,
+                                                      SAMPLES_PER_NOTE)
+        np.testing.assert_array_equal(rest, whole[num_samples:])
+        np.testing.assert_array_equal(whole[:num_samples], full)
+
+
+class TestSynthWrapperAudition:
+    """Test the key-press auditions with the exact render on a worker"""
+
+    @staticmethod
+    def wait_for_exact(wrapper, instrument_num, note_num, **kwargs):
+        """Audition a note and wait for its exact render"""
+        done = threading.Event()
+        exact = []
+        stand_in = wrapper.audition_note(
+            instrument_num, note_num,
+            on_exact=lambda *args: (exact.append(args), done.set()), **kwargs)
+        assert done.wait(5.0)
+        return stand_in, exact[0]
+
+    @patch('editor.audio.synth_wrapper.synth_engine.SynthEngine')
+    def test_nearest_note_stands_in(self, mock_engine_class):
+        """Test that the nearest rendered note is pitch-shifted until the exact render is ready"""
+        mock_engine = Mock()
+        mock_engine.initialize.return_value = True
+        mock_engine.render_instrument_note.side_effect = (
+            lambda instrument, note: list(np.arange(8, dtype=np.float32) + note))
+        mock_engine_class.return_value = mock_engine
+
+        wrapper = SynthWrapper()
+        stand_in, exact = self.wait_for_exact(wrapper, 1, 60)
+        assert len(stand_in) == 0
+        assert exact[:2] == (1, 60)
+        np.testing.assert_array_equal(exact[2], np.arange(8) + 60)
+
+        # Cached notes are returned without rendering
+        np.testing.assert_array_equal(wrapper.audition_note(1, 60), exact[2])
+        assert mock_engine.render_instrument_note.call_count == 1
+
+        # An octave up reads every second sample of the nearest note
+        stand_in, exact = self.wait_for_exact(wrapper, 1, 72)
+        np.testing.assert_array_equal(stand_in, np.float32([60, 62, 64, 66, 0, 0, 0, 0]))
+        np.testing.assert_array_equal(exact[2], np.arange(8) + 72)
+        assert len(wrapper.audition_note(2, 72)) == 0
+
+    @patch('editor.audio.synth_wrapper.synth_engine.SynthEngine')
+    def test_changed_instrument_renders_again(self, mock_engine_class):
+        """Test that outdated notes only stand in for the exact render"""
+        mock_engine = Mock()
+        mock_engine.initialize.return_value = True
+        mock_engine.render_instrument_note.return_value = [0.25] * 4
+        mock_engine_class.return_value = mock_engine
+
+        wrapper = SynthWrapper()
+        self.wait_for_exact(wrapper, 0, 60)
+        wrapper.invalidate_note_cache(0)
+
+        mock_engine.render_instrument_note.return_value = [0.5] * 4
+        stand_in, exact = self.wait_for_exact(wrapper, 0, 60, interpolation='sinc')
+        np.testing.assert_allclose(stand_in, [0.25] * 4, atol=1e-6)
+        np.testing.assert_array_equal(exact[2], [0.5] * 4)
+        with pytest.raises(ValueError):
+            wrapper.audition_note(0, 60, interpolation='cubic')
+
+    @patch('editor.audio.synth_wrapper.synth_engine.SynthEngine')
+    def test_failed_render_is_reported(self, mock_engine_class, caplog):
+        """Test that a failed exact render is logged and passed on as None"""
+        mock_engine = Mock()
+        mock_engine.initialize.return_value = True
+        mock_engine.render_instrument_note.side_effect = RuntimeError("out of voices")
+        mock_engine_class.return_value = mock_engine
+
+        wrapper = SynthWrapper()
+        _, exact = self.wait_for_exact(wrapper, 2, 60)
+        assert exact == (2, 60, None)
+        assert "out of voices" in caplog.text
+
+        # The next press tries again
+        mock_engine.render_instrument_note.side_effect = None
+        mock_engine.render_instrument_note.return_value = [0.5] * 4
+        _, exact = self.wait_for_exact(wrapper, 2, 60)
+        np.testing.assert_array_equal(exact[2], [0.5] * 4)
+
+    @patch('editor.audio.synth_wrapper.synth_engine.SynthEngine')
+    def test_parameter_update_waits_for_render(self, mock_engine_class):
+        """Test that parameter updates wait for the worker and outdate its notes"""
+        events = []
+        started = threading.Event()
+
+        def render(instrument, note):
+            events.append('render start')
+            started.set()
+            time.sleep(0.05)
+            events.append('render end')
+            return [0.25] * 4
+
+        mock_engine = Mock()
+        mock_engine.initialize.return_value = True
+        mock_engine.render_instrument_note.side_effect = render
+        mock_engine.update_instrument_parameter.side_effect = (
+            lambda *args: events.append('update') or True)
+        mock_engine.update_instrument_parameter_with_string.return_value = True
+        mock_engine_class.return_value = mock_engine
+
+        wrapper = SynthWrapper()
+        wrapper.audition_note(0, 60)
+        assert started.wait(5.0)
+        assert wrapper.update_parameter(0, 1, 2, 90)
+        assert events == ['render start', 'render end', 'update']
+
+        # The note rendered before the update is rendered again
+        wrapper.audition_note(0, 60)
+        assert started.wait(5.0)
+        assert wrapper.update_parameter(0, 1, 0, 'LOWPASS')
+        mock_engine.update_instrument_parameter_with_string.assert_called_once_with(
+            0, 1, 0, 'LOWPASS')
+
+    def test_exact_note_matches_render_with_real_engine(self):
+        """Test that the worker renders the same note as a direct render"""
+        wrapper = SynthWrapper()
+        _, exact = self.wait_for_exact(wrapper, 0, 69)
+        np.testing.assert_array_equal(exact[2], wrapper.render_instrument_note(0, 69))
+
+        stand_in, _ = self.wait_for_exact(wrapper, 0, 70)
+        assert len(stand_in) == len(exact[2])
+
+
+class TestSynthWrapperSong:
+    """Test loading song data at runtime"""
+
+    @patch('editor.audio.synth_wrapper.synth_engine.SynthEngine')
+    def test_load_song_passes_tables(self, mock_engine_class):
+        """Test that the four tables reach the engine as byte arrays"""
+        mock_engine = Mock()
+        mock_engine.initialize.return_value = True
+        mock_engine.load_song.return_value = True
+        mock_engine_class.return_value = mock_engine
+
+        wrapper = SynthWrapper()
+        song = SongData(*(np.array(table, dtype=np.uint8)
+                          for table in ([7, 0, 0], [128], [0] * 62, [60] + [HLD] * 15)))
+        assert wrapper.load_song(song)
+        tables = mock_engine.load_song.call_args.args
+        assert [table.dtype for table in tables] == [np.uint8] * 4
+        assert [table.tolist() for table in tables] == [[7, 0, 0], [128], [0] * 62,
+                                                        [60] + [HLD] * 15]
+
+    def test_parsed_song_matches_assembled_with_real_engine(self):
+        """Test that loading the parsed song.asm renders like the assembled song"""
+        wrapper = SynthWrapper()
+        instrument = wrapper.get_instrument(0)
+        before = wrapper.render_instrument_note(1, 60)
+        song = parse_song()
+        assert wrapper.load_song(song)
+        np.testing.assert_array_equal(wrapper.render_instrument_note(1, 60), before)
+
+        # An edited attack shows in the instrument returned before the load
+        parameters = song.parameters.copy()
+        parameters[0] = 12
+        assert wrapper.load_song(song._replace(parameters=parameters))
+        assert instrument.get_instruction_parameters(0)[0] == 12
+
+    def test_malformed_song_is_rejected_with_real_engine(self):
+        """Test that the engine keeps its song when the tables do not fit together"""
+        wrapper = SynthWrapper()
+        song = parse_song()
+        assert not wrapper.load_song(song._replace(parameters=song.parameters[:-1]))
+        assert not wrapper.load_song(song._replace(pattern_array=song.pattern_array[:16]))
+        assert wrapper.get_instrument(0).get_instruction_parameters(0)[0] == song.parameters[0]
+
+    def test_storeval_past_synth_data_is_rejected_with_real_engine(self):
+        """Test that STOREVAL may write into any instrument but not past the synth data"""
+        wrapper = SynthWrapper()
+        song = parse_song()
+
+        def with_storeval(destination):
+            # STOREVAL first in the program of instrument 0, whose data starts synth_data
+            return song._replace(
+                instructions=np.insert(song.instructions, 0, STOREVAL_ID),
+                parameters=np.insert(song.parameters, 0,
+                                     [64, destination & 0xFF, destination >> 8]).astype(np.uint8))
+
+        assert wrapper.load_song(with_storeval(4))
+        data_size = wrapper.engine.get_synth_data_size()
+        assert wrapper.load_song(with_storeval(data_size - 4))
+        assert not wrapper.load_song(with_storeval(data_size - 3))
+        assert wrapper.get_instrument(0).get_instruction_parameters(0)[1] == (data_size - 4) & 0xFF
+
+        # Parameter edits are held to the same bound
+        assert not wrapper.update_parameter(0, 0, 1, data_size)
+        assert wrapper.update_parameter(0, 0, 1, 0)
+
+
+class TestSynthWrapperProject:
+    """Test projects saved from and loaded into the engine"""
+
+    @patch('editor.audio.synth_wrapper.synth_engine.SynthEngine')
+    def test_get_song_pads_pattern_rows(self, mock_engine_class):
+        """Test that the song data of a short engine comes in rows of PATTERNS_PER_INSTRUMENT"""
+        mock_engine = Mock()
+        mock_engine.initialize.return_value = True
+        mock_engine.get_num_instruments.return_value = 2
+        mock_engine.get_instrument_patterns.side_effect = lambda i: [i + 1] * 4
+        mock_engine.get_program_bytes.return_value = [7, 0, 0, 0]
+        mock_engine.get_parameter_bytes.return_value = [128]
+        mock_engine.get_pattern_array.return_value = [0] * 48
+        mock_engine_class.return_value = mock_engine
+
+        song = SynthWrapper().get_song()
+        assert song.patterns.shape == (2 * PATTERNS_PER_INSTRUMENT,)
+        assert song.patterns[:5].tolist() == [1, 1, 1, 1, 0]
+        assert song.patterns[PATTERNS_PER_INSTRUMENT:][:5].tolist() == [2, 2, 2, 2, 0]
+        assert song.instructions.tolist() == [7, 0, 0, 0]
+
+    @patch('editor.audio.synth_wrapper.synth_engine.SynthEngine')
+    def test_rejected_project_keeps_song(self, mock_engine_class):
+        """Test that the settings are checked before the song is replaced"""
+        mock_engine = Mock()
+        mock_engine.initialize.return_value = True
+        mock_engine_class.return_value = mock_engine
+
+        wrapper = SynthWrapper()
+        song = SongData(*(np.array(table, dtype=np.uint8)
+                          for table in ([7, 0, 0], [128], [0] * 62, [60] + [HLD] * 15)))
+        assert not wrapper.load_project(ProjectData(song, sample_rate=1000))
+        assert not wrapper.load_project(ProjectData(song, tempo=5000))
+        mock_engine.load_song.assert_not_called()
+
+    def test_project_round_trip_with_real_engine(self, tmp_path):
+        """Test that a saved project loads back into the same song"""
+        wrapper = SynthWrapper()
+        instrument = wrapper.get_instrument(0)
+        instrument.update_parameter(0, 0, 12)
+        expected = wrapper.render_instrument_note(0, 60)
+        project_file = ProjectFile(tmp_path / 'song.d4kp')
+        project_file.save(wrapper.get_project())
+
+        assert wrapper.load_song(parse_song())
+        assert wrapper.load_project(project_file.load())
+        assert instrument.get_instruction_parameters(0)[0] == 12
+        np.testing.assert_array_equal(wrapper.render_instrument_note(0, 60), expected)
+
+
+class TestSynthWrapperPresets:
+    """Test loading preset patches into instruments"""
+
+    @pytest.fixture
+    def mock_engine(self):
+        """Engine whose instruments play an ENVELOPE and an OUTPUT"""
+        mock_engine = Mock()
+        mock_engine.initialize.return_value = True
+        mock_engine.get_instrument_instructions.return_value = [ENVELOPE_ID, OUTPUT_ID]
+        mock_engine.set_instrument_parameter_bytes.return_value = True
+        mock_engine.load_song.return_value = True
+        mock_engine.get_num_instruments.return_value = 2
+        mock_engine.get_instrument_patterns.return_value = [0] * PATTERNS_PER_INSTRUMENT
+        mock_engine.get_program_bytes.return_value = [ENVELOPE_ID, OUTPUT_ID, 0,
+                                                      ENVELOPE_ID, OUTPUT_ID, 0, 0]
+        mock_engine.get_parameter_bytes.return_value = list(range(12))
+        mock_engine.get_pattern_array.return_value = [0] * 16
+        return mock_engine
+
+    @patch('editor.audio.synth_wrapper.synth_engine.SynthEngine')
+    def test_same_program_is_one_write(self, mock_engine_class, mock_engine):
+        """Test that a preset with the instrument's program only writes its parameters"""
+        mock_engine_class.return_value = mock_engine
+        wrapper = SynthWrapper()
+        preset = Preset('key', 'Pluck', (), bytes([ENVELOPE_ID, OUTPUT_ID]), bytes(range(6)))
+
+        assert wrapper.load_preset(1, preset)
+        mock_engine.set_instrument_parameter_bytes.assert_called_once_with(1, list(range(6)))
+        mock_engine.load_song.assert_not_called()
+
+    @patch('editor.audio.synth_wrapper.synth_engine.SynthEngine')
+    def test_other_program_rebuilds_song(self, mock_engine_class, mock_engine):
+        """Test that a preset with another program is spliced into the song data"""
+        mock_engine_class.return_value = mock_engine
+        wrapper = SynthWrapper()
+        preset = Preset('key', 'Tone', (), bytes([OUTPUT_ID]), bytes([99]))
+
+        assert wrapper.load_preset(1, preset)
+        instructions, parameters = mock_engine.load_song.call_args.args[:2]
+        assert instructions.tolist() == [ENVELOPE_ID, OUTPUT_ID, 0, OUTPUT_ID, 0, 0]
+        assert parameters.tolist() == [0, 1, 2, 3, 4, 5, 99]
+        mock_engine.set_instrument_parameter_bytes.assert_not_called()
+
+    def test_preset_round_trip_with_real_engine(self, tmp_path):
+        """Test that a stored patch restores the parameters and the sound of an instrument"""
+        wrapper = SynthWrapper()
+        library = PresetLibrary(tmp_path / 'presets.d4kl')
+        preset = library.add('First', *wrapper.get_patch(0), tags=['test'])
+        expected = wrapper.render_instrument_note(0, 60)
+
+        instrument = wrapper.get_instrument(0)
+        instrument.update_parameter(0, 0, (preset.parameters[0] + 1) % 256)
+        assert wrapper.get_patch(0)[1] != preset.parameters
+        assert wrapper.load_preset(0, library.find(tags=['test'])[0])
+        assert wrapper.get_patch(0) == (preset.instructions, preset.parameters)
+        np.testing.assert_array_equal(wrapper.render_instrument_note(0, 60), expected)
+
+        # The program of instrument 1 replaces the one of instrument 0
+        other = library.add('Second', *wrapper.get_patch(1))
+        assert wrapper.load_preset(0, other)
+        assert wrapper.get_patch(0) == (other.instructions, other.parameters)
+
+    def test_storeval_past_synth_data_is_rejected_with_real_engine(self):
+        """Test that a preset of the same program cannot store past the synth data"""
+        wrapper = SynthWrapper()
+        song = parse_song()
+        assert wrapper.load_song(song._replace(
+            instructions=np.insert(song.instructions, 0, STOREVAL_ID),
+            parameters=np.insert(song.parameters, 0, [64, 4, 0]).astype(np.uint8)))
+        instructions, parameters = wrapper.get_patch(0)
+
+        destination = wrapper.engine.get_synth_data_size()
+        far = Preset('key', 'Far', (), instructions,
+                     bytes([64, destination & 0xFF, destination >> 8]) + parameters[3:])
+        assert not wrapper.load_preset(0, far)
+        assert wrapper.get_patch(0)[1] == parameters
+
+
+class TestSynthWrapperNoteEvents:
+    """Test the note events played by the engine"""
+
+    @pytest.fixture
+    def wrapper(self):
+        """Fixture providing initialized SynthWrapper"""
+        return SynthWrapper()
+
+    @patch('editor.audio.synth_wrapper.synth_engine.SynthEngine')
+    def test_compile_note_events(self, mock_engine_class):
+        """Test that the patterns of every instrument are compiled and uploaded"""
+        mock_engine = Mock()
+        mock_engine.initialize.return_value = True
+        mock_engine.get_num_instruments.return_value = 2
+        mock_engine.get_patterns_per_instrument.return_value = PATTERNS_PER_INSTRUMENT
+        mock_engine.get_instrument_patterns.side_effect = lambda i: [i] * PATTERNS_PER_INSTRUMENT
+        mock_engine.get_pattern_array.return_value = [60, HLD, 62] + [HLD] * 13 + [HLD] * 16
+        mock_engine.get_samples_per_note.return_value = 5000
+        mock_engine.set_note_events.return_value = True
+        mock_engine_class.return_value = mock_engine
+
+        wrapper = SynthWrapper()
+        assert wrapper.compile_note_events()
+
+        first, second = mock_engine.set_note_events.call_args_list
+        assert first.args[0] == 0
+        # Spaced at the engine's tempo
+        assert first.args[1][:4] == [0, 60 | NOTE_EVENT_ON << 8, 10000, 62 | NOTE_EVENT_ON << 8]
+        assert len(first.args[1]) == 2 * (2 * PATTERNS_PER_INSTRUMENT + 1)
+        assert second.args == (1, [NOTE_EVENT_END, 0])
+
+    def test_compiled_events_match_engine_with_real_engine(self, wrapper):
+        """Test that the NumPy builder produces the lists built by the engine"""
+        built = [wrapper.get_note_events(i) for i in range(wrapper.engine.get_num_instruments())]
+        song = wrapper.render_note()
+
+        assert wrapper.compile_note_events()
+        for instrument, events in enumerate(built):
+            assert events['sample'][-1] == NOTE_EVENT_END
+            np.testing.assert_array_equal(wrapper.get_note_events(instrument), events)
+        np.testing.assert_array_equal(wrapper.render_note(), song)
+
+        # Compiling again keeps the tempo
+        assert wrapper.set_tempo(90)
+        built = wrapper.get_note_events(0)
+        assert wrapper.compile_note_events()
+        np.testing.assert_array_equal(wrapper.get_note_events(0), built)
+
+    def test_set_note_events_with_real_engine(self, wrapper):
+        """Test that lists without end marker are rejected"""
+        events = wrapper.get_note_events(0)
+        assert wrapper.set_note_events(0, events)
+        assert not wrapper.set_note_events(0, events[:-1])
+        assert not wrapper.set_note_events(MAX_NUM_INSTRUMENTS, events)
+
+
 class TestSynthWrapperConstants:
     """Test synthesizer constants access"""
 
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Tests for the voice-batched instrument renderer
+
+This test suite validates that:
+- Every voice of a batch renders like the same voice rendered alone
+- Envelope and noise lanes match the analytic replicas bit for bit
+- Noise lanes are seeded from the note, the same note plays the same noise
+- Voices in release, stopped notes and STOREVAL feedback behave per lane
+- Programs without a batched implementation are rejected
+
+Running Tests:
+    pytest tests/editor/audio/test_voice_batch.py -v
+"""
+
+import numpy as np
+import pytest
+
+from editor.audio.engine_math import (ENVELOPE_ID, FILTER_ID, FILTER_LOWPASS, OPERATION_ID,
+                                      OSCILLATOR_ID, OSCILLATOR_NOISE, OSCILLATOR_SINE,
+                                      OUTPUT_ID, STOREVAL_ID, transform)
+from editor.audio.envelope_curve import envelope_curve
+from editor.audio.oscillator_preview import noise_seed, noise_sequence
+from editor.audio.voice_batch import INSTRUMENT_LENGTH, INSTRUMENT_WORKSPACES, VoiceBatch
+
+# Instruments 1 and 2 of the song: envelope feedback through STOREVAL, noise and a filter
+SINE_PROGRAM = ([ENVELOPE_ID, STOREVAL_ID, OSCILLATOR_ID, OPERATION_ID, OUTPUT_ID],
+                [72, 96, 96, 88, 128, 128, 20, 0, 64, 64, 64, 0, 40, 64, 128, OSCILLATOR_SINE,
+                 2, 128])
+NOISE_PROGRAM = ([ENVELOPE_ID, STOREVAL_ID, OSCILLATOR_ID, OPERATION_ID, FILTER_ID, OUTPUT_ID],
+                 [0, 76, 0, 0, 32, 128, 20, 0, 64, 64, 64, 0, 64, 64, 128, OSCILLATOR_NOISE,
+                  2, 80, 128, FILTER_LOWPASS, 64])
+ENVELOPE_PARAMS = [20, 40, 96, 30, 100]
+
+
+class TestVoiceBatch:
+    """Test the batched renderer"""
+
+    @pytest.mark.parametrize('program', [SINE_PROGRAM, NOISE_PROGRAM])
+    def test_voices_match_single_voices(self, program):
+        """Test that batching does not change the output of a voice"""
+        notes, releases = [60, 20, 45, 60], [1500, 800, 2500, 100]
+        batched = VoiceBatch(*program).render(notes, 3000, releases)
+
+        assert batched.shape == (4, 3000)
+        for voice, note in enumerate(notes):
+            single = VoiceBatch(*program).render([note], 3000, [releases[voice]])
+            np.testing.assert_array_equal(batched[voice].view(np.uint32), single[0].view(np.uint32))
+        assert not np.array_equal(batched[0], batched[3])
+
+    def test_envelope_lanes(self):
+        """Test envelope lanes against the analytic curve, until the note stops"""
+        batch = VoiceBatch([ENVELOPE_ID, OUTPUT_ID], ENVELOPE_PARAMS + [128])
+        releases = [300, 2000, 5000]
+        output = batch.render([60, 61, 62], 4000, releases)
+
+        for voice, release in enumerate(releases):
+            expected = envelope_curve(ENVELOPE_PARAMS, 4000, release)
+            np.testing.assert_array_equal(output[voice], expected)
+        assert list(batch.notes) == [0, 0, 62]
+
+    def test_noise_lanes(self):
+        """Test that every voice seeds its noise generator from the note and workspace"""
+        batch = VoiceBatch([OSCILLATOR_ID, OUTPUT_ID],
+                           [64, 64, 0, 0, 128, 64, 128, OSCILLATOR_NOISE, 128],
+                           data_offset=2 * INSTRUMENT_LENGTH)
+        output = batch.render([60, 60, 61], 100)
+
+        offset = 2 * INSTRUMENT_LENGTH + INSTRUMENT_WORKSPACES
+        np.testing.assert_array_equal(output[0], noise_sequence(100, noise_seed(60, offset)))
+        np.testing.assert_array_equal(output[1], output[0])
+        np.testing.assert_array_equal(output[2], noise_sequence(100, noise_seed(61, offset)))
+
+    def test_sample_rate(self):
+        """Test that the phase advances twice as far per sample at half the rate"""
+        params = [64, 64, 0, 0, 128, 64, 128, OSCILLATOR_SINE, 128]
+        batch = VoiceBatch([OSCILLATOR_ID, OUTPUT_ID], params)
+        half_rate = VoiceBatch([OSCILLATOR_ID, OUTPUT_ID], params, sample_rate=22050)
+        batch.render([60], 1)
+        half_rate.render([60], 1)
+
+        np.testing.assert_allclose(half_rate.workspace[0], 2 * batch.workspace[0], rtol=1e-4)
+
+    def test_storeval_feedback(self):
+        """Test that the STOREVAL writes the gain modulation of each voice"""
+        batch = VoiceBatch(*SINE_PROGRAM)
+        batch.start([60, 72])
+        for _ in range(10):
+            envelope = batch.workspace[2].copy()
+            batch.next_sample(np.array([False, False]))
+        assert np.all(batch.workspace[2] > envelope)
+        gain = transform(SINE_PROGRAM[1][4])
+        assert np.all(batch.workspace[1] * (gain + envelope) == batch.workspace[2])
+
+    def test_unsupported_programs(self):
+        """Test that instructions and destinations without lanes are rejected"""
+        with pytest.raises(ValueError):
+            VoiceBatch([6, OUTPUT_ID], [64, 128])
+        with pytest.raises(ValueError):
+            VoiceBatch([ENVELOPE_ID, STOREVAL_ID], ENVELOPE_PARAMS + [128, 8, 0])
+        # Past the two workspaces of the program, into the next instrument
+        with pytest.raises(ValueError):
+            VoiceBatch([ENVELOPE_ID, STOREVAL_ID], ENVELOPE_PARAMS + [128, 140, 0])
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Tests for the headless renderer
+
+This test suite validates that:
+- The render subcommand imports no GUI, plotting or audio device modules
+- Command line arguments are parsed into notes and parameter overrides
+- Songs are rendered in chunks, and stems with the other instruments muted
+- Every render starts from a silent engine, whatever was rendered before
+
+Running Tests:
+    pytest tests/editor/test_render.py -v
+"""
+
+import os
+import subprocess
+import sys
+from unittest.mock import Mock, patch
+
+import numpy as np
+import pytest
+
+from editor.audio.audio_file import AudioFileWriter
+from editor.audio.note_events import NOTE_EVENT_END, NOTE_EVENT_ON
+from editor.audio.synth_wrapper import SynthWrapper
+from editor.render import build_parser, main, render_song, solo
+
+GUI_MODULES = ('customtkinter', 'tkinter', 'matplotlib', 'pyaudio', 'editor.gui')
+
+
+@pytest.fixture(name='mock_engine')
+def fixture_mock_engine():
+    """Engine of two instruments with a song of 10000 samples"""
+    mock_engine = Mock()
+    mock_engine.initialize.return_value = True
+    mock_engine.is_initialized.return_value = True
+    mock_engine.get_num_instruments.return_value = 2
+    mock_engine.get_sample_rate.return_value = 44100
+    mock_engine.get_song_length.return_value = 10000
+    mock_engine.get_note_events.side_effect = lambda i: [0, 60 + i, NOTE_EVENT_END, 0]
+    mock_engine.set_note_events.return_value = True
+    mock_engine.render_instrument_note.side_effect = lambda i, n: [0.25] * 100
+
+    def render(num_samples, output):
+        output[:num_samples] = 0.5
+        return num_samples
+    mock_engine.render.side_effect = render
+    return mock_engine
+
+
+class TestRenderImports:
+    """Test the cold start of the renderer"""
+
+    def test_no_gui_imports(self):
+        """Test that importing the render subcommand loads no GUI modules"""
+        code = ("import sys, editor.__main__, editor.render; "
+                f"print([m for m in sys.modules if m.startswith({GUI_MODULES!r})])")
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+        result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True,
+                                env=env, check=True)
+        assert result.stdout.strip() == '[]'
+
+
+class TestRenderArguments:
+    """Test the parsing of the command line"""
+
+    def test_notes_and_overrides(self):
+        """Test that notes and overrides are split into their parts"""
+        args = build_parser().parse_args(['--note', '0:60', '--note', '1:48',
+                                          '--set', '0:FILTER:Frequency=90', 'out.wav'])
+        assert args.note == [(0, 60), (1, 48)]
+        assert args.overrides[0] == (0, 'FILTER', 'Frequency', '90')
+
+    @pytest.mark.parametrize('arguments', [
+        ['--note', '60', 'out.wav'],
+        ['--set', '0:FILTER=90', 'out.wav'],
+        ['--stems', '--note', '0:60', 'out.wav'],
+    ])
+    def test_malformed_arguments(self, arguments):
+        """Test that malformed arguments exit with a usage error"""
+        with pytest.raises(SystemExit):
+            build_parser().parse_args(arguments)
+
+
+class TestRender:
+    """Test rendering to files"""
+
+    @patch('editor.audio.synth_wrapper.synth_engine.SynthEngine')
+    def test_song_in_chunks(self, mock_engine_class, mock_engine, tmp_path):
+        """Test that the song is rendered and written in chunks"""
+        mock_engine_class.return_value = mock_engine
+        path = tmp_path / 'song.raw'
+        assert main(['--chunk', '4096', str(path)]) == 0
+
+        np.testing.assert_array_equal(np.fromfile(path, dtype='<f4'), np.full(10000, 0.5))
+        assert [c.args[0] for c in mock_engine.render.call_args_list] == [4096, 4096, 1808]
+        mock_engine.set_position.assert_called_once_with(0)
+        mock_engine.set_note_events.assert_not_called()
+
+    @patch('editor.audio.synth_wrapper.synth_engine.SynthEngine')
+    def test_stems_mute_the_other_instruments(self, mock_engine_class, mock_engine, tmp_path):
+        """Test that every stem mutes the other instruments and restores their events"""
+        mock_engine_class.return_value = mock_engine
+        assert main(['--stems', '--duration', '0.1', str(tmp_path / 'stem.wav')]) == 0
+
+        assert (tmp_path / 'stem_0.wav').stat().st_size == 44 + 4 * 4410
+        assert (tmp_path / 'stem_1.wav').exists()
+        muted = [(c.args[0], c.args[1][0]) for c in mock_engine.set_note_events.call_args_list]
+        # Muted with an end marker, then restored
+        assert muted == [(1, NOTE_EVENT_END), (1, 0), (0, NOTE_EVENT_END), (0, 0)]
+
+    @patch('editor.audio.synth_wrapper.synth_engine.SynthEngine')
+    def test_notes_and_errors(self, mock_engine_class, mock_engine, tmp_path, capsys):
+        """Test that notes get a file each and bad instruments are reported"""
+        mock_engine_class.return_value = mock_engine
+        assert main(['--note', '0:60', '--note', '1:62', str(tmp_path / 'note.raw')]) == 0
+        assert len(np.fromfile(tmp_path / 'note_1_62.raw', dtype='<f4')) == 100
+        assert 'realtime' in capsys.readouterr().err
+
+        assert main(['--instrument', '5', str(tmp_path / 'song.wav')]) == 1
+        assert 'no instrument 5' in capsys.readouterr().err
+
+    @patch('editor.audio.synth_wrapper.synth_engine.SynthEngine')
+    def test_engine_output_kept_off_stdout(self, mock_engine_class, mock_engine, tmp_path,
+                                           capfd):
+        """Test that the engine writing to file descriptor 1 does not reach stdout"""
+        mock_engine_class.return_value = mock_engine
+        mock_engine.initialize.side_effect = lambda: os.write(1, b'engine log\n') > 0
+        assert main([str(tmp_path / 'song.wav')]) == 0
+
+        out, err = capfd.readouterr()
+        assert out == ''
+        assert 'engine log' in err
+
+    def test_repeated_stems_with_real_engine(self, tmp_path):
+        """Test that a note held at the end of a stem does not sound in the next one"""
+        synth = SynthWrapper()
+        events = synth.get_note_events(0)
+        start = events['sample'][np.flatnonzero(events['kind'] == NOTE_EVENT_ON)[0]]
+        # Cut the stems in the middle of the first note
+        num_samples = int(start) + 1000
+        stems = []
+        for stem in range(2):
+            path = tmp_path / f'stem_{stem}.raw'
+            with solo(synth, [0]), AudioFileWriter(path, 44100, 'raw') as writer:
+                render_song(synth, writer, num_samples)
+            stems.append(np.fromfile(path, dtype='<f4'))
+        assert np.any(stems[0] != 0)
+        np.testing.assert_array_equal(stems[1], stems[0])
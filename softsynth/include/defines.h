@@ -5,7 +5,9 @@
 #define SAMPLE_RATE 44100
 #define BEATS_PER_MINUTE 125
 #define NOTES_PER_BEAT 4
-#define SAMPLES_PER_NOTE (60 * 44100 / (BEATS_PER_MINUTE * NOTES_PER_BEAT))
+#define SAMPLES_PER_NOTE (60 * SAMPLE_RATE / (BEATS_PER_MINUTE * NOTES_PER_BEAT))
+#define FREQUENCY_BASE 0.000185392     // 440.0/(2^(69/12)) / SAMPLE_RATE
+#define LFO_FREQUENCY_BASE 0.000041106 // LFO base frequency at SAMPLE_RATE
 
 // Instrument constants
 #define MAX_NUM_INSTRUMENTS 4
@@ -18,6 +20,13 @@
 #define HLD 1
 #define NOTES_PER_SONG (PATTERNS_PER_INSTRUMENT * NOTES_PER_PATTERN)
 
+// Note events compiled from the patterns, see build_note_events
+#define NOTE_EVENT_ON 1                                 // Start a note
+#define NOTE_EVENT_RELEASE 2                            // Release the playing note
+#define NOTE_EVENT_END 0xFFFFFFFF                       // Sample offset ending an event list
+#define NOTE_EVENT_SIZE 8                               // Sample offset, note, kind and a reserved half word
+#define NOTE_EVENTS_PER_INSTRUMENT (NOTES_PER_SONG + 1) // One event per row and the end marker
+
 #define ENVELOPE_ID 1
 #define OSCILLATOR_ID 2
 #define STOREVAL_ID 3
@@ -28,6 +37,17 @@
 #define ACCUMULATE_ID 8
 #define INSTRUMENT_END 0
 
+// Fused kernels of the program compiler (editor builds only)
+#define KERNEL_VOICE 9                  // ENVELOPE, OSCILLATOR, OPERATION and OUTPUT
+#define KERNEL_VOICE_STOREVAL 1         // Flag: STOREVAL after the ENVELOPE
+#define KERNEL_VOICE_FILTER 2           // Flag: FILTER before the OUTPUT
+#define KERNEL_SILENT 13                // Instrument that can only output zero
+#define PROGRAM_SIZE ((MAX_NUM_INSTRUMENTS + 1) * (MAX_COMMANDS + 1)) // Opcodes of all instruments and the song
+
+// Noise oscillators seed from the note shifted above the byte offset of their
+// workspace, which stays below 1 << 20 even in the largest editor layout
+#define NOISE_SEED_NOTE_SHIFT 20
+
 #define OSCILLATOR_SINE 0x01
 #define OSCILLATOR_SQUARE 0x02
 #define OSCILLATOR_SAW 0x04
@@ -35,6 +55,12 @@
 #define OSCILLATOR_NOISE 0x10
 #define OSCILLATOR_LFO 0x20
 
+// Wavetable oscillator mode (editor builds only)
+#define WAVETABLE_SIZE 2048                  // Samples per table period
+#define WAVETABLE_STRIDE (WAVETABLE_SIZE + 1) // Last sample repeats the first one
+#define WAVETABLE_TYPES 4                    // Sine, square, saw and triangle
+#define WAVETABLE_LEVELS 11                  // Band limits, one per octave of phase increment
+
 #define FILTER_LOWPASS 1
 #define FILTER_HIGHPASS 2
 #define FILTER_BANDSTOP 3
@@ -12,7 +12,8 @@ extern "C"
                         unsigned char *stream,
                         int len);
     void transform_values(void);
-    extern float transformed_parameters[16];
+    void transform_parameters(void);
+    extern float transformed_parameters[(MAX_NUM_INSTRUMENTS + 1) * MAX_COMMANDS * MAX_COMMAND_PARAMS];
     void envelope_function(void);
     void storeval_function(void);
     void oscillator_function(void);
@@ -21,7 +22,12 @@ extern "C"
     void accumulate_function(void);
     void process_stack(void);
     extern void (*instrument_instructions_lookup[256])(void);
-    void new_instrument_note(void);
+    void build_note_events(void);
+    void seek_note_events(uint32_t sample);
+    void play_note_events(void);
+    void play_due_events(void);
+    extern uint32_t next_event_sample;
+    extern uint32_t note_events[MAX_NUM_INSTRUMENTS * NOTE_EVENTS_PER_INSTRUMENT * NOTE_EVENT_SIZE / 4];
     void cosine_waveform(void);
     void pwr(void);
 
@@ -29,9 +35,59 @@ extern "C"
     void debug_start_instrument_note(uint8_t instrument, uint8_t note);
     void debug_next_instrument_sample(uint8_t instrument, float *sample, uint8_t release);
     void debug_setup_sx_registers(void);
+    void debug_render_samples(uint32_t note, float *output, uint32_t first_sample, uint32_t end_sample);
     extern uint32_t synth_data[];
     extern uint8_t instrument_instructions[];
     extern uint8_t instrument_parameters[];
+    extern uint8_t instrument_patterns[];
+    extern uint8_t pattern_array[];
+    extern uint32_t control_rate;
+    void wavetable_waveform(void);
+    extern uint32_t wavetable_mode;
+    extern float wavetables[WAVETABLE_LEVELS * WAVETABLE_TYPES * WAVETABLE_STRIDE];
+    extern uint32_t flush_to_zero;
+    extern uint32_t skip_silent;
+    extern uint32_t subnormal_counts[(MAX_NUM_INSTRUMENTS + 1) * MAX_COMMANDS];
+    extern float vm_stack_data[];
+    extern uint32_t program_compiler;
+    extern uint8_t compiled_instructions[PROGRAM_SIZE];
+    void voice_kernel(void);
+    void silent_kernel(void);
+
+    // Layout of one instrument in the engine buffers, see common.asm
+    struct instrument_layout
+    {
+        uint64_t data;       // Offset of the instrument data in synth_data
+        uint64_t parameters; // Offset of the first transformed parameters slot
+        uint64_t workspaces; // Number of workspaces, at least 1
+        uint64_t reserved;
+    };
+
+    // Buffers and sizes of the engine, the static ones until the editor replaces them
+    struct engine_layout
+    {
+        uint32_t *synth_data;
+        float *transformed_parameters;
+        uint32_t *subnormal_counts;
+        uint8_t *compiled_instructions;
+        uint8_t *instrument_instructions;
+        uint8_t *instrument_parameters;
+        uint8_t *instrument_patterns;
+        uint8_t *pattern_array;
+        uint64_t *skip_data; // Instruction and parameter pointers after each program, and its skip flags
+        uint32_t *note_events;
+        uint64_t *note_event_cursors;
+        struct instrument_layout *instruments; // The song instrument last
+        uint64_t num_instruments;
+        uint64_t patterns_per_instrument;
+        uint64_t note_event_stride; // Bytes per event list
+        uint64_t samples_per_note;
+        float frequency_base;     // FREQUENCY_BASE at the sample rate
+        float lfo_frequency_base; // LFO_FREQUENCY_BASE at the sample rate
+        float rate_scale;         // SAMPLE_RATE / sample rate, scales envelope steps and filter frequencies
+        float reserved;
+    };
+    extern struct engine_layout synth_layout;
 #endif // DEBUG
 
 #ifdef __cplusplus
@@ -0,0 +1,66 @@
+#ifndef WAVETABLE_H
+#define WAVETABLE_H
+
+#include <math.h>
+#include "defines.h"
+
+#define WAVETABLE_PI 3.14159265358979323846
+
+// Number of harmonics stored in a table level. Level k is used for phase
+// increments up to 2^(k - 11), so its highest harmonic stays below Nyquist
+static inline int wavetable_harmonics(int level)
+{
+    int harmonics = 1 << (WAVETABLE_LEVELS - 1 - level);
+    return harmonics < WAVETABLE_SIZE / 2 ? harmonics : WAVETABLE_SIZE / 2 - 1;
+}
+
+// Fill the [level][type][sample] tables used by wavetable_waveform with
+// additive, band-limited versions of the oscillator waveforms. Sine and
+// triangle start at their peak like the cosine of the polynomial path:
+//     sine     = cos(2*pi*u)
+//     square   = 4/pi * sum(sin(2*pi*k*u) / k), odd k
+//     saw      = -2/pi * sum(sin(2*pi*k*u) / k), rising from -1 to 1
+//     triangle = 8/pi^2 * sum(cos(2*pi*k*u) / k^2), odd k
+static inline void build_wavetables(float *tables)
+{
+    static double sine[WAVETABLE_SIZE];
+    static double cosine[WAVETABLE_SIZE];
+    static double sums[WAVETABLE_TYPES][WAVETABLE_SIZE];
+    for (int i = 0; i < WAVETABLE_SIZE; i++)
+    {
+        sine[i] = sin(2.0 * WAVETABLE_PI * i / WAVETABLE_SIZE);
+        cosine[i] = cos(2.0 * WAVETABLE_PI * i / WAVETABLE_SIZE);
+        sums[0][i] = cosine[i];
+        sums[1][i] = sums[2][i] = sums[3][i] = 0.0;
+    }
+
+    // Start with the fewest harmonics and add the missing ones per level
+    int harmonic = 1;
+    for (int level = WAVETABLE_LEVELS - 1; level >= 0; level--)
+    {
+        for (; harmonic <= wavetable_harmonics(level); harmonic++)
+        {
+            for (int i = 0; i < WAVETABLE_SIZE; i++)
+            {
+                int index = (int)(((long)harmonic * i) % WAVETABLE_SIZE);
+                if (harmonic & 1)
+                {
+                    sums[1][i] += 4.0 / WAVETABLE_PI * sine[index] / harmonic;
+                    sums[3][i] += 8.0 / (WAVETABLE_PI * WAVETABLE_PI) * cosine[index] / ((double)harmonic * harmonic);
+                }
+                sums[2][i] -= 2.0 / WAVETABLE_PI * sine[index] / harmonic;
+            }
+        }
+        for (int type = 0; type < WAVETABLE_TYPES; type++)
+        {
+            float *table = tables + (level * WAVETABLE_TYPES + type) * WAVETABLE_STRIDE;
+            for (int i = 0; i < WAVETABLE_SIZE; i++)
+            {
+                table[i] = (float)sums[type][i];
+            }
+            table[WAVETABLE_SIZE] = table[0];
+        }
+    }
+}
+
+#endif // WAVETABLE_H
@@ -15,7 +15,11 @@
 .equ ENVELOPE_WS_STATE,     0
 .equ ENVELOPE_WS_LEVEL,     ENVELOPE_WS_STATE + 4
 .equ ENVELOPE_WS_GAIN_MOD,  ENVELOPE_WS_LEVEL + 4
-.equ ENVELOPE_WS_SIZE,      ENVELOPE_WS_GAIN_MOD + 4
+// Control-rate mode (editor only): step of the current state and samples left until it is recomputed
+.equ ENVELOPE_WS_CONTROL_STEP,  ENVELOPE_WS_GAIN_MOD + 4
+.equ ENVELOPE_WS_CONTROL_STATE, ENVELOPE_WS_CONTROL_STEP + 4
+.equ ENVELOPE_WS_CONTROL_COUNT, ENVELOPE_WS_CONTROL_STATE + 4
+.equ ENVELOPE_WS_SIZE,      ENVELOPE_WS_CONTROL_COUNT + 4
 .equ ENVELOPE_PARAM_ATTACK, 0
 .equ ENVELOPE_PARAM_DECAY,  ENVELOPE_PARAM_ATTACK + 4
 .equ ENVELOPE_PARAM_SUSTAIN,ENVELOPE_PARAM_DECAY + 4
@@ -59,7 +63,14 @@
 .equ OSCILLATOR_WS_FREQUENCY_MOD,   OSCILLATOR_WS_DETUNE_MOD + 4
 .equ OSCILLATOR_WS_COLOR_MOD,       OSCILLATOR_WS_FREQUENCY_MOD + 4
 .equ OSCILLATOR_WS_PHASE_MOD,       OSCILLATOR_WS_COLOR_MOD + 4
-.equ OSCILLATOR_WS_SIZE,            OSCILLATOR_WS_PHASE_MOD + 4
+.equ OSCILLATOR_WS_CACHE_KEY,       OSCILLATOR_WS_PHASE_MOD + 4 // Valid bit, type and note of the cached increment
+.equ OSCILLATOR_WS_CACHE_TRANSPOSE, OSCILLATOR_WS_CACHE_KEY + 4
+.equ OSCILLATOR_WS_CACHE_DETUNE,    OSCILLATOR_WS_CACHE_TRANSPOSE + 4
+.equ OSCILLATOR_WS_CACHE_TRANSPOSE_MOD, OSCILLATOR_WS_CACHE_DETUNE + 4
+.equ OSCILLATOR_WS_CACHE_DETUNE_MOD, OSCILLATOR_WS_CACHE_TRANSPOSE_MOD + 4
+.equ OSCILLATOR_WS_CACHE_INCREMENT, OSCILLATOR_WS_CACHE_DETUNE_MOD + 4
+.equ OSCILLATOR_WS_NOISE_SEED,      OSCILLATOR_WS_CACHE_INCREMENT + 4 // Noise generator state, 0 until the first sample
+.equ OSCILLATOR_WS_SIZE,            OSCILLATOR_WS_NOISE_SEED + 4
 .equ OSCILLATOR_PARAM_TRANSPOSE,    0
 .equ OSCILLATOR_PARAM_DETUNE,       OSCILLATOR_PARAM_TRANSPOSE + 4
 .equ OSCILLATOR_PARAM_PHASE,        OSCILLATOR_PARAM_DETUNE + 4
@@ -74,6 +85,11 @@
     .hword \destination
 .endmacro
 .equ STOREVAL_PARAM_AMOUNT, 0
+// Control-rate mode (editor only): ramped value, per-sample ramp delta and samples left until the next target
+.equ STOREVAL_WS_CONTROL_VALUE, 0
+.equ STOREVAL_WS_CONTROL_DELTA, STOREVAL_WS_CONTROL_VALUE + 4
+.equ STOREVAL_WS_CONTROL_COUNT, STOREVAL_WS_CONTROL_DELTA + 4
+.equ STOREVAL_WS_SIZE,          STOREVAL_WS_CONTROL_COUNT + 4
 .equ STOREVAL_PARAM_SIZE, STOREVAL_PARAM_AMOUNT + 4
 #define STORE_AMOUNT(val) val
 #define STORE_DEST(val) val
@@ -114,6 +130,7 @@
 #define OUTPUT_GAIN(val) val
 
 .equ OUTPUT_WS_GAIN_MOD,        0
+.equ OUTPUT_WS_SIZE,            OUTPUT_WS_GAIN_MOD + 4
 
 .equ OUTPUT_PARAM_GAIN,         0
 .equ OUTPUT_PARAM_SIZE,         OUTPUT_PARAM_GAIN + 4
@@ -131,8 +148,65 @@
 .equ instrument_workspaces,     instrument_output + 4
 .equ instrument_length,         instrument_workspaces + MAX_COMMANDS*MAX_COMMAND_PARAMS*4
 
+/// Data to skip the program of a silent instrument
+.equ skip_data_instructions,    0                               // Instructions of the next instrument
+.equ skip_data_parameters,      skip_data_instructions + 8      // Parameters of the next instrument
+.equ skip_data_flags,           skip_data_parameters + 8        // SKIP_FLAG_* of the program
+.equ SKIP_DATA_SHIFT,           5
+.equ SKIP_FLAG_NEVER_BIT,       0
+.equ SKIP_FLAG_NEVER,           1 << SKIP_FLAG_NEVER_BIT        // Has STOREVAL, which writes every sample
+.equ SKIP_FLAG_FILTER,          2                               // Has filters, which ring after their input stops
+.equ skip_data_size,            1 << SKIP_DATA_SHIFT
+
+/// Note event structure, see build_note_events
+.equ note_event_sample,         0                               // Song sample the event is due at
+.equ note_event_note,           note_event_sample + 4           // Note to start
+.equ note_event_kind,           note_event_note + 1             // NOTE_EVENT_ON or NOTE_EVENT_RELEASE
+.equ note_event_reserved,       note_event_kind + 1
+
 /// Synth structure
 .equ instrument_data_size,      instrument_length * MAX_NUM_INSTRUMENTS
 .equ global_data_size,          instrument_length
 .equ synth_data_size,           (instrument_data_size + global_data_size)
 
+/// Runtime layout of the editor engine, see synth_layout. The player uses the
+/// static buffers and the constants above, the editor allocates its buffers when
+/// the engine is created and packs the workspaces of each instrument
+.equ layout_synth_data,                 0
+.equ layout_transformed_parameters,     layout_synth_data + 8
+.equ layout_subnormal_counts,           layout_transformed_parameters + 8
+.equ layout_compiled_instructions,      layout_subnormal_counts + 8
+.equ layout_instrument_instructions,    layout_compiled_instructions + 8
+.equ layout_instrument_parameters,      layout_instrument_instructions + 8
+.equ layout_instrument_patterns,        layout_instrument_parameters + 8
+.equ layout_pattern_array,              layout_instrument_patterns + 8
+.equ layout_skip_data,                  layout_pattern_array + 8
+.equ layout_note_events,                layout_skip_data + 8
+.equ layout_note_event_cursors,         layout_note_events + 8
+.equ layout_instruments,                layout_note_event_cursors + 8   // Instrument layouts, the song instrument last
+.equ layout_num_instruments,            layout_instruments + 8
+.equ layout_patterns_per_instrument,    layout_num_instruments + 8
+.equ layout_note_event_stride,          layout_patterns_per_instrument + 8 // Bytes per event list
+.equ layout_samples_per_note,           layout_note_event_stride + 8
+.equ layout_frequency_base,             layout_samples_per_note + 8     // Float, FREQUENCY_BASE at the sample rate
+.equ layout_lfo_frequency_base,         layout_frequency_base + 4       // Float, LFO_FREQUENCY_BASE at the sample rate
+.equ layout_rate_scale,                 layout_lfo_frequency_base + 4   // Float, SAMPLE_RATE / sample rate
+.equ layout_size,                       layout_rate_scale + 8
+
+/// Layout of one instrument
+.equ instrument_layout_data,        0                               // Offset of the instrument data in synth_data
+.equ instrument_layout_parameters,  instrument_layout_data + 8      // Offset of the first transformed parameters slot
+.equ instrument_layout_workspaces,  instrument_layout_parameters + 8 // Number of workspaces, at least 1
+.equ INSTRUMENT_LAYOUT_SHIFT,       5
+.equ instrument_layout_size,        1 << INSTRUMENT_LAYOUT_SHIFT
+
+/// Range of the note rendered by dope4ks_render in the editor, see debug_render_samples
+.equ render_range_first,        0                               // First sample
+.equ render_range_end,          render_range_first + 4          // Sample after the last one
+
+
+/// VM stack depth in floats
+.equ VM_STACK_SIZE,             16
+
+/// Flush-to-zero bit of the floating-point control register
+.equ FPCR_FZ_BIT,               24
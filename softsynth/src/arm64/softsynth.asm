@@ -25,6 +25,54 @@
     ldr     \reg, [\reg, \symbol@GOTPAGEOFF]
 .endmacro
 
+// Buffers and sizes of the engine. The editor chooses them at runtime and
+// keeps them in synth_layout, the player uses the static buffers and constants
+.macro LOAD_BUFFER reg, symbol, field
+#ifdef DEBUG
+    LOAD_ADDR   \reg, synth_layout
+    ldr         \reg, [\reg, #\field]
+#else
+    LOAD_ADDR   \reg, \symbol
+#endif
+.endmacro
+
+.macro LOAD_SIZE reg, field, constant
+#ifdef DEBUG
+    LOAD_ADDR   \reg, synth_layout
+    ldr         \reg, [\reg, #\field]
+#else
+    mov         \reg, #\constant
+#endif
+.endmacro
+
+// Constants that depend on the sample rate. The editor keeps them in
+// synth_layout, the player uses the ones for SAMPLE_RATE in the literal pool
+.macro LOAD_RATE_CONSTANT reg, scratch, field, symbol
+#ifdef DEBUG
+    LOAD_ADDR   \scratch, synth_layout
+    ldr         \reg, [\scratch, #\field]
+#else
+    ldr         \reg, \symbol
+#endif
+.endmacro
+
+#ifdef DEBUG
+/// Load a field of the layout of instrument \index
+.macro INSTRUMENT_LAYOUT reg, index, field
+    LOAD_ADDR   \reg, synth_layout
+    ldr         \reg, [\reg, #layout_instruments]
+    add         \reg, \reg, \index, lsl #INSTRUMENT_LAYOUT_SHIFT
+    ldr         \reg, [\reg, #\field]
+.endmacro
+#endif
+
+// The editor can evaluate envelope steps at control rate
+#ifdef DEBUG
+#define ENVELOPE_STEP envelope_control_step
+#else
+#define ENVELOPE_STEP envelope_map
+#endif
+
 // Standard softsynth entry point
 .global _dope4ks_render
 #define dope4ks_render _dope4ks_render
@@ -32,6 +80,8 @@
 // For testing
 .global _transform_values
 #define transform_values _transform_values
+.global _transform_parameters
+#define transform_parameters _transform_parameters
 .global _transformed_parameters
 #define transformed_parameters _transformed_parameters
 .global _envelope_function
@@ -52,8 +102,18 @@
 #define process_stack _process_stack
 .global _instrument_instructions_lookup
 #define instrument_instructions_lookup _instrument_instructions_lookup
-.global _new_instrument_note
-#define new_instrument_note _new_instrument_note
+.global _build_note_events
+#define build_note_events _build_note_events
+.global _seek_note_events
+#define seek_note_events _seek_note_events
+.global _play_note_events
+#define play_note_events _play_note_events
+.global _play_due_events
+#define play_due_events _play_due_events
+.global _next_event_sample
+#define next_event_sample _next_event_sample
+.global _note_events
+#define note_events _note_events
 .global _debug_start_instrument_note
 #define debug_start_instrument_note _debug_start_instrument_note
 .global _debug_next_instrument_sample
@@ -66,6 +126,36 @@
 #define cosine_waveform _cosine_waveform
 .global _pwr
 #define pwr _pwr
+#ifdef DEBUG
+.global _control_rate
+#define control_rate _control_rate
+.global _wavetable_mode
+#define wavetable_mode _wavetable_mode
+.global _wavetables
+#define wavetables _wavetables
+.global _wavetable_waveform
+#define wavetable_waveform _wavetable_waveform
+.global _flush_to_zero
+#define flush_to_zero _flush_to_zero
+.global _skip_silent
+#define skip_silent _skip_silent
+.global _subnormal_counts
+#define subnormal_counts _subnormal_counts
+.global _vm_stack_data
+#define vm_stack_data _vm_stack_data
+.global _program_compiler
+#define program_compiler _program_compiler
+.global _compiled_instructions
+#define compiled_instructions _compiled_instructions
+.global _voice_kernel
+#define voice_kernel _voice_kernel
+.global _silent_kernel
+#define silent_kernel _silent_kernel
+.global _synth_layout
+#define synth_layout _synth_layout
+.global _debug_render_samples
+#define debug_render_samples _debug_render_samples
+#endif
 
 // Song data
 .extern _instrument_instructions
@@ -87,12 +177,13 @@
 ///   note_num in x1
 debug_start_instrument_note:
     // x5 = instrument data
-    LOAD_ADDR   x10, synth_data
-    mov         x3, #instrument_length
-    mul         x4, x0, x3
+    LOAD_BUFFER x10, synth_data, layout_synth_data
+    INSTRUMENT_LAYOUT x4, x0, instrument_layout_data
     add         x5, x10, x4
     mov         x14, x5
-    mov         x16, #MAX_COMMANDS * MAX_COMMAND_PARAMS / 4
+    // Clear the workspaces of the instrument, 4 * 16 bytes each
+    INSTRUMENT_LAYOUT x16, x0, instrument_layout_workspaces
+    lsl         x16, x16, #2
 1:
     stp         xzr, xzr, [x14], #16
     subs        x16, x16, #1
@@ -123,11 +214,10 @@ debug_next_instrument_sample:
     ///     x6 = instrument instructions pointer
     bl          debug_set_instrument_pointers
     ///     x10 = synth data pointer
-    LOAD_ADDR   x10, synth_data
+    LOAD_BUFFER x10, synth_data, layout_synth_data
     ///     x5 = instrument data pointer
-    mov         x3, #instrument_length
-    mul         x3, x0, x3
-    add         x5, x10, x3
+    INSTRUMENT_LAYOUT x12, x0, instrument_layout_data
+    add         x5, x10, x12
     /// Set release
     strb        w2, [x5, #instrument_release]
     ///     x8 = VM stack data pointer
@@ -144,8 +234,8 @@ debug_set_instrument_pointers:
     // Instrument #
     mov         x3, #0
     // Start values
-    LOAD_ADDR   x6, instrument_instructions
-    LOAD_ADDR   x4, instrument_parameters
+    LOAD_BUFFER x6, instrument_instructions, layout_instrument_instructions
+    LOAD_BUFFER x4, instrument_parameters, layout_instrument_parameters
 debug_set_instrument_pointers_loop:
     cmp     x3, x0
     b.eq    debug_set_instrument_pointers_end
@@ -194,6 +284,27 @@ debug_setup_sx_registers:
     fmov        s26, #-1.0
     ret
 
+/// Render a range of the samples of a song note with dope4ks_render
+///
+/// Arguments:
+///   note_num in w0
+///   pointer to output buffer in x1
+///   first_sample in w2
+///   end_sample in w3, after first_sample and at most the samples per note of synth_layout
+debug_render_samples:
+    PUSH_LINK_REGISTER
+    LOAD_ADDR   x12, dope4ks_current_note
+    str         w0, [x12]
+    LOAD_ADDR   x12, render_range
+    stp         w2, w3, [x12]
+    bl          dope4ks_render
+    // Other dope4ks_render calls render whole notes
+    LOAD_ADDR   x12, render_range
+    LOAD_SIZE   x13, layout_samples_per_note, SAMPLES_PER_NOTE
+    stp         wzr, w13, [x12]
+    POP_LINK_REGISTER
+    ret
+
 #endif // DEBUG
 
 ///
@@ -214,7 +325,34 @@ debug_setup_sx_registers:
 ///     x10 = synth data pointer
 ///     
 dope4ks_render:
-    PUSH_LINK_REGISTER
+    // Flush subnormal results to zero while rendering. Filter and envelope
+    // tails decay through them, which stalls FPUs that handle them in microcode.
+    // The caller's mode is restored on return
+    mrs         x11, fpcr
+    stp         x30, x11, [sp, #-16]!
+#ifdef DEBUG
+    // The editor can disable flushing to find the instructions producing them
+    LOAD_ADDR   x12, flush_to_zero
+    ldr         w12, [x12]
+    bfi         x11, x12, #FPCR_FZ_BIT, #1
+#else
+    orr         x11, x11, #(1 << FPCR_FZ_BIT)
+#endif
+    msr         fpcr, x11
+    // Parameters are constant during a block, convert them once
+    bl          transform_parameters
+    // Move the note event cursors to the start of the block
+    LOAD_ADDR   x0, dope4ks_current_note
+    ldr         w0, [x0]
+    LOAD_SIZE   x17, layout_samples_per_note, SAMPLES_PER_NOTE
+    mul         w0, w0, w17
+#ifdef DEBUG
+    // The editor may start inside the note, see debug_render_samples
+    LOAD_ADDR   x12, render_range
+    ldr         w12, [x12, #render_range_first]
+    add         w0, w0, w12
+#endif
+    bl          seek_note_events
     // Initialize pointers
     LOAD_ADDR   x0, dope4ks_current_note
     // Constants
@@ -227,27 +365,47 @@ dope4ks_render:
     // x0 is current note #
     ldr         w0, [x0]
     // x2 is current sample #
+#ifdef DEBUG
+    LOAD_ADDR   x2, render_range
+    ldr         w2, [x2, #render_range_first]
+#else
     mov         x2, #0
+#endif
+    // Look for due events at the first sample
+    LOAD_ADDR   x12, next_event_sample
+    str         w2, [x12]
 render_sampleloop:
-    LOAD_ADDR   x4, instrument_parameters
-    LOAD_ADDR   x6, instrument_instructions
+    // Start or release the notes due at this sample
+    LOAD_ADDR   x12, next_event_sample
+    ldr         w12, [x12]
+    cmp         w2, w12
+    b.lo        1f
+    bl          play_due_events
+1:
+    LOAD_BUFFER x4, instrument_parameters, layout_instrument_parameters
+    LOAD_BUFFER x6, instrument_instructions, layout_instrument_instructions
     LOAD_ADDR   x8, vm_stack_data
-    LOAD_ADDR   x10, synth_data
+    LOAD_BUFFER x10, synth_data, layout_synth_data
     mov         x5, x10
     // x3 is current instrument #
     mov         x3, #0
 render_instrumentloop:
-    // First sample = new note
-    cbnz        w2, no_new_note
-    bl          new_instrument_note
-no_new_note:
     // Render the current instrument
     bl          render_instrument
     // Advance to next instrument
+#ifdef DEBUG
+    add         x3, x3, #1
+    INSTRUMENT_LAYOUT x5, x3, instrument_layout_data
+    add         x5, x10, x5
+    // Are we done?
+    LOAD_SIZE   x12, layout_num_instruments, MAX_NUM_INSTRUMENTS
+    cmp         x3, x12
+#else
     add         x5, x5, #instrument_length
     add         x3, x3, #1
     // Are we done?
     cmp         x3, #MAX_NUM_INSTRUMENTS
+#endif
     b.lt        render_instrumentloop
     // Fake a note on the synth vm to force rendering
     str         w5, [x5, #instrument_note]
@@ -259,14 +417,18 @@ no_new_note:
     // Advance to nextsample
     add         x2, x2, #1                              // x2 = current sample + 1
     // Are we done?
-    ldr         w17, near_samples_per_note
+#ifdef DEBUG
+    LOAD_ADDR   x17, render_range
+    ldr         w17, [x17, #render_range_end]
+#else
+    mov         x17, #SAMPLES_PER_NOTE
+#endif
     cmp         x2, x17
     b.lt        render_sampleloop
-    POP_LINK_REGISTER
+    ldp         x30, x11, [sp], #16
+    msr         fpcr, x11
     ret
 
-near_samples_per_note:  .word SAMPLES_PER_NOTE
-
 ///
 /// Render the current instrument and add to output buffer
 ///
@@ -281,6 +443,43 @@ near_samples_per_note:  .word SAMPLES_PER_NOTE
 ///     x9 = transformed instrument instruction parameters pointer
 ///     x10 = synth data pointer
 render_instrument:
+    // An instrument without a note whose output and filters have decayed to
+    // silence stays silent until play_note_events starts its next note. Skip
+    // its program, unless it stores values somewhere every sample
+#ifdef DEBUG
+    LOAD_ADDR   x12, skip_silent
+    ldr         w12, [x12]
+    cbz         w12, .render_instrument_active
+#endif
+    ldr         w12, [x5, #instrument_note]
+    cbnz        w12, .render_instrument_active
+    ldr         w12, [x5, #instrument_output]
+    tst         w12, #0x7FFFFFFF
+    b.ne        .render_instrument_active
+    LOAD_BUFFER x12, instrument_skip_data, layout_skip_data
+    add         x12, x12, x3, lsl #SKIP_DATA_SHIFT
+    ldr         x13, [x12, #skip_data_flags]
+    cbz         x13, .render_instrument_skip
+    tbnz        x13, #SKIP_FLAG_NEVER_BIT, .render_instrument_active
+    // The low and band state of every filter must be zero too
+    mov         x14, x6
+    add         x15, x5, #instrument_workspaces
+.render_instrument_filters:
+    ldrb        w16, [x14], #1
+    cbz         w16, .render_instrument_skip
+    cmp         w16, #FILTER_ID
+    b.ne        1f
+    // FILTER_WS_LOW and FILTER_WS_BAND, -0.0 counts as zero
+    ldr         x16, [x15, #FILTER_WS_LOW]
+    tst         x16, #0x7FFFFFFF7FFFFFFF
+    b.ne        .render_instrument_active
+1:
+    add         x15, x15, #(MAX_COMMAND_PARAMS * 4)
+    b           .render_instrument_filters
+.render_instrument_skip:
+    ldp         x6, x4, [x12, #skip_data_instructions]
+    ret
+.render_instrument_active:
     PUSH_LINK_REGISTER
     // Process the VM instructions for this instrument
     bl          process_stack
@@ -297,55 +496,191 @@ render_instrument_done:
 
 
 ///
-/// Setup instrument for the next note
+/// Start and release the notes of every instrument that are due at the current
+/// sample, and store the sample of the next event of the block in
+/// next_event_sample. The instruments without due events cost nothing until then
+///
+/// Input registers:
+///     x0 = current note #
+///     x2 = current sample #
+/// Destroyed registers:
+///     x3-x17
+play_due_events:
+    PUSH_LINK_REGISTER
+    // w9 = song sample of the earliest next event
+    mov         w9, #NOTE_EVENT_END
+    LOAD_BUFFER x10, synth_data, layout_synth_data
+    LOAD_BUFFER x6, instrument_instructions, layout_instrument_instructions
+    LOAD_BUFFER x8, instrument_skip_data, layout_skip_data
+    mov         x3, #0
+.play_due_loop:
+#ifdef DEBUG
+    INSTRUMENT_LAYOUT x5, x3, instrument_layout_data
+    add         x5, x10, x5
+#else
+    mov         x7, #instrument_length
+    madd        x5, x3, x7, x10
+#endif
+    bl          play_note_events
+    cmp         w15, w9
+    csel        w9, w15, w9, lo
+    // The program of the next instrument starts where this one ends
+    ldr         x6, [x8, #skip_data_instructions]
+    add         x8, x8, #skip_data_size
+    add         x3, x3, #1
+#ifdef DEBUG
+    LOAD_SIZE   x12, layout_num_instruments, MAX_NUM_INSTRUMENTS
+    cmp         x3, x12
+#else
+    cmp         x3, #MAX_NUM_INSTRUMENTS
+#endif
+    b.lt        .play_due_loop
+    // Sample of the block, the end marker lands past the end of any block
+    LOAD_SIZE   x14, layout_samples_per_note, SAMPLES_PER_NOTE
+    msub        w9, w0, w14, w9
+    LOAD_ADDR   x12, next_event_sample
+    str         w9, [x12]
+    POP_LINK_REGISTER
+    ret
+
+///
+/// Start and release the notes of the current instrument that are due at
+/// the current sample, and advance its event cursor past them
 ///
 ///     x0 = current note #
 ///     x2 = current sample #
 ///     x3 = current instrument #
-///     x4 = current instrument parameters pointer
 ///     x5 = instrument data pointer
 ///     x6 = instrument instructions pointer
-///     x7 = instrument instruction workspace pointer
-///     x8 = VM stack data pointer
-///     x9 = transformed instrument instruction parameters pointer
-///     x10 = synth data pointer
-new_instrument_note:
-    // x16 = current pattern index (note# / NOTES_PER_PATTERN)
-    // x15 = note in current pattern (note# % NOTES_PER_PATTERN)
-    mov         x17, #NOTES_PER_PATTERN
-    udiv        x16, x0, x17
-    msub        x15, x16, x17, x0
-    // x14 = pattern index (instrument# * PATTERNS_PER_INSTRUMENT + pattern_index)
-    mov         x14, #PATTERNS_PER_INSTRUMENT
-    madd        x14, x3, x14, x16
-    // x14 = pattern # (instrument_patterns[pattern_index])
-    LOAD_ADDR   x13, instrument_patterns
-    ldrb        w14, [x13, x14]
-    // x17 = note offset into pattern list
-    madd        x17, x14, x17, x15
-    // x17 = note #
-    LOAD_ADDR   x13, pattern_array
-    ldrb        w17, [x13, x17]
-    // If HLD, skip note setup
-    cmp         w17, #HLD
-    b.eq        .skip_note_setup
+/// Output registers:
+///     w15 = song sample of the next event of the instrument
+/// Destroyed registers:
+///     x11-x17
+play_note_events:
+    // x12 = cursor of the instrument, x13 = next event
+    LOAD_BUFFER x12, note_event_cursors, layout_note_event_cursors
+    add         x12, x12, x3, lsl #3
+    ldr         x13, [x12]
+    // w14 = song sample (note # * SAMPLES_PER_NOTE + sample #)
+    LOAD_SIZE   x14, layout_samples_per_note, SAMPLES_PER_NOTE
+    madd        w14, w0, w14, w2
+.play_event_loop:
+    // The end marker is later than any sample
+    ldr         w15, [x13, #note_event_sample]
+    cmp         w15, w14
+    b.hi        .play_events_done
     // Ensure we have released the note by storing something != 0 there
     str         w5, [x5, #instrument_release]
-    // If zero, skip note setup
-    b.lt        .skip_note_setup
-    // Zero MAX_COMMANDS * MAX_COMMAND_PARAMS + 3 dwords at [x5] without modifying x5
-    mov         x14, x5
-    mov         x16, #MAX_COMMANDS * MAX_COMMAND_PARAMS / 4
-.zero_loop:
-    stp         xzr, xzr, [x14], #16
-    subs        x16, x16, #1
-    bne         .zero_loop
-    // final 12 bytes
-    str         xzr, [x14], #8
-    str         wzr, [x14], #4
+    ldrb        w15, [x13, #note_event_kind]
+    cmp         w15, #NOTE_EVENT_ON
+    b.ne        .play_next_event
+    // Zero the note, release and output dwords at [x5] without modifying x5
+    str         xzr, [x5, #instrument_note]
+    str         wzr, [x5, #instrument_output]
+    // Zero the workspaces the instructions at x6 use, 8 bytes at a time
+    mov         x15, x6
+    add         x16, x5, #instrument_workspaces
+    adr         x17, instruction_workspace_sizes
+.reset_instruction_loop:
+    ldrb        w11, [x15], #1
+    cbz         w11, .reset_done
+    ldrb        w11, [x17, x11]
+.reset_word_loop:
+    cbz         w11, .reset_next_instruction
+    sub         w11, w11, #1
+    str         xzr, [x16, x11, lsl #3]
+    b           .reset_word_loop
+.reset_next_instruction:
+    add         x16, x16, #(MAX_COMMAND_PARAMS * 4)
+    b           .reset_instruction_loop
+.reset_done:
     // Set note value
-    str         w17, [x5, #instrument_note]
-.skip_note_setup:
+    ldrb        w15, [x13, #note_event_note]
+    str         w15, [x5, #instrument_note]
+.play_next_event:
+    add         x13, x13, #NOTE_EVENT_SIZE
+    b           .play_event_loop
+.play_events_done:
+    str         x13, [x12]
+    ret
+
+///
+/// Move the event cursor of every instrument to its first event at or after
+/// a song sample
+///
+/// Input registers:
+///     w0 = song sample
+/// Destroyed registers:
+///     x12-x16
+seek_note_events:
+    LOAD_BUFFER x12, note_events, layout_note_events
+    LOAD_BUFFER x13, note_event_cursors, layout_note_event_cursors
+    LOAD_SIZE   x14, layout_num_instruments, MAX_NUM_INSTRUMENTS
+.seek_instrument_loop:
+    mov         x15, x12
+.seek_event_loop:
+    // The end marker stops the search
+    ldr         w16, [x15], #NOTE_EVENT_SIZE
+    cmp         w16, w0
+    b.lo        .seek_event_loop
+    sub         x15, x15, #NOTE_EVENT_SIZE
+    str         x15, [x13], #8
+    LOAD_SIZE   x16, layout_note_event_stride, NOTE_EVENTS_PER_INSTRUMENT * NOTE_EVENT_SIZE
+    add         x12, x12, x16
+    subs        x14, x14, #1
+    b.ne        .seek_instrument_loop
+    ret
+
+///
+/// Compile the patterns of every instrument into its list of note events.
+/// A row with a note starts it, a zero row releases the playing note and a
+/// HLD row has no event. Each list is sorted by sample and ends with a
+/// NOTE_EVENT_END marker, so rendering never looks at the patterns
+///
+/// Destroyed registers:
+///     x0-x6, x11-x17
+build_note_events:
+    LOAD_BUFFER x11, instrument_patterns, layout_instrument_patterns
+    LOAD_BUFFER x12, pattern_array, layout_pattern_array
+    LOAD_BUFFER x13, note_events, layout_note_events
+    LOAD_SIZE   x5, layout_samples_per_note, SAMPLES_PER_NOTE
+    mov         w6, #NOTE_EVENT_RELEASE
+    LOAD_SIZE   x14, layout_num_instruments, MAX_NUM_INSTRUMENTS
+.build_instrument_loop:
+    // x15 = next event, w16 = song sample of the current row
+    mov         x15, x13
+    mov         w16, #0
+    LOAD_SIZE   x17, layout_patterns_per_instrument, PATTERNS_PER_INSTRUMENT
+.build_pattern_loop:
+    // x0 = rows of the next pattern, x1 = rows left
+    ldrb        w0, [x11], #1
+    mov         x1, #NOTES_PER_PATTERN
+    madd        x0, x0, x1, x12
+.build_row_loop:
+    ldrb        w2, [x0], #1
+    cmp         w2, #HLD
+    b.eq        .build_next_row
+    // Zero releases, anything else starts a note
+    mov         w3, #NOTE_EVENT_ON
+    csel        w3, w6, w3, lo
+    str         w16, [x15, #note_event_sample]
+    strb        w2, [x15, #note_event_note]
+    strb        w3, [x15, #note_event_kind]
+    strh        wzr, [x15, #note_event_reserved]
+    add         x15, x15, #NOTE_EVENT_SIZE
+.build_next_row:
+    add         w16, w16, w5
+    subs        x1, x1, #1
+    b.ne        .build_row_loop
+    subs        x17, x17, #1
+    b.ne        .build_pattern_loop
+    // End the list
+    mov         w2, #NOTE_EVENT_END
+    stp         w2, wzr, [x15]
+    LOAD_SIZE   x16, layout_note_event_stride, NOTE_EVENTS_PER_INSTRUMENT * NOTE_EVENT_SIZE
+    add         x13, x13, x16
+    subs        x14, x14, #1
+    b.ne        .build_instrument_loop
     ret
 
 ///
@@ -363,8 +698,24 @@ new_instrument_note:
 ///     x10 = synth data pointer
 process_stack:
     PUSH_LINK_REGISTER
+#ifdef DEBUG
+    // Run the compiled program of the editor instead, see Instrument::compile_program.
+    // It has the layout of the instructions, so only the opcode pointer moves
+    bl          compiled_program_offset
+    add         x6, x6, x13
+#endif
     // Load workspace pointer (instrument data + 8)
     add         x7, x5, #instrument_workspaces
+    // Load transformed parameters pointer of the first instruction
+#ifdef DEBUG
+    INSTRUMENT_LAYOUT x9, x3, instrument_layout_parameters
+    LOAD_BUFFER x14, transformed_parameters, layout_transformed_parameters
+    add         x9, x9, x14
+#else
+    LOAD_ADDR   x9, transformed_parameters
+    mov         x14, #(MAX_COMMANDS * MAX_COMMAND_PARAMS * 4)
+    madd        x9, x3, x14, x9
+#endif
 stack_loop:
     // Get command byte and increment pointer
     ldrb        w15, [x6], #1
@@ -374,14 +725,145 @@ stack_loop:
     LOAD_ADDR   x14, instrument_instructions_lookup
     ldr         x13, [x14, x15, lsl #3]
     blr         x13
-    // Move to next command workspace slot
+#ifdef DEBUG
+    // Count subnormal results left on the VM stack by the instruction
+    LOAD_ADDR   x13, vm_stack_data
+    sub         x14, x8, x13
+    sub         x14, x14, #1
+    cmp         x14, #(VM_STACK_SIZE * 4)
+    b.hs        .no_subnormal
+    ldr         w13, [x8, #-4]
+    tst         w13, #0x7F800000
+    b.ne        .no_subnormal
+    tst         w13, #0x007FFFFF
+    b.eq        .no_subnormal
+    // The counter of an instruction has the index of its transformed parameters slot
+    LOAD_BUFFER x13, transformed_parameters, layout_transformed_parameters
+    sub         x14, x9, x13
+    LOAD_BUFFER x13, subnormal_counts, layout_subnormal_counts
+    add         x13, x13, x14, lsr #4
+    ldr         w14, [x13]
+    add         w14, w14, #1
+    str         w14, [x13]
+.no_subnormal:
+#endif
+    // Move to next command workspace and transformed parameters slot
     add         x7, x7, #(MAX_COMMAND_PARAMS * 4)
+    add         x9, x9, #(MAX_COMMAND_PARAMS * 4)
     // Loop over all commands
     b           stack_loop            // jump back to loop
 .process_instrument_done:
+#ifdef DEBUG
+    bl          compiled_program_offset
+    sub         x6, x6, x13
+#endif
     POP_LINK_REGISTER
     ret
 
+#ifdef DEBUG
+///
+/// Offset of the compiled program from the instructions
+///
+/// Output registers:
+///     x13 = offset, 0 when the program compiler is disabled
+/// Destroyed registers:
+///     x14
+compiled_program_offset:
+    LOAD_ADDR   x13, program_compiler
+    ldr         w13, [x13]
+    cbz         w13, 1f
+    LOAD_BUFFER x13, compiled_instructions, layout_compiled_instructions
+    LOAD_BUFFER x14, instrument_instructions, layout_instrument_instructions
+    sub         x13, x13, x14
+1:
+    ret
+
+/// Move to the opcode, workspace and parameters of the next fused instruction
+.macro NEXT_FUSED_INSTRUCTION
+    add         x6, x6, #1
+    add         x7, x7, #(MAX_COMMAND_PARAMS * 4)
+    add         x9, x9, #(MAX_COMMAND_PARAMS * 4)
+.endmacro
+
+///
+/// Fused ENVELOPE, [STOREVAL], OSCILLATOR, OPERATION, [FILTER], OUTPUT chain.
+/// Runs the same code as the single instructions, but the values stay in
+/// registers instead of passing through the VM stack and the dispatch of
+/// process_stack. The opcode is KERNEL_VOICE plus the KERNEL_VOICE_STOREVAL
+/// and KERNEL_VOICE_FILTER flags
+///
+/// Input registers:
+///     w15 = opcode
+///     x0-x10 like the instruction functions
+/// Output registers:
+///     x6, x7 and x9 at the OUTPUT instruction, process_stack moves past it
+/// Destroyed registers:
+///     x11-x17, s0-s9, s24
+voice_kernel:
+    sub         w15, w15, #KERNEL_VOICE
+    stp         x30, x15, [sp, #-16]!
+    bl          envelope_value
+    fmov        s24, s0
+    ldr         x15, [sp, #8]
+    tst         w15, #KERNEL_VOICE_STOREVAL
+    b.eq        .voice_oscillator
+    NEXT_FUSED_INSTRUCTION
+    bl          storeval_value
+.voice_oscillator:
+    NEXT_FUSED_INSTRUCTION
+    bl          oscillator_value
+    // Multiply unless the operand loads as OPERATOR_MULP, like operation_function
+    NEXT_FUSED_INSTRUCTION
+    ldr         x17, [x4], #1
+    cmp         x17, #OPERATOR_MULP
+    b.eq        .voice_no_multiply
+    fmul        s0, s24, s0
+    b           .voice_filter
+.voice_no_multiply:
+    // The envelope value stays on the VM stack below the oscillator value
+    str         s24, [x8], #4
+.voice_filter:
+    ldr         x15, [sp, #8]
+    tst         w15, #KERNEL_VOICE_FILTER
+    b.eq        .voice_output
+    NEXT_FUSED_INSTRUCTION
+    bl          filter_value
+.voice_output:
+    NEXT_FUSED_INSTRUCTION
+    // Same as output_function
+    add         x4, x4, #1
+    ldr         s1, [x9, #OUTPUT_PARAM_GAIN]
+    ldr         s2, [x7, #OUTPUT_WS_GAIN_MOD]
+    fadd        s1, s1, s2
+    fmul        s0, s0, s1
+    str         s0, [x5, #instrument_output]
+    ldp         x30, x15, [sp], #16
+    ret
+
+///
+/// Instrument that can only output zero. Stops the note, so render_instrument
+/// skips the instrument until its next note
+///
+/// Input registers:
+///     x0-x10 like the instruction functions
+/// Output registers:
+///     x4 = parameters of the next instrument
+///     x6 = INSTRUMENT_END opcode of the instrument
+/// Destroyed registers:
+///     x12, x13
+silent_kernel:
+    str         wzr, [x5, #instrument_output]
+    str         wzr, [x5, #instrument_note]
+    LOAD_BUFFER x12, instrument_skip_data, layout_skip_data
+    add         x12, x12, x3, lsl #SKIP_DATA_SHIFT
+    ldr         x4, [x12, #skip_data_parameters]
+.silent_end:
+    ldrb        w13, [x6], #1
+    cbnz        w13, .silent_end
+    sub         x6, x6, #1
+    ret
+#endif // DEBUG
+
 ///
 /// Envelope function
 ///
@@ -400,14 +882,25 @@ stack_loop:
 ///     x17
 envelope_function:
     PUSH_LINK_REGISTER
-    // Transform parameters (5 values)
-    mov         x17, #5
-    bl          transform_values
+    bl          envelope_value
+    str         s0, [x8], #4
+    POP_LINK_REGISTER
+    ret
+
+///
+/// Envelope output without the VM stack, for envelope_function and the fused kernels
+///
+/// Output registers:
+///     s0 = envelope output
+envelope_value:
+    PUSH_LINK_REGISTER
+    // Skip the parameters (5 values), they are read from the transformed parameters
+    add         x4, x4, #5
     // Check if the envelope is active by checking if note = 0
     ldr         w16, [x5]
     cbnz        w16, envelope_is_active
-    // Push 0.0 onto the VM stack
-    str         wzr, [x8], #4
+    // Output 0.0
+    fmov        s0, wzr
     b           envelope_done
 envelope_is_active:
     // Are we in release mode?
@@ -426,7 +919,7 @@ envelope_process:
 envelope_attack:
 	cmp         w17, #ENV_STATE_ATTACK
     bne         envelope_decay
-    bl          envelope_map
+    bl          ENVELOPE_STEP
     fadd        s0, s0, s1
     // If value > 1, then end of attack
     fmov        s1, #1.0
@@ -437,7 +930,7 @@ envelope_attack:
 envelope_decay:
     cmp         w17, #ENV_STATE_DECAY
     bne         envelope_release
-    bl          envelope_map
+    bl          ENVELOPE_STEP
     fsub        s0, s0, s1
     // If value < sustain, then end of decay
     ldr         s1, [x9, #ENVELOPE_PARAM_SUSTAIN]
@@ -448,7 +941,7 @@ envelope_decay:
 envelope_release:
     cmp         w17, #ENV_STATE_RELEASE
     bne         envelope_leave
-    bl          envelope_map
+    bl          ENVELOPE_STEP
     fsub        s0, s0, s1
     // If value < 0, then end of release
     //fmov        s1, #0.0
@@ -461,16 +954,59 @@ envelope_state_change:
 envelope_leave:
 	str         s0, [x7, #ENVELOPE_WS_LEVEL]
 envelope_gain:
-    // Multiply s0 with gain parameter and store result in [x8], then advance x8 by 4 bytes
+    // Multiply s0 with gain parameter
     ldr     s1, [x9, #ENVELOPE_PARAM_GAIN]
     ldr     s2, [x7, #ENVELOPE_WS_GAIN_MOD]
     fadd    s1, s1, s2
     fmul    s0, s0, s1
-    str     s0, [x8], #4
 envelope_done:
     POP_LINK_REGISTER
     ret
 
+#ifdef DEBUG
+///
+/// Control-rate version of envelope_map
+/// The step of the current state is recomputed every [control_rate] samples and
+/// when the state changes. The ADSR segments are linear, so the level still
+/// advances on every sample.
+///
+/// Input registers:
+///     w17 = envelope state
+///     x7 = instrument instruction workspace pointer
+///     x9 = transformed instrument instruction parameters pointer
+/// Output registers:
+///     s1 = computed value
+/// Destroyed registers:
+///     x11, x12
+///     s1, s2, s3, s4, s5, s6, s7, s8
+envelope_control_step:
+    ldr         w11, [x7, #ENVELOPE_WS_CONTROL_COUNT]
+    ldr         w12, [x7, #ENVELOPE_WS_CONTROL_STATE]
+    // Recompute if the state changed or the countdown expired
+    cmp         w12, w17
+    ccmp        w11, #0, #4, eq
+    b.eq        1f
+    sub         w11, w11, #1
+    str         w11, [x7, #ENVELOPE_WS_CONTROL_COUNT]
+    ldr         s1, [x7, #ENVELOPE_WS_CONTROL_STEP]
+    ret
+1:
+    PUSH_LINK_REGISTER
+    bl          envelope_map
+    POP_LINK_REGISTER
+    // The steps of envelope_map are tuned for SAMPLE_RATE
+    LOAD_ADDR   x11, synth_layout
+    ldr         s2, [x11, #layout_rate_scale]
+    fmul        s1, s1, s2
+    str         s1, [x7, #ENVELOPE_WS_CONTROL_STEP]
+    str         w17, [x7, #ENVELOPE_WS_CONTROL_STATE]
+    LOAD_ADDR   x11, control_rate
+    ldr         w11, [x11]
+    sub         w11, w11, #1
+    str         w11, [x7, #ENVELOPE_WS_CONTROL_COUNT]
+    ret
+#endif // DEBUG
+
 ///
 ///
 ///
@@ -611,12 +1147,16 @@ pwr:
 ///     else:
 ///         note_value = combined_offset
 ///
-///     frequency = power(2, note_value / 12)
-///
-///     if (LFO_mode):
-///         frequency = frequency × LFO_NORMALIZE
+///     if (note, type, transpose, detune, transpose_mod, detune_mod unchanged):
+///         frequency = cached_frequency
 ///     else:
-///         frequency = frequency × FREQ_NORMALIZE
+///         frequency = power(2, note_value / 12)
+///
+///         if (LFO_mode):
+///             frequency = frequency × LFO_NORMALIZE
+///         else:
+///             frequency = frequency × FREQ_NORMALIZE
+///         cached_frequency = frequency
 ///     new_phase = (old_phase + frequency + frequency_mod) mod 1
 ///     final_phase = (new_phase + phase_mod + phase_param) mod 1
 ///     color = color_param + color_mod
@@ -634,13 +1174,49 @@ pwr:
 ///     final_output = output × (gain + gm)
 _oscillator_function:
     PUSH_LINK_REGISTER
-    // Transform parameters
-    mov         x17, #7
-    bl          transform_values
+    bl          oscillator_value
+    str         s0, [x8], #4
+    POP_LINK_REGISTER
+    ret
+
+///
+/// Oscillator output without the VM stack, for oscillator_function and the fused kernels
+///
+/// Output registers:
+///     s0 = oscillator output
+oscillator_value:
+    PUSH_LINK_REGISTER
+    // Skip the parameters (7 values), they are read from the transformed parameters
+    add         x4, x4, #7
     // Load oscillator type into w17
     ldrb        w17, [x4], #1
     // Perhaps check for end of note?
     // Stereo?
+    // The phase increment only changes with the note, the type, the transpose
+    // and detune parameters and their modulation inputs. Reuse the increment
+    // of the previous sample when none of them changed
+    // w16 = valid bit | type << 16 | note
+    ldr         w16, [x5, #instrument_note]
+    orr         w16, w16, w17, lsl #16
+    orr         w16, w16, #0x80000000
+    ldr         w11, [x7, #OSCILLATOR_WS_CACHE_KEY]
+    cmp         w11, w16
+    ldp         w11, w12, [x9, #OSCILLATOR_PARAM_TRANSPOSE]
+    ldp         w13, w14, [x7, #OSCILLATOR_WS_CACHE_TRANSPOSE]
+    ccmp        w11, w13, #0, eq
+    ccmp        w12, w14, #0, eq
+    ldp         w13, w14, [x7, #OSCILLATOR_WS_TRANSPOSE_MOD]
+    ldp         w11, w12, [x7, #OSCILLATOR_WS_CACHE_TRANSPOSE_MOD]
+    ccmp        w13, w11, #0, eq
+    ccmp        w14, w12, #0, eq
+    b.ne        .update_increment
+    ldr         s0, [x7, #OSCILLATOR_WS_CACHE_INCREMENT]
+    b           .add_increment
+.update_increment:
+    str         w16, [x7, #OSCILLATOR_WS_CACHE_KEY]
+    stp         w13, w14, [x7, #OSCILLATOR_WS_CACHE_TRANSPOSE_MOD]
+    ldp         w11, w12, [x9, #OSCILLATOR_PARAM_TRANSPOSE]
+    stp         w11, w12, [x7, #OSCILLATOR_WS_CACHE_TRANSPOSE]
     // s0 = transpose value [-128..128]
     ldr         s0, [x9, #OSCILLATOR_PARAM_TRANSPOSE]
     fsub        s0, s0, s31
@@ -666,12 +1242,14 @@ _oscillator_function:
     bl          pwr
     tst         w17, #OSCILLATOR_LFO
     b.eq        .normalize_note
-    ldr         s2, LFO_frequency_base
+    LOAD_RATE_CONSTANT s2, x11, layout_lfo_frequency_base, LFO_frequency_base
     b          .normalized
 .normalize_note:
-    ldr         s2, frequency_base
+    LOAD_RATE_CONSTANT s2, x11, layout_frequency_base, frequency_base
 .normalized:
     fmul        s0, s1, s2
+    str         s0, [x7, #OSCILLATOR_WS_CACHE_INCREMENT]
+.add_increment:
     // Add the phase and frequency modulation
     ldr         s1, [x7, #OSCILLATOR_WS_PHASE]
     fadd        s0, s0, s1
@@ -699,19 +1277,37 @@ _oscillator_function:
     ldr         s2, [x7, #OSCILLATOR_WS_COLOR_MOD]
     fadd        s1, s1, s2
     // So, s0 is now phase and s1 is color. Let's create the waveform
+#ifdef DEBUG
+    // The editor can look the waveforms up in band-limited tables instead
+    LOAD_ADDR   x11, wavetable_mode
+    ldr         w11, [x11]
+    cbz         w11, .polynomial_waveform
+    tst         w17, #(OSCILLATOR_SINE | OSCILLATOR_SQUARE | OSCILLATOR_SAW | OSCILLATOR_TRIANGLE)
+    b.eq        .polynomial_waveform
+    bl          wavetable_waveform
+    b           .not_sine
+.polynomial_waveform:
+#endif
     tst         w17, #OSCILLATOR_SINE
     b.eq        .not_sine
     bl          cosine_waveform
 .not_sine:
     tst         w17, #OSCILLATOR_NOISE
     b.eq        .not_noise
-    // Simple white noise
+    // Simple white noise from a generator in the workspace
     // seed = seed * 16007
-    LOAD_ADDR   x11, rand_seed
-    ldr         w13, [x11]
+    ldr         w13, [x7, #OSCILLATOR_WS_NOISE_SEED]
+    cbnz        w13, .noise_seeded
+    // The workspace is cleared when the note starts, seed from the note and the
+    // position of the workspace: note << NOISE_SEED_NOTE_SHIFT | (x7 - synth_data) | 1
+    ldr         w13, [x5, #instrument_note]
+    sub         x12, x7, x10
+    orr         w13, w12, w13, lsl #NOISE_SEED_NOTE_SHIFT
+    orr         w13, w13, #1
+.noise_seeded:
     mov         w12, #16007
     mul         w13, w13, w12
-    str         w13, [x11]
+    str         w13, [x7, #OSCILLATOR_WS_NOISE_SEED]
     // // s0 = (float)seed / (float)c_RandDiv
     scvtf       s0, w13
     LOAD_ADDR   x12, rand_div
@@ -724,7 +1320,6 @@ _oscillator_function:
     ldr         s2, [x7, #OSCILLATOR_WS_GAIN_MOD]
     fadd        s1, s1, s2
     fmul        s0, s0, s1
-    str         s0, [x8], #4
     POP_LINK_REGISTER
     ret
 
@@ -788,6 +1383,80 @@ cosine_waveform:
     ret
 
 
+#ifdef DEBUG
+///
+/// Wavetable waveform function
+///
+/// Evaluates the waveforms selected by the oscillator type from band-limited
+/// tables with linear interpolation. Color scales the period like it does for
+/// cosine_waveform, so the table level is chosen from the phase increment
+/// divided by color. Level k holds the harmonics below Nyquist for increments
+/// up to 2^(k - 11).
+///
+/// Against cos(2*pi*phase/color) the sine table errs by at most 2e-6. The
+/// polynomial in cosine_waveform errs by up to 0.02 near a quarter period,
+/// which bounds the difference between the two modes to 0.0201.
+///
+/// Input: s0 = phase, s1 = color, w17 = oscillator type, x7 = workspace
+///        with the phase increment of the current sample
+/// Output: s0 = sum of the selected waveforms, 0.0 if phase > color
+/// Uses: s1, s2, s3, s4, x11, x12, x13, x14, w15
+wavetable_waveform:
+    // Output 0.0 outside of the color, like cosine_waveform
+    fcmp        s0, s1
+    b.gt        .wavetable_silent
+    fcmp        s1, #0.0
+    b.le        .wavetable_silent
+    // s2 = 1 / color, s0 = position within the waveform period [0..1]
+    fdiv        s2, s28, s1
+    fmul        s0, s0, s2
+    // w11 = table level from the exponent of the increment per period
+    ldr         s1, [x7, #OSCILLATOR_WS_CACHE_INCREMENT]
+    fmul        s1, s1, s2
+    fmov        w11, s1
+    ubfx        w11, w11, #23, #8
+    subs        w11, w11, #(127 - WAVETABLE_LEVELS - 1)
+    csel        w11, wzr, w11, lt
+    mov         w12, #(WAVETABLE_LEVELS - 1)
+    cmp         w11, w12
+    csel        w11, w12, w11, gt
+    // w12 = table index, s2 = interpolation fraction
+    mov         w12, #WAVETABLE_SIZE
+    scvtf       s1, w12
+    fmul        s1, s0, s1
+    fcvtzu      w12, s1
+    mov         w13, #(WAVETABLE_SIZE - 1)
+    cmp         w12, w13
+    csel        w12, w13, w12, hi
+    ucvtf       s2, w12
+    fsub        s2, s1, s2
+    // x13 = sample of the sine table of the level, x14 = distance between types
+    LOAD_ADDR   x13, wavetables
+    mov         w14, #(WAVETABLE_TYPES * WAVETABLE_STRIDE * 4)
+    umaddl      x13, w11, w14, x13
+    add         x13, x13, x12, lsl #2
+    mov         x14, #(WAVETABLE_STRIDE * 4)
+    // Sum the waveforms in flag order: sine, square, saw, triangle
+    fmov        s0, wzr
+    mov         w15, #OSCILLATOR_SINE
+.wavetable_type:
+    tst         w17, w15
+    b.eq        .wavetable_next_type
+    ldp         s3, s4, [x13]
+    fsub        s4, s4, s3
+    fmadd       s3, s4, s2, s3
+    fadd        s0, s0, s3
+.wavetable_next_type:
+    add         x13, x13, x14
+    lsl         w15, w15, #1
+    cmp         w15, #OSCILLATOR_NOISE
+    b.ne        .wavetable_type
+    ret
+.wavetable_silent:
+    fmov        s0, wzr
+    ret
+#endif
+
 ///
 /// Store latest instruction output * value function
 ///
@@ -804,18 +1473,37 @@ cosine_waveform:
 ///     x10 = synth data pointer
 /// Destroyed registers:
 storeval_function:
+    // The value on top of the VM stack is the input
+    ldr         s0, [x8, #-4]
+/// Entry point with the input in s0, for the fused kernels
+storeval_value:
     PUSH_LINK_REGISTER
-    // Transform parameters (1 value)
-    mov         x17, #1
-    bl          transform_values
+    // Skip the parameters (1 value), they are read from the transformed parameters
+    add         x4, x4, #1
+#ifdef DEBUG
+    // Between control points, continue the ramp towards the last value
+    ldr         w11, [x7, #STOREVAL_WS_CONTROL_COUNT]
+    cbz         w11, storeval_control_point
+    sub         w11, w11, #1
+    str         w11, [x7, #STOREVAL_WS_CONTROL_COUNT]
+    ldr         s1, [x7, #STOREVAL_WS_CONTROL_VALUE]
+    ldr         s2, [x7, #STOREVAL_WS_CONTROL_DELTA]
+    fadd        s1, s1, s2
+    str         s1, [x7, #STOREVAL_WS_CONTROL_VALUE]
+    b           storeval_destination
+storeval_control_point:
+#endif
     ldr         s1, [x9, #STOREVAL_PARAM_AMOUNT]
     // Remap s1 from [0,1] to [-1,1]: s1 = (s1 - 0.5) / 0.5
     fmov        s2, #0.5
     fsub        s1, s1, s2
     fdiv        s1, s1, s2
-    // // Multiply with value at top of VM stack
-    ldr         s2, [x8, #-4]
-    fmul        s1, s1, s2
+    // Multiply with the input value
+    fmul        s1, s1, s0
+#ifdef DEBUG
+    bl          storeval_control_ramp
+storeval_destination:
+#endif
     // Load 16-bit value from [x4], advance x4 by 2
     ldrh        w17, [x4], #2
     and         w16, w17, #STOREVAL_MASK
@@ -836,6 +1524,37 @@ storeval_function:
     POP_LINK_REGISTER
     ret
 
+#ifdef DEBUG
+///
+/// Start a control-rate ramp from the current value towards the value in s1
+/// At full rate (control_rate = 1) the value is used as is.
+///
+/// Input registers:
+///     s1 = value computed at this control point
+///     x7 = instrument instruction workspace pointer
+/// Output registers:
+///     s1 = value for the current sample
+/// Destroyed registers:
+///     x11, x12
+///     s2, s3, s4
+storeval_control_ramp:
+    LOAD_ADDR   x11, control_rate
+    ldr         w11, [x11]
+    sub         w12, w11, #1
+    str         w12, [x7, #STOREVAL_WS_CONTROL_COUNT]
+    cbz         w12, 1f
+    // delta = (value - current) / control_rate
+    ldr         s2, [x7, #STOREVAL_WS_CONTROL_VALUE]
+    fsub        s3, s1, s2
+    ucvtf       s4, w11
+    fdiv        s3, s3, s4
+    str         s3, [x7, #STOREVAL_WS_CONTROL_DELTA]
+    fadd        s1, s2, s3
+1:
+    str         s1, [x7, #STOREVAL_WS_CONTROL_VALUE]
+    ret
+#endif // DEBUG
+
 ///
 /// SVF - State Variable Filter
 ///
@@ -874,9 +1593,23 @@ storeval_function:
 ///         output -= high
 filter_function:
     PUSH_LINK_REGISTER
-    // Transform parameters (1 value)
-    mov         x17, #2
-    bl          transform_values
+    ldr         s0, [x8, #-4]
+    bl          filter_value
+    // Store output back to VM stack
+    str         s0, [x8, #-4]
+    POP_LINK_REGISTER
+    ret
+
+///
+/// Filter without the VM stack, for filter_function and the fused kernels
+///
+/// Input registers:
+///     s0 = filter input
+/// Output registers:
+///     s0 = filter output
+filter_value:
+    // Skip the parameters (2 values), they are read from the transformed parameters
+    add         x4, x4, #2
     // Load filter type into w17
     ldrb        w17, [x4], #1
     // Calculate frequency
@@ -884,12 +1617,21 @@ filter_function:
     ldr         s2, [x7, #FILTER_WS_FREQUENCY_MOD]
     fadd        s1, s1, s2
     fmul        s1, s1, s1
+#ifdef DEBUG
+    // The frequencies are tuned for SAMPLE_RATE. At lower rates the scaled
+    // frequency is kept at max(frequency, 1.0), where the filter stays stable
+    LOAD_ADDR   x11, synth_layout
+    ldr         s2, [x11, #layout_rate_scale]
+    fmul        s2, s1, s2
+    fmax        s3, s1, s28
+    fmin        s1, s2, s3
+#endif
     // Load resonance
     ldr         s2, [x9, #FILTER_PARAM_RESONANCE]
     ldr         s3, [x7, #FILTER_WS_RESONANCE_MOD]
     fadd        s2, s2, s3
-    // Load input value from top of VM stack
-    ldr         s4, [x8, #-4]
+    // Input value
+    fmov        s4, s0
     // Load current state variables
     ldr         s3, [x7, #FILTER_WS_BAND]
     ldr         s6, [x7, #FILTER_WS_LOW]
@@ -925,9 +1667,6 @@ filter_function:
     fadd        s0, s0, s9          // output += low
     fsub        s0, s0, s8          // output -= high
 .not_peak:
-    // Store output back to VM stack
-    str         s0, [x8, #-4]
-    POP_LINK_REGISTER
     ret
 
 ///
@@ -974,10 +1713,8 @@ operation_function:
 ///     x10 = synth data pointer
 /// Destroyed registers:
 output_function:
-    PUSH_LINK_REGISTER
-    // Transform parameters (gain)
-    mov         x17, #1
-    bl          transform_values
+    // Skip the parameters (gain), they are read from the transformed parameters
+    add         x4, x4, #1
     ldr         s1, [x9, #OUTPUT_PARAM_GAIN]
     ldr         s2, [x7, #OUTPUT_WS_GAIN_MOD]
     fadd        s1, s1, s2
@@ -985,7 +1722,6 @@ output_function:
     ldr         s0, [x8]
     fmul        s0, s0, s1
     str         s0, [x5, #instrument_output]
-    POP_LINK_REGISTER
     ret
 
 ///
@@ -1005,6 +1741,20 @@ output_function:
 /// Destroyed registers:
 accumulate_function:
     PUSH_LINK_REGISTER
+#ifdef DEBUG
+    mov         x11, #0
+    fmov        s0, wzr
+.accumulate_loop:
+    // Load instrument output
+    INSTRUMENT_LAYOUT x13, x11, instrument_layout_data
+    add         x13, x13, #instrument_output
+    ldr         s1, [x10, x13]
+    fadd        s0, s0, s1
+    add         x11, x11, #1
+    LOAD_SIZE   x13, layout_num_instruments, MAX_NUM_INSTRUMENTS
+    cmp         x11, x13
+    b.lt        .accumulate_loop
+#else
     mov         x13, x10
     mov         x11, #MAX_NUM_INSTRUMENTS
     fmov        s0, wzr
@@ -1015,12 +1765,74 @@ accumulate_function:
     add         x13, x13, #instrument_length
     subs        x11, x11, #1
     b.ne        .accumulate_loop
+#endif
     str         s0, [x8], #4
     POP_LINK_REGISTER
     ret
 
 ///
-/// Convert [x17] 8-bit values in [x4] to floats in [_transformed_parameters]
+/// Convert the parameters of all instruments into the transformed parameters table
+///
+/// The table has one slot of MAX_COMMAND_PARAMS floats per instruction, in the same
+/// layout as the instrument workspaces. process_stack points x9 at the slot of the
+/// instruction being executed. The instruments and the song instrument
+/// (MAX_NUM_INSTRUMENTS + 1 in total) are converted.
+///
+/// The skip data used by render_instrument for silent instruments is filled in
+/// on the way: where the program of the next instrument starts, and the
+/// SKIP_FLAG_* of the instructions of the program.
+///
+/// Destroyed registers:
+///     x3, x4, x6, x9, x11, x12, x13, x14, x15, x16, x17
+///     s0, s3
+transform_parameters:
+    PUSH_LINK_REGISTER
+    LOAD_BUFFER x4, instrument_parameters, layout_instrument_parameters
+    LOAD_BUFFER x6, instrument_instructions, layout_instrument_instructions
+    LOAD_BUFFER x16, transformed_parameters, layout_transformed_parameters
+    adr         x13, instruction_parameter_sizes
+    mov         x3, #0
+.transform_instrument_loop:
+    mov         x12, #0
+    // x9 = slot of the first instruction of instrument x3
+#ifdef DEBUG
+    INSTRUMENT_LAYOUT x9, x3, instrument_layout_parameters
+    add         x9, x9, x16
+#else
+    mov         x15, #(MAX_COMMANDS * MAX_COMMAND_PARAMS * 4)
+    madd        x9, x3, x15, x16
+#endif
+.transform_instruction_loop:
+    ldrb        w15, [x6], #1
+    cbz         w15, .transform_instrument_done
+    adr         x14, instruction_skip_flags
+    ldrb        w14, [x14, x15]
+    orr         x12, x12, x14
+    // Convert all parameter bytes of the instruction
+    ldrb        w17, [x13, x15]
+    cbz         w17, 1f
+    bl          transform_values
+1:
+    add         x9, x9, #(MAX_COMMAND_PARAMS * 4)
+    b           .transform_instruction_loop
+.transform_instrument_done:
+    LOAD_BUFFER x14, instrument_skip_data, layout_skip_data
+    add         x14, x14, x3, lsl #SKIP_DATA_SHIFT
+    stp         x6, x4, [x14, #skip_data_instructions]
+    str         x12, [x14, #skip_data_flags]
+    add         x3, x3, #1
+#ifdef DEBUG
+    LOAD_SIZE   x15, layout_num_instruments, MAX_NUM_INSTRUMENTS
+    cmp         x3, x15
+#else
+    cmp         x3, #MAX_NUM_INSTRUMENTS
+#endif
+    b.le        .transform_instrument_loop
+    POP_LINK_REGISTER
+    ret
+
+///
+/// Convert [x17] 8-bit values in [x4] to floats in [x9]
 ///
 /// Input registers:
 ///     x0 = current note #
@@ -1035,13 +1847,10 @@ accumulate_function:
 ///     x10 = synth data pointer
 /// Output registers:
 ///     x4 = point to next 8-bit value
-///     x9 = point to transformed parameters
 /// Destroyed registers:
-///     x9, w14, x17
+///     x11, w14, x17
 ///     s0, s3
 transform_values:
-    // x9 = pointer to transformed parameters
-    LOAD_ADDR   x9, transformed_parameters
     mov         x11, x9
     // Load 1/128 constant from memory into s3
     ldr         s3, inv_128_const
@@ -1062,8 +1871,8 @@ inv_128_const:      .float  0.0078125       // 1/128
 inv_12_const:       .float  0.0833333       // 1/12
 pi2_const:          .float  6.283185307    // 2*pi
 pi_const:           .float  3.1415927
-frequency_base:     .float  0.000185392  // 440.0/(2^(69/12)) / 44100.0
-LFO_frequency_base: .float  0.000041106    // LFO base frequency
+frequency_base:     .float  FREQUENCY_BASE
+LFO_frequency_base: .float  LFO_FREQUENCY_BASE
 cos_c4:             .float  0.04166667
 
 
@@ -1076,6 +1885,43 @@ pwr_c2:             .float  0.240226   // coefficient for 2^x approximation
 pwr_c3:             .float  0.0555041  // coefficient for 2^x approximation
 pwr_c4:             .float  0.00961812 // coefficient for 2^x approximation
 
+/// Number of parameter bytes of each instruction, indexed by instruction ID
+instruction_parameter_sizes:
+                    .byte 0 // INSTRUMENT_END
+                    .byte 5 // ENVELOPE_ID
+                    .byte 8 // OSCILLATOR_ID
+                    .byte 3 // STOREVAL_ID
+                    .byte 1 // OPERATION_ID
+                    .byte 3 // FILTER_ID
+                    .byte 1 // PANNING_ID (not implemented)
+                    .byte 1 // OUTPUT_ID
+                    .byte 0 // ACCUMULATE_ID
+
+/// Workspace size an instruction clears on note-on, in 8-byte units (one str xzr
+/// each, so a 4-byte workspace rounds up to 1), indexed by instruction ID
+instruction_workspace_sizes:
+                    .byte 0                             // INSTRUMENT_END
+                    .byte (ENVELOPE_WS_SIZE + 7) / 8    // ENVELOPE_ID
+                    .byte (OSCILLATOR_WS_SIZE + 7) / 8  // OSCILLATOR_ID
+                    .byte (STOREVAL_WS_SIZE + 7) / 8    // STOREVAL_ID
+                    .byte 0                             // OPERATION_ID
+                    .byte (FILTER_WS_SIZE + 7) / 8      // FILTER_ID
+                    .byte 0                             // PANNING_ID (not implemented)
+                    .byte (OUTPUT_WS_SIZE + 7) / 8      // OUTPUT_ID
+                    .byte 0                             // ACCUMULATE_ID
+
+/// What keeps render_instrument from skipping a silent program, indexed by instruction ID
+instruction_skip_flags:
+                    .byte 0                 // INSTRUMENT_END
+                    .byte 0                 // ENVELOPE_ID
+                    .byte 0                 // OSCILLATOR_ID
+                    .byte SKIP_FLAG_NEVER   // STOREVAL_ID
+                    .byte 0                 // OPERATION_ID
+                    .byte SKIP_FLAG_FILTER  // FILTER_ID
+                    .byte 0                 // PANNING_ID (not implemented)
+                    .byte 0                 // OUTPUT_ID
+                    .byte 0                 // ACCUMULATE_ID
+
 
 .data
 ///
@@ -1092,21 +1938,98 @@ instrument_instructions_lookup:
                     .quad 0 // panning_function (not implemented)
                     .quad output_function
                     .quad accumulate_function
+#ifdef DEBUG
+                    .quad voice_kernel      // KERNEL_VOICE
+                    .quad voice_kernel      // KERNEL_VOICE + KERNEL_VOICE_STOREVAL
+                    .quad voice_kernel      // KERNEL_VOICE + KERNEL_VOICE_FILTER
+                    .quad voice_kernel      // KERNEL_VOICE + both flags
+                    .quad silent_kernel     // KERNEL_SILENT
+#endif
 
-rand_seed:          .word 1
 rand_div:           .float 2147483648.0
 
+#ifdef DEBUG
+/// Number of samples between control-rate updates (1 = every sample)
+control_rate:       .word 1
+/// Non-zero to evaluate oscillator waveforms from wavetables
+wavetable_mode:     .word 0
+/// Non-zero to flush subnormal results to zero in dope4ks_render
+flush_to_zero:      .word 1
+/// Non-zero to skip the programs of silent instruments, see render_instrument
+skip_silent:        .word 1
+/// Non-zero to run compiled_instructions instead of the instructions
+program_compiler:   .word 0
+/// First and end sample of the note rendered by dope4ks_render
+render_range:       .word 0, SAMPLES_PER_NOTE
+
+/// Buffers and sizes of the engine, the static ones until the editor replaces them
+.p2align 3
+synth_layout:
+                    .quad synth_data
+                    .quad transformed_parameters
+                    .quad subnormal_counts
+                    .quad compiled_instructions
+                    .quad instrument_instructions
+                    .quad instrument_parameters
+                    .quad instrument_patterns
+                    .quad pattern_array
+                    .quad instrument_skip_data
+                    .quad note_events
+                    .quad note_event_cursors
+                    .quad static_instrument_layouts
+                    .quad MAX_NUM_INSTRUMENTS
+                    .quad PATTERNS_PER_INSTRUMENT
+                    .quad NOTE_EVENTS_PER_INSTRUMENT * NOTE_EVENT_SIZE
+                    .quad SAMPLES_PER_NOTE
+                    .float FREQUENCY_BASE
+                    .float LFO_FREQUENCY_BASE
+                    .float 1.0
+                    .float 0.0
+/// Layouts of the static buffers, every instrument has room for MAX_COMMANDS workspaces
+static_instrument_layouts:
+.set layout_index, 0
+.rept MAX_NUM_INSTRUMENTS + 1
+                    .quad layout_index * instrument_length
+                    .quad layout_index * MAX_COMMANDS * MAX_COMMAND_PARAMS * 4
+                    .quad MAX_COMMANDS
+                    .quad 0
+.set layout_index, layout_index + 1
+.endr
+#endif
+
 .bss
 
 /// Synth data
 synth_data:                 .space   synth_data_size
-transformed_parameters:     .space   MAX_COMMAND_PARAMS * 4
+/// Transformed parameters, one slot per instruction of each instrument and the song
+transformed_parameters:     .space   (MAX_NUM_INSTRUMENTS + 1) * MAX_COMMANDS * MAX_COMMAND_PARAMS * 4
+
+#ifdef DEBUG
+/// Band-limited waveform tables, [level][type][sample], built by the editor
+wavetables:                 .space   WAVETABLE_LEVELS * WAVETABLE_TYPES * WAVETABLE_STRIDE * 4
+/// Number of subnormal results per instruction, indexed like the transformed parameter slots
+subnormal_counts:           .space   (MAX_NUM_INSTRUMENTS + 1) * MAX_COMMANDS * 4
+/// Opcodes with fused kernels, laid out like the instructions, see Instrument::compile_program
+compiled_instructions:      .space   PROGRAM_SIZE
+#endif
+
+.p2align 3
+/// Program ends of the instruments, see transform_parameters
+instrument_skip_data:       .space   (MAX_NUM_INSTRUMENTS + 1) * skip_data_size
+
+/// Note events of every instrument, see build_note_events
+note_events:                .space   MAX_NUM_INSTRUMENTS * NOTE_EVENTS_PER_INSTRUMENT * NOTE_EVENT_SIZE
+/// Next event of every instrument, see seek_note_events
+.p2align 3
+note_event_cursors:         .space   MAX_NUM_INSTRUMENTS * 8
+/// Sample of the block where the next event of any instrument is due, see play_due_events
+next_event_sample:          .space   4
 
 /// The current note being rendered
 dope4ks_current_note:       .space   4
 
 /// VM Stack data (for all instruments)
-vm_stack_data:             .space   16 * 4
+vm_stack_data:             .space   VM_STACK_SIZE * 4
 
 /// Legacy variables for softsynth_wrapper.asm
 _get_noise_waveform:
@@ -39,8 +39,6 @@ INSTRUMENT_START Instrument2
     .byte INSTRUMENT_END
 INSTRUMENT_START Instrument3
     .byte INSTRUMENT_END
-INSTRUMENT_START Instrument4
-    .byte INSTRUMENT_END
 song_instructions:
 INSTRUMENT_START Song
     .byte ACCUMULATE_ID
@@ -73,7 +71,6 @@ INSTRUMENT_START Instrument2
     // PAN PAN_VALUE(64)
     OUTPUT OUTPUT_GAIN(64)
 INSTRUMENT_START Instrument3
-INSTRUMENT_START Instrument4
 song_parameters:
 INSTRUMENT_START Song
     ACCUMULATE
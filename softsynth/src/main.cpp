@@ -13,6 +13,7 @@ float data[SAMPLES_PER_NOTE];
 // #define FULLSCREEN
 int main(void)
 {
+    build_note_events();
     dope4ks_render(NULL, (uint8_t *)data, SAMPLES_PER_NOTE);
 
     SDL_Init(SDL_INIT_VIDEO);
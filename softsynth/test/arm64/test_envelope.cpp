@@ -37,6 +37,8 @@ void setup_envelope_function(uint32_t current_note, bool is_released = false, un
 
 void run_envelope_function()
 {
+    float transformed[MAX_COMMAND_PARAMS];
+    transform_test_parameters(instruction_params, 5, transformed);
     for (int i = 0; i < 16; i++)
         vm_stack[i] = -1.0f;
     // Set up registers
@@ -44,14 +46,16 @@ void run_envelope_function()
     ///     x5 = instrument data pointer
     ///     x7 = current instrument instruction workspace pointer
     ///     x8 = VM stack data pointer
+    ///     x9 = transformed instrument instruction parameters pointer
     asm volatile(
         "mov     x4, %0\n"
         "mov     x5, %1\n"
         "mov     x7, %2\n"
         "mov     x8, %3\n"
+        "mov     x9, %4\n"
         :
-        : "r"(instruction_params), "r"(instrument_data), "r"(&instrument_data[INSTRUMENT_WS_OFFSET]), "r"(vm_stack)
-        : "x4", "x5", "x7", "x8");
+        : "r"(instruction_params), "r"(instrument_data), "r"(&instrument_data[INSTRUMENT_WS_OFFSET]), "r"(vm_stack), "r"(transformed)
+        : "x4", "x5", "x7", "x8", "x9");
     envelope_function();
     asm volatile("mov %0, x8" : "=r"(x8_ptr));
 }
@@ -170,6 +174,34 @@ void test_envelope_function_adsr_run(void)
     }
 }
 
+void test_envelope_function_control_rate(void)
+{
+    // Render the full ADSR at full rate as reference
+    float reference[200];
+    setup_envelope_function(1, false, 16, 32, 64, 32);
+    for (int i = 0; i < 200; i++)
+    {
+        if (i == 100)
+            instrument_data[INSTRUMENT_RELEASE_OFFSET] = 1;
+        run_envelope_function();
+        reference[i] = vm_stack[0];
+    }
+
+    TEST_ASSERT_EQUAL_UINT32(4, instrument_data[INSTRUMENT_WS_OFFSET]);
+
+    // The steps only depend on the state, so control rate gives the same curve
+    control_rate = 32;
+    setup_envelope_function(1, false, 16, 32, 64, 32);
+    for (int i = 0; i < 200; i++)
+    {
+        if (i == 100)
+            instrument_data[INSTRUMENT_RELEASE_OFFSET] = 1;
+        run_envelope_function();
+        TEST_ASSERT_EQUAL_FLOAT(reference[i], vm_stack[0]);
+    }
+    control_rate = 1;
+}
+
 int main(void)
 {
     UNITY_BEGIN();
@@ -177,5 +209,6 @@ int main(void)
     RUN_TEST(test_envelope_function_attack_starts);
     RUN_TEST(test_envelope_function_gain);
     RUN_TEST(test_envelope_function_adsr_run);
+    RUN_TEST(test_envelope_function_control_rate);
     return UNITY_END();
 }
\ No newline at end of file
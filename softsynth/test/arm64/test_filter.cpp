@@ -55,18 +55,23 @@ void run_filter_function(uint8_t frequency, uint8_t resonance, uint8_t filter_ty
     freq *= freq; // Squared frequency
     float res = ((float)(resonance) / PARAM_MAX);
 
+    float transformed[MAX_COMMAND_PARAMS];
+    transform_test_parameters(instrument_params, 2, transformed);
+
     // Set up registers
     ///     x4 = current instrument parameters pointer
     ///     x5 = instrument data pointer
     ///     x7 = instrument instruction workspace pointer
     ///     x8 = VM stack pointer
+    ///     x9 = transformed instrument instruction parameters pointer
     asm volatile(
         "mov     x4, %0\n"
         "mov     x7, %1\n"
         "mov     x8, %2\n"
+        "mov     x9, %3\n"
         :
-        : "r"(instrument_params), "r"(filter_ws), "r"(&vm_stack[1])
-        : "x4", "x7", "x8");
+        : "r"(instrument_params), "r"(filter_ws), "r"(&vm_stack[1]), "r"(transformed)
+        : "x4", "x7", "x8", "x9");
     debug_setup_sx_registers();
     filter_function();
 
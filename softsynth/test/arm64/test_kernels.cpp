@@ -0,0 +1,222 @@
+#include "../unity.h"
+#include "../../include/defines.h"
+#include "../../include/softsynth.h"
+#include "../test_common.h"
+#include <string.h>
+
+// Samples rendered per comparison, the second half is released
+#define KERNEL_TEST_SAMPLES 4096
+
+// Byte offset of the gain modulation of the first instruction (envelope)
+#define ENVELOPE_GAIN_MOD_DEST 20
+
+// Sample of the released tail where the skip test disturbs instrument 0
+#define SKIP_TEST_SAMPLE (KERNEL_TEST_SAMPLES / 2 + 16)
+
+uint8_t saved_instructions[sizeof(instrument_instructions)];
+uint8_t saved_parameters[sizeof(instrument_parameters)];
+
+// Unity setup/teardown functions
+extern "C"
+{
+    void setUp(void)
+    {
+        memcpy(saved_instructions, instrument_instructions, sizeof(instrument_instructions));
+        memcpy(saved_parameters, instrument_parameters, sizeof(instrument_parameters));
+    }
+
+    void tearDown(void)
+    {
+        program_compiler = 0;
+        skip_silent = 1;
+        memcpy(instrument_instructions, saved_instructions, sizeof(instrument_instructions));
+        memcpy(instrument_parameters, saved_parameters, sizeof(instrument_parameters));
+        transform_parameters();
+    }
+}
+
+// Build instrument 0 from a voice chain, the other instruments are empty
+int load_voice_chain(uint8_t flags, uint8_t oscillator_type, uint8_t output_gain)
+{
+    int count = 0;
+    int size = 0;
+    memset(instrument_instructions, INSTRUMENT_END, sizeof(instrument_instructions));
+    memset(instrument_parameters, 0, sizeof(instrument_parameters));
+
+    const uint8_t envelope[5] = {72, 96, 96, 88, 128};
+    instrument_instructions[count++] = ENVELOPE_ID;
+    memcpy(&instrument_parameters[size], envelope, 5);
+    size += 5;
+    if (flags & KERNEL_VOICE_STOREVAL)
+    {
+        const uint8_t storeval[3] = {96, ENVELOPE_GAIN_MOD_DEST, 0};
+        instrument_instructions[count++] = STOREVAL_ID;
+        memcpy(&instrument_parameters[size], storeval, 3);
+        size += 3;
+    }
+    const uint8_t oscillator[8] = {64, 64, 0, 0, 128, 64, 128, oscillator_type};
+    instrument_instructions[count++] = OSCILLATOR_ID;
+    memcpy(&instrument_parameters[size], oscillator, 8);
+    size += 8;
+    instrument_instructions[count++] = OPERATION_ID;
+    instrument_parameters[size++] = OPERATOR_MULP;
+    if (flags & KERNEL_VOICE_FILTER)
+    {
+        const uint8_t filter[3] = {80, 128, FILTER_LOWPASS};
+        instrument_instructions[count++] = FILTER_ID;
+        memcpy(&instrument_parameters[size], filter, 3);
+        size += 3;
+    }
+    instrument_instructions[count++] = OUTPUT_ID;
+    instrument_parameters[size++] = output_gain;
+
+    transform_parameters();
+    memcpy(compiled_instructions, instrument_instructions, sizeof(instrument_instructions));
+    return size;
+}
+
+void render_instrument_0(uint32_t compiled, float *output)
+{
+    program_compiler = compiled;
+    debug_start_instrument_note(0, 60);
+    for (int i = 0; i < KERNEL_TEST_SAMPLES; i++)
+        debug_next_instrument_sample(0, &output[i], i >= KERNEL_TEST_SAMPLES / 2);
+    program_compiler = 0;
+}
+
+void check_voice_kernel(uint8_t flags)
+{
+    static float reference[KERNEL_TEST_SAMPLES];
+    static float fused[KERNEL_TEST_SAMPLES];
+    load_voice_chain(flags, OSCILLATOR_SINE, 128);
+    compiled_instructions[0] = KERNEL_VOICE + flags;
+
+    render_instrument_0(0, reference);
+    render_instrument_0(1, fused);
+    TEST_ASSERT_NOT_EQUAL_FLOAT(0.0f, reference[KERNEL_TEST_SAMPLES / 4]);
+    TEST_ASSERT_EQUAL_MEMORY(reference, fused, sizeof(reference));
+}
+
+void test_voice_kernel(void)
+{
+    check_voice_kernel(0);
+    check_voice_kernel(KERNEL_VOICE_STOREVAL);
+    check_voice_kernel(KERNEL_VOICE_FILTER);
+    check_voice_kernel(KERNEL_VOICE_STOREVAL | KERNEL_VOICE_FILTER);
+}
+
+void test_voice_kernel_pointers(void)
+{
+    uint8_t flags = KERNEL_VOICE_STOREVAL | KERNEL_VOICE_FILTER;
+    int size = load_voice_chain(flags, OSCILLATOR_SINE, 128);
+    compiled_instructions[0] = KERNEL_VOICE + flags;
+    uint8_t *x4_ptr;
+    uint8_t *x6_ptr;
+    float *x8_ptr;
+
+    // The pointers end like after interpreting the six instructions
+    program_compiler = 1;
+    debug_start_instrument_note(0, 60);
+    asm volatile(
+        "mov     x3, #0\n"
+        "mov     x4, %0\n"
+        "mov     x5, %1\n"
+        "mov     x6, %2\n"
+        "mov     x8, %3\n"
+        "mov     x10, %1\n"
+        :
+        : "r"(instrument_parameters), "r"(synth_data), "r"(instrument_instructions), "r"(vm_stack_data)
+        : "x3", "x4", "x5", "x6", "x8", "x10");
+    debug_setup_sx_registers();
+    process_stack();
+    asm volatile(
+        "mov     %0, x4\n"
+        "mov     %1, x6\n"
+        "mov     %2, x8\n"
+        : "=r"(x4_ptr), "=r"(x6_ptr), "=r"(x8_ptr));
+    TEST_ASSERT_EQUAL_PTR(&instrument_parameters[size], x4_ptr);
+    TEST_ASSERT_EQUAL_PTR(&instrument_instructions[7], x6_ptr);
+    TEST_ASSERT_EQUAL_PTR(vm_stack_data, x8_ptr);
+}
+
+void test_silent_kernel(void)
+{
+    static float reference[KERNEL_TEST_SAMPLES];
+    static float silent[KERNEL_TEST_SAMPLES];
+    load_voice_chain(0, OSCILLATOR_NOISE, 0);
+
+    // Output gain 0 only outputs zero, whatever the noise oscillator does
+    render_instrument_0(0, reference);
+    compiled_instructions[0] = KERNEL_SILENT;
+    render_instrument_0(1, silent);
+    // The interpreter may output -0.0, which mixes like 0.0
+    for (int i = 0; i < KERNEL_TEST_SAMPLES; i++)
+    {
+        TEST_ASSERT_EQUAL_FLOAT(0.0f, reference[i]);
+        TEST_ASSERT_EQUAL_FLOAT(0.0f, silent[i]);
+    }
+    // The note is stopped, render_instrument skips the instrument from now on
+    TEST_ASSERT_EQUAL_UINT32(0, synth_data[0]);
+}
+
+// Render instrument 0 with or without skipping. Once the note has stopped, the
+// output is zeroed like at a zero crossing of the tail and the STOREVAL
+// destination gets a value the program has not stored
+uint32_t render_released_instrument_0(uint32_t skip, float *output)
+{
+    skip_silent = skip;
+    debug_start_instrument_note(0, 60);
+    for (int i = 0; i < KERNEL_TEST_SAMPLES; i++)
+    {
+        if (i == SKIP_TEST_SAMPLE)
+        {
+            TEST_ASSERT_EQUAL_UINT32(0, synth_data[INSTRUMENT_NOTE_OFFSET]);
+            synth_data[INSTRUMENT_OUTPUT_OFFSET] = 0;
+            synth_data[ENVELOPE_GAIN_MOD_DEST / 4] = 0x3F800000;
+        }
+        debug_next_instrument_sample(0, &output[i], i >= KERNEL_TEST_SAMPLES / 2);
+    }
+    skip_silent = 1;
+    return synth_data[ENVELOPE_GAIN_MOD_DEST / 4];
+}
+
+void check_skip_silent(uint8_t flags)
+{
+    static float reference[KERNEL_TEST_SAMPLES];
+    static float skipped[KERNEL_TEST_SAMPLES];
+    int size = load_voice_chain(flags, OSCILLATOR_SINE, 128);
+    // Stop the note right at the release, and let the filter ring
+    instrument_parameters[3] = 0;
+    if (flags & KERNEL_VOICE_FILTER)
+        instrument_parameters[size - 3] = 8;
+    transform_parameters();
+
+    uint32_t reference_stored = render_released_instrument_0(0, reference);
+    uint32_t skipped_stored = render_released_instrument_0(1, skipped);
+    if (flags & KERNEL_VOICE_FILTER)
+        TEST_ASSERT_NOT_EQUAL_FLOAT(0.0f, reference[SKIP_TEST_SAMPLE + 1]);
+    // The interpreter may output -0.0 where the skipped program leaves 0.0
+    for (int i = 0; i < KERNEL_TEST_SAMPLES; i++)
+        TEST_ASSERT_TRUE(reference[i] == skipped[i]);
+    TEST_ASSERT_EQUAL_UINT32(reference_stored, skipped_stored);
+}
+
+void test_skip_silent(void)
+{
+    check_skip_silent(0);
+    check_skip_silent(KERNEL_VOICE_STOREVAL);
+    check_skip_silent(KERNEL_VOICE_FILTER);
+    check_skip_silent(KERNEL_VOICE_STOREVAL | KERNEL_VOICE_FILTER);
+}
+
+int main(void)
+{
+    UNITY_BEGIN();
+
+    RUN_TEST(test_voice_kernel);
+    RUN_TEST(test_voice_kernel_pointers);
+    RUN_TEST(test_silent_kernel);
+    RUN_TEST(test_skip_silent);
+
+    return UNITY_END();
+}
@@ -36,6 +36,10 @@
 #define INSTRUMENT_WS_SIZE 16    // Size of instrument workspace array
 #define INSTRUMENT_DATA_SIZE 3   // Size of instrument data array
 
+// Noise generator of the oscillator workspace
+#define NOISE_MULTIPLIER 16007u
+#define NOISE_WS_OFFSET 76       // Workspace of the second instruction in synth_data
+
 // Unity required functions
 void setUp(void)
 {
@@ -54,11 +58,14 @@ void run_oscillator_function(int num, uint8_t note, uint8_t types, uint8_t trans
     uint8_t instrument_params[8] = {transpose, detune, phase, gates, color, shape, gain, types};
     float instrument_ws[16] = {0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0};
     uint32_t instrument_data2[3] = {note, 0, 0};
+    float transformed[MAX_COMMAND_PARAMS];
+    transform_test_parameters(instrument_params, 7, transformed);
 
     // Set up registers
     ///     x4 = current instrument parameters pointer
     ///     x5 = instrument data pointer
     ///     x7 = instrument instruction workspace pointer
+    ///     x9 = transformed instrument instruction parameters pointer
     for (int n = 0; n < num; n++)
     {
         asm volatile(
@@ -66,9 +73,10 @@ void run_oscillator_function(int num, uint8_t note, uint8_t types, uint8_t trans
             "mov     x5, %1\n"
             "mov     x7, %2\n"
             "mov     x8, %3\n"
+            "mov     x9, %4\n"
             :
-            : "r"(instrument_params), "r"(instrument_data2), "r"(instrument_ws), "r"(vm_stack)
-            : "x4", "x5", "x7", "x8");
+            : "r"(instrument_params), "r"(instrument_data2), "r"(instrument_ws), "r"(vm_stack), "r"(transformed)
+            : "x4", "x5", "x7", "x8", "x9");
         debug_setup_sx_registers();
         oscillator_function();
     }
@@ -76,6 +84,52 @@ void run_oscillator_function(int num, uint8_t note, uint8_t types, uint8_t trans
     *output_phase = instrument_ws[0];
 }
 
+void step_oscillator_function(uint8_t *instrument_params, uint32_t *instrument_data, float *instrument_ws, float *transformed)
+{
+    asm volatile(
+        "mov     x4, %0\n"
+        "mov     x5, %1\n"
+        "mov     x7, %2\n"
+        "mov     x8, %3\n"
+        "mov     x9, %4\n"
+        :
+        : "r"(instrument_params), "r"(instrument_data), "r"(instrument_ws), "r"(vm_stack), "r"(transformed)
+        : "x4", "x5", "x7", "x8", "x9");
+    debug_setup_sx_registers();
+    oscillator_function();
+}
+
+// Oscillator step with x10 pointing NOISE_WS_OFFSET bytes before the workspace, like synth_data
+void step_noise_oscillator(uint8_t *instrument_params, uint32_t *instrument_data, float *instrument_ws, float *transformed)
+{
+    uint8_t *synth_base = (uint8_t *)instrument_ws - NOISE_WS_OFFSET;
+    asm volatile(
+        "mov     x4, %0\n"
+        "mov     x5, %1\n"
+        "mov     x7, %2\n"
+        "mov     x8, %3\n"
+        "mov     x9, %4\n"
+        "mov     x10, %5\n"
+        :
+        : "r"(instrument_params), "r"(instrument_data), "r"(instrument_ws), "r"(vm_stack), "r"(transformed), "r"(synth_base)
+        : "x4", "x5", "x7", "x8", "x9", "x10");
+    debug_setup_sx_registers();
+    oscillator_function();
+}
+
+// Generator state after a number of samples, the LCG multiplier raised by squaring
+uint32_t noise_jump(uint32_t seed, uint32_t samples)
+{
+    uint32_t multiplier = NOISE_MULTIPLIER;
+    for (; samples; samples >>= 1)
+    {
+        if (samples & 1)
+            seed *= multiplier;
+        multiplier *= multiplier;
+    }
+    return seed;
+}
+
 void run_sine_test(uint8_t note, uint8_t transpose, uint8_t detune, uint8_t gain, float expected_freq)
 {
     float output;
@@ -123,11 +177,81 @@ void test_gain_sine(void)
     run_sine_test(A2, PARAM_CENTER, PARAM_CENTER, PARAM_CENTER, A2_FREQ);
 }
 
+void test_frequency_cache(void)
+{
+    uint8_t instrument_params[8] = {PARAM_CENTER, PARAM_CENTER, PARAM_MIN, PARAM_MIN, PARAM_MAX, PARAM_MIN, PARAM_MAX, OSCILLATOR_SINE};
+    float instrument_ws[INSTRUMENT_WS_SIZE] = {0};
+    uint32_t instrument_data[INSTRUMENT_DATA_SIZE] = {A3, 0, 0};
+    float transformed[MAX_COMMAND_PARAMS];
+    transform_test_parameters(instrument_params, 7, transformed);
+
+    // First sample computes the increment, the second one reuses it
+    step_oscillator_function(instrument_params, instrument_data, instrument_ws, transformed);
+    float increment = instrument_ws[0];
+    TEST_ASSERT_FLOAT_WITHIN(PHASE_TOLERANCE_COARSE, A3_FREQ / SAMPLE_RATE, increment);
+    step_oscillator_function(instrument_params, instrument_data, instrument_ws, transformed);
+    TEST_ASSERT_FLOAT_WITHIN(PHASE_TOLERANCE_FINE, 2 * increment, instrument_ws[0]);
+
+    // Transpose modulation of one octave doubles the increment
+    float phase = instrument_ws[0];
+    instrument_ws[2] = (float)NOTES_IN_OCTAVE / PARAM_MAX;
+    step_oscillator_function(instrument_params, instrument_data, instrument_ws, transformed);
+    TEST_ASSERT_FLOAT_WITHIN(PHASE_TOLERANCE_FINE, phase + 2 * increment, instrument_ws[0]);
+
+    // A new note and a new detune parameter are picked up as well
+    phase = instrument_ws[0];
+    instrument_ws[2] = 0.0f;
+    instrument_data[0] = A4;
+    step_oscillator_function(instrument_params, instrument_data, instrument_ws, transformed);
+    TEST_ASSERT_FLOAT_WITHIN(PHASE_TOLERANCE_FINE, phase + 2 * increment, instrument_ws[0]);
+    phase = instrument_ws[0];
+    transformed[1] = 1.0f;
+    step_oscillator_function(instrument_params, instrument_data, instrument_ws, transformed);
+    TEST_ASSERT_FLOAT_WITHIN(PHASE_TOLERANCE_COARSE, phase + 2 * increment * powf(2.0f, 1.0f / NOTES_IN_OCTAVE), instrument_ws[0]);
+}
+
+void test_noise_generator(void)
+{
+    uint8_t instrument_params[8] = {PARAM_CENTER, PARAM_CENTER, PARAM_MIN, PARAM_MIN, PARAM_MAX, PARAM_MIN, PARAM_MAX, OSCILLATOR_NOISE};
+    float first_ws[INSTRUMENT_WS_SIZE] = {0};
+    float second_ws[INSTRUMENT_WS_SIZE] = {0};
+    uint32_t *first_state = (uint32_t *)&first_ws[OSCILLATOR_NOISE_SEED_WORD];
+    uint32_t *second_state = (uint32_t *)&second_ws[OSCILLATOR_NOISE_SEED_WORD];
+    uint32_t instrument_data[INSTRUMENT_DATA_SIZE] = {A2, 0, 0};
+    float transformed[MAX_COMMAND_PARAMS];
+    transform_test_parameters(instrument_params, 7, transformed);
+
+    // The cleared workspace is seeded from the note and its position
+    uint32_t seed = (A2 << NOISE_SEED_NOTE_SHIFT) | NOISE_WS_OFFSET | 1;
+    step_noise_oscillator(instrument_params, instrument_data, first_ws, transformed);
+    TEST_ASSERT_EQUAL_UINT32(seed * NOISE_MULTIPLIER, *first_state);
+    TEST_ASSERT_EQUAL_FLOAT((float)(int32_t)(seed * NOISE_MULTIPLIER) / 2147483648.0f, vm_stack[0]);
+
+    // Every sample is one multiplication, so a workspace can start at any sample
+    for (int i = 1; i < 1000; i++)
+        step_noise_oscillator(instrument_params, instrument_data, first_ws, transformed);
+    TEST_ASSERT_EQUAL_UINT32(noise_jump(seed, 1000), *first_state);
+    *second_state = noise_jump(seed, 1000);
+    step_noise_oscillator(instrument_params, instrument_data, first_ws, transformed);
+    float expected = vm_stack[0];
+    step_noise_oscillator(instrument_params, instrument_data, second_ws, transformed);
+    TEST_ASSERT_EQUAL_UINT32(*first_state, *second_state);
+    TEST_ASSERT_EQUAL_FLOAT(expected, vm_stack[0]);
+
+    // Another note starts another sequence
+    memset(second_ws, 0, sizeof(second_ws));
+    instrument_data[0] = A3;
+    step_noise_oscillator(instrument_params, instrument_data, second_ws, transformed);
+    TEST_ASSERT_EQUAL_UINT32(((A3 << NOISE_SEED_NOTE_SHIFT) | NOISE_WS_OFFSET | 1) * NOISE_MULTIPLIER, *second_state);
+}
+
 int main(void)
 {
     UNITY_BEGIN();
     RUN_TEST(test_basic_sine);
     RUN_TEST(test_transpose_detune_sine);
     RUN_TEST(test_gain_sine);
+    RUN_TEST(test_frequency_cache);
+    RUN_TEST(test_noise_generator);
     return UNITY_END();
 }
\ No newline at end of file
@@ -31,15 +31,18 @@ void run_output_function(float stack_value, unsigned char gain, float gain_modul
     instruction_params[0] = gain;
     // Set up gain modulator
     ((float *)instrument_data)[3] = gain_modulator;
+    float transformed[MAX_COMMAND_PARAMS];
+    transform_test_parameters(instruction_params, 1, transformed);
     // Set up registers
     asm volatile(
         "mov     x4, %0\n"
         "mov     x5, %1\n"
         "mov     x7, %2\n"
         "mov     x8, %3\n"
+        "mov     x9, %4\n"
         :
-        : "r"(instruction_params), "r"(instrument_data), "r"(&instrument_data[INSTRUMENT_WS_OFFSET]), "r"(&vm_stack[1])
-        : "x4", "x5", "x7", "x8");
+        : "r"(instruction_params), "r"(instrument_data), "r"(&instrument_data[INSTRUMENT_WS_OFFSET]), "r"(&vm_stack[1]), "r"(transformed)
+        : "x4", "x5", "x7", "x8", "x9");
     output_function();
     asm volatile("mov %0, x8" : "=r"(x8_ptr));
 }
@@ -63,6 +66,7 @@ void test_debug_instrument_output(void)
 {
     float output;
 
+    transform_parameters();
     debug_start_instrument_note(0, 32);
     TEST_ASSERT_EQUAL_UINT32(32, synth_data[INSTRUMENT_NOTE_OFFSET]);
     TEST_ASSERT_EQUAL_UINT32(0, synth_data[INSTRUMENT_RELEASE_OFFSET]);
@@ -27,10 +27,11 @@ void test_transform_values(void)
     // Set up registers
     asm volatile(
         "mov     x4, %0\n"
+        "mov     x9, %1\n"
         "mov     x17, #4\n"
         :
-        : "r"(test_data)
-        : "x4", "x17");
+        : "r"(test_data), "r"(transformed_parameters)
+        : "x4", "x9", "x17");
     transform_values();
     // Retrieve x4 register value
     asm volatile("mov %0, x4" : "=r"(x4_ptr));
@@ -44,6 +45,26 @@ void test_transform_values(void)
     TEST_ASSERT_EQUAL_PTR(&test_data[4], x4_ptr);
 }
 
+void test_transform_parameters(void)
+{
+    const int slot = MAX_COMMAND_PARAMS;
+    const int instrument = MAX_COMMANDS * MAX_COMMAND_PARAMS;
+    memset(transformed_parameters, 0, sizeof(transformed_parameters));
+    transform_parameters();
+
+    // Instrument 0: ENVELOPE, OSCILLATOR and OUTPUT each get their own slot
+    for (int i = 0; i < 5; i++)
+        TEST_ASSERT_EQUAL_FLOAT(instrument_parameters[i] / 128.0f, transformed_parameters[i]);
+    for (int i = 0; i < 8; i++)
+        TEST_ASSERT_EQUAL_FLOAT(instrument_parameters[5 + i] / 128.0f, transformed_parameters[slot + i]);
+    TEST_ASSERT_EQUAL_FLOAT(instrument_parameters[13] / 128.0f, transformed_parameters[2 * slot]);
+    TEST_ASSERT_EQUAL_FLOAT(0.0f, transformed_parameters[3 * slot]);
+    // Instrument 1 starts at its own row
+    for (int i = 0; i < 5; i++)
+        TEST_ASSERT_EQUAL_FLOAT(instrument_parameters[14 + i] / 128.0f, transformed_parameters[instrument + i]);
+    TEST_ASSERT_EQUAL_FLOAT(0.0f, transformed_parameters[instrument + slot]);
+}
+
 unsigned char inum = 0;
 unsigned char instructions[4] = {1, 2, 3, 0};
 unsigned char icallers[3] = {0, 0, 0};
@@ -158,23 +179,134 @@ void test_process_stack(void)
     TEST_ASSERT_EQUAL_PTR(&instrument_data[INSTRUMENT_WS_OFFSET + 16 * 2], iargs[2]);
 }
 
+// Instruction pushing the smallest subnormal float onto the VM stack
+__attribute__((naked)) void push_subnormal(void)
+{
+    asm volatile(
+        "mov     w11, #1\n"
+        "fmov    s0, w11\n"
+        "str     s0, [x8], #4\n"
+        "ret\n");
+}
+
+// Instruction pushing 1.0 onto the VM stack
+__attribute__((naked)) void push_one(void)
+{
+    asm volatile(
+        "fmov    s0, #1.0\n"
+        "str     s0, [x8], #4\n"
+        "ret\n");
+}
+
+void test_subnormal_counts(void)
+{
+    unsigned char subnormal_instructions[4] = {4, 5, 4, 0};
+    instrument_instructions_lookup[4] = push_subnormal;
+    instrument_instructions_lookup[5] = push_one;
+    memset(subnormal_counts, 0, sizeof(subnormal_counts));
+    ///     x3 = current instrument #
+    ///     x5 = instrument data pointer
+    ///     x6 = instrument instruction pointer
+    ///     x8 = VM stack data pointer
+    asm volatile(
+        "mov     x3, #1\n"
+        "mov     x5, %0\n"
+        "mov     x6, %1\n"
+        "mov     x8, %2\n" : : "r"(instrument_data),
+                               "r"(subnormal_instructions),
+                               "r"(vm_stack_data) : "x3", "x5", "x6", "x8");
+    process_stack();
+    // Counters of instrument 1 are indexed by instruction
+    TEST_ASSERT_EQUAL_UINT32(1, subnormal_counts[MAX_COMMANDS + 0]);
+    TEST_ASSERT_EQUAL_UINT32(0, subnormal_counts[MAX_COMMANDS + 1]);
+    TEST_ASSERT_EQUAL_UINT32(1, subnormal_counts[MAX_COMMANDS + 2]);
+    TEST_ASSERT_EQUAL_UINT32(0, subnormal_counts[0]);
+}
+
+uint64_t read_fpcr(void)
+{
+    uint64_t fpcr;
+    asm volatile("mrs %0, fpcr" : "=r"(fpcr));
+    return fpcr;
+}
+
+void test_render_restores_fpcr(void)
+{
+    static float buffer[SAMPLES_PER_NOTE];
+    uint64_t fpcr = read_fpcr();
+    build_note_events();
+    dope4ks_render(NULL, (unsigned char *)buffer, sizeof(buffer));
+    TEST_ASSERT_EQUAL_UINT64(fpcr, read_fpcr());
+}
+
+void test_skip_silent_instrument(void)
+{
+    uint32_t *instrument = &synth_data[0];
+    float sample = 1.0f;
+    // Turn the oscillator of instrument 0 into a noise oscillator
+    uint8_t type = instrument_parameters[12];
+    instrument_parameters[12] = OSCILLATOR_NOISE;
+    transform_parameters();
+    memset(instrument, 0, INSTRUMENT_SIZE * sizeof(uint32_t));
+    uint32_t *noise_state = &instrument[INSTRUMENT_WS_OFFSET + MAX_COMMAND_PARAMS + OSCILLATOR_NOISE_SEED_WORD];
+
+    // No note and silent output, neither the envelope nor the noise oscillator run
+    debug_next_instrument_sample(0, &sample, 0);
+    TEST_ASSERT_EQUAL_FLOAT(0.0f, sample);
+    TEST_ASSERT_EQUAL_UINT32(0, instrument[INSTRUMENT_WS_OFFSET + 1]);
+    TEST_ASSERT_EQUAL_UINT32(0, *noise_state);
+
+    // A note runs the program, the attack raises the envelope level and the
+    // noise oscillator seeds its generator from the note
+    instrument[INSTRUMENT_NOTE_OFFSET] = 60;
+    debug_next_instrument_sample(0, &sample, 0);
+    TEST_ASSERT_NOT_EQUAL(0, instrument[INSTRUMENT_WS_OFFSET + 1]);
+    uint32_t workspace_offset = (INSTRUMENT_WS_OFFSET + MAX_COMMAND_PARAMS) * sizeof(uint32_t);
+    TEST_ASSERT_EQUAL_UINT32(((60 << NOISE_SEED_NOTE_SHIFT) | workspace_offset | 1) * 16007u, *noise_state);
+
+    instrument_parameters[12] = type;
+    transform_parameters();
+}
+
 void reset_instrument_data(unsigned char val)
 {
     memset(instrument_data, val, sizeof(instrument_data));
 }
 
-void run_new_instrument_note(uint32_t instrument_num, uint32_t note_num, uint32_t expected_note, bool release = false)
+// Program whose workspaces a note-on resets, and the words it resets in each
+unsigned char reset_program[] = {ENVELOPE_ID, OSCILLATOR_ID, OPERATION_ID, OUTPUT_ID, INSTRUMENT_END};
+const int reset_words[] = {6, 14, 0, 2};
+
+void assert_reset_workspaces(const uint32_t *data)
+{
+    for (int i = 0; i < MAX_COMMANDS; i++)
+    {
+        const uint32_t *workspace = &data[INSTRUMENT_WS_OFFSET + i * MAX_COMMAND_PARAMS];
+        int words = i < 4 ? reset_words[i] : 0;
+        for (int j = 0; j < MAX_COMMAND_PARAMS; j++)
+        {
+            TEST_ASSERT_EQUAL_UINT32(j < words ? 0 : 0xFFFFFFFF, workspace[j]);
+        }
+    }
+}
+
+void run_play_note_events(uint32_t instrument_num, uint32_t note_num, uint32_t expected_note, bool release = false)
 {
     ///     x0 = current note #
+    ///     x2 = current sample #
     ///     x3 = current instrument #
     ///     x5 = instrument data pointer
+    ///     x6 = instrument instructions pointer
+    seek_note_events(note_num * SAMPLES_PER_NOTE);
     asm volatile(
         "mov     w0, %w0\n"
+        "mov     x2, #0\n"
         "mov     w3, %w1\n"
-        "mov     x5, %2\n" :
-        : "r"(note_num), "r"(instrument_num), "r"(&instrument_data[instrument_num * INSTRUMENT_SIZE])
-        : "x0", "x3", "x5");
-    new_instrument_note();
+        "mov     x5, %2\n"
+        "mov     x6, %3\n" :
+        : "r"(note_num), "r"(instrument_num), "r"(&instrument_data[instrument_num * INSTRUMENT_SIZE]), "r"(reset_program)
+        : "x0", "x2", "x3", "x5", "x6");
+    play_note_events();
     for (int i = 0; i < MAX_NUM_INSTRUMENTS; i++)
     {
         if (i == instrument_num)
@@ -188,7 +320,9 @@ void run_new_instrument_note(uint32_t instrument_num, uint32_t note_num, uint32_
             {
                 TEST_ASSERT_EQUAL_UINT32(0, instrument_data[i * INSTRUMENT_SIZE + INSTRUMENT_RELEASE_OFFSET]);
             }
-            TEST_ASSERT_EACH_EQUAL_UINT32(0, &instrument_data[i * INSTRUMENT_SIZE + INSTRUMENT_OUTPUT_OFFSET], INSTRUMENT_SIZE - 2);
+            // Only the words the program uses are reset
+            TEST_ASSERT_EQUAL_UINT32(0, instrument_data[i * INSTRUMENT_SIZE + INSTRUMENT_OUTPUT_OFFSET]);
+            assert_reset_workspaces(&instrument_data[i * INSTRUMENT_SIZE]);
         }
         else
         {
@@ -197,41 +331,139 @@ void run_new_instrument_note(uint32_t instrument_num, uint32_t note_num, uint32_
     }
 }
 
-void test_new_instrument_note(void)
+void test_build_note_events(void)
 {
+    build_note_events();
+
+    // Pattern 0 of instrument 0: notes on even rows, a release on row 5 and HLD elsewhere
+    const uint32_t *event = note_events;
+    const uint32_t rows[] = {0, 2, 4, 5, 6};
+    const uint32_t notes[] = {60, 62, 64, 0, 65};
+    for (int i = 0; i < 5; i++, event += NOTE_EVENT_SIZE / 4)
+    {
+        TEST_ASSERT_EQUAL_UINT32(rows[i] * SAMPLES_PER_NOTE, event[0]);
+        TEST_ASSERT_EQUAL_UINT8(notes[i], event[1] & 0xFF);
+        TEST_ASSERT_EQUAL_UINT8(notes[i] ? NOTE_EVENT_ON : NOTE_EVENT_RELEASE, (event[1] >> 8) & 0xFF);
+        TEST_ASSERT_EQUAL_UINT16(0, event[1] >> 16);
+    }
+
+    // Every list is sorted and ends with the end marker
+    for (int i = 0; i < MAX_NUM_INSTRUMENTS; i++)
+    {
+        event = &note_events[i * NOTE_EVENTS_PER_INSTRUMENT * NOTE_EVENT_SIZE / 4];
+        uint32_t previous = 0;
+        while (event[0] != NOTE_EVENT_END)
+        {
+            TEST_ASSERT_TRUE(event[0] >= previous);
+            TEST_ASSERT_TRUE(event[0] < NOTES_PER_SONG * SAMPLES_PER_NOTE);
+            previous = event[0];
+            event += NOTE_EVENT_SIZE / 4;
+        }
+        TEST_ASSERT_TRUE(event - note_events < (i + 1) * NOTE_EVENTS_PER_INSTRUMENT * NOTE_EVENT_SIZE / 4);
+    }
+}
+
+void test_play_note_events(void)
+{
+    build_note_events();
+
     // Strike note 60 on instrument 0
     reset_instrument_data(0xFF);
-    run_new_instrument_note(0, 0, 60);
+    run_play_note_events(0, 0, 60);
     // Hold
-    run_new_instrument_note(0, 1, 60);
+    run_play_note_events(0, 1, 60);
     // Release
-    run_new_instrument_note(0, 5, 60, true);
+    run_play_note_events(0, 5, 60, true);
 
     // Strike note 62 on instrument 0, should retrigger
-    run_new_instrument_note(0, 2, 62);
+    run_play_note_events(0, 2, 62);
     // Hold
-    run_new_instrument_note(0, 3, 62);
+    run_play_note_events(0, 3, 62);
     // Release
-    run_new_instrument_note(0, 5, 62, true);
+    run_play_note_events(0, 5, 62, true);
 
     // Strike notes on instrument 0
     reset_instrument_data(0xFF);
-    run_new_instrument_note(0, NOTES_PER_PATTERN, 61);
-    run_new_instrument_note(0, NOTES_PER_PATTERN + 2, 63);
+    run_play_note_events(0, NOTES_PER_PATTERN, 61);
+    run_play_note_events(0, NOTES_PER_PATTERN + 2, 63);
 
     // Strike notes on instrument 1
     reset_instrument_data(0xFF);
-    run_new_instrument_note(1, 0, 61);
-    run_new_instrument_note(1, 2, 63);
-    run_new_instrument_note(1, NOTES_PER_PATTERN, 62);
-    run_new_instrument_note(1, NOTES_PER_PATTERN + 2, 64);
+    run_play_note_events(1, 0, 61);
+    run_play_note_events(1, 2, 63);
+    run_play_note_events(1, NOTES_PER_PATTERN, 62);
+    run_play_note_events(1, NOTES_PER_PATTERN + 2, 64);
+}
+
+void test_seek_note_events(void)
+{
+    build_note_events();
+    reset_instrument_data(0xFF);
+
+    // Seeking into a row starts the next event only when its sample is reached
+    seek_note_events(2 * SAMPLES_PER_NOTE - 1);
+    for (uint32_t sample = 0; sample < 2; sample++)
+    {
+        asm volatile(
+            "mov     w0, #1\n"
+            "mov     w2, %w0\n"
+            "mov     w3, #0\n"
+            "mov     x5, %1\n"
+            "mov     x6, %2\n" :
+            : "r"(SAMPLES_PER_NOTE - 1 + sample), "r"(instrument_data), "r"(reset_program)
+            : "x0", "x2", "x3", "x5", "x6");
+        play_note_events();
+        TEST_ASSERT_EQUAL_UINT32(sample ? 62 : 0xFFFFFFFF, instrument_data[0]);
+    }
+}
+
+void run_play_due_events(uint32_t note_num, uint32_t sample)
+{
+    ///     x0 = current note #
+    ///     x2 = current sample #
+    asm volatile(
+        "mov     w0, %w0\n"
+        "mov     w2, %w1\n" :
+        : "r"(note_num), "r"(sample)
+        : "x0", "x2");
+    play_due_events();
+}
+
+void test_play_due_events(void)
+{
+    build_note_events();
+    transform_parameters();
+    memset(synth_data, 0, SYNTH_SIZE * sizeof(uint32_t));
+
+    // Nothing is due on row 1, the next events are on row 2 in the next block
+    seek_note_events(2 * SAMPLES_PER_NOTE - 1);
+    run_play_due_events(1, SAMPLES_PER_NOTE - 1);
+    TEST_ASSERT_EACH_EQUAL_UINT32(0, synth_data, SYNTH_SIZE);
+    TEST_ASSERT_EQUAL_UINT32(SAMPLES_PER_NOTE, next_event_sample);
+
+    // Row 2 starts a note on every instrument, the next events are on row 4
+    run_play_due_events(2, 0);
+    const uint32_t notes[MAX_NUM_INSTRUMENTS] = {62, 63, 64, 62};
+    for (int i = 0; i < MAX_NUM_INSTRUMENTS; i++)
+    {
+        TEST_ASSERT_EQUAL_UINT32(notes[i], synth_data[i * INSTRUMENT_SIZE + INSTRUMENT_NOTE_OFFSET]);
+    }
+    TEST_ASSERT_EQUAL_UINT32(2 * SAMPLES_PER_NOTE, next_event_sample);
 }
 
 int main(void)
 {
     UNITY_BEGIN();
+    // Runs before the lookup table is replaced with test instructions
+    RUN_TEST(test_render_restores_fpcr);
+    RUN_TEST(test_skip_silent_instrument);
     RUN_TEST(test_transform_values);
+    RUN_TEST(test_transform_parameters);
     RUN_TEST(test_process_stack);
-    RUN_TEST(test_new_instrument_note);
+    RUN_TEST(test_subnormal_counts);
+    RUN_TEST(test_build_note_events);
+    RUN_TEST(test_play_note_events);
+    RUN_TEST(test_seek_note_events);
+    RUN_TEST(test_play_due_events);
     return UNITY_END();
 }
\ No newline at end of file
@@ -33,19 +33,23 @@ void run_storeval(uint8_t amount, uint16_t addr, float stack_value, float dest_v
     vm_stack[0] = stack_value;
     // Destination value
     ((float *)(&instrument_data[(addr & 0x3FFF) / 4]))[0] = dest_value;
+    float transformed[MAX_COMMAND_PARAMS];
+    transform_test_parameters(instruction_params, 1, transformed);
     // Set up registers
     ///     x4 = instrument instruction parameters pointer
     ///     x5 = instrument data pointer
     ///     x7 = current instrument instruction workspace pointer
     ///     x8 = VM stack data pointer
+    ///     x9 = transformed instrument instruction parameters pointer
     asm volatile(
         "mov     x4, %0\n"
         "mov     x5, %1\n"
         "mov     x7, %2\n"
         "mov     x8, %3\n"
+        "mov     x9, %4\n"
         :
-        : "r"(instruction_params), "r"(instrument_data), "r"(&instrument_data[INSTRUMENT_WS_OFFSET]), "r"(&vm_stack[1])
-        : "x4", "x5", "x7", "x8");
+        : "r"(instruction_params), "r"(instrument_data), "r"(&instrument_data[INSTRUMENT_WS_OFFSET]), "r"(&vm_stack[1]), "r"(transformed)
+        : "x4", "x5", "x7", "x8", "x9");
     storeval_function();
     asm volatile("mov %0, x8" : "=r"(x8_ptr));
 }
@@ -73,11 +77,29 @@ void test_storeval_function(void)
     TEST_ASSERT_EQUAL_PTR(&vm_stack[0], x8_ptr);
 }
 
+void test_storeval_function_control_rate(void)
+{
+    // Ramp towards 1.0, hold, then ramp down to 0.0 in steps of 4 samples
+    float expected[12] = {0.25f, 0.5f, 0.75f, 1.0f, 1.0f, 1.0f, 1.0f, 1.0f, 0.75f, 0.5f, 0.25f, 0.0f};
+    memset(instrument_data, 0, sizeof(instrument_data));
+    control_rate = 4;
+    for (int i = 0; i < 12; i++)
+    {
+        // The stack value is only read at control points
+        float stack_value = i < 8 ? 1.0f : 0.0f;
+        run_storeval(128, 42 * 4, i % 4 == 0 ? stack_value : 123.0f, 0.3f);
+        TEST_ASSERT_EQUAL_FLOAT(expected[i], ((float *)(&instrument_data[42]))[0]);
+        TEST_ASSERT_EQUAL_PTR(&vm_stack[1], x8_ptr);
+    }
+    control_rate = 1;
+}
+
 int main(void)
 {
     UNITY_BEGIN();
 
     RUN_TEST(test_storeval_function);
+    RUN_TEST(test_storeval_function_control_rate);
 
     return UNITY_END();
 }
\ No newline at end of file
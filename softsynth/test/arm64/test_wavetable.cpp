@@ -0,0 +1,184 @@
+#include "../unity.h"
+#include "../../include/defines.h"
+#include "../../include/softsynth.h"
+#include "../../include/wavetable.h"
+#include "../test_common.h"
+#include <stdio.h>
+#include <string.h>
+#include <time.h>
+#include <cmath>
+
+// Phase increments selecting the lowest and the highest table level
+#define LOW_INCREMENT 0.0001f
+#define HIGH_INCREMENT 0.4f
+
+// Documented error bounds of wavetable_waveform
+#define MAX_TABLE_ERROR 0.000002f      // Against cos(2*pi*phase/color)
+#define MAX_POLYNOMIAL_ERROR 0.0201f   // Against cosine_waveform
+#define SHAPE_TOLERANCE 0.01f          // Band-limited shapes away from their edges
+
+// Benchmark constants
+#define BENCHMARK_CALLS 1000000
+
+// Oscillator workspace index of the cached phase increment
+#define WS_CACHE_INCREMENT 12
+
+// Unity setup/teardown functions
+extern "C"
+{
+    void setUp(void)
+    {
+        static bool built = false;
+        if (!built)
+        {
+            build_wavetables(wavetables);
+            built = true;
+        }
+    }
+
+    void tearDown(void)
+    {
+        wavetable_mode = 0;
+    }
+}
+
+float call_cosine_waveform(float phase, float color)
+{
+    float result;
+    asm volatile(
+        "fmov s0, %w0\n" // phase in s0
+        "fmov s1, %w1\n" // color in s1
+        :
+        : "r"(phase), "r"(color)
+        : "s0", "s1", "s2", "s3", "s4", "s5", "s6", "s7", "x3", "x7", "w11");
+    debug_setup_sx_registers();
+    cosine_waveform();
+    asm volatile(
+        "fmov %w0, s0\n" // get result from s0
+        : "=r"(result));
+    return result;
+}
+
+float call_wavetable_waveform(float phase, float color, uint8_t types, float increment)
+{
+    float result;
+    float instrument_ws[16] = {0};
+    instrument_ws[WS_CACHE_INCREMENT] = increment;
+    asm volatile(
+        "fmov s0, %w0\n" // phase in s0
+        "fmov s1, %w1\n" // color in s1
+        "mov  w17, %w2\n"
+        "mov  x7, %3\n"
+        :
+        : "r"(phase), "r"(color), "r"(types), "r"(instrument_ws)
+        : "s0", "s1", "x7", "x17");
+    debug_setup_sx_registers();
+    wavetable_waveform();
+    asm volatile(
+        "fmov %w0, s0\n" // get result from s0
+        : "=r"(result));
+    return result;
+}
+
+void test_sine_error(void)
+{
+    float table_error = 0.0f;
+    float polynomial_error = 0.0f;
+    for (int i = 0; i <= 4096; i++)
+    {
+        float phase = i / 4096.0f;
+        float result = call_wavetable_waveform(phase, 1.0f, OSCILLATOR_SINE, LOW_INCREMENT);
+        table_error = fmaxf(table_error, fabsf(result - cosf(2.0f * (float)M_PI * phase)));
+        polynomial_error = fmaxf(polynomial_error, fabsf(result - call_cosine_waveform(phase, 1.0f)));
+    }
+    TEST_ASSERT_FLOAT_WITHIN(MAX_TABLE_ERROR, 0.0f, table_error);
+    TEST_ASSERT_FLOAT_WITHIN(MAX_POLYNOMIAL_ERROR, 0.0f, polynomial_error);
+}
+
+void test_color(void)
+{
+    // Phase beyond color is silent, color 0.5 plays the period twice as fast
+    TEST_ASSERT_EQUAL_FLOAT(0.0f, call_wavetable_waveform(0.8f, 0.5f, OSCILLATOR_SINE, LOW_INCREMENT));
+    TEST_ASSERT_FLOAT_WITHIN(MAX_TABLE_ERROR, -1.0f, call_wavetable_waveform(0.25f, 0.5f, OSCILLATOR_SINE, LOW_INCREMENT));
+    TEST_ASSERT_FLOAT_WITHIN(MAX_TABLE_ERROR, 1.0f, call_wavetable_waveform(0.5f, 0.5f, OSCILLATOR_SINE, LOW_INCREMENT));
+}
+
+void test_band_limited_shapes(void)
+{
+    // Enough harmonics to approximate the ideal shapes
+    TEST_ASSERT_FLOAT_WITHIN(SHAPE_TOLERANCE, 1.0f, call_wavetable_waveform(0.25f, 1.0f, OSCILLATOR_SQUARE, LOW_INCREMENT));
+    TEST_ASSERT_FLOAT_WITHIN(SHAPE_TOLERANCE, -1.0f, call_wavetable_waveform(0.75f, 1.0f, OSCILLATOR_SQUARE, LOW_INCREMENT));
+    TEST_ASSERT_FLOAT_WITHIN(SHAPE_TOLERANCE, -0.5f, call_wavetable_waveform(0.25f, 1.0f, OSCILLATOR_SAW, LOW_INCREMENT));
+    TEST_ASSERT_FLOAT_WITHIN(SHAPE_TOLERANCE, 0.5f, call_wavetable_waveform(0.75f, 1.0f, OSCILLATOR_SAW, LOW_INCREMENT));
+    TEST_ASSERT_FLOAT_WITHIN(SHAPE_TOLERANCE, 1.0f, call_wavetable_waveform(0.0f, 1.0f, OSCILLATOR_TRIANGLE, LOW_INCREMENT));
+    TEST_ASSERT_FLOAT_WITHIN(SHAPE_TOLERANCE, -1.0f, call_wavetable_waveform(0.5f, 1.0f, OSCILLATOR_TRIANGLE, LOW_INCREMENT));
+
+    // Close to Nyquist only the fundamental remains
+    TEST_ASSERT_FLOAT_WITHIN(MAX_TABLE_ERROR, 4.0f / (float)M_PI, call_wavetable_waveform(0.25f, 1.0f, OSCILLATOR_SQUARE, HIGH_INCREMENT));
+    TEST_ASSERT_FLOAT_WITHIN(MAX_TABLE_ERROR, -2.0f / (float)M_PI, call_wavetable_waveform(0.25f, 1.0f, OSCILLATOR_SAW, HIGH_INCREMENT));
+}
+
+void test_combined_types(void)
+{
+    float sine = call_wavetable_waveform(0.1f, 1.0f, OSCILLATOR_SINE, LOW_INCREMENT);
+    float triangle = call_wavetable_waveform(0.1f, 1.0f, OSCILLATOR_TRIANGLE, LOW_INCREMENT);
+    TEST_ASSERT_FLOAT_WITHIN(MAX_TABLE_ERROR, sine + triangle, call_wavetable_waveform(0.1f, 1.0f, OSCILLATOR_SINE | OSCILLATOR_TRIANGLE, LOW_INCREMENT));
+}
+
+void test_oscillator_wavetable_mode(void)
+{
+    uint8_t instrument_params[8] = {64, 64, 32, 0, 128, 0, 128, OSCILLATOR_SQUARE};
+    float instrument_ws[16] = {0};
+    uint32_t instrument_data[3] = {57, 0, 0};
+    float transformed[MAX_COMMAND_PARAMS];
+    transform_test_parameters(instrument_params, 7, transformed);
+
+    // Phase offset of a quarter period puts the square at its positive half
+    wavetable_mode = 1;
+    asm volatile(
+        "mov     x4, %0\n"
+        "mov     x5, %1\n"
+        "mov     x7, %2\n"
+        "mov     x8, %3\n"
+        "mov     x9, %4\n"
+        :
+        : "r"(instrument_params), "r"(instrument_data), "r"(instrument_ws), "r"(vm_stack), "r"(transformed)
+        : "x4", "x5", "x7", "x8", "x9");
+    debug_setup_sx_registers();
+    oscillator_function();
+    TEST_ASSERT_FLOAT_WITHIN(SHAPE_TOLERANCE, 1.0f, vm_stack[0]);
+}
+
+void test_benchmark_waveform_modes(void)
+{
+    char message[128];
+    volatile float sink = 0.0f;
+
+    clock_t start = clock();
+    for (int i = 0; i < BENCHMARK_CALLS; i++)
+        sink = sink + call_cosine_waveform((i & 1023) / 1024.0f, 1.0f);
+    double polynomial_time = (double)(clock() - start) / CLOCKS_PER_SEC;
+
+    start = clock();
+    for (int i = 0; i < BENCHMARK_CALLS; i++)
+        sink = sink + call_wavetable_waveform((i & 1023) / 1024.0f, 1.0f, OSCILLATOR_SINE, LOW_INCREMENT);
+    double wavetable_time = (double)(clock() - start) / CLOCKS_PER_SEC;
+
+    snprintf(message, sizeof(message), "%d calls: polynomial %.1f ms, wavetable %.1f ms",
+             BENCHMARK_CALLS, polynomial_time * 1000.0, wavetable_time * 1000.0);
+    TEST_MESSAGE(message);
+}
+
+int main(void)
+{
+    UNITY_BEGIN();
+
+    RUN_TEST(test_sine_error);
+    RUN_TEST(test_color);
+    RUN_TEST(test_band_limited_shapes);
+    RUN_TEST(test_combined_types);
+    RUN_TEST(test_oscillator_wavetable_mode);
+    RUN_TEST(test_benchmark_waveform_modes);
+
+    return UNITY_END();
+}
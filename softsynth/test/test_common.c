@@ -1,7 +1,7 @@
 #include "test_common.h"
 
-uint8_t instrument_instructions[6] = {ENVELOPE_ID, OSCILLATOR_ID, OUTPUT_ID, INSTRUMENT_END, ENVELOPE_ID, INSTRUMENT_END};
-uint8_t instrument_parameters[19] =
+uint8_t instrument_instructions[16] = {ENVELOPE_ID, OSCILLATOR_ID, OUTPUT_ID, INSTRUMENT_END, ENVELOPE_ID, INSTRUMENT_END, INSTRUMENT_END, INSTRUMENT_END, INSTRUMENT_END};
+uint8_t instrument_parameters[32] =
     {
         72, 96, 96, 88, 128,
         0, 32, 64, 64, 128, 32, 32, 32,
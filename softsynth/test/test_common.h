@@ -9,15 +9,25 @@
 #define INSTRUMENT_OUTPUT_OFFSET 2
 #define INSTRUMENT_WS_OFFSET 3
 
+// Word of the noise generator state in an oscillator workspace (OSCILLATOR_WS_NOISE_SEED)
+#define OSCILLATOR_NOISE_SEED_WORD 13
+
 #define INSTRUMENT_SIZE (3 + MAX_COMMANDS * MAX_COMMAND_PARAMS)
 #define SYNTH_SIZE INSTRUMENT_SIZE *MAX_NUM_INSTRUMENTS
 
 // Global test data and symbols required by softsynth.o
-extern uint8_t instrument_instructions[6];
-extern uint8_t instrument_parameters[19];
+extern uint8_t instrument_instructions[16];
+extern uint8_t instrument_parameters[32];
 extern uint8_t instrument_patterns[PATTERNS_PER_INSTRUMENT * MAX_NUM_INSTRUMENTS];
 extern uint8_t pattern_array[NOTES_PER_PATTERN * 19];
 extern float vm_stack[16];
 extern float *x8_ptr;
 
+// Convert parameter bytes like transform_parameters does, for calling instructions directly
+static inline void transform_test_parameters(const uint8_t *params, int count, float *transformed)
+{
+    for (int i = 0; i < count; i++)
+        transformed[i] = params[i] / 128.0f;
+}
+
 #endif // TEST_COMMON_H
\ No newline at end of file